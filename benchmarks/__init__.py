@@ -0,0 +1,12 @@
+import os
+import sys
+
+#   The service modules use flat imports from src/, so make them importable for the benchmark tools.
+
+PROJECT_ROOT=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIRECTORY=os.path.join(PROJECT_ROOT, "src")
+DATA_DIRECTORY=os.path.join(PROJECT_ROOT, "data")
+RESULTS_DIRECTORY=os.path.join(PROJECT_ROOT, "benchmarks", "results")
+
+if SRC_DIRECTORY not in sys.path:
+    sys.path.insert(0, SRC_DIRECTORY)
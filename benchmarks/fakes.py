@@ -0,0 +1,294 @@
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+from typing import (
+    List,
+    Dict,
+    Any,
+    Optional,
+    Sequence
+)
+import numpy as np
+from pydantic import (
+    Field,
+    PrivateAttr
+)
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage
+)
+from langchain_core.outputs import (
+    ChatGeneration,
+    ChatResult
+)
+from langchain_qdrant import (
+    SparseEmbeddings,
+    SparseVector
+)
+
+'''
+
+    Deterministic local stand-ins for the Gemini chat model, Gemini embeddings, FastEmbed BM25
+    and the RankLLM reranker. Every stand-in takes a latency (seconds) and an optional jitter
+    fraction so benchmarks can model upstream response times without network access.
+
+'''
+
+TOKEN_PATTERN=re.compile(r"[a-z0-9]+")
+
+INFO_TERMS={
+    "visa", "visas", "refund", "refunds", "policy", "policies", "baggage", "cancel", "cancellation",
+    "cancelled", "rules", "requirements", "tips", "documents", "passport", "allowance", "change", "fees"
+}
+FLIGHT_TERMS={
+    "flight", "flights", "fly", "flying", "airline", "airlines", "business", "economy", "first",
+    "cheapest", "price", "fare", "fares", "ticket", "tickets", "layover", "nonstop", "direct"
+}
+TRAVEL_CLASS_TERMS=[
+    ("premium economy", "premium_economy"),
+    ("first class", "first"),
+    ("business", "business"),
+    ("economy", "economy")
+]
+
+#   Tokenize text into lowercase alphanumeric words.
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+#   Stable 64-bit hash of a token (Python's hash() is salted per process).
+
+def stable_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+#   Upstream latency model: a base delay with optional seeded jitter.
+
+class Latency:
+
+    def __init__(self, seconds: float=0.0, jitter: float=0.0, seed: int=0):
+        self.seconds=seconds
+        self.jitter=jitter
+        self._random=random.Random(seed)
+
+    def sample(self) -> float:
+        if self.seconds<=0:
+            return 0.0
+        return max(0.0, self.seconds*(1+self._random.uniform(-self.jitter, self.jitter)))
+
+    def sleep(self) -> None:
+        delay=self.sample()
+        if delay:
+            time.sleep(delay)
+
+    async def asleep(self) -> None:
+        delay=self.sample()
+        if delay:
+            await asyncio.sleep(delay)
+
+#   Build the vocabulary the fake chat model uses for classification and filter extraction.
+
+def build_vocabulary(flights: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    places={}
+    for flight in flights:
+        for city_key, country_key in (("from", "from_country"), ("to", "to_country")):
+            places[flight[city_key].lower()]=flight[country_key]
+            places[flight[country_key].lower()]=flight[country_key]
+    return {
+        "airlines": sorted({flight["airline"] for flight in flights}, key=len, reverse=True),
+        "places": dict(sorted(places.items(), key=lambda item: len(item[0]), reverse=True)),
+        "aircraft_types": sorted({flight["aircraft_type"] for flight in flights})
+    }
+
+#   Classify a query the same way the prompt instructs the LLM to.
+
+def classify_text(query: str, vocabulary: Dict[str, Any]) -> str:
+    tokens=set(tokenize(query))
+    lowered=query.lower()
+    is_flight=bool(tokens & FLIGHT_TERMS) or any(airline.lower() in lowered for airline in vocabulary["airlines"])
+    is_info=bool(tokens & INFO_TERMS)
+    if is_flight and is_info:
+        return "both"
+    if is_info:
+        return "info_only"
+    return "flight_only" if is_flight else "both"
+
+#   Extract hard filters from a query with simple pattern matching.
+
+def extract_filters(query: str, vocabulary: Dict[str, Any]) -> Dict[str, Any]:
+    lowered=query.lower()
+    filters={
+        "airline": None,
+        "from_country": None,
+        "to_country": None,
+        "travel_class": None,
+        "max_price": None,
+        "refundable": None,
+        "baggage_included": None,
+        "wifi_available": None,
+        "meal_service": None,
+        "aircraft_type": None
+    }
+    for airline in vocabulary["airlines"]:
+        if airline.lower() in lowered:
+            filters["airline"]=airline
+            break
+    for place, country in vocabulary["places"].items():
+        if filters["to_country"] is None and re.search(rf"\bto {re.escape(place)}\b", lowered):
+            filters["to_country"]=country
+        if filters["from_country"] is None and re.search(rf"\bfrom {re.escape(place)}\b", lowered):
+            filters["from_country"]=country
+    for term, travel_class in TRAVEL_CLASS_TERMS:
+        if term in lowered:
+            filters["travel_class"]=travel_class
+            break
+    price_match=re.search(r"(?:under|below|less than|max(?:imum)?)\s*\$?\s*(\d[\d,]*)", lowered)
+    if price_match:
+        filters["max_price"]=int(price_match.group(1).replace(",", ""))
+    if "non-refundable" in lowered or "nonrefundable" in lowered:
+        filters["refundable"]=False
+    elif "refundable" in lowered:
+        filters["refundable"]=True
+    if "wifi" in lowered or "wi-fi" in lowered:
+        filters["wifi_available"]=True
+    if "baggage included" in lowered or "with baggage" in lowered:
+        filters["baggage_included"]=True
+    for aircraft_type in vocabulary["aircraft_types"]:
+        if aircraft_type.lower() in lowered:
+            filters["aircraft_type"]=aircraft_type
+            break
+    return filters
+
+#   Deterministic chat model standing in for ChatGoogleGenerativeAI.
+
+class FakeChatModel(BaseChatModel):
+
+    vocabulary: Dict[str, Any]=Field(default_factory=lambda: {"airlines": [], "places": {}, "aircraft_types": []})
+    latency: float=0.0
+    jitter: float=0.0
+    model: str="fake-gemini"
+    _latency: Latency=PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._latency=Latency(self.latency, self.jitter)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        text="\n".join(str(message.content) for message in messages)
+        queries=re.findall(r"(?:User Query|Question):\s*(.+)", text)
+        query=queries[-1].strip() if queries else text
+        if "query classifier" in text:
+            return classify_text(query, self.vocabulary)
+        if "filter generation assistant" in text:
+            return json.dumps(extract_filters(query, self.vocabulary))
+        context=text.split("Context:", 1)[-1].split("Please answer", 1)[0].strip()
+        return f"Answer to '{query}' based on the provided context: {context[:300]}"
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        content=self._respond(messages)
+        input_tokens=sum(len(str(message.content).split()) for message in messages)
+        output_tokens=len(content.split())
+        message=AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens+output_tokens
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]]=None, run_manager=None, **kwargs) -> ChatResult:
+        self._latency.sleep()
+        return self._result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]]=None, run_manager=None, **kwargs) -> ChatResult:
+        await self._latency.asleep()
+        return self._result(messages)
+
+#   Deterministic dense embeddings: hashed bag of words and bigrams, L2-normalized.
+
+class FakeEmbeddings(Embeddings):
+
+    def __init__(self, size: int=768, latency: float=0.0, jitter: float=0.0):
+        self.size=size
+        self.latency=Latency(latency, jitter)
+
+    def _embed(self, text: str) -> List[float]:
+        vector=np.zeros(self.size, dtype=np.float32)
+        tokens=tokenize(text)
+        for token in tokens+[f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            hashed=stable_hash(token)
+            vector[hashed%self.size]+=1.0 if (hashed>>32)&1 else -1.0
+        norm=np.linalg.norm(vector)
+        return (vector/norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.latency.sleep()
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.latency.sleep()
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await self.latency.asleep()
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await self.latency.asleep()
+        return self._embed(text)
+
+#   Deterministic sparse embeddings standing in for FastEmbed BM25 (term frequencies over hashed tokens).
+
+class FakeSparseEmbeddings(SparseEmbeddings):
+
+    def __init__(self, model_name: str="Qdrant/bm25", **kwargs):
+        self.model_name=model_name
+
+    def _embed(self, text: str) -> SparseVector:
+        counts={}
+        for token in tokenize(text):
+            index=stable_hash(token)%(2**31)
+            counts[index]=counts.get(index, 0)+1.0
+        indices=sorted(counts)
+        return SparseVector(indices=indices, values=[counts[index] for index in indices])
+
+    def embed_documents(self, texts: List[str]) -> List[SparseVector]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> SparseVector:
+        return self._embed(text)
+
+#   Lexical-overlap reranker standing in for RankLLMRerank.
+
+class FakeRankLLMRerank:
+
+    def __init__(self, top_n: int=3, latency: float=0.0, jitter: float=0.0):
+        self.top_n=top_n
+        self.latency=Latency(latency, jitter)
+
+    def _rank(self, documents: Sequence[Document], query: str) -> List[Document]:
+        query_tokens=set(tokenize(query))
+        scored=[
+            (len(query_tokens & set(tokenize(document.page_content))), -index, document)
+            for index, document in enumerate(documents)
+        ]
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [document for _, _, document in scored[:self.top_n]]
+
+    def compress_documents(self, documents: Sequence[Document], query: str, callbacks=None) -> List[Document]:
+        self.latency.sleep()
+        return self._rank(documents, query)
+
+    async def acompress_documents(self, documents: Sequence[Document], query: str, callbacks=None) -> List[Document]:
+        await self.latency.asleep()
+        return self._rank(documents, query)
@@ -0,0 +1,133 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional
+)
+from benchmarks import (
+    PROJECT_ROOT,
+    SRC_DIRECTORY
+)
+
+'''
+
+    Start-up benchmark: measures `python -X importtime` for the service entry points and checks them
+    against the regression budget in benchmarks/import_budget.json.
+
+        python -m benchmarks.import_time                  # measure and check the budget
+        python -m benchmarks.import_time --update-budget  # recalibrate the millisecond budgets
+
+    Besides a time budget per target, the budget lists modules that must stay out of the import graph
+    (heavy upstream clients that are only imported on first use).
+
+'''
+
+BUDGET_FILE=os.path.join(PROJECT_ROOT, "benchmarks", "import_budget.json")
+IMPORTTIME_PATTERN=re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+#   Code executed per target; "graph_app" includes compiling the workflow (the langgraph.json entry point).
+
+TARGETS={
+    "main": "import main",
+    "graph": "import graph",
+    "graph_app": "import graph; graph.app"
+}
+
+#   Run one target in a fresh interpreter and parse its import times.
+
+def measure_target(code: str) -> Dict[str, Any]:
+    start_time=time.perf_counter()
+    completed=subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SRC_DIRECTORY,
+        env={**os.environ, "PYTHONPATH": SRC_DIRECTORY},
+        capture_output=True,
+        text=True
+    )
+    spawn_ms=(time.perf_counter()-start_time)*1000
+    if completed.returncode!=0:
+        raise RuntimeError(f"'{code}' failed: {completed.stderr.strip().splitlines()[-1:]}")
+    modules={}
+    total_us=0
+    for line in completed.stderr.splitlines():
+        match=IMPORTTIME_PATTERN.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module=int(match.group(1)), int(match.group(2)), match.group(3), match.group(4)
+        modules[module]={"self_us": self_us, "cumulative_us": cumulative_us}
+        if len(indent)==1:
+            total_us+=cumulative_us
+    return {"import_ms": total_us/1000, "spawn_ms": spawn_ms, "modules": modules}
+
+#   Measure a target several times and keep medians plus the heaviest modules of the last run.
+
+def benchmark_target(code: str, repeats: int) -> Dict[str, Any]:
+    runs=[measure_target(code) for _ in range(repeats)]
+    heaviest=sorted(runs[-1]["modules"].items(), key=lambda item: item[1]["cumulative_us"], reverse=True)[:15]
+    return {
+        "import_ms": round(statistics.median(run["import_ms"] for run in runs), 1),
+        "spawn_ms": round(statistics.median(run["spawn_ms"] for run in runs), 1),
+        "modules": sorted(runs[-1]["modules"]),
+        "heaviest": [{"module": module, "cumulative_ms": round(times["cumulative_us"]/1000, 1)} for module, times in heaviest]
+    }
+
+def load_budget() -> Dict[str, Any]:
+    with open(BUDGET_FILE, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+#   Compare measurements with the budget; returns a list of violations.
+
+def check_budget(results: Dict[str, Dict[str, Any]], budget: Dict[str, Any]) -> List[str]:
+    violations=[]
+    for target, result in results.items():
+        target_budget=budget["targets"].get(target, {})
+        for forbidden in target_budget.get("forbidden_modules", []):
+            imported=[module for module in result["modules"] if module==forbidden or module.startswith(f"{forbidden}.")]
+            if imported:
+                violations.append(f"{target}: imports {forbidden} at start-up")
+        max_import_ms=target_budget.get("max_import_ms")
+        if max_import_ms is not None and result["import_ms"]>max_import_ms:
+            violations.append(f"{target}: import time {result['import_ms']} ms exceeds budget {max_import_ms} ms")
+    return violations
+
+def parse_args(argv: Optional[List[str]]=None) -> argparse.Namespace:
+    parser=argparse.ArgumentParser(description="Import-time start-up benchmark with a regression budget")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS), choices=list(TARGETS))
+    parser.add_argument("--update-budget", action="store_true", help="Set each millisecond budget to the measured median plus headroom")
+    parser.add_argument("--output", default=None, help="Write the measurements as JSON")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]]=None) -> int:
+    args=parse_args(argv)
+    budget=load_budget()
+    results={target: benchmark_target(TARGETS[target], args.repeats) for target in args.targets}
+    for target, result in results.items():
+        print(f"{target}: import {result['import_ms']} ms, interpreter spawn {result['spawn_ms']} ms")
+        for entry in result["heaviest"][:8]:
+            print(f"    {entry['module']:<48}{entry['cumulative_ms']:>10.1f} ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if args.update_budget:
+        for target, result in results.items():
+            budget["targets"].setdefault(target, {})["max_import_ms"]=round(result["import_ms"]*(1+budget.get("headroom", 0.2)), 1)
+        with open(BUDGET_FILE, "w", encoding="utf-8") as file:
+            json.dump(budget, file, indent=2)
+            file.write("\n")
+        print(f"Updated {BUDGET_FILE}")
+    violations=check_budget(results, budget)
+    for violation in violations:
+        print(f"BUDGET VIOLATION – {violation}")
+    return 1 if violations else 0
+
+if __name__=="__main__":
+    sys.exit(main())
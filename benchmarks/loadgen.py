@@ -0,0 +1,376 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+from bisect import bisect_left
+from collections import Counter
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional,
+    Tuple
+)
+import httpx
+from benchmarks import RESULTS_DIRECTORY
+from benchmarks.offline import load_flights
+from benchmarks.queries import build_query_distribution
+from metrics import summarize_latencies
+
+'''
+
+    Concurrent HTTP load generator for the FastAPI service.
+
+    Drives /search, /ingest or a mix of both, either open-loop at a target RPS or closed-loop at a fixed
+    concurrency, and records latency histograms and error rates per endpoint. The "ramp" command steps
+    concurrency up until throughput stops growing, latency breaks the SLO or errors appear, and reports
+    the saturation point. /ingest latency covers job submission only; the ingestion itself runs in the
+    background and shows up as its effect on /search latency (and 429s once the job queue is full).
+    Point it at benchmarks.offline_server to run without live upstreams:
+
+        python -m benchmarks.offline_server --port 8001 &
+        python -m benchmarks.loadgen run --scenario mix --rps 20 --duration 60 --output run-a.json
+        python -m benchmarks.loadgen ramp --scenario search --max-concurrency 64 --output ramp-a.json
+        python -m benchmarks.loadgen compare run-a.json run-b.json
+
+'''
+
+logger=logging.getLogger(__name__)
+
+HISTOGRAM_BUCKETS_MS=[5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+INGEST_FILES=[
+    ("data/test.txt", "text"),
+    ("data/refund_policies.md", "markdown"),
+    ("data/visa_rules.md", "markdown")
+]
+
+#   Latency histogram with fixed millisecond buckets plus raw samples for percentiles.
+
+class LatencyHistogram:
+
+    def __init__(self):
+        self.counts=[0]*(len(HISTOGRAM_BUCKETS_MS)+1)
+        self.samples=[]
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect_left(HISTOGRAM_BUCKETS_MS, seconds*1000)]+=1
+        self.samples.append(seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels=[f"<={bucket}ms" for bucket in HISTOGRAM_BUCKETS_MS]+[f">{HISTOGRAM_BUCKETS_MS[-1]}ms"]
+        return {
+            **summarize_latencies(self.samples),
+            "histogram": dict(zip(labels, self.counts))
+        }
+
+#   Per-endpoint outcome statistics for one load phase.
+
+class EndpointStats:
+
+    def __init__(self):
+        self.latency=LatencyHistogram()
+        self.statuses=Counter()
+        self.errors=Counter()
+
+    @property
+    def total(self) -> int:
+        return sum(self.statuses.values())+sum(self.errors.values())
+
+    @property
+    def failures(self) -> int:
+        return sum(count for status, count in self.statuses.items() if status>=400)+sum(self.errors.values())
+
+    def to_dict(self, wall_seconds: float) -> Dict[str, Any]:
+        return {
+            "requests": self.total,
+            "throughput_rps": round(self.total/wall_seconds, 3) if wall_seconds else 0.0,
+            "error_rate": round(self.failures/self.total, 4) if self.total else 0.0,
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "errors": dict(self.errors),
+            "latency": self.latency.to_dict()
+        }
+
+#   Generates request payloads for a scenario from the realistic query distribution.
+
+class Workload:
+
+    def __init__(self, scenario: str, collection: str, ingest_collection: str, ingest_ratio: float, seed: int=7):
+        self.scenario=scenario
+        self.collection=collection
+        self.ingest_collection=ingest_collection
+        self.ingest_ratio=ingest_ratio
+        self.queries=build_query_distribution(load_flights(), size=500, seed=seed)
+        self._random=random.Random(seed)
+
+    def next_request(self) -> Tuple[str, Dict[str, Any]]:
+        use_ingest=self.scenario=="ingest" or (self.scenario=="mix" and self._random.random()<self.ingest_ratio)
+        if use_ingest:
+            filename, file_type=self._random.choice(INGEST_FILES)
+            return "/ingest", {"filename": filename, "file_type": file_type, "collection_name": self.ingest_collection}
+        return "/search", {"query": self._random.choice(self.queries), "collection_name": self.collection}
+
+#   Issue one request and record its outcome.
+
+async def send_request(client: httpx.AsyncClient, workload: Workload, stats: Dict[str, EndpointStats]) -> None:
+    path, payload=workload.next_request()
+    endpoint_stats=stats.setdefault(path, EndpointStats())
+    start_time=time.perf_counter()
+    try:
+        response=await client.post(path, json=payload)
+        endpoint_stats.statuses[response.status_code]+=1
+    except httpx.TimeoutException:
+        endpoint_stats.errors["timeout"]+=1
+    except httpx.HTTPError as e:
+        endpoint_stats.errors[type(e).__name__]+=1
+    endpoint_stats.latency.record(time.perf_counter()-start_time)
+
+#   Closed-loop phase: a fixed number of workers each keep one request in flight.
+
+async def run_closed_loop(client: httpx.AsyncClient, workload: Workload, concurrency: int, duration: float) -> Dict[str, Any]:
+    stats={}
+    deadline=time.perf_counter()+duration
+
+    async def worker() -> None:
+        while time.perf_counter()<deadline:
+            await send_request(client, workload, stats)
+
+    start_time=time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize_phase(stats, time.perf_counter()-start_time, {"mode": "concurrency", "concurrency": concurrency})
+
+#   Open-loop phase: requests start on a fixed (or Poisson) schedule regardless of response times.
+
+async def run_open_loop(
+    client: httpx.AsyncClient,
+    workload: Workload,
+    rps: float,
+    duration: float,
+    max_inflight: int,
+    poisson: bool=False
+) -> Dict[str, Any]:
+    stats={}
+    tasks=set()
+    dropped=0
+    rng=random.Random(11)
+    start_time=time.perf_counter()
+    next_start=start_time
+    while next_start<start_time+duration:
+        delay=next_start-time.perf_counter()
+        if delay>0:
+            await asyncio.sleep(delay)
+        if len(tasks)>=max_inflight:
+            dropped+=1
+        else:
+            task=asyncio.create_task(send_request(client, workload, stats))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        next_start+=rng.expovariate(rps) if poisson else 1/rps
+    if tasks:
+        await asyncio.gather(*tasks)
+    result=summarize_phase(stats, time.perf_counter()-start_time, {"mode": "rps", "target_rps": rps, "max_inflight": max_inflight})
+    result["dropped"]=dropped
+    return result
+
+#   Combine endpoint statistics for a phase.
+
+def summarize_phase(stats: Dict[str, EndpointStats], wall_seconds: float, config: Dict[str, Any]) -> Dict[str, Any]:
+    total=sum(endpoint.total for endpoint in stats.values())
+    failures=sum(endpoint.failures for endpoint in stats.values())
+    all_samples=[sample for endpoint in stats.values() for sample in endpoint.latency.samples]
+    return {
+        **config,
+        "wall_seconds": round(wall_seconds, 3),
+        "requests": total,
+        "throughput_rps": round(total/wall_seconds, 3) if wall_seconds else 0.0,
+        "error_rate": round(failures/total, 4) if total else 0.0,
+        "latency": summarize_latencies(all_samples),
+        "endpoints": {path: endpoint.to_dict(wall_seconds) for path, endpoint in sorted(stats.items())}
+    }
+
+#   Step concurrency up and find where the service saturates.
+
+async def run_ramp(
+    client: httpx.AsyncClient,
+    workload: Workload,
+    start: int,
+    step: int,
+    maximum: int,
+    step_duration: float,
+    slo_ms: float,
+    max_error_rate: float,
+    min_gain: float
+) -> Dict[str, Any]:
+    steps=[]
+    saturation=None
+    concurrency=start
+    while concurrency<=maximum:
+        phase=await run_closed_loop(client, workload, concurrency, step_duration)
+        steps.append(phase)
+        logger.warning(f"concurrency={concurrency} throughput={phase['throughput_rps']} rps p95={phase['latency']['p95_ms']} ms errors={phase['error_rate']}")
+        reasons=[]
+        if phase["latency"]["p95_ms"]>slo_ms:
+            reasons.append(f"p95 {phase['latency']['p95_ms']} ms above SLO {slo_ms} ms")
+        if phase["error_rate"]>max_error_rate:
+            reasons.append(f"error rate {phase['error_rate']} above {max_error_rate}")
+        if len(steps)>1 and phase["throughput_rps"]<steps[-2]["throughput_rps"]*(1+min_gain):
+            reasons.append(f"throughput gain below {min_gain*100:.0f}%")
+        if reasons:
+            saturation={
+                "concurrency": concurrency,
+                "reasons": reasons,
+                "last_healthy_concurrency": steps[-2]["concurrency"] if len(steps)>1 else None
+            }
+            break
+        concurrency+=step
+    best=max(steps, key=lambda phase: phase["throughput_rps"]) if steps else None
+    return {
+        "mode": "ramp",
+        "steps": steps,
+        "saturation": saturation,
+        "max_throughput_rps": best["throughput_rps"] if best else 0.0,
+        "max_throughput_concurrency": best["concurrency"] if best else None
+    }
+
+#   Compare two load test results (run or ramp) and return rows of metric changes.
+
+def compare_runs(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def change(before, after):
+        return round(100*(after-before)/before, 2) if before else None
+
+    rows=[]
+    if baseline["result"]["mode"]=="ramp" or current["result"]["mode"]=="ramp":
+        for key in ("max_throughput_rps", "max_throughput_concurrency"):
+            before=baseline["result"].get(key) or 0
+            after=current["result"].get(key) or 0
+            rows.append({"name": "ramp", "metric": key, "baseline": before, "current": after, "change_pct": change(before, after)})
+        return rows
+    for key in ("throughput_rps", "error_rate"):
+        before=baseline["result"][key]
+        after=current["result"][key]
+        rows.append({"name": "overall", "metric": key, "baseline": before, "current": after, "change_pct": change(before, after)})
+    endpoints=sorted(set(baseline["result"]["endpoints"]) | set(current["result"]["endpoints"]))
+    for path in endpoints:
+        before_stats=baseline["result"]["endpoints"].get(path)
+        after_stats=current["result"]["endpoints"].get(path)
+        if not before_stats or not after_stats:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            before=before_stats["latency"][key]
+            after=after_stats["latency"][key]
+            rows.append({"name": path, "metric": key, "baseline": before, "current": after, "change_pct": change(before, after)})
+        for key in ("throughput_rps", "error_rate"):
+            before=before_stats[key]
+            after=after_stats[key]
+            rows.append({"name": path, "metric": key, "baseline": before, "current": after, "change_pct": change(before, after)})
+    return rows
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    lines=[f"{'name':<12}{'metric':<28}{'baseline':>12}{'current':>12}{'change':>10}"]
+    for row in rows:
+        change="n/a" if row["change_pct"] is None else f"{row['change_pct']:+.1f}%"
+        lines.append(f"{row['name']:<12}{row['metric']:<28}{row['baseline']:>12}{row['current']:>12}{change:>10}")
+    return "\n".join(lines)
+
+def format_phase(phase: Dict[str, Any]) -> str:
+    lines=[f"{'endpoint':<12}{'requests':>10}{'rps':>10}{'errors':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+    for path, endpoint in phase["endpoints"].items():
+        latency=endpoint["latency"]
+        lines.append(f"{path:<12}{endpoint['requests']:>10}{endpoint['throughput_rps']:>10}{endpoint['error_rate']:>10}{latency['p50_ms']:>10.0f}{latency['p95_ms']:>10.0f}{latency['p99_ms']:>10.0f}")
+    return "\n".join(lines)
+
+def parse_args(argv: Optional[List[str]]=None) -> argparse.Namespace:
+    parser=argparse.ArgumentParser(description="Concurrent HTTP load generator for the KAVAK API")
+    subparsers=parser.add_subparsers(dest="command", required=True)
+    for name in ("run", "ramp"):
+        command=subparsers.add_parser(name)
+        command.add_argument("--url", default="http://127.0.0.1:8001")
+        command.add_argument("--scenario", choices=["search", "ingest", "mix"], default="search")
+        command.add_argument("--collection", default="flights")
+        command.add_argument("--ingest-collection", default="loadtest_ingest")
+        command.add_argument("--ingest-ratio", type=float, default=0.1, help="Share of /ingest requests in the mix scenario")
+        command.add_argument("--timeout", type=float, default=60.0)
+        command.add_argument("--seed", type=int, default=7)
+        command.add_argument("--output", default=None)
+        command.add_argument("--label", default=None, help="Free-form label stored with the result")
+    run=subparsers.choices["run"]
+    run.add_argument("--rps", type=float, default=None, help="Open-loop target requests per second")
+    run.add_argument("--concurrency", type=int, default=8, help="Closed-loop concurrency (used when --rps is not set)")
+    run.add_argument("--poisson", action="store_true", help="Poisson arrivals instead of a fixed interval")
+    run.add_argument("--max-inflight", type=int, default=512)
+    run.add_argument("--duration", type=float, default=30.0)
+    ramp=subparsers.choices["ramp"]
+    ramp.add_argument("--start-concurrency", type=int, default=1)
+    ramp.add_argument("--step", type=int, default=4)
+    ramp.add_argument("--max-concurrency", type=int, default=64)
+    ramp.add_argument("--step-duration", type=float, default=20.0)
+    ramp.add_argument("--slo-ms", type=float, default=5000.0, help="p95 latency SLO in milliseconds")
+    ramp.add_argument("--max-error-rate", type=float, default=0.01)
+    ramp.add_argument("--min-gain", type=float, default=0.05, help="Minimum relative throughput gain per step")
+    compare=subparsers.add_parser("compare")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+async def run_command(args: argparse.Namespace) -> Dict[str, Any]:
+    workload=Workload(args.scenario, args.collection, args.ingest_collection, args.ingest_ratio, seed=args.seed)
+    limits=httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        if args.command=="ramp":
+            return await run_ramp(
+                client,
+                workload,
+                start=args.start_concurrency,
+                step=args.step,
+                maximum=args.max_concurrency,
+                step_duration=args.step_duration,
+                slo_ms=args.slo_ms,
+                max_error_rate=args.max_error_rate,
+                min_gain=args.min_gain
+            )
+        if args.rps:
+            return await run_open_loop(client, workload, args.rps, args.duration, args.max_inflight, poisson=args.poisson)
+        return await run_closed_loop(client, workload, args.concurrency, args.duration)
+
+def main(argv: Optional[List[str]]=None) -> int:
+    args=parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="%(asctime)s-%(levelname)s-%(name)s-%(message)s")
+    if args.command=="compare":
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline=json.load(file)
+        with open(args.current, "r", encoding="utf-8") as file:
+            current=json.load(file)
+        print(format_comparison(compare_runs(baseline, current)))
+        return 0
+    result=asyncio.run(run_command(args))
+    report={
+        "benchmark": "loadgen",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "label": args.label,
+        "url": args.url,
+        "scenario": args.scenario,
+        "result": result
+    }
+    output=args.output or os.path.join(RESULTS_DIRECTORY, f"loadgen-{args.command}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    if result["mode"]=="ramp":
+        for phase in result["steps"]:
+            print(f"concurrency {phase['concurrency']}:")
+            print(format_phase(phase))
+        print(f"saturation: {result['saturation']}")
+        print(f"max throughput: {result['max_throughput_rps']} rps at concurrency {result['max_throughput_concurrency']}")
+    else:
+        print(format_phase(result))
+        if "dropped" in result:
+            print(f"dropped (max in-flight reached): {result['dropped']}")
+    print(f"Results written to {output}")
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import logging
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional
+)
+from qdrant_client import QdrantClient
+from benchmarks import DATA_DIRECTORY
+from benchmarks.fakes import (
+    FakeChatModel,
+    FakeEmbeddings,
+    FakeSparseEmbeddings,
+    FakeRankLLMRerank,
+    build_vocabulary
+)
+
+logger=logging.getLogger(__name__)
+
+#   Data files loaded into the offline collection, with their declared file types.
+
+OFFLINE_DATA_FILES=[
+    ("flights.json", "json"),
+    ("refund_policies.md", "markdown"),
+    ("visa_rules.md", "markdown"),
+    ("test.txt", "text")
+]
+
+#   Upstream latencies (seconds) used when none are given – rough medians observed in production.
+
+DEFAULT_LATENCIES={
+    "chat": 0.6,
+    "embedding": 0.08,
+    "rerank": 0.9
+}
+
+#   Replace a module attribute and every already-imported alias of it (modules use "from x import y").
+
+def swap_attribute(module, name: str, replacement) -> None:
+    original=getattr(module, name)
+    for loaded_module in list(sys.modules.values()):
+        if loaded_module is not None and getattr(loaded_module, name, None) is original:
+            setattr(loaded_module, name, replacement)
+
+#   Load the generated flight records.
+
+def load_flights(path: Optional[str]=None) -> List[Dict[str, Any]]:
+    with open(path or os.path.join(DATA_DIRECTORY, "flights.json"), "r", encoding="utf-8") as file:
+        return json.load(file)
+
+#   Handle to the installed stand-ins.
+
+class OfflineStack:
+
+    def __init__(self, client: QdrantClient, chat_model: FakeChatModel, embeddings: FakeEmbeddings, latencies: Dict[str, float]):
+        self.client=client
+        self.chat_model=chat_model
+        self.embeddings=embeddings
+        self.latencies=latencies
+
+#   Install the local stand-ins for Gemini, OpenAI (RankLLM) and Qdrant into the service modules.
+
+def install_offline_stack(
+    latencies: Optional[Dict[str, float]]=None,
+    jitter: float=0.0
+) -> OfflineStack:
+    import client_qdrant
+    import embeddings as embeddings_module
+    import graph
+    latencies={**DEFAULT_LATENCIES, **(latencies or {})}
+    client=QdrantClient(location=":memory:")
+    dense_embeddings=FakeEmbeddings(latency=latencies["embedding"], jitter=jitter)
+    chat_model=FakeChatModel(
+        vocabulary=build_vocabulary(load_flights()),
+        latency=latencies["chat"],
+        jitter=jitter
+    )
+    swap_attribute(client_qdrant, "get_qdrant_client", lambda timeout=30: client)
+    swap_attribute(client_qdrant, "FastEmbedSparse", FakeSparseEmbeddings)
+    client_qdrant.QDRANT_ASYNC_SEARCH=False    #   An in-memory async client would not share the sync client's storage.
+    swap_attribute(embeddings_module, "get_embedding_model", lambda model_name="text-embedding-004": dense_embeddings)
+    swap_attribute(graph, "get_reranker", lambda top_n, model=None: FakeRankLLMRerank(top_n=top_n, latency=latencies["rerank"], jitter=jitter))
+    graph.llm=chat_model
+    graph.embeddings=dense_embeddings
+    graph.client=client
+    logger.info(f"Installed offline stack with latencies {latencies}")
+    return OfflineStack(client, chat_model, dense_embeddings, latencies)
+
+#   Create the collection and ingest the bundled data files into the in-memory Qdrant.
+
+async def load_offline_data(collection_name: str="flights") -> Dict[str, int]:
+    from ingestion import (
+        create_collection,
+        ingest_data_to_qdrant
+    )
+    from models import FileType
+    result=await create_collection(collection_name=collection_name)
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    counts={}
+    for filename, file_type in OFFLINE_DATA_FILES:
+        counts[filename]=await ingest_data_to_qdrant(
+            file_path=os.path.join(DATA_DIRECTORY, filename),
+            file_type=FileType(file_type),
+            collection_name=collection_name
+        )
+    logger.info(f"Loaded offline collection '{collection_name}': {counts}")
+    return counts
@@ -0,0 +1,63 @@
+import sys
+import asyncio
+import logging
+import argparse
+from typing import (
+    List,
+    Optional
+)
+import uvicorn
+from benchmarks.offline import (
+    DEFAULT_LATENCIES,
+    install_offline_stack,
+    load_offline_data
+)
+
+'''
+
+    Serve the FastAPI app from src/main.py against the offline stand-ins, so load tests run anywhere:
+
+        python -m benchmarks.offline_server --port 8001 --chat-latency 0.6
+
+'''
+
+logger=logging.getLogger(__name__)
+
+def parse_args(argv: Optional[List[str]]=None) -> argparse.Namespace:
+    parser=argparse.ArgumentParser(description="Run the API server with offline stand-in upstreams")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--collection", default="flights", help="Collection loaded with data/ for /search")
+    parser.add_argument("--ingest-collection", default="loadtest_ingest", help="Empty collection created for /ingest traffic")
+    parser.add_argument("--chat-latency", type=float, default=DEFAULT_LATENCIES["chat"])
+    parser.add_argument("--embedding-latency", type=float, default=DEFAULT_LATENCIES["embedding"])
+    parser.add_argument("--rerank-latency", type=float, default=DEFAULT_LATENCIES["rerank"])
+    parser.add_argument("--jitter", type=float, default=0.1)
+    return parser.parse_args(argv)
+
+#   Prepare the stand-ins and collections before the app (and its imports) are loaded.
+
+async def prepare(args: argparse.Namespace) -> None:
+    from ingestion import create_collection
+    await load_offline_data(args.collection)
+    result=await create_collection(collection_name=args.ingest_collection)
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+
+def main(argv: Optional[List[str]]=None) -> int:
+    args=parse_args(argv)
+    install_offline_stack(
+        latencies={
+            "chat": args.chat_latency,
+            "embedding": args.embedding_latency,
+            "rerank": args.rerank_latency
+        },
+        jitter=args.jitter
+    )
+    asyncio.run(prepare(args))
+    from main import app
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
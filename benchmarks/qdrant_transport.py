@@ -0,0 +1,197 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional
+)
+import benchmarks  # noqa: F401
+from metrics import summarize_latencies
+
+'''
+
+    Qdrant transport benchmark: compares the sync REST client driven from a thread pool (what the
+    LangChain vector store does) with the shared AsyncQdrantClient over REST and over gRPC, for search,
+    scroll and batch upsert against a local Qdrant.
+
+        docker run -p 6333:6333 -p 6334:6334 qdrant/qdrant
+        python -m benchmarks.qdrant_transport --url http://localhost:6333 --points 20000 --concurrency 32
+
+    Every transport works on its own scratch collection filled with random vectors and flight-like payloads.
+
+'''
+
+TRANSPORTS=["rest_threads", "async_rest", "async_grpc"]
+AIRLINES=["Emirates", "Qatar Airways", "Lufthansa", "Delta", "Turkish Airlines", "Singapore Airlines"]
+TRAVEL_CLASSES=["economy", "premium economy", "business", "first"]
+
+#   Random unit vector.
+
+def random_vector(dimension: int, rng: random.Random) -> List[float]:
+    vector=[rng.gauss(0, 1) for _ in range(dimension)]
+    norm=sum(value*value for value in vector)**0.5
+    return [value/norm for value in vector]
+
+#   Flight-like payload in the LangChain layout.
+
+def random_payload(index: int, rng: random.Random) -> Dict[str, Any]:
+    return {
+        "page_content": f"Flight {index}",
+        "metadata": {
+            "flight_id": f"FL{index}",
+            "airline": rng.choice(AIRLINES),
+            "travel_class": rng.choice(TRAVEL_CLASSES),
+            "price_usd": rng.randint(100, 5000)
+        }
+    }
+
+def build_points(count: int, dimension: int, seed: int) -> List[Any]:
+    from qdrant_client.models import PointStruct
+    rng=random.Random(seed)
+    return [PointStruct(id=index, vector=random_vector(dimension, rng), payload=random_payload(index, rng)) for index in range(count)]
+
+def create_sync_client(url: str, api_key: Optional[str]):
+    from qdrant_client import QdrantClient
+    return QdrantClient(url=url, api_key=api_key, prefer_grpc=False, timeout=60)
+
+def create_async_client(url: str, api_key: Optional[str], prefer_grpc: bool, grpc_port: int):
+    import client_qdrant
+    os.environ["QDRANT_URL"]=url
+    if api_key:
+        os.environ["QDRANT_API_KEY"]=api_key
+    client_qdrant.QDRANT_GRPC_PORT=grpc_port
+    return client_qdrant.create_async_qdrant_client(prefer_grpc=prefer_grpc, timeout=60)
+
+def create_scratch_collection(client, collection_name: str, dimension: int) -> None:
+    from qdrant_client.models import (
+        VectorParams,
+        Distance
+    )
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+    client.create_collection(collection_name, vectors_config=VectorParams(size=dimension, distance=Distance.COSINE))
+
+#   Run `operation` for every item with at most `concurrency` in flight, returning per-call latencies in ms.
+
+async def run_async_operations(operation, items: List[Any], concurrency: int) -> List[float]:
+    semaphore=asyncio.Semaphore(concurrency)
+    latencies=[]
+
+    async def run_one(item):
+        async with semaphore:
+            start_time=time.perf_counter()
+            await operation(item)
+            latencies.append((time.perf_counter()-start_time)*1000)
+
+    await asyncio.gather(*(run_one(item) for item in items))
+    return latencies
+
+def run_threaded_operations(operation, items: List[Any], concurrency: int) -> List[float]:
+
+    def run_one(item):
+        start_time=time.perf_counter()
+        operation(item)
+        return (time.perf_counter()-start_time)*1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(run_one, items))
+
+def summarize_phase(latencies: List[float], elapsed_seconds: float) -> Dict[str, Any]:
+    return {**summarize_latencies(latencies), "throughput_per_s": round(len(latencies)/elapsed_seconds, 1) if elapsed_seconds else 0.0}
+
+#   Upsert, search and scroll through one transport; returns a summary per operation.
+
+async def benchmark_transport(transport: str, args: argparse.Namespace, points: List[Any], queries: List[List[float]]) -> Dict[str, Any]:
+    from qdrant_client.models import (
+        Filter,
+        FieldCondition,
+        MatchValue
+    )
+    collection_name=f"{args.collection_prefix}_{transport}"
+    sync_client=create_sync_client(args.url, args.api_key)
+    create_scratch_collection(sync_client, collection_name, args.dimension)
+    batches=[points[index:index+args.batch_size] for index in range(0, len(points), args.batch_size)]
+    query_filter=Filter(must=[FieldCondition(key="metadata.airline", match=MatchValue(value=AIRLINES[0]))])
+    offsets=list(range(0, len(points), max(1, len(points)//len(queries))))[:len(queries)]
+    results={}
+    if transport=="rest_threads":
+        phases={
+            "batch_upsert": (lambda batch: sync_client.upsert(collection_name, points=batch, wait=True), batches),
+            "search": (lambda vector: sync_client.query_points(collection_name, query=vector, limit=args.k), queries),
+            "filtered_search": (lambda vector: sync_client.query_points(collection_name, query=vector, query_filter=query_filter, limit=args.k), queries),
+            "scroll": (lambda offset: sync_client.scroll(collection_name, limit=args.k, offset=offset, with_vectors=False), offsets)
+        }
+        for phase, (operation, items) in phases.items():
+            start_time=time.perf_counter()
+            latencies=await asyncio.get_running_loop().run_in_executor(None, run_threaded_operations, operation, items, args.concurrency)
+            results[phase]=summarize_phase(latencies, time.perf_counter()-start_time)
+    else:
+        async_client=create_async_client(args.url, args.api_key, transport=="async_grpc", args.grpc_port)
+        phases={
+            "batch_upsert": (lambda batch: async_client.upsert(collection_name, points=batch, wait=True), batches),
+            "search": (lambda vector: async_client.query_points(collection_name, query=vector, limit=args.k), queries),
+            "filtered_search": (lambda vector: async_client.query_points(collection_name, query=vector, query_filter=query_filter, limit=args.k), queries),
+            "scroll": (lambda offset: async_client.scroll(collection_name, limit=args.k, offset=offset, with_vectors=False), offsets)
+        }
+        try:
+            for phase, (operation, items) in phases.items():
+                start_time=time.perf_counter()
+                latencies=await run_async_operations(operation, items, args.concurrency)
+                results[phase]=summarize_phase(latencies, time.perf_counter()-start_time)
+        finally:
+            await async_client.close()
+    if not args.keep_collections:
+        sync_client.delete_collection(collection_name)
+    sync_client.close()
+    return results
+
+def print_results(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"{'operation':<18}{'transport':<15}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}")
+    operations=next(iter(results.values())).keys()
+    for operation in operations:
+        for transport, transport_results in results.items():
+            summary=transport_results[operation]
+            print(f"{operation:<18}{transport:<15}{summary['p50_ms']:>10.1f}{summary['p95_ms']:>10.1f}{summary['p99_ms']:>10.1f}{summary['throughput_per_s']:>10.1f}")
+
+def parse_args(argv: Optional[List[str]]=None) -> argparse.Namespace:
+    parser=argparse.ArgumentParser(description="Compare REST+threads, async REST and async gRPC Qdrant transports")
+    parser.add_argument("--url", default="http://localhost:6333")
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--grpc-port", type=int, default=6334)
+    parser.add_argument("--transports", nargs="+", default=TRANSPORTS, choices=TRANSPORTS)
+    parser.add_argument("--points", type=int, default=10000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--collection-prefix", default="transport_benchmark")
+    parser.add_argument("--keep-collections", action="store_true")
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    return parser.parse_args(argv)
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    points=build_points(args.points, args.dimension, args.seed)
+    rng=random.Random(args.seed+1)
+    queries=[random_vector(args.dimension, rng) for _ in range(args.queries)]
+    return {transport: await benchmark_transport(transport, args, points, queries) for transport in args.transports}
+
+def main(argv: Optional[List[str]]=None) -> int:
+    args=parse_args(argv)
+    results=asyncio.run(run(args))
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"config": vars(args), "results": results}, file, indent=2)
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
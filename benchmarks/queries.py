@@ -0,0 +1,70 @@
+import random
+from typing import (
+    List,
+    Dict,
+    Any,
+    Sequence
+)
+
+#   Fixed query mix for the search benchmark – covers every graph path (flight_only, info_only, both).
+
+QUERY_MIX=[
+    "flights from New York to London under $1000",
+    "Emirates business class flights to Dubai",
+    "flights to Japan with layover in Singapore",
+    "cheapest refundable flights to Turkey",
+    "first class flights from Singapore with wifi",
+    "Qatar Airways economy flights to India under $800",
+    "refund policies for cancelled flights",
+    "visa requirements for US citizens traveling to India",
+    "baggage allowance for international flights",
+    "what happens if I cancel within 24 hours",
+    "flights to Turkey and visa requirements",
+    "Emirates flights to Dubai and their baggage policy"
+]
+
+INFO_QUERIES=[
+    "refund policies for cancelled flights",
+    "visa requirements for US citizens traveling to India",
+    "baggage allowance for international flights",
+    "what happens if I cancel within 24 hours",
+    "do I need a transit visa for a layover in the UK",
+    "can I change my ticket date without a fee"
+]
+
+TRAVEL_CLASS_LABELS={
+    "economy": "economy",
+    "premium_economy": "premium economy",
+    "business": "business class",
+    "first": "first class"
+}
+
+#   Build a realistic query distribution from the flights dataset – popular routes appear as often as in the data.
+
+def build_query_distribution(
+    flights: Sequence[Dict[str, Any]],
+    size: int=200,
+    seed: int=7,
+    info_share: float=0.2,
+    mixed_share: float=0.1
+) -> List[str]:
+    rng=random.Random(seed)
+    templates=[
+        lambda f: f"flights from {f['from']} to {f['to']}",
+        lambda f: f"{f['airline']} {TRAVEL_CLASS_LABELS[f['travel_class']]} flights to {f['to']}",
+        lambda f: f"{TRAVEL_CLASS_LABELS[f['travel_class']]} flights to {f['to_country']} under ${int(round(f['price_usd'], -2))+100}",
+        lambda f: f"cheapest flights from {f['from']} to {f['to']}",
+        lambda f: f"refundable flights to {f['to']} with wifi",
+        lambda f: f"{f['airline']} flights from {f['from_country']} on a {f['aircraft_type']}"
+    ]
+    queries=[]
+    for _ in range(size):
+        draw=rng.random()
+        flight=rng.choice(flights)
+        if draw<info_share:
+            queries.append(rng.choice(INFO_QUERIES))
+        elif draw<info_share+mixed_share:
+            queries.append(f"flights to {flight['to_country']} and visa requirements")
+        else:
+            queries.append(rng.choice(templates)(flight))
+    return queries
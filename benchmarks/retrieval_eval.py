@@ -0,0 +1,359 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import itertools
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional,
+    Tuple
+)
+from benchmarks import (
+    DATA_DIRECTORY,
+    RESULTS_DIRECTORY
+)
+from benchmarks.offline import (
+    DEFAULT_LATENCIES,
+    install_offline_stack,
+    load_offline_data,
+    load_flights
+)
+from metrics import summarize_latencies
+
+'''
+
+    Retrieval quality vs latency evaluation harness.
+
+    Flight queries are generated from data/flights.json together with the constraints that produced them,
+    so their relevant flights are known exactly; policy questions are hand-labelled against the markdown
+    documents. Every retrieval configuration (dense/hybrid, filter strategy, candidate depth k, rerank
+    backend and top_n) is scored on recall@5, recall@10, MRR and retrieval pipeline latency (filter
+    extraction + search + rerank), and the result is printed as a Pareto table:
+
+        python -m benchmarks.retrieval_eval --max-queries 60 --output benchmarks/results/retrieval.json
+
+    recall@k is capped: hits in the top k divided by min(relevant, k), so queries with more relevant
+    flights than k can still reach 1.0.
+
+'''
+
+logger=logging.getLogger(__name__)
+
+MAX_RELEVANT=25
+
+#   Query templates over the constraint combinations a user typically states.
+
+FLIGHT_QUERY_SPECS=[
+    (("to_country",), "flights to {to_country}"),
+    (("airline", "to_country"), "{airline} flights to {to_country}"),
+    (("travel_class", "to_country"), "{travel_class_label} flights to {to_country}"),
+    (("from_country", "to_country"), "flights from {from_country} to {to_country}"),
+    (("to_country", "max_price"), "flights to {to_country} under ${max_price}"),
+    (("airline", "travel_class"), "{airline} {travel_class_label} flights"),
+    (("refundable", "to_country"), "refundable flights to {to_country}")
+]
+
+TRAVEL_CLASS_LABELS={
+    "economy": "economy",
+    "premium_economy": "premium economy",
+    "business": "business class",
+    "first": "first class"
+}
+
+#   Hand-labelled policy questions: (question, source file, phrases identifying the relevant chunks).
+
+POLICY_QUESTIONS=[
+    ("can I get a full refund if I cancel within 24 hours of booking", "refund_policies.md", ["24-Hour Rule"]),
+    ("what fees apply when I change a non-refundable ticket", "refund_policies.md", ["Change Fees and Conditions"]),
+    ("should I buy travel insurance for my trip", "refund_policies.md", ["recommends purchasing comprehensive travel insurance"]),
+    ("what is cancel for any reason insurance", "refund_policies.md", ["Cancel For Any Reason"]),
+    ("how flexible are business and first class fares", "refund_policies.md", ["Business Class / First Class (Most Flexible)"]),
+    ("do I need an ESTA to visit the United States", "visa_rules.md", ["Visa Waiver Program"]),
+    ("can I get an eVisa for India", "visa_rules.md", ["Available for citizens of over 170 countries"]),
+    ("do I need a transit visa for a layover", "visa_rules.md", ["Transit Visa Requirements", "Airport Transit Visa"]),
+    ("how long does visa processing take", "visa_rules.md", ["Processing Times"]),
+    ("which documents are required for a visa application", "visa_rules.md", ["Documentation Required"]),
+    ("what is ETIAS for the Schengen area", "visa_rules.md", ["ETIAS"]),
+    ("how long can I stay without a visa", "visa_rules.md", ["Visa-Exempt Entries"])
+]
+
+#   Stable identity of an ingested document: (file name, item or chunk index).
+
+def document_identity(metadata: Dict[str, Any]) -> Tuple[str, int]:
+    index=metadata.get("item_index", metadata.get("chunk_index", 0))
+    return os.path.basename(metadata.get("source", "")), int(index)
+
+#   Generate flight queries whose relevant flights are known from the constraints that produced them.
+
+def generate_flight_queries(flights: List[Dict[str, Any]], max_queries: int, seed: int=13) -> List[Dict[str, Any]]:
+    rng=random.Random(seed)
+    queries={}
+    attempts=0
+    while len(queries)<max_queries and attempts<max_queries*50:
+        attempts+=1
+        keys, template=rng.choice(FLIGHT_QUERY_SPECS)
+        flight=rng.choice(flights)
+        constraints={key: flight[key] for key in keys if key!="max_price"}
+        if "max_price" in keys:
+            constraints["max_price"]=(flight["price_usd"]//500+1)*500
+        if "refundable" in keys:
+            constraints["refundable"]=True
+            if not flight["refundable"]:
+                continue
+        relevant=[
+            ("flights.json", index) for index, candidate in enumerate(flights)
+            if all(
+                candidate["price_usd"]<=value if key=="max_price" else candidate[key]==value
+                for key, value in constraints.items()
+            )
+        ]
+        if not 1<=len(relevant)<=MAX_RELEVANT:
+            continue
+        text=template.format(
+            travel_class_label=TRAVEL_CLASS_LABELS.get(constraints.get("travel_class", ""), ""),
+            **constraints
+        )
+        queries.setdefault(text, {"query": text, "kind": "flight", "constraints": constraints, "relevant": relevant})
+    return list(queries.values())
+
+#   Resolve hand-labelled policy questions to the chunk identities produced by ingestion.
+
+async def label_policy_questions() -> List[Dict[str, Any]]:
+    from ingestion import process_markdown_file
+    chunks={}
+    labelled=[]
+    for question, filename, phrases in POLICY_QUESTIONS:
+        if filename not in chunks:
+            chunks[filename]=await process_markdown_file(os.path.join(DATA_DIRECTORY, filename))
+        relevant=[
+            document_identity(chunk.metadata) for chunk in chunks[filename]
+            if any(phrase.lower() in chunk.page_content.lower() for phrase in phrases)
+        ]
+        if not relevant:
+            logger.warning(f"No chunks match the labels of '{question}', skipping")
+            continue
+        labelled.append({"query": question, "kind": "policy", "constraints": {}, "relevant": relevant})
+    return labelled
+
+#   Retrieval configurations evaluated by default.
+
+def build_configurations(
+    retrieval_modes: List[str],
+    filter_strategies: List[str],
+    depths: List[int],
+    rerank_backends: List[str],
+    top_ns: List[int]
+) -> List[Dict[str, Any]]:
+    configurations=[]
+    for retrieval, filters, k, rerank in itertools.product(retrieval_modes, filter_strategies, depths, rerank_backends):
+        for top_n in (top_ns if rerank!="none" else [None]):
+            if top_n is not None and top_n>k:
+                continue
+            name=f"{retrieval}/{filters}/k{k}/{rerank}"+(f"@{top_n}" if top_n else "")
+            configurations.append({"name": name, "retrieval": retrieval, "filters": filters, "k": k, "rerank": rerank, "top_n": top_n})
+    return configurations
+
+#   Capped recall@k and reciprocal rank for a ranked result list.
+
+def score_ranking(ranked: List[Tuple[str, int]], relevant: List[Tuple[str, int]]) -> Dict[str, float]:
+    relevant_set=set(relevant)
+    scores={}
+    for k in (5, 10):
+        hits=len(relevant_set & set(ranked[:k]))
+        scores[f"recall@{k}"]=hits/min(len(relevant_set), k)
+    scores["mrr"]=next((1/rank for rank, identity in enumerate(ranked, start=1) if identity in relevant_set), 0.0)
+    return scores
+
+#   Evaluates configurations over the labelled queries against one collection.
+
+class RetrievalEvaluator:
+
+    def __init__(self, collection_name: str, concurrency: int=8):
+        self.collection_name=collection_name
+        self.concurrency=concurrency
+        self.stores={}
+        self.llm_filters={}
+
+    async def prepare(self, labelled: List[Dict[str, Any]], retrieval_modes: List[str], use_llm_filters: bool) -> None:
+        import graph
+        await graph.initialize_components()
+        configured_mode=graph.RETRIEVAL_MODE
+        try:
+            for mode in retrieval_modes:
+                graph.RETRIEVAL_MODE=mode
+                self.stores[mode]=await graph.get_vector_store(self.collection_name)
+        finally:
+            graph.RETRIEVAL_MODE=configured_mode
+        if use_llm_filters:
+            for item in labelled:
+                if item["kind"]!="flight":
+                    continue
+                start_time=time.perf_counter()
+                command=await graph.generate_filters({"query": item["query"], "collection_name": self.collection_name, "query_type": "both"})
+                self.llm_filters[item["query"]]=(command.update.get("filters", {}), time.perf_counter()-start_time)
+
+    #   Run the retrieval pipeline of one configuration for one query; returns the ranking and its latency.
+
+    async def retrieve(self, configuration: Dict[str, Any], item: Dict[str, Any]) -> Tuple[List[Tuple[str, int]], float]:
+        import graph
+        from filters import build_qdrant_filter
+        elapsed=0.0
+        filters={}
+        match_mode="must"
+        if item["kind"]=="flight" and configuration["filters"]!="none":
+            strategy, match_mode=configuration["filters"].split("_")
+            if strategy=="oracle":
+                filters=item["constraints"]
+            else:
+                filters, elapsed=self.llm_filters[item["query"]]
+        start_time=time.perf_counter()
+        store=self.stores[configuration["retrieval"]]
+        filter_obj=build_qdrant_filter(filters, match_mode=match_mode)
+        documents=await store.asimilarity_search(item["query"], k=configuration["k"], filter=filter_obj)
+        if not documents and filter_obj is not None:
+            documents=await store.asimilarity_search(item["query"], k=configuration["k"])
+        if configuration["rerank"]=="rankllm" and documents:
+            compressor=await asyncio.to_thread(graph.get_reranker, min(configuration["top_n"], len(documents)))
+            documents=await compressor.acompress_documents(documents=documents, query=item["query"])
+        elapsed+=time.perf_counter()-start_time
+        return [document_identity(document.metadata) for document in documents], elapsed
+
+    async def evaluate(self, configuration: Dict[str, Any], labelled: List[Dict[str, Any]]) -> Dict[str, Any]:
+        semaphore=asyncio.Semaphore(self.concurrency)
+        outcomes=[]
+
+        async def run(item: Dict[str, Any]) -> None:
+            async with semaphore:
+                ranked, elapsed=await self.retrieve(configuration, item)
+                outcomes.append((item["kind"], score_ranking(ranked, item["relevant"]), elapsed))
+
+        await asyncio.gather(*[run(item) for item in labelled])
+        result={**configuration}
+        for kind in ("all", "flight", "policy"):
+            selected=[outcome for outcome in outcomes if kind=="all" or outcome[0]==kind]
+            if not selected:
+                continue
+            result[kind]={
+                metric: round(sum(scores[metric] for _, scores, _ in selected)/len(selected), 4)
+                for metric in ("recall@5", "recall@10", "mrr")
+            }
+            result[kind]["latency"]=summarize_latencies([elapsed for _, _, elapsed in selected])
+        return result
+
+#   Mark configurations on the Pareto frontier of p95 latency (lower) vs recall@10 (higher).
+
+def mark_pareto(results: List[Dict[str, Any]]) -> None:
+    for result in results:
+        latency=result["all"]["latency"]["p95_ms"]
+        recall=result["all"]["recall@10"]
+        result["pareto"]=not any(
+            other is not result
+            and other["all"]["latency"]["p95_ms"]<=latency
+            and other["all"]["recall@10"]>=recall
+            and (other["all"]["latency"]["p95_ms"]<latency or other["all"]["recall@10"]>recall)
+            for other in results
+        )
+
+#   Fastest configuration whose recall@10 is within the tolerance of the best one.
+
+def recommend(results: List[Dict[str, Any]], tolerance: float) -> Optional[Dict[str, Any]]:
+    if not results:
+        return None
+    best_recall=max(result["all"]["recall@10"] for result in results)
+    eligible=[result for result in results if result["all"]["recall@10"]>=best_recall*(1-tolerance)]
+    return min(eligible, key=lambda result: result["all"]["latency"]["p95_ms"])
+
+#   Environment settings that apply a configuration to the service.
+
+def configuration_settings(configuration: Dict[str, Any]) -> Dict[str, str]:
+    settings={
+        "RETRIEVAL_MODE": configuration["retrieval"],
+        "FLIGHT_RETRIEVAL_K": str(configuration["k"])
+    }
+    if configuration["filters"]!="none":
+        settings["FILTER_MATCH_MODE"]=configuration["filters"].split("_")[1]
+    if configuration["top_n"]:
+        settings["RERANK_TOP_N"]=str(configuration["top_n"])
+    return settings
+
+def format_pareto_table(results: List[Dict[str, Any]]) -> str:
+    lines=[f"{'configuration':<36}{'R@5':>8}{'R@10':>8}{'MRR':>8}{'p50 ms':>10}{'p95 ms':>10}{'pareto':>8}"]
+    for result in sorted(results, key=lambda result: result["all"]["latency"]["p95_ms"]):
+        summary=result["all"]
+        lines.append(
+            f"{result['name']:<36}{summary['recall@5']:>8.3f}{summary['recall@10']:>8.3f}{summary['mrr']:>8.3f}"
+            f"{summary['latency']['p50_ms']:>10.1f}{summary['latency']['p95_ms']:>10.1f}{'*' if result['pareto'] else '':>8}"
+        )
+    return "\n".join(lines)
+
+def parse_args(argv: Optional[List[str]]=None) -> argparse.Namespace:
+    parser=argparse.ArgumentParser(description="Retrieval quality vs latency evaluation")
+    parser.add_argument("--online", action="store_true", help="Use the live services and an existing collection instead of the offline stand-ins")
+    parser.add_argument("--collection", default="eval_flights")
+    parser.add_argument("--max-queries", type=int, default=60, help="Generated flight queries")
+    parser.add_argument("--retrieval", nargs="+", default=["dense", "hybrid"], choices=["dense", "hybrid"])
+    parser.add_argument("--filters", nargs="+", default=["none", "llm_should", "llm_must", "oracle_must"], choices=["none", "llm_should", "llm_must", "oracle_should", "oracle_must"])
+    parser.add_argument("--k", nargs="+", type=int, default=[10, 20])
+    parser.add_argument("--rerank", nargs="+", default=["none", "rankllm"], choices=["none", "rankllm"])
+    parser.add_argument("--top-n", nargs="+", type=int, default=[5, 10])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--quality-tolerance", type=float, default=0.02, help="Allowed relative recall@10 loss for the recommendation")
+    parser.add_argument("--chat-latency", type=float, default=DEFAULT_LATENCIES["chat"])
+    parser.add_argument("--embedding-latency", type=float, default=DEFAULT_LATENCIES["embedding"])
+    parser.add_argument("--rerank-latency", type=float, default=DEFAULT_LATENCIES["rerank"])
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+async def run_evaluation(args: argparse.Namespace) -> Dict[str, Any]:
+    if not args.online:
+        install_offline_stack(latencies={
+            "chat": args.chat_latency,
+            "embedding": args.embedding_latency,
+            "rerank": args.rerank_latency
+        })
+        await load_offline_data(args.collection)
+    labelled=generate_flight_queries(load_flights(), args.max_queries)+await label_policy_questions()
+    configurations=build_configurations(args.retrieval, args.filters, args.k, args.rerank, args.top_n)
+    evaluator=RetrievalEvaluator(args.collection, concurrency=args.concurrency)
+    await evaluator.prepare(labelled, args.retrieval, any(strategy.startswith("llm") for strategy in args.filters))
+    results=[]
+    for configuration in configurations:
+        results.append(await evaluator.evaluate(configuration, labelled))
+        logger.warning(f"Evaluated {configuration['name']}")
+    mark_pareto(results)
+    recommended=recommend(results, args.quality_tolerance)
+    return {
+        "benchmark": "retrieval_eval",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "mode": "online" if args.online else "offline",
+        "queries": {
+            "flight": sum(1 for item in labelled if item["kind"]=="flight"),
+            "policy": sum(1 for item in labelled if item["kind"]=="policy")
+        },
+        "results": results,
+        "recommended": recommended["name"] if recommended else None,
+        "recommended_settings": configuration_settings(recommended) if recommended else {}
+    }
+
+def main(argv: Optional[List[str]]=None) -> int:
+    args=parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="%(asctime)s-%(levelname)s-%(name)s-%(message)s")
+    report=asyncio.run(run_evaluation(args))
+    output=args.output or os.path.join(RESULTS_DIRECTORY, f"retrieval-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2, default=list)
+    print(format_pareto_table(report["results"]))
+    print(f"Recommended: {report['recommended']} {report['recommended_settings']}")
+    print(f"Results written to {output}")
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
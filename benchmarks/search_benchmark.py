@@ -0,0 +1,269 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import resource
+import tracemalloc
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional
+)
+from benchmarks import RESULTS_DIRECTORY
+from benchmarks.offline import (
+    DEFAULT_LATENCIES,
+    install_offline_stack,
+    load_offline_data
+)
+from benchmarks.queries import QUERY_MIX
+
+'''
+
+    Offline end-to-end benchmark for run_search_and_answer.
+
+    Runs a fixed query mix against local stand-ins (fake Gemini chat and embeddings, fake RankLLM,
+    in-memory Qdrant loaded from data/) and reports per-node p50/p95/p99, throughput and memory.
+    Results are written as JSON and can be compared against a baseline run:
+
+        python -m benchmarks.search_benchmark --iterations 5 --baseline benchmarks/results/baseline.json
+
+    With --cassette the stand-ins are replaced by a cassette recorded against the real upstreams
+    (CASSETTE_MODE=record), and the recorded searches are replayed at recorded or zero latency:
+
+        python -m benchmarks.search_benchmark --cassette cassettes/upstream.cassette --cassette-latency zero
+
+'''
+
+logger=logging.getLogger(__name__)
+
+COMPARED_PERCENTILES=("p50_ms", "p95_ms", "p99_ms")
+
+#   Run the query mix and collect request, stage and memory statistics.
+
+async def run_benchmark(
+    iterations: int=3,
+    concurrency: int=1,
+    warmup: int=2,
+    latencies: Optional[Dict[str, float]]=None,
+    jitter: float=0.0,
+    trace_memory: bool=False,
+    collection_name: str="benchmark_flights",
+    cassette: Optional[str]=None,
+    cassette_latency: str="recorded"
+) -> Dict[str, Any]:
+    load_start=time.perf_counter()
+    if cassette:
+        from cassette import (
+            use_cassette,
+            recorded_searches
+        )
+        replay=use_cassette(cassette, "replay", cassette_latency, repeat=iterations>1 or warmup>0)  #   Warm-up and extra passes re-run the recorded searches.
+        searches=recorded_searches()
+        if not searches:
+            raise ValueError(f"Cassette {cassette} has no recorded searches")
+        latencies_config=cassette_latency
+        ingested={}
+    else:
+        replay=None
+        stack=install_offline_stack(latencies=latencies, jitter=jitter)
+        searches=[{"query": query, "collection_name": collection_name} for query in QUERY_MIX]
+        latencies_config=stack.latencies
+        ingested=await load_offline_data(collection_name)
+    load_seconds=time.perf_counter()-load_start
+    from graph import run_search_and_answer
+    from metrics import (
+        reset_metrics,
+        get_stage_latency_summary,
+        summarize_latencies
+    )
+    from resilience import get_upstream_states
+    from model_router import (
+        reset_routing,
+        get_routing_report
+    )
+    for search in searches[:warmup]:
+        await run_search_and_answer(**search)
+    reset_metrics()
+    reset_routing()
+    if trace_memory:
+        tracemalloc.start()
+    semaphore=asyncio.Semaphore(concurrency)
+    request_latencies=[]
+    errors=[]
+
+    async def run_query(search: Dict[str, Any]) -> None:
+        async with semaphore:
+            start_time=time.perf_counter()
+            result=await run_search_and_answer(**search)
+            request_latencies.append(time.perf_counter()-start_time)
+            if not result.get("success", False):
+                errors.append({"query": search["query"], "error": result.get("error")})
+
+    wall_start=time.perf_counter()
+    await asyncio.gather(*[run_query(search) for _ in range(iterations) for search in searches])
+    wall_seconds=time.perf_counter()-wall_start
+    memory={"max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024, 2)}
+    if trace_memory:
+        current, peak=tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory.update({
+            "traced_current_mb": round(current/1024/1024, 2),
+            "traced_peak_mb": round(peak/1024/1024, 2)
+        })
+    return {
+        "benchmark": "search",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "config": {
+            "iterations": iterations,
+            "concurrency": concurrency,
+            "warmup": warmup,
+            "queries": len(searches),
+            "latencies": latencies_config,
+            "jitter": jitter,
+            "cassette": cassette
+        },
+        "ingestion": {
+            "documents": ingested,
+            "seconds": round(load_seconds, 3)
+        },
+        "requests": {
+            **summarize_latencies(request_latencies),
+            "errors": len(errors),
+            "error_samples": errors[:5]
+        },
+        "throughput_qps": round(len(request_latencies)/wall_seconds, 3) if wall_seconds else 0.0,
+        "wall_seconds": round(wall_seconds, 3),
+        "stages": get_stage_latency_summary(),
+        "upstreams": get_upstream_states(),
+        "models": get_routing_report(),
+        "cassette": dict(replay.counts) if replay else None,
+        "memory": memory
+    }
+
+#   Compare the percentiles of a run against a baseline run.
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    sections=[("request", current["requests"], baseline["requests"])]
+    for stage in sorted(current["stages"]):
+        if stage in baseline.get("stages", {}):
+            sections.append((stage, current["stages"][stage], baseline["stages"][stage]))
+    rows=[]
+    for name, current_stats, baseline_stats in sections:
+        for key in COMPARED_PERCENTILES:
+            before=baseline_stats.get(key, 0.0)
+            after=current_stats.get(key, 0.0)
+            rows.append({
+                "name": name,
+                "metric": key,
+                "baseline": before,
+                "current": after,
+                "change_pct": round(100*(after-before)/before, 2) if before else None
+            })
+    before=baseline.get("throughput_qps", 0.0)
+    after=current.get("throughput_qps", 0.0)
+    rows.append({
+        "name": "throughput",
+        "metric": "qps",
+        "baseline": before,
+        "current": after,
+        "change_pct": round(100*(after-before)/before, 2) if before else None
+    })
+    return rows
+
+#   Render per-stage latency statistics as a text table.
+
+def format_stage_table(result: Dict[str, Any]) -> str:
+    lines=[f"{'stage':<24}{'count':>8}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}"]
+    for name, stats in [("request", result["requests"])]+sorted(result["stages"].items()):
+        lines.append(f"{name:<24}{stats['count']:>8}{stats['p50_ms']:>12.1f}{stats['p95_ms']:>12.1f}{stats['p99_ms']:>12.1f}")
+    lines.append(f"throughput: {result['throughput_qps']} qps, errors: {result['requests']['errors']}, memory: {result['memory']}")
+    return "\n".join(lines)
+
+#   Render a baseline comparison as a text table.
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    lines=[f"{'name':<24}{'metric':>8}{'baseline':>12}{'current':>12}{'change':>10}"]
+    for row in rows:
+        change="n/a" if row["change_pct"] is None else f"{row['change_pct']:+.1f}%"
+        lines.append(f"{row['name']:<24}{row['metric']:>8}{row['baseline']:>12.1f}{row['current']:>12.1f}{change:>10}")
+    return "\n".join(lines)
+
+#   Find p95 regressions beyond the allowed threshold (throughput regressions are drops).
+
+def find_regressions(rows: List[Dict[str, Any]], threshold_pct: float) -> List[Dict[str, Any]]:
+    regressions=[]
+    for row in rows:
+        if row["change_pct"] is None:
+            continue
+        if row["name"]=="throughput":
+            if row["change_pct"]<-threshold_pct:
+                regressions.append(row)
+        elif row["metric"]=="p95_ms" and row["change_pct"]>threshold_pct:
+            regressions.append(row)
+    return regressions
+
+def parse_args(argv: Optional[List[str]]=None) -> argparse.Namespace:
+    parser=argparse.ArgumentParser(description="Offline end-to-end benchmark for run_search_and_answer")
+    parser.add_argument("--iterations", type=int, default=3, help="Passes over the query mix")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent in-flight searches")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured warm-up queries")
+    parser.add_argument("--chat-latency", type=float, default=DEFAULT_LATENCIES["chat"], help="Fake Gemini chat latency (s)")
+    parser.add_argument("--embedding-latency", type=float, default=DEFAULT_LATENCIES["embedding"], help="Fake embedding latency (s)")
+    parser.add_argument("--rerank-latency", type=float, default=DEFAULT_LATENCIES["rerank"], help="Fake RankLLM latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latency jitter fraction (0.2 = ±20%%)")
+    parser.add_argument("--cassette", default=None, help="Replay the searches and upstream calls of a recorded cassette instead of the stand-ins")
+    parser.add_argument("--cassette-latency", choices=["recorded", "zero"], default="recorded", help="Replay cassette calls at their recorded latency or instantly")
+    parser.add_argument("--trace-memory", action="store_true", help="Track Python allocations with tracemalloc")
+    parser.add_argument("--output", default=None, help="Result JSON path (default: benchmarks/results/search-<timestamp>.json)")
+    parser.add_argument("--baseline", default=None, help="Baseline result JSON to compare against")
+    parser.add_argument("--fail-threshold", type=float, default=None, help="Exit non-zero if p95 regresses by more than this percent")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]]=None) -> int:
+    args=parse_args(argv)
+    logging.basicConfig(level=args.log_level, format="%(asctime)s-%(levelname)s-%(name)s-%(message)s")
+    result=asyncio.run(run_benchmark(
+        iterations=args.iterations,
+        concurrency=args.concurrency,
+        warmup=args.warmup,
+        latencies={
+            "chat": args.chat_latency,
+            "embedding": args.embedding_latency,
+            "rerank": args.rerank_latency
+        },
+        jitter=args.jitter,
+        trace_memory=args.trace_memory,
+        cassette=args.cassette,
+        cassette_latency=args.cassette_latency
+    ))
+    output=args.output or os.path.join(RESULTS_DIRECTORY, f"search-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(result, file, indent=2)
+    print(format_stage_table(result))
+    print(f"Results written to {output}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline=json.load(file)
+        rows=compare_results(result, baseline)
+        print(format_comparison(rows))
+        if args.fail_threshold is not None:
+            regressions=find_regressions(rows, args.fail_threshold)
+            if regressions:
+                print(f"{len(regressions)} regression(s) beyond {args.fail_threshold}%")
+                return 1
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional
+)
+from benchmarks.offline import (
+    DEFAULT_LATENCIES,
+    install_offline_stack,
+    load_offline_data
+)
+
+'''
+
+    Offline benchmark for conversational sessions: compares first turns (full pipeline) with refinement
+    follow-ups that re-filter the previous candidates in memory.
+
+        python -m benchmarks.session_benchmark --sessions 20
+
+'''
+
+logger=logging.getLogger(__name__)
+
+#   Conversations: a first search followed by refinements of its results.
+
+CONVERSATIONS=[
+    ["flights to Japan", "only the refundable ones", "which of them have wifi", "sort them by the earliest departure"],
+    ["business class flights to UAE", "just the ones under $6000", "what about direct flights"],
+    ["Emirates flights to Turkey", "only with baggage included", "the cheapest of those"],
+    ["economy flights from USA", "only refundable ones with wifi", "any under $900"],
+]
+
+async def run(sessions: int, latencies: Optional[Dict[str, float]], collection_name: str) -> Dict[str, Any]:
+    install_offline_stack(latencies=latencies)
+    import sessions as sessions_module
+    sessions_module.SESSION_DB_PATH=":memory:"
+    await load_offline_data(collection_name)
+    from graph import run_search_and_answer
+    from metrics import summarize_latencies
+    first_turns=[]
+    follow_ups=[]
+    refined=0
+    for index in range(sessions):
+        conversation=CONVERSATIONS[index%len(CONVERSATIONS)]
+        session_id=f"benchmark-{index}"
+        for turn, query in enumerate(conversation):
+            start_time=time.perf_counter()
+            result=await run_search_and_answer(query=query, collection_name=collection_name, session_id=session_id)
+            elapsed=time.perf_counter()-start_time
+            if turn==0:
+                first_turns.append(elapsed)
+            else:
+                follow_ups.append(elapsed)
+                refined+=int(result.get("refined", False))
+    await sessions_module.close_checkpointer()
+    first=summarize_latencies(first_turns)
+    follow=summarize_latencies(follow_ups)
+    return {
+        "first_turns": first,
+        "follow_ups": follow,
+        "refined_follow_ups": refined,
+        "total_follow_ups": len(follow_ups),
+        "speedup_p50": round(first["p50_ms"]/follow["p50_ms"], 1) if follow["p50_ms"] else None
+    }
+
+def parse_args(argv: Optional[List[str]]=None) -> argparse.Namespace:
+    parser=argparse.ArgumentParser(description="Offline first-turn vs refinement latency benchmark")
+    parser.add_argument("--sessions", type=int, default=len(CONVERSATIONS))
+    parser.add_argument("--chat-latency", type=float, default=DEFAULT_LATENCIES["chat"])
+    parser.add_argument("--embedding-latency", type=float, default=DEFAULT_LATENCIES["embedding"])
+    parser.add_argument("--rerank-latency", type=float, default=DEFAULT_LATENCIES["rerank"])
+    parser.add_argument("--collection", default="benchmark_flights")
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]]=None) -> int:
+    args=parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    latencies={"chat": args.chat_latency, "embedding": args.embedding_latency, "rerank": args.rerank_latency}
+    results=asyncio.run(run(args.sessions, latencies, args.collection))
+    print(f"first turns: p50 {results['first_turns']['p50_ms']:.0f} ms, p95 {results['first_turns']['p95_ms']:.0f} ms")
+    print(f"follow-ups:  p50 {results['follow_ups']['p50_ms']:.0f} ms, p95 {results['follow_ups']['p95_ms']:.0f} ms ({results['refined_follow_ups']}/{results['total_follow_ups']} refined in memory)")
+    print(f"speed-up (p50): {results['speedup_p50']}x")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
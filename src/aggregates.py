@@ -0,0 +1,124 @@
+import re
+import logging
+import numpy as np
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional
+)
+from langchain_core.documents import Document
+from flight_index import FlightIndex
+
+'''
+
+    Aggregate flight questions ("cheapest business flight to Japan", "average price London to Dubai",
+    "how many refundable Emirates flights", "average price by airline") answered exactly over every
+    matching flight in the columnar flight index, instead of over the top-k of a similarity search.
+
+'''
+
+logger=logging.getLogger(__name__)
+
+#   Representative flights passed on to answer generation with the figures.
+
+AGGREGATE_SAMPLE_FLIGHTS=5
+
+#   Operation keywords, checked in order (the first match wins).
+
+OPERATION_PATTERNS=[
+    ("count", re.compile(r"\b(how many|number of|count)\b", re.IGNORECASE)),
+    ("avg", re.compile(r"\b(average|mean|typical)\b", re.IGNORECASE)),
+    ("max", re.compile(r"\b(most expensive|priciest|highest|maximum|longest)\b", re.IGNORECASE)),
+    ("min", re.compile(r"\b(cheapest|least expensive|lowest|minimum|shortest|fastest|quickest)\b", re.IGNORECASE)),
+]
+
+#   Metric keywords; price is the default.
+
+METRIC_PATTERNS=[
+    ("flight_duration_hours", re.compile(r"\b(duration|longest|shortest|fastest|quickest|flight time|hours)\b", re.IGNORECASE)),
+    ("layover_duration_hours", re.compile(r"\blayover (time|duration)\b", re.IGNORECASE)),
+    ("availability", re.compile(r"\b(seats|availability)\b", re.IGNORECASE)),
+]
+
+GROUP_BY_AIRLINE_PATTERN=re.compile(r"\b(by|per|each|every|which) airlines?\b|\bairlines? (compare|ranking)\b", re.IGNORECASE)
+
+#   Detect an aggregate intent, or None for a regular search.
+
+def detect_aggregate_intent(query: str) -> Optional[Dict[str, Any]]:
+    operation=next((name for name, pattern in OPERATION_PATTERNS if pattern.search(query)), None)
+    group_by="airline" if GROUP_BY_AIRLINE_PATTERN.search(query) else None
+    if operation is None and group_by is None:
+        return None
+    metric=next((name for name, pattern in METRIC_PATTERNS if pattern.search(query)), "price_usd")
+    return {"operation": operation or "count", "metric": metric, "group_by": group_by}
+
+def round_value(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 2)
+
+#   Per-group count and metric over the matching rows, using the group's dictionary codes.
+
+def group_aggregate(index: FlightIndex, matches: np.ndarray, values: np.ndarray, operation: str, group_by: str) -> List[Dict[str, Any]]:
+    column=index.columns[group_by]
+    codes=column["values"][matches]
+    names={code: name for name, code in column["vocabulary"].items()}
+    valid=(codes>=0)&~np.isnan(values)
+    codes, values=codes[valid], values[valid]
+    group_count=len(names)
+    counts=np.bincount(codes, minlength=group_count)
+    if operation=="avg":
+        results=np.bincount(codes, weights=values, minlength=group_count)/np.maximum(counts, 1)
+    elif operation=="min":
+        results=np.full(group_count, np.inf)
+        np.minimum.at(results, codes, values)
+    elif operation=="max":
+        results=np.full(group_count, -np.inf)
+        np.maximum.at(results, codes, values)
+    else:
+        results=counts.astype(float)
+    groups=[
+        {group_by: names[code], "count": int(counts[code]), "value": round(float(results[code]), 2)}
+        for code in np.flatnonzero(counts)
+    ]
+    return sorted(groups, key=lambda group: group["value"], reverse=operation in ("max", "count"))
+
+#   Compute an aggregate over every flight matching the filters (all filters must hold).
+
+def compute_aggregate(index: FlightIndex, filters: Dict[str, Any], intent: Dict[str, Any]) -> Dict[str, Any]:
+    operation, metric, group_by=intent["operation"], intent["metric"], intent["group_by"]
+    matches=np.flatnonzero(index.filter_mask(filters, match_mode="must"))
+    values=index.columns[metric]["values"][matches].astype(np.float64)
+    result={
+        "operation": operation,
+        "metric": metric,
+        "filters": filters,
+        "matching_flights": int(len(matches))
+    }
+    sample=matches[:AGGREGATE_SAMPLE_FLIGHTS]
+    if group_by:
+        result["group_by"]=group_by
+        result["groups"]=group_aggregate(index, matches, values, operation, group_by)
+    elif operation=="count":
+        result["value"]=int(len(matches))
+    elif not len(matches) or np.all(np.isnan(values)):
+        result["value"]=None
+    elif operation=="avg":
+        result["value"]=round_value(np.nanmean(values))
+    else:
+        order=np.argsort(values, kind="stable")
+        if operation=="max":
+            order=order[::-1]
+        order=order[~np.isnan(values[order])]
+        result["value"]=round_value(values[order[0]])
+        result["flight_ids"]=[index.records[int(matches[position])].get("flight_id") for position in order if values[position]==values[order[0]]]
+        sample=matches[order[:AGGREGATE_SAMPLE_FLIGHTS]]
+    result["sample_flights"]=[index.to_document(int(row)) for row in sample]
+    return result
+
+#   Aggregate as JSON-serialisable figures for the prompt and the response (sample flights are passed as documents).
+
+def aggregate_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in result.items() if key!="sample_flights"}
+
+def sample_documents(result: Dict[str, Any]) -> List[Document]:
+    return result.get("sample_flights", [])
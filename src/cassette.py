@@ -0,0 +1,278 @@
+import os
+import gzip
+import json
+import time
+import pickle
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional,
+    Callable,
+    Awaitable
+)
+from langchain_core.embeddings import Embeddings
+
+'''
+
+    Record/replay of upstream calls. In record mode every call to Gemini (chat and embeddings), OpenAI
+    (RankLLM reranking) and Qdrant made by the graph and by ingestion is appended to a gzip-compressed
+    cassette of pickled entries, keyed by a hash of the upstream, the operation and the request. Incoming
+    searches are recorded too, so a cassette carries the traffic that produced it.
+
+    In replay mode the same calls are served from the cassette, at their recorded latency or at zero latency,
+    without API keys or a Qdrant server. Every recording is served once: a request gets the next unused
+    recording of its key, and a request whose key was never recorded (writes carrying random point ids) the
+    next unused recording of the same operation. Anything else is a miss, unless the cassette was opened with
+    repeat=True (to re-run its traffic more than once), which serves the last recording of an exhausted key again.
+
+    Recording appends to one file, so the server runs a single worker while CASSETTE_MODE=record.
+
+    Cassettes are pickles: only replay cassettes you recorded yourself.
+
+'''
+
+logger=logging.getLogger(__name__)
+
+CASSETTE_MODE=os.getenv("CASSETTE_MODE", "off").lower()     #   "off", "record" or "replay".
+CASSETTE_PATH=os.getenv("CASSETTE_PATH", "cassettes/upstream.cassette")
+CASSETTE_LATENCY=os.getenv("CASSETTE_LATENCY", "recorded").lower()  #   "recorded" or "zero".
+
+#   Qdrant client methods recorded (every other attribute passes through to the client).
+
+QDRANT_METHODS=[
+    "query_points", "search", "scroll", "count", "retrieve", "facet",
+    "upsert", "delete", "set_payload", "create_payload_index",
+    "get_collection", "get_collections", "collection_exists", "create_collection", "delete_collection"
+]
+
+class CassetteMiss(Exception):
+    pass
+
+#   Hash of a request; anything that is not JSON serialisable is keyed by its repr.
+
+def request_key(upstream: str, operation: str, request: Any) -> str:
+    encoded=json.dumps([upstream, operation, request], sort_keys=True, default=repr)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+class Cassette:
+
+    def __init__(self, path: str, mode: str, latency: str="recorded", repeat: bool=False):
+        self.path=path
+        self.mode=mode
+        self.latency=latency
+        self.repeat=repeat
+        self.lock=threading.Lock()
+        self.entries=defaultdict(list)  #   Key -> recorded entries, replayed in order.
+        self.by_operation=defaultdict(list)     #   (upstream, operation) -> entries, for requests whose key was never recorded.
+        self.consumed=set()     #   Ids of the entries already replayed, by key or by operation.
+        self.searches=[]    #   Recorded search requests, in order.
+        self.counts={"recorded": 0, "replayed": 0, "fallbacks": 0, "repeats": 0, "misses": 0}
+        self.file=None
+        if mode=="replay":
+            self.load()
+        elif mode=="record":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.file=gzip.open(path, "ab")
+
+    def load(self) -> None:
+        with gzip.open(self.path, "rb") as file:
+            while True:
+                try:
+                    entry=pickle.load(file)
+                except EOFError:
+                    break
+                if entry["upstream"]=="search":
+                    self.searches.append(entry["request"])
+                    continue
+                self.entries[entry["key"]].append(entry)
+                self.by_operation[(entry["upstream"], entry["operation"])].append(entry)
+        logger.info(f"Loaded cassette {self.path}: {sum(len(entries) for entries in self.entries.values())} calls, {len(self.searches)} searches")
+
+    def record(self, upstream: str, operation: str, request: Any, seconds: float, response: Any=None, error: Optional[str]=None) -> None:
+        entry={
+            "key": request_key(upstream, operation, request),
+            "upstream": upstream,
+            "operation": operation,
+            "request": request if upstream=="search" else None,     #   Only searches are replayed by request; calls by key.
+            "latency": seconds,
+            "response": response,
+            "error": error
+        }
+        with self.lock:
+            pickle.dump(entry, self.file, protocol=pickle.HIGHEST_PROTOCOL)
+            self.file.flush()
+            self.counts["recorded"]+=1
+
+    #   Mark and return the first entry not replayed yet, or None.
+
+    def take(self, entries: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        for entry in entries:
+            if id(entry) not in self.consumed:
+                self.consumed.add(id(entry))
+                return entry
+        return None
+
+    def lookup(self, upstream: str, operation: str, request: Any) -> Dict[str, Any]:
+        key=request_key(upstream, operation, request)
+        with self.lock:
+            entries=self.entries.get(key)
+            if entries:
+                entry=self.take(entries)
+                if entry is not None:
+                    self.counts["replayed"]+=1
+                    return entry
+                if self.repeat:
+                    self.counts["repeats"]+=1
+                    return entries[-1]
+            else:
+                entry=self.take(self.by_operation.get((upstream, operation), []))
+                if entry is not None:
+                    self.counts["fallbacks"]+=1
+                    return entry
+            self.counts["misses"]+=1
+        raise CassetteMiss(f"No unused recording of {upstream}.{operation} in {self.path}")
+
+    def delay(self, entry: Dict[str, Any]) -> float:
+        return entry["latency"] if self.latency=="recorded" else 0.0
+
+    @staticmethod
+    def result(entry: Dict[str, Any]) -> Any:
+        if entry["error"] is not None:
+            raise RuntimeError(entry["error"])
+        return entry["response"]
+
+    async def call(self, upstream: str, operation: str, request: Any, call: Callable[[], Awaitable]) -> Any:
+        if self.mode=="replay":
+            entry=self.lookup(upstream, operation, request)
+            await asyncio.sleep(self.delay(entry))
+            return self.result(entry)
+        start_time=time.perf_counter()
+        try:
+            response=await call()
+        except Exception as e:
+            self.record(upstream, operation, request, time.perf_counter()-start_time, error=str(e))
+            raise
+        self.record(upstream, operation, request, time.perf_counter()-start_time, response)
+        return response
+
+    def call_sync(self, upstream: str, operation: str, request: Any, call: Callable[[], Any]) -> Any:
+        if self.mode=="replay":
+            entry=self.lookup(upstream, operation, request)
+            time.sleep(self.delay(entry))
+            return self.result(entry)
+        start_time=time.perf_counter()
+        try:
+            response=call()
+        except Exception as e:
+            self.record(upstream, operation, request, time.perf_counter()-start_time, error=str(e))
+            raise
+        self.record(upstream, operation, request, time.perf_counter()-start_time, response)
+        return response
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file=None
+
+_cassette=None
+
+#   The process-wide cassette, opened from CASSETTE_MODE/CASSETTE_PATH on first use; None when recording is off.
+
+def get_cassette() -> Optional[Cassette]:
+    global _cassette
+    if _cassette is None and CASSETTE_MODE in ("record", "replay"):
+        _cassette=Cassette(CASSETTE_PATH, CASSETTE_MODE, CASSETTE_LATENCY)
+    return _cassette
+
+def is_replaying() -> bool:
+    cassette=get_cassette()
+    return cassette is not None and cassette.mode=="replay"
+
+#   Open a cassette explicitly (benchmarks and tests), replacing the configured one.
+
+def use_cassette(path: str, mode: str, latency: str="recorded", repeat: bool=False) -> Cassette:
+    global _cassette
+    close_cassette()
+    _cassette=Cassette(path, mode, latency, repeat)
+    return _cassette
+
+def close_cassette() -> None:
+    global _cassette
+    if _cassette is not None:
+        _cassette.close()
+        _cassette=None
+
+#   Run an async upstream call through the cassette, if one is active.
+
+async def replayable(upstream: str, operation: str, request: Any, call: Callable[[], Awaitable]) -> Any:
+    cassette=get_cassette()
+    if cassette is None:
+        return await call()
+    return await cassette.call(upstream, operation, request, call)
+
+#   Record an incoming search, so replaying a cassette can re-run its traffic.
+
+def record_search(request: Dict[str, Any]) -> None:
+    cassette=get_cassette()
+    if cassette is not None and cassette.mode=="record":
+        cassette.record("search", "run_search_and_answer", request, 0.0)
+
+def recorded_searches() -> List[Dict[str, Any]]:
+    cassette=get_cassette()
+    return list(cassette.searches) if cassette is not None else []
+
+#   Route a Qdrant client's recorded methods through the cassette (the client itself is kept for isinstance checks).
+
+def wrap_qdrant_client(client, asynchronous: bool=False):
+    cassette=get_cassette()
+    if cassette is None or getattr(client, "_cassette_wrapped", False):
+        return client
+    for name in QDRANT_METHODS:
+        method=getattr(client, name, None)
+        if method is None:
+            continue
+        if asynchronous:
+            async def wrapper(*args, _name=name, _method=method, **kwargs):
+                return await cassette.call("qdrant", _name, [args, kwargs], lambda: _method(*args, **kwargs))
+        else:
+            def wrapper(*args, _name=name, _method=method, **kwargs):
+                return cassette.call_sync("qdrant", _name, [args, kwargs], lambda: _method(*args, **kwargs))
+        setattr(client, name, wrapper)
+    client._cassette_wrapped=True
+    return client
+
+#   Embedding model recorded through the cassette; in replay mode it needs no underlying model.
+
+class CassetteEmbeddings(Embeddings):
+
+    def __init__(self, embeddings: Optional[Embeddings], model_name: str):
+        self.embeddings=embeddings
+        self.model_name=model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return get_cassette().call_sync("embedding", self.model_name, texts, lambda: self.embeddings.embed_documents(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return get_cassette().call_sync("embedding", self.model_name, text, lambda: self.embeddings.embed_query(text))
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await get_cassette().call("embedding", self.model_name, texts, lambda: self.embeddings.aembed_documents(texts))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await get_cassette().call("embedding", self.model_name, text, lambda: self.embeddings.aembed_query(text))
+
+#   Stand-in for a chat model or reranker in replay mode, where every call is served from the cassette.
+
+class ReplayOnly:
+
+    def __init__(self, model_name: str):
+        self.model_name=model_name
+
+    def invoke(self, *args, **kwargs):
+        raise CassetteMiss(f"{self.model_name} is not available while replaying a cassette")
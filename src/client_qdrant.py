@@ -1,10 +1,15 @@
 import os
+import math
 import asyncio
 import logging
-from qdrant_client import QdrantClient
+from qdrant_client import (
+    QdrantClient,
+    AsyncQdrantClient
+)
 from qdrant_client.models import (
     VectorParams,
     SparseVectorParams,
+    PointStruct,
     Distance
 )
 from langchain_qdrant import (
@@ -12,21 +17,280 @@ from langchain_qdrant import (
     RetrievalMode,
     QdrantVectorStore
 )
-from typing import Optional
+from typing import (
+    Optional,
+    List,
+    Dict,
+    Any
+)
+from langchain_core.documents import Document
+from filters import (
+    payload_key,
+    METADATA_PAYLOAD_KEY
+)
 
 logger=logging.getLogger(__name__)
 
-#   Configuration for Qdrant client connection.
+_sparse_embeddings={}   #   Loaded sparse models by name – loading FastEmbed BM25 is slow, so it happens once per process.
+_indexed_collections=set()  #   Collections whose filter indexes are known to exist.
+_async_client=None  #   Process-wide async client shared by every request.
+_embedded_client=None   #   Process-wide embedded client – local storage is locked by one client and in-memory storage is per client.
+
+#   Where Qdrant runs: "remote" (QDRANT_URL), "local" (embedded, persisted under QDRANT_PATH) or "memory" (embedded, optionally loaded from QDRANT_SNAPSHOT_PATH).
+
+QDRANT_MODE=os.getenv("QDRANT_MODE", "remote").lower()
+QDRANT_PATH=os.getenv("QDRANT_PATH", "qdrant_storage")
+QDRANT_SNAPSHOT_PATH=os.getenv("QDRANT_SNAPSHOT_PATH")
+
+#   Async client configuration: transport, connection pool, keep-alive and per-call timeouts (seconds).
+
+QDRANT_ASYNC_SEARCH=os.getenv("QDRANT_ASYNC_SEARCH", "true").lower()=="true"
+QDRANT_PREFER_GRPC=os.getenv("QDRANT_PREFER_GRPC", "false").lower()=="true"
+QDRANT_GRPC_PORT=int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_POOL_MAX_CONNECTIONS=int(os.getenv("QDRANT_POOL_MAX_CONNECTIONS", "100"))
+QDRANT_POOL_MAX_KEEPALIVE=int(os.getenv("QDRANT_POOL_MAX_KEEPALIVE", "20"))
+QDRANT_KEEPALIVE_SECONDS=float(os.getenv("QDRANT_KEEPALIVE_SECONDS", "30"))
+QDRANT_TIMEOUT=int(os.getenv("QDRANT_TIMEOUT", "30"))
+QDRANT_SEARCH_TIMEOUT=float(os.getenv("QDRANT_SEARCH_TIMEOUT", "5"))
+
+#   Fields to index for filtering.
+
+FILTER_INDEX_FIELDS=[
+    ("document_type", "keyword"),
+    ("source", "keyword"),     #   Ingestion looks up the stored points of a file by source.
+    ("airline", "keyword"),
+    ("alliance", "keyword"),
+    ("from_country", "keyword"),
+    ("to_country", "keyword"),
+    ("travel_class", "keyword"),
+    ("price_usd", "integer"),
+    ("refundable", "bool"),
+    ("baggage_included", "bool"),
+    ("wifi_available", "bool"),
+    ("meal_service", "keyword"),
+    ("aircraft_type", "keyword"),
+    ("availability", "integer"),
+    ("flight_duration_hours", "float"),
+    ("departure_date", "datetime"),
+]
+
+#   Whether Qdrant runs in-process instead of behind QDRANT_URL.
+
+def is_embedded_mode() -> bool:
+    return QDRANT_MODE in ("local", "memory")
+
+#   Configuration for Qdrant client connection. While a cassette replays, an empty in-memory client stands in
+#   and every recorded call is served from the cassette.
 
 def get_qdrant_client(timeout: int=30):
+    from cassette import (
+        is_replaying,
+        wrap_qdrant_client
+    )
+    if is_replaying():
+        return wrap_qdrant_client(QdrantClient(location=":memory:"))
+    if is_embedded_mode():
+        return wrap_qdrant_client(get_embedded_qdrant_client())
     qdrant_url=os.getenv("QDRANT_URL")
-    return QdrantClient(
+    return wrap_qdrant_client(QdrantClient(
         url=qdrant_url,
         api_key=os.getenv("QDRANT_API_KEY"),
         port=None,
         prefer_grpc=False,
         timeout=timeout
+    ))
+
+#   Get the process-wide embedded client, opening the storage (or loading the snapshot) on first use.
+
+def get_embedded_qdrant_client() -> QdrantClient:
+    global _embedded_client
+    if _embedded_client is None:
+        if QDRANT_MODE=="local":
+            _embedded_client=QdrantClient(path=QDRANT_PATH)
+            logger.info(f"Opened embedded Qdrant storage at {QDRANT_PATH}")
+        else:
+            _embedded_client=QdrantClient(location=":memory:")
+            if QDRANT_SNAPSHOT_PATH:
+                counts=load_snapshot(_embedded_client, QDRANT_SNAPSHOT_PATH)
+                logger.info(f"Loaded in-memory Qdrant from snapshot {QDRANT_SNAPSHOT_PATH}: {counts}")
+    return _embedded_client
+
+#   Close the embedded client (on shutdown) so local storage is flushed and its lock released.
+
+def close_embedded_qdrant_client() -> None:
+    global _embedded_client
+    if _embedded_client is not None:
+        _embedded_client.close()
+        _embedded_client=None
+
+#   Copy collections (config, points with all named vectors, payloads and payload indexes) between two clients.
+
+def copy_collections(
+    source: QdrantClient,
+    target: QdrantClient,
+    collection_names: Optional[List[str]]=None,
+    batch_size: int=256
+) -> Dict[str, int]:
+    if collection_names is None:
+        collection_names=[collection.name for collection in source.get_collections().collections]
+    counts={}
+    for collection_name in collection_names:
+        collection_info=source.get_collection(collection_name)
+        if target.collection_exists(collection_name):
+            target.delete_collection(collection_name)
+        target.create_collection(
+            collection_name=collection_name,
+            vectors_config=collection_info.config.params.vectors,
+            sparse_vectors_config=collection_info.config.params.sparse_vectors
+        )
+        for field_name, field_info in (collection_info.payload_schema or {}).items():
+            try:
+                target.create_payload_index(collection_name, field_name=field_name, field_schema=field_info.data_type)
+            except Exception as e:
+                logger.warning(f"Failed to copy index for field {field_name}: {str(e)}")
+        counts[collection_name]=0
+        offset=None
+        while True:
+            points, offset=source.scroll(
+                collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            if points:
+                target.upsert(
+                    collection_name,
+                    points=[PointStruct(id=point.id, vector=point.vector, payload=point.payload) for point in points]
+                )
+                counts[collection_name]+=len(points)
+            if offset is None:
+                break
+        _indexed_collections.discard(collection_name)
+    return counts
+
+#   Load a snapshot – an embedded storage directory written by export_snapshot – into a client.
+
+def load_snapshot(client: QdrantClient, snapshot_path: str, collection_names: Optional[List[str]]=None) -> Dict[str, int]:
+    if not os.path.isdir(snapshot_path):
+        raise FileNotFoundError(f"Qdrant snapshot not found: {snapshot_path}")
+    source=QdrantClient(path=snapshot_path)
+    try:
+        return copy_collections(source, client, collection_names)
+    finally:
+        source.close()
+
+#   Export collections from a client into an embedded storage directory usable as QDRANT_PATH or QDRANT_SNAPSHOT_PATH.
+
+def export_snapshot(client: QdrantClient, snapshot_path: str, collection_names: Optional[List[str]]=None) -> Dict[str, int]:
+    target=QdrantClient(path=snapshot_path)
+    try:
+        return copy_collections(client, target, collection_names)
+    finally:
+        target.close()
+
+#   Create an async Qdrant client over gRPC or pooled keep-alive HTTP.
+
+def create_async_qdrant_client(prefer_grpc: Optional[bool]=None, timeout: int=QDRANT_TIMEOUT) -> AsyncQdrantClient:
+    import httpx
+    prefer_grpc=QDRANT_PREFER_GRPC if prefer_grpc is None else prefer_grpc
+    client_kwargs={
+        "url": os.getenv("QDRANT_URL"),
+        "api_key": os.getenv("QDRANT_API_KEY"),
+        "port": None,
+        "prefer_grpc": prefer_grpc,
+        "timeout": timeout
+    }
+    if prefer_grpc:
+        client_kwargs["grpc_port"]=QDRANT_GRPC_PORT
+        client_kwargs["grpc_options"]={
+            "grpc.keepalive_time_ms": int(QDRANT_KEEPALIVE_SECONDS*1000),
+            "grpc.keepalive_timeout_ms": 10000,
+            "grpc.keepalive_permit_without_calls": 1,
+            "grpc.http2.max_pings_without_data": 0
+        }
+    else:
+        client_kwargs["limits"]=httpx.Limits(
+            max_connections=QDRANT_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=QDRANT_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=QDRANT_KEEPALIVE_SECONDS
+        )
+    return AsyncQdrantClient(**client_kwargs)
+
+#   Get the process-wide async client, creating it on first use.
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    global _async_client
+    if _async_client is None:
+        from cassette import (
+            is_replaying,
+            wrap_qdrant_client
+        )
+        _async_client=wrap_qdrant_client(AsyncQdrantClient(location=":memory:") if is_replaying() else create_async_qdrant_client(), asynchronous=True)
+        logger.info(f"Created async Qdrant client (gRPC: {QDRANT_PREFER_GRPC})")
+    return _async_client
+
+#   Close the process-wide async client (on shutdown).
+
+async def close_async_qdrant_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client=None
+
+#   Whether searches go through the async client instead of the sync client in a thread.
+#   Embedded storage belongs to the sync client, and in-process searches have no network hop to overlap.
+
+def use_async_search() -> bool:
+    return QDRANT_ASYNC_SEARCH and not is_embedded_mode()
+
+#   Convert a Qdrant point with a LangChain payload into a Document.
+
+def point_to_document(point, collection_name: str) -> Document:
+    payload=point.payload or {}
+    metadata=dict(payload.get(METADATA_PAYLOAD_KEY) or {})
+    metadata["_id"]=point.id
+    metadata["_collection_name"]=collection_name
+    return Document(page_content=payload.get("page_content", ""), metadata=metadata)
+
+#   Dense similarity search through the shared async client.
+
+async def async_dense_search(
+    collection_name: str,
+    query_vector: List[float],
+    k: int,
+    query_filter=None,
+    timeout: float=QDRANT_SEARCH_TIMEOUT
+) -> List[Document]:
+    response=await get_async_qdrant_client().query_points(
+        collection_name=collection_name,
+        query=query_vector,
+        query_filter=query_filter,
+        limit=k,
+        with_payload=True,
+        with_vectors=False,
+        timeout=max(1, math.ceil(timeout))
+    )
+    return [point_to_document(point, collection_name) for point in response.points]
+
+#   Scroll a page of points through the shared async client.
+
+async def async_scroll(collection_name: str, limit: int, timeout: float=QDRANT_SEARCH_TIMEOUT, **kwargs) -> List[Any]:
+    points, _=await get_async_qdrant_client().scroll(
+        collection_name=collection_name,
+        limit=limit,
+        timeout=max(1, math.ceil(timeout)),
+        **kwargs
     )
+    return points
+
+#   Get the sparse embedding model, loading it on first use.
+
+def get_sparse_embedding(model_name: str="Qdrant/bm25"):
+    if model_name not in _sparse_embeddings:
+        _sparse_embeddings[model_name]=FastEmbedSparse(model_name=model_name)
+        logger.info(f"Loaded sparse embedding model: {model_name}")
+    return _sparse_embeddings[model_name]
 
 #   Initialize the Qdrant vector store with the given parameters.
 
@@ -37,12 +301,13 @@ async def initialize_vector_store(
     sparse_model: str="Qdrant/bm25"
 ) -> Optional[QdrantVectorStore]:
     try:
+        sparse_embedding=await asyncio.to_thread(get_sparse_embedding, sparse_model)
         vector_store=await asyncio.to_thread(
             QdrantVectorStore,
             client=client,
             collection_name=collection_name,
             embedding=embedding_model,
-            sparse_embedding=FastEmbedSparse(model_name=sparse_model),
+            sparse_embedding=sparse_embedding,
             sparse_vector_name="default",
             retrieval_mode=RetrievalMode.HYBRID
         )
@@ -65,6 +330,7 @@ async def create_qdrant_collection(
         
         if any(collection.name==collection_name for collection in collections.collections):
             await asyncio.to_thread(client.delete_collection, collection_name)
+            _indexed_collections.discard(collection_name)
             logger.info(f"Deleted existing collection: {collection_name}")
         await asyncio.to_thread(
             client.create_collection,
@@ -78,6 +344,11 @@ async def create_qdrant_collection(
             }
         )
         logger.info(f"Successfully created collection: {collection_name}")
+        from vector_mirror import bump_collection_version
+        from flight_index import reset_flight_index
+        from facets import reset_facets
+        reset_flight_index(collection_name, bump_collection_version(collection_name))
+        reset_facets(collection_name)
         await create_filter_indexes(client, collection_name)
     except Exception as e:
         logger.error(f"Error in collection creation: {str(e)}")
@@ -85,32 +356,16 @@ async def create_qdrant_collection(
 
 #   Create payload indexes for fields that will be used in filtering.
 
-async def create_filter_indexes(client: QdrantClient, collection_name: str) -> None:
+async def create_filter_indexes(client: QdrantClient, collection_name: str, existing_fields: Optional[set]=None) -> None:
     try:
-
-        #   Defining the fields to index for filtering.
-
-        filter_fields=[
-            ("document_type", "keyword"),
-            ("airline", "keyword"),
-            ("alliance", "keyword"),
-            ("from_country", "keyword"),
-            ("to_country", "keyword"),
-            ("travel_class", "keyword"),
-            ("price_usd", "integer"),
-            ("refundable", "bool"),
-            ("baggage_included", "bool"),
-            ("wifi_available", "bool"),
-            ("meal_service", "keyword"),
-            ("aircraft_type", "keyword"),
-        ]
-        
-        for field_name, field_type in filter_fields:
+        for field_name, field_type in FILTER_INDEX_FIELDS:
+            if existing_fields and payload_key(field_name) in existing_fields:
+                continue
             try:
                 await asyncio.to_thread(
                     client.create_payload_index,
                     collection_name=collection_name,
-                    field_name=field_name,
+                    field_name=payload_key(field_name),
                     field_schema=field_type
                 )
                 logger.info(f"Created index for field: {field_name} ({field_type})")
@@ -125,8 +380,11 @@ async def create_filter_indexes(client: QdrantClient, collection_name: str) -> N
         raise
 
 #   Ensure that payload indexes exist for fields that will be used in filtering.
+#   Only missing indexes are created, and a collection is checked once per process.
 
 async def ensure_filter_indexes(client: QdrantClient, collection_name: str) -> None:
+    if collection_name in _indexed_collections:
+        return
     try:
         
         #   Checking if the collection exists before creating indexes.
@@ -137,7 +395,31 @@ async def ensure_filter_indexes(client: QdrantClient, collection_name: str) -> N
         if not collection_exists:
             logger.warning(f"Collection {collection_name} does not exist, cannot create indexes")
             return
-        await create_filter_indexes(client, collection_name)    #   Create indexes for the collection.
+        collection_info=await asyncio.to_thread(client.get_collection, collection_name)
+        existing_fields=set((collection_info.payload_schema or {}).keys())
+        await create_filter_indexes(client, collection_name, existing_fields=existing_fields)    #   Create missing indexes for the collection.
+        _indexed_collections.add(collection_name)
     except Exception as e:
         logger.error(f"Error ensuring filter indexes: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+#   Read collection payload schemas synchronously – used before forking workers so each one starts with the index state primed.
+
+def preload_collection_schemas(collection_names: List[str]) -> List[str]:
+    if is_embedded_mode():
+        logger.info("Embedded Qdrant is opened by each worker, skipping schema preload")
+        return sorted(_indexed_collections)
+    client=get_qdrant_client()
+    required_fields={payload_key(field_name) for field_name, _ in FILTER_INDEX_FIELDS}
+    try:
+        for collection_name in collection_names:
+            try:
+                collection_info=client.get_collection(collection_name)
+            except Exception as e:
+                logger.warning(f"Could not preload schema for collection {collection_name}: {str(e)}")
+                continue
+            if required_fields<=set((collection_info.payload_schema or {}).keys()):
+                _indexed_collections.add(collection_name)
+    finally:
+        client.close()  #   No connections may be shared across forked workers.
+    return sorted(_indexed_collections)
@@ -0,0 +1,80 @@
+import os
+import time
+import asyncio
+import logging
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional,
+    Awaitable
+)
+
+'''
+
+    Request deadlines: every search carries an absolute deadline in the graph state, taken from the request's
+    "timeout_ms" field, the X-Request-Timeout-Ms header or SEARCH_DEADLINE_MS.
+
+    Upstream-bound nodes check the budget left before calling out and bound their calls by it. A node without
+    enough budget degrades instead of failing: classification falls back to "both", filters are extracted
+    locally from the facet catalogue, reranking keeps the retrieval order, retrieval returns what it has and
+    the answer is rendered from the documents without an LLM. Degraded stages are reported in the response.
+
+'''
+
+logger=logging.getLogger(__name__)
+
+SEARCH_DEADLINE_MS=int(os.getenv("SEARCH_DEADLINE_MS", "15000"))    #   Default request budget; 0 disables deadlines.
+DEADLINE_HEADER="X-Request-Timeout-Ms"
+
+#   Expected duration of each upstream-bound stage; a stage with less budget left is degraded without calling out.
+
+STAGE_BUDGET_SECONDS={
+    "classify_query": float(os.getenv("CLASSIFY_BUDGET_SECONDS", "1.5")),
+    "generate_filters": float(os.getenv("FILTERS_BUDGET_SECONDS", "2.0")),
+    "llm_reranker": float(os.getenv("RERANK_BUDGET_SECONDS", "3.0")),
+    "merge_documents": float(os.getenv("RERANK_BUDGET_SECONDS", "3.0")),
+    "generate_answer": float(os.getenv("ANSWER_BUDGET_SECONDS", "3.0")),
+}
+
+#   Absolute deadline (monotonic seconds) for a request budget in milliseconds; 0.0 means no deadline.
+
+def deadline_from(timeout_ms: Optional[int]=None) -> float:
+    timeout_ms=timeout_ms if timeout_ms is not None else SEARCH_DEADLINE_MS
+    if not timeout_ms or timeout_ms<=0:
+        return 0.0
+    return time.monotonic()+timeout_ms/1000
+
+#   Seconds left before the request's deadline, or None when it has none.
+
+def remaining_seconds(state: Dict[str, Any]) -> Optional[float]:
+    deadline=state.get("deadline")
+    if not deadline:
+        return None
+    return deadline-time.monotonic()
+
+#   Whether enough budget is left for a stage's upstream call.
+
+def has_budget(state: Dict[str, Any], stage: str) -> bool:
+    remaining=remaining_seconds(state)
+    return remaining is None or remaining>=STAGE_BUDGET_SECONDS.get(stage, 0.0)
+
+#   Await an upstream call bounded by the request's remaining budget (and the call's own timeout, if given);
+#   raises asyncio.TimeoutError when either runs out.
+
+async def within_deadline(state: Dict[str, Any], awaitable: Awaitable, timeout: Optional[float]=None):
+    remaining=remaining_seconds(state)
+    if remaining is not None:
+        timeout=max(remaining, 0.0) if timeout is None else max(min(timeout, remaining), 0.0)
+    if timeout is None:
+        return await awaitable
+    return await asyncio.wait_for(awaitable, timeout=timeout)
+
+#   Degraded stages of the request with one more added; the reason is logged ("deadline", or an upstream failure).
+
+def mark_degraded(state: Dict[str, Any], stage: str, reason: str="deadline") -> List[str]:
+    degraded=list(state.get("degraded") or [])
+    if stage not in degraded:
+        degraded.append(stage)
+    logger.warning(f"Degrading {stage} ({reason}): {remaining_seconds(state)} seconds of the request budget left")
+    return degraded
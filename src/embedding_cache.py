@@ -0,0 +1,263 @@
+import os
+import sys
+import math
+import time
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import argparse
+import threading
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional,
+    Callable,
+    Awaitable
+)
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+'''
+
+    Content-addressed embedding cache. Vectors are stored as float32 blobs in SQLite at EMBEDDING_CACHE_PATH,
+    keyed by (model, task, dimension, sha256 of the text); the task separates query from document
+    embeddings, which Gemini computes differently. Ingestion and search consult it before any embedding call,
+    so unchanged content is never embedded twice.
+
+    When the stored vectors exceed EMBEDDING_CACHE_MAX_MB, the least recently used entries are evicted down to
+    90% of the limit. Inspect or manage the cache with:
+
+        python src/embedding_cache.py stats
+        python src/embedding_cache.py evict --max-mb 256
+        python src/embedding_cache.py clear
+
+'''
+
+logger=logging.getLogger(__name__)
+
+EMBEDDING_CACHE_ENABLED=os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower()=="true"
+EMBEDDING_CACHE_PATH=os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite")
+EMBEDDING_CACHE_MAX_MB=float(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+EMBEDDING_DIMENSION=int(os.getenv("EMBEDDING_DIMENSION", "768"))
+
+EVICTION_TARGET_RATIO=0.9
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+
+    def __init__(self, path: str, max_mb: float=EMBEDDING_CACHE_MAX_MB):
+        self.path=path
+        self.max_bytes=int(max_mb*1024*1024)
+        self.lock=threading.Lock()
+        self.counts={"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection=sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                task TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, task, dimension, hash)
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.connection.commit()
+        self.size_bytes=self.connection.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    #   Cached vectors of the given text hashes (hash -> vector); hits are marked as recently used.
+
+    def get_many(self, model: str, task: str, dimension: int, hashes: List[str]) -> Dict[str, List[float]]:
+        found={}
+        with self.lock:
+            for start in range(0, len(hashes), 500):
+                chunk=hashes[start:start+500]
+                rows=self.connection.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model=? AND task=? AND dimension=? AND hash IN ({','.join('?'*len(chunk))})",
+                    [model, task, dimension, *chunk]
+                ).fetchall()
+                for hash_value, vector in rows:
+                    found[hash_value]=np.frombuffer(vector, dtype=np.float32).tolist()
+            if found:
+                now=time.time()
+                self.connection.executemany(
+                    "UPDATE embeddings SET last_used=? WHERE model=? AND task=? AND dimension=? AND hash=?",
+                    [(now, model, task, dimension, hash_value) for hash_value in found]
+                )
+                self.connection.commit()
+            self.counts["hits"]+=len(found)
+            self.counts["misses"]+=len(hashes)-len(found)
+        return found
+
+    def put_many(self, model: str, task: str, dimension: int, vectors: Dict[str, List[float]]) -> None:
+        if not vectors:
+            return
+        now=time.time()
+        rows=[(model, task, dimension, hash_value, np.asarray(vector, dtype=np.float32).tobytes(), now) for hash_value, vector in vectors.items()]
+        with self.lock:
+            self.connection.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.connection.commit()
+            self.counts["writes"]+=len(rows)
+            self.size_bytes+=sum(len(row[4]) for row in rows)     #   Replacements overcount until the next eviction recounts.
+            if self.size_bytes>self.max_bytes:
+                self.evict_locked(int(self.max_bytes*EVICTION_TARGET_RATIO))
+
+    #   Delete least recently used entries until the stored vectors fit in target_bytes.
+
+    def evict_locked(self, target_bytes: int) -> int:
+        self.size_bytes=self.connection.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        evicted=0
+        while self.size_bytes>target_bytes:
+            row_bytes=self.connection.execute("SELECT AVG(LENGTH(vector)) FROM embeddings").fetchone()[0] or 1
+            count=max(math.ceil((self.size_bytes-target_bytes)/row_bytes), 1)
+            deleted=self.connection.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (count,)
+            ).rowcount
+            self.connection.commit()
+            if not deleted:
+                break
+            evicted+=deleted
+            self.size_bytes=self.connection.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        if evicted:
+            self.counts["evictions"]+=evicted
+            logger.info(f"Evicted {evicted} embeddings from {self.path} ({self.size_bytes/1024/1024:.1f} MB left)")
+        return evicted
+
+    def evict(self, max_mb: float) -> int:
+        with self.lock:
+            return self.evict_locked(int(max_mb*1024*1024))
+
+    def clear(self) -> None:
+        with self.lock:
+            self.connection.execute("DELETE FROM embeddings")
+            self.connection.commit()
+            self.connection.execute("VACUUM")
+            self.size_bytes=0
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            models=[
+                {"model": model, "task": task, "dimension": dimension, "entries": entries, "mb": round(size/1024/1024, 2)}
+                for model, task, dimension, entries, size in self.connection.execute(
+                    "SELECT model, task, dimension, COUNT(*), SUM(LENGTH(vector)) FROM embeddings GROUP BY model, task, dimension"
+                ).fetchall()
+            ]
+            lookups=self.counts["hits"]+self.counts["misses"]
+            return {
+                "path": self.path,
+                "entries": sum(model["entries"] for model in models),
+                "size_mb": round(self.size_bytes/1024/1024, 2),
+                "max_mb": round(self.max_bytes/1024/1024, 2),
+                "file_mb": round(os.path.getsize(self.path)/1024/1024, 2) if os.path.exists(self.path) else 0.0,
+                "hit_rate": round(self.counts["hits"]/lookups, 4) if lookups else None,
+                **self.counts,
+                "models": models
+            }
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+_cache=None
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    global _cache
+    if _cache is None and EMBEDDING_CACHE_ENABLED:
+        _cache=EmbeddingCache(EMBEDDING_CACHE_PATH)
+    return _cache
+
+def close_embedding_cache() -> None:
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache=None
+
+#   Embedding model behind the cache: only texts without a cached vector reach the model, each distinct text once.
+
+class CachedEmbeddings(Embeddings):
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: EmbeddingCache, dimension: int=EMBEDDING_DIMENSION):
+        self.embeddings=embeddings
+        self.model_name=model_name
+        self.cache=cache
+        self.dimension=dimension
+
+    def split(self, texts: List[str], task: str):
+        hashes=[text_hash(text) for text in texts]
+        found=self.cache.get_many(self.model_name, task, self.dimension, list(dict.fromkeys(hashes)))
+        missing={}
+        for hash_value, text in zip(hashes, texts):
+            if hash_value not in found:
+                missing.setdefault(hash_value, text)
+        return hashes, found, missing
+
+    def store(self, task: str, found: Dict[str, List[float]], missing: Dict[str, str], vectors: List[List[float]]) -> None:
+        computed=dict(zip(missing, vectors))
+        self.cache.put_many(self.model_name, task, self.dimension, computed)
+        found.update(computed)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, found, missing=self.split(texts, "document")
+        if missing:
+            self.store("document", found, missing, self.embeddings.embed_documents(list(missing.values())))
+        return [found[hash_value] for hash_value in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        hashes, found, missing=self.split([text], "query")
+        if missing:
+            self.store("query", found, missing, [self.embeddings.embed_query(text)])
+        return found[hashes[0]]
+
+    #   Cached document embedding; misses go to embed (the ingestion executor) or the wrapped model.
+
+    async def aembed_documents(self, texts: List[str], embed: Optional[Callable[[List[str]], Awaitable[List[List[float]]]]]=None) -> List[List[float]]:
+        hashes, found, missing=await asyncio.to_thread(self.split, texts, "document")
+        if missing:
+            vectors=await (embed or self.embeddings.aembed_documents)(list(missing.values()))
+            await asyncio.to_thread(self.store, "document", found, missing, vectors)
+        return [found[hash_value] for hash_value in hashes]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        hashes, found, missing=await asyncio.to_thread(self.split, [text], "query")
+        if missing:
+            vector=await self.embeddings.aembed_query(text)
+            await asyncio.to_thread(self.store, "query", found, missing, [vector])
+        return found[hashes[0]]
+
+def parse_args(argv: Optional[List[str]]=None) -> argparse.Namespace:
+    parser=argparse.ArgumentParser(description="Inspect or manage the embedding cache")
+    parser.add_argument("command", choices=["stats", "evict", "clear"])
+    parser.add_argument("--path", default=EMBEDDING_CACHE_PATH, help="Cache database (default: EMBEDDING_CACHE_PATH)")
+    parser.add_argument("--max-mb", type=float, default=EMBEDDING_CACHE_MAX_MB, help="Size to evict down to")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]]=None) -> int:
+    import json
+    logging.basicConfig(level=logging.INFO)
+    args=parse_args(argv)
+    if not os.path.exists(args.path):
+        print(f"No embedding cache at {args.path}")
+        return 1
+    cache=EmbeddingCache(args.path, args.max_mb)
+    try:
+        if args.command=="evict":
+            print(f"Evicted {cache.evict(args.max_mb)} entries")
+        elif args.command=="clear":
+            cache.clear()
+            print(f"Cleared {args.path}")
+        print(json.dumps(cache.stats(), indent=2))
+    finally:
+        cache.close()
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional
+)
+
+'''
+
+    Embedding executor for ingestion. Texts are embedded in calls of EMBED_BATCH_SIZE, at most
+    EMBED_CONCURRENCY at a time, paced by token buckets shared by the whole process (one Gemini API key):
+    EMBED_REQUESTS_PER_MINUTE embedding calls and, when set, EMBED_TEXTS_PER_MINUTE embedded texts.
+
+    Rate-limited calls (HTTP 429 / RESOURCE_EXHAUSTED) are retried up to EMBED_MAX_RETRIES times with
+    exponential backoff and full jitter, starting at EMBED_BACKOFF_SECONDS and capped at
+    EMBED_MAX_BACKOFF_SECONDS; any other error fails the batch.
+
+'''
+
+logger=logging.getLogger(__name__)
+
+EMBED_BATCH_SIZE=int(os.getenv("EMBED_BATCH_SIZE", "64"))  #   Gemini accepts at most 100 texts per batch call.
+EMBED_CONCURRENCY=int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_REQUESTS_PER_MINUTE=float(os.getenv("EMBED_REQUESTS_PER_MINUTE", "1500"))
+EMBED_TEXTS_PER_MINUTE=float(os.getenv("EMBED_TEXTS_PER_MINUTE", "0"))  #   0 disables the per-text bucket.
+EMBED_MAX_RETRIES=int(os.getenv("EMBED_MAX_RETRIES", "6"))
+EMBED_BACKOFF_SECONDS=float(os.getenv("EMBED_BACKOFF_SECONDS", "1"))
+EMBED_MAX_BACKOFF_SECONDS=float(os.getenv("EMBED_MAX_BACKOFF_SECONDS", "60"))
+
+RATE_LIMIT_MARKERS=("429", "resource_exhausted", "resource exhausted", "rate limit", "quota")
+
+#   Token bucket refilled continuously at rate_per_minute, holding at most one minute of tokens.
+
+class TokenBucket:
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float]=None):
+        self.rate=rate_per_minute/60
+        self.capacity=capacity or rate_per_minute
+        self.tokens=self.capacity
+        self.updated_at=time.monotonic()
+        self.lock=asyncio.Lock()
+        self.waited_seconds=0.0
+
+    #   Wait until the tokens are available and take them; a request larger than the bucket waits for a full one.
+
+    async def acquire(self, tokens: float=1.0) -> None:
+        tokens=min(tokens, self.capacity)
+        async with self.lock:
+            while True:
+                now=time.monotonic()
+                self.tokens=min(self.capacity, self.tokens+(now-self.updated_at)*self.rate)
+                self.updated_at=now
+                if self.tokens>=tokens:
+                    self.tokens-=tokens
+                    return
+                wait=(tokens-self.tokens)/self.rate
+                self.waited_seconds+=wait
+                await asyncio.sleep(wait)
+
+_buckets=None
+
+#   The process-wide request and text buckets (None when the text bucket is disabled).
+
+def get_rate_limiters() -> Dict[str, Optional[TokenBucket]]:
+    global _buckets
+    if _buckets is None:
+        _buckets={
+            "requests": TokenBucket(EMBED_REQUESTS_PER_MINUTE) if EMBED_REQUESTS_PER_MINUTE>0 else None,
+            "texts": TokenBucket(EMBED_TEXTS_PER_MINUTE) if EMBED_TEXTS_PER_MINUTE>0 else None
+        }
+    return _buckets
+
+def is_rate_limited(error: Exception) -> bool:
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests"):
+        return True
+    message=str(error).lower()
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+#   Delay before retry number attempt (0-based): full jitter over an exponentially growing, capped window.
+
+def backoff_seconds(attempt: int) -> float:
+    return random.uniform(0, min(EMBED_MAX_BACKOFF_SECONDS, EMBED_BACKOFF_SECONDS*2**attempt))
+
+class EmbeddingExecutor:
+
+    def __init__(self, embeddings, batch_size: int=EMBED_BATCH_SIZE, concurrency: int=EMBED_CONCURRENCY):
+        from embedding_cache import CachedEmbeddings
+        self.cached=embeddings if isinstance(embeddings, CachedEmbeddings) else None   #   Cache hits skip the rate limiter.
+        self.embeddings=embeddings.embeddings if self.cached else embeddings
+        self.batch_size=max(batch_size, 1)
+        self.semaphore=asyncio.Semaphore(max(concurrency, 1))
+        self.buckets=get_rate_limiters()
+        self.counts={"texts": 0, "calls": 0, "rate_limited": 0, "retries": 0}
+        self.embedding_seconds=0.0
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        async with self.semaphore:
+            attempt=0
+            while True:
+                if self.buckets["requests"] is not None:
+                    await self.buckets["requests"].acquire()
+                if self.buckets["texts"] is not None:
+                    await self.buckets["texts"].acquire(len(texts))
+                start_time=time.perf_counter()
+                try:
+                    self.counts["calls"]+=1
+                    vectors=await self.embeddings.aembed_documents(texts)
+                except Exception as e:
+                    if not is_rate_limited(e) or attempt>=EMBED_MAX_RETRIES:
+                        raise
+                    delay=backoff_seconds(attempt)
+                    self.counts["rate_limited"]+=1
+                    self.counts["retries"]+=1
+                    attempt+=1
+                    logger.warning(f"Embedding call rate limited, retry {attempt}/{EMBED_MAX_RETRIES} in {delay:.2f}s: {e}")
+                    await asyncio.sleep(delay)
+                    continue
+                self.embedding_seconds+=time.perf_counter()-start_time
+                self.counts["texts"]+=len(texts)
+                return vectors
+
+    async def embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        batches=[texts[i:i+self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results=await asyncio.gather(*[self.embed_batch(batch) for batch in batches])
+        return [vector for vectors in results for vector in vectors]
+
+    #   Embed texts in concurrent batch calls (after the embedding cache, if any), returning vectors in input order.
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if self.cached:
+            return await self.cached.aembed_documents(texts, embed=self.embed_uncached)
+        return await self.embed_uncached(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        waited=sum(bucket.waited_seconds for bucket in self.buckets.values() if bucket is not None)
+        return {
+            **self.counts,
+            "embedding_seconds": round(self.embedding_seconds, 3),
+            "rate_limiter_wait_seconds": round(waited, 3)
+        }
@@ -1,12 +1,20 @@
 import os
 import logging
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from cassette import (
+    get_cassette,
+    CassetteEmbeddings
+)
 
 logger=logging.getLogger(__name__)
 
-#   Initializing the embedding model for Gemini.
+#   Initializing the embedding model for Gemini, behind the embedding cache (or recorded or replayed when a
+#   cassette is active, which bypasses the cache so every call reaches the cassette).
 
 def get_embedding_model(model_name: str="text-embedding-004"):
+    cassette=get_cassette()
+    if cassette is not None and cassette.mode=="replay":
+        return CassetteEmbeddings(None, model_name)
     try:
         google_api_key=os.getenv("GOOGLE_API_KEY")
         if not google_api_key:
@@ -21,6 +29,15 @@ def get_embedding_model(model_name: str="text-embedding-004"):
             google_api_key=google_api_key
         )
         logger.info(f"Successfully initialized Gemini embeddings with model: {full_model_name}")
+        if cassette is not None:
+            return CassetteEmbeddings(embeddings, model_name)
+        from embedding_cache import (
+            get_embedding_cache,
+            CachedEmbeddings
+        )
+        cache=get_embedding_cache()
+        if cache is not None:
+            return CachedEmbeddings(embeddings, model_name, cache)
         return embeddings
     except Exception as e:
         logger.error(f"Failed to initialize Gemini embeddings: {str(e)}")
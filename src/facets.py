@@ -0,0 +1,186 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from typing import (
+    Dict,
+    Any,
+    List
+)
+from langchain_core.documents import Document
+from filters import (
+    FILTER_FIELDS,
+    METADATA_PAYLOAD_KEY,
+    payload_key
+)
+
+'''
+
+    Facet catalogue: the filterable values that actually occur in a collection's flights.
+
+    Catalogues are discovered per collection with a payload-only scan, cached, and updated incrementally
+    by ingestion. The filter prompt gets a compact serialization of the relevant facets only: small fields
+    in full, large fields (airlines, countries, aircraft) restricted to the values the query mentions –
+    with a city mentioned in the query resolved to its country.
+
+'''
+
+logger=logging.getLogger(__name__)
+
+FACET_REFRESH_SECONDS=float(os.getenv("FACET_REFRESH_SECONDS", "300"))
+FACET_INLINE_MAX_VALUES=int(os.getenv("FACET_INLINE_MAX_VALUES", "8"))
+FACET_SCROLL_BATCH=int(os.getenv("FACET_SCROLL_BATCH", "1000"))
+
+BOOLEAN_FIELDS=["refundable", "baggage_included", "wifi_available"]
+VALUE_FIELDS=[field for field, kind in FILTER_FIELDS.values() if kind=="match" and field not in BOOLEAN_FIELDS]
+PRICE_FIELD="price_usd"
+COUNTRY_FIELDS={"from_country": "from", "to_country": "to"}
+SCANNED_FIELDS=VALUE_FIELDS+[PRICE_FIELD, "from", "to", "flight_id"]
+
+_catalogues={}  #   Collection name -> FacetCatalogue.
+_catalogue_locks={}     #   Collection name -> asyncio.Lock, so concurrent requests discover a catalogue only once.
+
+class FacetCatalogue:
+
+    def __init__(self, collection_name: str):
+        self.collection_name=collection_name
+        self.values={field: {} for field in VALUE_FIELDS}   #   Field -> value -> number of flights.
+        self.places={}  #   City -> country.
+        self.price_min=None
+        self.price_max=None
+        self.flight_count=0
+        self.updated_at=time.monotonic()
+
+    #   Add flight metadata records (other documents carry empty placeholder values and are skipped).
+
+    def add_records(self, records: List[Dict[str, Any]]) -> None:
+        for record in records:
+            if not record.get("flight_id"):
+                continue
+            self.flight_count+=1
+            for field in VALUE_FIELDS:
+                value=record.get(field)
+                if value not in (None, ""):
+                    self.values[field][str(value)]=self.values[field].get(str(value), 0)+1
+            for country_field, city_field in COUNTRY_FIELDS.items():
+                if record.get(city_field) and record.get(country_field):
+                    self.places[record[city_field]]=record[country_field]
+            price=record.get(PRICE_FIELD)
+            if isinstance(price, (int, float)):
+                self.price_min=price if self.price_min is None else min(self.price_min, price)
+                self.price_max=price if self.price_max is None else max(self.price_max, price)
+
+    #   Compact description of the facets relevant to a query, for the filter prompt.
+
+    def describe(self, query: str) -> str:
+        if not self.flight_count:
+            return "No flights in this collection."
+        mentioned_countries=set()
+        for city, country in self.places.items():
+            if mentions(query, city):
+                mentioned_countries.add(country)
+        lines=[]
+        omitted=[]
+        for field in VALUE_FIELDS:
+            values=sorted(self.values[field])
+            if not values:
+                continue
+            if len(values)<=FACET_INLINE_MAX_VALUES:
+                lines.append(f"{field}: {'|'.join(values)}")
+                continue
+            relevant=[value for value in values if mentions(query, value)]
+            if field in COUNTRY_FIELDS:
+                relevant=sorted(set(relevant)|mentioned_countries)
+            if relevant:
+                lines.append(f"{field}: {'|'.join(relevant)}")
+            else:
+                omitted.append(field)
+        if self.price_min is not None:
+            lines.append(f"{PRICE_FIELD} (max_price/min_price): {self.price_min}-{self.price_max}")
+        lines.append(f"true/false: {', '.join(BOOLEAN_FIELDS)}")
+        if omitted:
+            lines.append(f"not mentioned in the query (leave null): {', '.join(omitted)}")
+        return "\n".join(lines)
+
+#   Whether a facet value occurs in the query as a whole word.
+
+def mentions(query: str, value: str) -> bool:
+    return re.search(rf"(?<!\w){re.escape(value)}(?!\w)", query, re.IGNORECASE) is not None
+
+#   Discover a collection's facets with a payload-only scan of the fields they need.
+
+def discover_facets(client, collection_name: str) -> FacetCatalogue:
+    catalogue=FacetCatalogue(collection_name)
+    offset=None
+    while True:
+        points, offset=client.scroll(
+            collection_name,
+            limit=FACET_SCROLL_BATCH,
+            offset=offset,
+            with_payload=[payload_key(field) for field in SCANNED_FIELDS],
+            with_vectors=False
+        )
+        catalogue.add_records([(point.payload or {}).get(METADATA_PAYLOAD_KEY) or {} for point in points])
+        if offset is None:
+            break
+    logger.info(f"Discovered facets of {collection_name}: {catalogue.flight_count} flights, {sum(len(values) for values in catalogue.values.values())} values")
+    return catalogue
+
+#   Get the cached catalogue of a collection, discovering it on first use and after FACET_REFRESH_SECONDS.
+
+async def get_facet_catalogue(client, collection_name: str) -> FacetCatalogue:
+    catalogue=_catalogues.get(collection_name)
+    if catalogue is not None and time.monotonic()-catalogue.updated_at<FACET_REFRESH_SECONDS:
+        return catalogue
+    lock=_catalogue_locks.setdefault(collection_name, asyncio.Lock())
+    async with lock:
+        catalogue=_catalogues.get(collection_name)
+        if catalogue is None or time.monotonic()-catalogue.updated_at>=FACET_REFRESH_SECONDS:
+            _catalogues[collection_name]=await asyncio.to_thread(discover_facets, client, collection_name)
+        return _catalogues[collection_name]
+
+#   Compact facet description for a query's filter prompt.
+
+async def describe_facets(client, collection_name: str, query: str) -> str:
+    catalogue=await get_facet_catalogue(client, collection_name)
+    return catalogue.describe(query)
+
+#   Add ingested documents to a cached catalogue (a missing one is discovered with them on first use).
+
+def update_facets(collection_name: str, documents: List[Document]) -> None:
+    catalogue=_catalogues.get(collection_name)
+    if catalogue is not None:
+        catalogue.add_records([document.metadata for document in documents])
+
+#   Drop a collection's catalogue after points were replaced or deleted; it is discovered again on next use.
+
+def discard_facets(collection_name: str) -> None:
+    _catalogues.pop(collection_name, None)
+
+#   Start an empty catalogue for a newly created collection.
+
+def reset_facets(collection_name: str) -> None:
+    _catalogues[collection_name]=FacetCatalogue(collection_name)
+
+#   Discover catalogues synchronously – used before forking workers so they start with them cached.
+
+def preload_facets(collection_names: List[str]) -> Dict[str, int]:
+    from client_qdrant import (
+        get_qdrant_client,
+        is_embedded_mode
+    )
+    if is_embedded_mode():
+        return {}
+    client=get_qdrant_client()
+    counts={}
+    try:
+        for collection_name in collection_names:
+            try:
+                _catalogues[collection_name]=discover_facets(client, collection_name)
+                counts[collection_name]=_catalogues[collection_name].flight_count
+            except Exception as e:
+                logger.warning(f"Could not preload facets for collection {collection_name}: {str(e)}")
+    finally:
+        client.close()  #   No connections may be shared across forked workers.
+    return counts
@@ -0,0 +1,128 @@
+import os
+import logging
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Any,
+    Optional
+)
+
+if TYPE_CHECKING:
+    from qdrant_client.models import Filter
+
+logger=logging.getLogger(__name__)
+
+#   LangChain's QdrantVectorStore nests document metadata under this payload key.
+
+METADATA_PAYLOAD_KEY="metadata"
+
+#   How multiple filter conditions are combined: "should" (any condition, the original behaviour) or "must" (all conditions).
+
+FILTER_MATCH_MODE=os.getenv("FILTER_MATCH_MODE", "should")
+
+#   Generated filter keys mapped to the metadata field they constrain and how.
+
+FILTER_FIELDS={
+    "airline": ("airline", "match"),
+    "alliance": ("alliance", "match"),
+    "from_country": ("from_country", "match"),
+    "to_country": ("to_country", "match"),
+    "travel_class": ("travel_class", "match"),
+    "max_price": ("price_usd", "lte"),
+    "min_price": ("price_usd", "gte"),
+    "refundable": ("refundable", "match"),
+    "baggage_included": ("baggage_included", "match"),
+    "wifi_available": ("wifi_available", "match"),
+    "meal_service": ("meal_service", "match"),
+    "aircraft_type": ("aircraft_type", "match"),
+}
+
+#   Flight constraints that always narrow the results, whatever FILTER_MATCH_MODE says: the number of layovers, seats
+#   left, travel time and the departure window (ISO dates or datetimes; a bare date in "departure_before" covers the day).
+
+CONSTRAINT_FILTER_FIELDS={
+    "max_layovers": ("layovers", "count_lte"),
+    "min_availability": ("availability", "gte"),
+    "departure_after": ("departure_date", "after"),
+    "departure_before": ("departure_date", "before"),
+    "max_duration_hours": ("flight_duration_hours", "lte"),
+}
+
+#   Payload key of a metadata field.
+
+def payload_key(field: str) -> str:
+    return f"{METADATA_PAYLOAD_KEY}.{field}"
+
+#   Bound of a departure window as an ISO datetime.
+
+def departure_bound(kind: str, value: Any) -> str:
+    value=str(value)
+    if len(value)==10:
+        return f"{value}T23:59:59" if kind=="before" else f"{value}T00:00:00"
+    return value
+
+#   Qdrant condition for one generated filter.
+
+def field_condition(field: str, kind: str, value: Any):
+    from qdrant_client.models import (
+        FieldCondition,
+        MatchValue,
+        Range,
+        DatetimeRange,
+        ValuesCount
+    )
+    if kind=="match":
+        return FieldCondition(key=payload_key(field), match=MatchValue(value=value))
+    if kind=="lte":
+        return FieldCondition(key=payload_key(field), range=Range(lte=value))
+    if kind=="gte":
+        return FieldCondition(key=payload_key(field), range=Range(gte=value))
+    if kind=="count_lte":
+        return FieldCondition(key=payload_key(field), values_count=ValuesCount(lte=value))
+    if kind=="after":
+        return FieldCondition(key=payload_key(field), range=DatetimeRange(gte=departure_bound(kind, value)))
+    return FieldCondition(key=payload_key(field), range=DatetimeRange(lte=departure_bound(kind, value)))
+
+#   Build the Qdrant filter for a set of generated filters, or None when nothing applies.
+
+def build_qdrant_filter(filters: Dict[str, Any], match_mode: Optional[str]=None) -> Optional["Filter"]:
+    from qdrant_client.models import Filter
+    match_mode=match_mode or FILTER_MATCH_MODE
+    filter_conditions=[field_condition(field, kind, filters[filter_key]) for filter_key, (field, kind) in FILTER_FIELDS.items() if filter_key in filters]
+    constraints=[field_condition(field, kind, filters[filter_key]) for filter_key, (field, kind) in CONSTRAINT_FILTER_FIELDS.items() if filter_key in filters]
+    if not filter_conditions and not constraints:
+        return None
+    if match_mode=="should" and len(filter_conditions)>1:
+        return Filter(should=filter_conditions, must=constraints or None)
+    return Filter(must=filter_conditions+constraints)
+
+#   Whether one metadata field satisfies a generated filter, evaluated in memory like the Qdrant condition.
+
+def condition_holds(metadata: Dict[str, Any], filter_key: str, value: Any) -> bool:
+    field, kind=FILTER_FIELDS.get(filter_key) or CONSTRAINT_FILTER_FIELDS[filter_key]
+    actual=metadata.get(field)
+    if kind=="count_lte":
+        return len(actual or [])<=value
+    if actual is None:
+        return False
+    if kind=="match":
+        return actual==value
+    if kind in ("after", "before"):
+        departure=departure_bound(kind, actual)
+        return departure>=departure_bound(kind, value) if kind=="after" else departure<=departure_bound(kind, value)
+    if not isinstance(actual, (int, float)):
+        return False
+    return actual<=value if kind=="lte" else actual>=value
+
+#   Whether a document's metadata matches a set of generated filters, combined like build_qdrant_filter.
+
+def matches_filters(metadata: Dict[str, Any], filters: Dict[str, Any], match_mode: Optional[str]=None) -> bool:
+    if not all(condition_holds(metadata, filter_key, filters[filter_key]) for filter_key in CONSTRAINT_FILTER_FIELDS if filter_key in filters):
+        return False
+    results=[condition_holds(metadata, filter_key, filters[filter_key]) for filter_key in FILTER_FIELDS if filter_key in filters]
+    if not results:
+        return True
+    match_mode=match_mode or FILTER_MATCH_MODE
+    if match_mode=="should" and len(results)>1:
+        return any(results)
+    return all(results)
@@ -0,0 +1,271 @@
+import os
+import re
+import time
+import asyncio
+import logging
+import numpy as np
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional,
+    Tuple
+)
+from langchain_core.documents import Document
+from filters import (
+    FILTER_FIELDS,
+    CONSTRAINT_FILTER_FIELDS,
+    METADATA_PAYLOAD_KEY
+)
+from vector_mirror import (
+    encode_column,
+    encode_dates,
+    column_mask,
+    get_collection_version
+)
+
+'''
+
+    Columnar in-memory index of the structured flights in a collection.
+
+    Every flight field that queries constrain or sort on is held in a NumPy column – float32 prices and
+    durations, datetime64 departure/return times, int8 layover counts and booleans, int32 availability,
+    and dictionary-encoded codes for strings (airline, alliance, class, countries, cities, aircraft, meal).
+    Generated filters become vectorized boolean masks that every constraint narrows, and results are ordered
+    with one argsort by price, duration or departure. Flight-only queries with explicit constraints are answered from here without a
+    vector search or LLM rerank.
+
+    The index is extended in-process by ingestion and otherwise loaded from the collection's payloads on
+    first use; it is reloaded when the collection version changes, and its row count is rechecked against
+    Qdrant every FLIGHT_INDEX_REFRESH_SECONDS to pick up ingests from other workers.
+
+'''
+
+logger=logging.getLogger(__name__)
+
+FLIGHT_INDEX_ENABLED=os.getenv("FLIGHT_INDEX_ENABLED", "true").lower()=="true"
+FLIGHT_INDEX_TOP_N=int(os.getenv("FLIGHT_INDEX_TOP_N", "10"))
+FLIGHT_INDEX_REFRESH_SECONDS=float(os.getenv("FLIGHT_INDEX_REFRESH_SECONDS", "60"))
+FLIGHT_INDEX_SCROLL_BATCH=int(os.getenv("FLIGHT_INDEX_SCROLL_BATCH", "1000"))
+
+#   Columns held in the index; every other field of a flight is only kept in its record.
+
+STRING_COLUMNS=["airline", "alliance", "travel_class", "from", "from_country", "to", "to_country", "meal_service", "aircraft_type"]
+NUMBER_COLUMNS=["price_usd", "flight_duration_hours", "layover_duration_hours", "cancellation_fee_percent"]
+BOOL_COLUMNS=["refundable", "baggage_included", "wifi_available"]
+DATE_COLUMNS=["departure_date", "return_date"]
+
+#   Columns and comparisons the index evaluates the constraint filters (filters.CONSTRAINT_FILTER_FIELDS) with.
+
+INDEX_FILTER_FIELDS={
+    "max_layovers": ("layover_count", "lte"),
+    "min_availability": ("availability", "gte"),
+    "departure_after": ("departure_date", "after"),
+    "departure_before": ("departure_date", "before"),
+    "max_duration_hours": ("flight_duration_hours", "lte"),
+}
+
+#   Sort keys: column and direction.
+
+SORT_KEYS={
+    "price": ("price_usd", False),
+    "duration": ("flight_duration_hours", False),
+    "departure": ("departure_date", False),
+    "latest_departure": ("departure_date", True),
+}
+
+#   Words that ask for a particular order of the results.
+
+SORT_PATTERNS=[
+    (re.compile(r"\b(shortest|fastest|quickest)\b", re.IGNORECASE), "duration"),
+    (re.compile(r"\b(earliest|soonest|next)\b", re.IGNORECASE), "departure"),
+    (re.compile(r"\b(latest|last)\b", re.IGNORECASE), "latest_departure"),
+    (re.compile(r"\b(cheapest|lowest price|least expensive|budget)\b", re.IGNORECASE), "price"),
+]
+
+_flight_indexes={}  #   Collection name -> FlightIndex.
+_index_locks={}     #   Collection name -> asyncio.Lock, so concurrent requests load an index only once.
+
+#   Whether a metadata record is a structured flight.
+
+def is_flight_record(metadata: Dict[str, Any]) -> bool:
+    return bool(metadata.get("flight_id")) and metadata.get("document_type")=="json"
+
+class FlightIndex:
+
+    def __init__(self, collection_name: str, version: int, contents: List[str], records: List[Dict[str, Any]]):
+        self.collection_name=collection_name
+        self.version=version
+        self.loaded_at=time.monotonic()
+        self.contents=list(contents)
+        self.records=list(records)
+        self.point_count=None   #   Collection point count at the last check against Qdrant.
+        self._columns=None  #   Built on first use and after appends, so ingest batches only extend the lists.
+
+    @property
+    def size(self) -> int:
+        return len(self.records)
+
+    @property
+    def columns(self) -> Dict[str, Dict[str, Any]]:
+        if self._columns is None:
+            self._columns=self.build_columns()
+        return self._columns
+
+    def build_columns(self) -> Dict[str, Dict[str, Any]]:
+        records=self.records
+        columns={field: encode_column([record.get(field) for record in records]) for field in STRING_COLUMNS+BOOL_COLUMNS}
+        for field in NUMBER_COLUMNS:
+            columns[field]={"kind": "number", "values": np.array([np.nan if record.get(field) is None else record[field] for record in records], dtype=np.float32)}
+        for field in DATE_COLUMNS:
+            columns[field]={"kind": "date", "values": encode_dates([record.get(field) for record in records])}
+        columns["layover_count"]={"kind": "number", "values": np.array([len(record.get("layovers") or []) for record in records], dtype=np.int8)}
+        columns["availability"]={"kind": "number", "values": np.array([record.get("availability") or 0 for record in records], dtype=np.int32)}
+        return columns
+
+    #   Append flights in place; the columns are rebuilt once, on the next read, rather than after every ingest batch.
+
+    def extend(self, version: int, contents: List[str], records: List[Dict[str, Any]]) -> None:
+        self.contents.extend(contents)
+        self.records.extend(records)
+        self.version=version
+        self._columns=None
+
+    def condition_mask(self, field: str, kind: str, value: Any) -> np.ndarray:
+        return column_mask(self.columns[field], kind, value)
+
+    #   Mask of a set of generated filters. The index answers explicit constraints, so every filter narrows by default;
+    #   match_mode="should" ORs the shared filter keys like build_qdrant_filter does, constraint keys always narrow.
+
+    def filter_mask(self, filters: Dict[str, Any], match_mode: str="must") -> np.ndarray:
+        shared_masks=[
+            self.condition_mask(field, kind, filters[filter_key])
+            for filter_key, (field, kind) in FILTER_FIELDS.items()
+            if filter_key in filters and field in self.columns
+        ]
+        mask=np.ones(self.size, dtype=bool)
+        if shared_masks:
+            if match_mode=="should" and len(shared_masks)>1:
+                mask=np.logical_or.reduce(shared_masks)
+            else:
+                mask=np.logical_and.reduce(shared_masks)
+        for filter_key, (field, kind) in INDEX_FILTER_FIELDS.items():
+            if filter_key in filters:
+                mask&=self.condition_mask(field, kind, filters[filter_key])
+        return mask
+
+    #   Matching flights ordered by a sort key.
+
+    def search(self, filters: Dict[str, Any], sort_by: str="price", limit: int=FLIGHT_INDEX_TOP_N) -> List[Document]:
+        matches=np.flatnonzero(self.filter_mask(filters))
+        if not len(matches):
+            return []
+        field, descending=SORT_KEYS[sort_by]
+        values=self.columns[field]["values"][matches]
+        order=np.argsort(values, kind="stable")
+        if descending:
+            order=order[::-1]
+        return [self.to_document(int(matches[index])) for index in order[:limit]]
+
+    def to_document(self, index: int) -> Document:
+        return Document(page_content=self.contents[index], metadata=dict(self.records[index]))
+
+#   Whether generated filters constrain anything the index can evaluate.
+
+def has_explicit_constraints(filters: Dict[str, Any]) -> bool:
+    return any(key in filters for key in list(FILTER_FIELDS)+list(CONSTRAINT_FILTER_FIELDS))
+
+#   Result order asked for by the query, if any.
+
+def requested_sort(query: str) -> Optional[str]:
+    for pattern, sort_by in SORT_PATTERNS:
+        if pattern.search(query):
+            return sort_by
+    return None
+
+#   Result order for a query, defaulting to price.
+
+def detect_sort(query: str) -> str:
+    return requested_sort(query) or "price"
+
+#   Add freshly ingested flight documents to an index that is current up to the previous version.
+
+def index_ingested_documents(collection_name: str, documents: List[Document], previous_version: int, version: int) -> None:
+    flights=[document for document in documents if is_flight_record(document.metadata)]
+    index=_flight_indexes.get(collection_name)
+    if index is None or index.version!=previous_version:
+        _flight_indexes.pop(collection_name, None)  #   Reloaded from the collection on next use.
+        return
+    index.extend(version, [document.page_content for document in flights], [dict(document.metadata) for document in flights])
+    if flights:
+        logger.info(f"Added {len(flights)} flights to the index of {collection_name} ({index.size} flights)")
+
+#   Drop a collection's index after points were replaced or deleted; it is reloaded from the collection on next use.
+
+def discard_flight_index(collection_name: str) -> None:
+    _flight_indexes.pop(collection_name, None)
+
+#   Start an empty index for a newly created collection.
+
+def reset_flight_index(collection_name: str, version: int) -> None:
+    _flight_indexes[collection_name]=FlightIndex(collection_name, version, [], [])
+
+#   Load the flights of a collection from its payloads.
+
+def load_flight_index(client, collection_name: str, version: int) -> FlightIndex:
+    contents=[]
+    records=[]
+    offset=None
+    while True:
+        points, offset=client.scroll(
+            collection_name,
+            limit=FLIGHT_INDEX_SCROLL_BATCH,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False
+        )
+        for point in points:
+            payload=point.payload or {}
+            metadata=payload.get(METADATA_PAYLOAD_KEY) or {}
+            if is_flight_record(metadata):
+                contents.append(payload.get("page_content", ""))
+                records.append(dict(metadata, _id=point.id, _collection_name=collection_name))
+        if offset is None:
+            break
+    index=FlightIndex(collection_name, version, contents, records)
+    index.point_count=client.count(collection_name, exact=True).count
+    logger.info(f"Loaded flight index of {collection_name}: {index.size} flights")
+    return index
+
+def is_current(client, index: FlightIndex) -> bool:
+    if index.version!=get_collection_version(index.collection_name):
+        return False
+    if time.monotonic()-index.loaded_at<FLIGHT_INDEX_REFRESH_SECONDS:
+        return True
+    point_count=client.count(index.collection_name, exact=True).count
+    if index.point_count is not None and point_count!=index.point_count:
+        return False
+    index.point_count=point_count
+    index.loaded_at=time.monotonic()
+    return True
+
+#   Get the current flight index of a collection, loading it if needed.
+
+async def get_flight_index(client, collection_name: str) -> FlightIndex:
+    index=_flight_indexes.get(collection_name)
+    if index is not None and index.version==get_collection_version(collection_name) and time.monotonic()-index.loaded_at<FLIGHT_INDEX_REFRESH_SECONDS:
+        return index
+    lock=_index_locks.setdefault(collection_name, asyncio.Lock())
+    async with lock:
+        index=_flight_indexes.get(collection_name)
+        if index is not None and await asyncio.to_thread(is_current, client, index):
+            return index
+        _flight_indexes[collection_name]=await asyncio.to_thread(load_flight_index, client, collection_name, get_collection_version(collection_name))
+        return _flight_indexes[collection_name]
+
+#   Answer structured flight filters from the index; returns the matches and the sort key used.
+
+async def search_flights(client, collection_name: str, query: str, filters: Dict[str, Any], limit: int=FLIGHT_INDEX_TOP_N) -> Tuple[List[Document], str]:
+    index=await get_flight_index(client, collection_name)
+    sort_by=detect_sort(query)
+    return index.search(filters, sort_by, limit), sort_by
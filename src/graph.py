@@ -1,13 +1,18 @@
 import os
+import time
 import logging
 import asyncio
 import json
+import uuid
 from typing import (
+    TYPE_CHECKING,
     TypedDict,
+    Optional,
     List,
     Dict,
     Any,
-    Literal
+    Literal,
+    Tuple
 )
 from langgraph.graph import (
     StateGraph,
@@ -19,75 +24,286 @@ from langchain_core.messages import (
     HumanMessage,
     SystemMessage
 )
-from langchain_qdrant import (
-    QdrantVectorStore,
-    RetrievalMode
-)
-from langchain_community.document_compressors.rankllm_rerank import RankLLMRerank
 from langchain_core.documents import Document
-from qdrant_client.models import (
-    Filter,
-    FieldCondition,
-    MatchValue,
-    Range
+from filters import (
+    build_qdrant_filter,
+    matches_filters
+)
+from metrics import (
+    timed_node,
+    record_stage_latency
+)
+from deadlines import (
+    deadline_from,
+    has_budget,
+    within_deadline,
+    mark_degraded
 )
-from client_qdrant import (
-    get_qdrant_client,
-    ensure_filter_indexes
+from renderer import render_answer
+from resilience import (
+    BreakerOpen,
+    call_upstream
+)
+from cassette import (
+    ReplayOnly,
+    is_replaying,
+    replayable,
+    record_search
 )
-from embeddings import get_embedding_model
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 
+#   Heavy clients (Gemini, RankLLM, Qdrant, LangChain-Qdrant) are imported on first use to keep worker start-up fast.
+
+if TYPE_CHECKING:
+    from langchain_qdrant import QdrantVectorStore
+
 logger=logging.getLogger(__name__)
 
 embeddings=None
-llm=None
+llm=None     #   When set (offline benchmarks), serves every chat stage instead of the routed models.
 client=None
 
-#   Start the event loop in the current thread if none exists.
+#   Retrieval settings – tune these with benchmarks/retrieval_eval.py.
 
-def start_event_loop_sync():
-    try:
-        asyncio.get_event_loop()
-    except RuntimeError:
-        asyncio.set_event_loop(asyncio.new_event_loop())
+RETRIEVAL_MODE=os.getenv("RETRIEVAL_MODE", "dense")  #   "dense" or "hybrid" (dense + BM25 sparse).
+FLIGHT_RETRIEVAL_K=int(os.getenv("FLIGHT_RETRIEVAL_K", "20"))
+INFO_RETRIEVAL_K=int(os.getenv("INFO_RETRIEVAL_K", "10"))
+RERANK_TOP_N=int(os.getenv("RERANK_TOP_N", "10"))
+COMBINED_RERANK_TOP_N=int(os.getenv("COMBINED_RERANK_TOP_N", "15"))
+
+#   Speculative retrieval: the query embedding and an unfiltered top-k start with the turn, concurrently with classification.
+
+SPECULATIVE_RETRIEVAL=os.getenv("SPECULATIVE_RETRIEVAL", "true").lower()=="true"
+SPECULATIVE_K=int(os.getenv("SPECULATIVE_K", "50"))
+
+_speculations={}    #   Speculation id -> asyncio.Task resolving to (query vector, documents).
 
-#   Initialize the embedding model and Qdrant client asynchronously.
+#   Initialize the embedding model and Qdrant client once per worker.
+#   Runs on the event loop thread: the Gemini clients bind to the running loop when they are created.
 
 async def initialize_components():
     global embeddings, client
+    from client_qdrant import get_qdrant_client
+    from embeddings import get_embedding_model
     if embeddings is None:
-        await asyncio.to_thread(start_event_loop_sync)  #   Ensure event loop is running before initializing embeddings.
-        embeddings=await asyncio.to_thread(get_embedding_model, "text-embedding-004")
+        embeddings=get_embedding_model("text-embedding-004")
     if client is None:
-        client=await asyncio.to_thread(get_qdrant_client)
+        client=get_qdrant_client()
 
-#   Initialize the LLM instance for answer generation.
+#   Chat model for a routed stage, created once per model configuration.
 
-async def get_gemini_llm():
-    global llm
-    if llm is None:
+_chat_models={}     #   (model, temperature, max tokens, timeout) -> ChatGoogleGenerativeAI.
+
+async def get_stage_llm(stage: str) -> Tuple[Any, Dict[str, Any]]:
+    from model_router import select_model
+    choice=select_model(stage)
+    if llm is not None:
+        return llm, choice
+    if is_replaying():
+        return ReplayOnly(choice["model"]), choice
+    key=(choice["model"], choice["temperature"], choice["max_tokens"], choice["thinking_budget"], choice["timeout"])
+    if key not in _chat_models:
         try:
+            from langchain_google_genai import ChatGoogleGenerativeAI
             google_api_key=os.getenv("GOOGLE_API_KEY")
             if not google_api_key:
                 raise ValueError("GOOGLE_API_KEY not found in environment variables")
-            await asyncio.to_thread(start_event_loop_sync)  #   Ensure event loop is running before initializing LLM.
-            llm=await asyncio.to_thread(
-                lambda: ChatGoogleGenerativeAI(
-                    model="gemini-2.5-flash",
-                    google_api_key=google_api_key,
-                    temperature=0.1
-                )
+            _chat_models[key]=ChatGoogleGenerativeAI(
+                model=choice["model"],
+                google_api_key=google_api_key,
+                temperature=choice["temperature"],
+                max_output_tokens=choice["max_tokens"],
+                thinking_budget=choice["thinking_budget"],
+                timeout=choice["timeout"]
             )
-            return llm
         except Exception as e:
-            logger.error(f"Failed to initialize Gemini LLM: {str(e)}")
-            return None
-    return llm
+            logger.error(f"Failed to initialize Gemini LLM {choice['model']} for {stage}: {str(e)}")
+            return None, choice
+    return _chat_models[key], choice
+
+#   Build every client and prime per-collection state ahead of traffic; returns the time spent per step.
+
+async def warm_up(collection_names: List[str]) -> Dict[str, float]:
+    from client_qdrant import (
+        ensure_filter_indexes,
+        get_sparse_embedding
+    )
+    timings={}
+
+    async def step(name, coroutine):
+        start_time=time.perf_counter()
+        result=await coroutine
+        timings[name]=round(time.perf_counter()-start_time, 3)
+        logger.info(f"Warm-up step '{name}' completed in {timings[name]:.2f}s")
+        return result
+
+    await step("components", initialize_components())
+    from model_router import CHAT_STAGES
+    for stage in CHAT_STAGES:
+        stage_llm, _=await step(f"llm:{stage}", get_stage_llm(stage))
+        if stage_llm is None:
+            raise RuntimeError(f"Gemini LLM for {stage} could not be initialized")
+    await step("sparse_model", asyncio.to_thread(get_sparse_embedding))
+    from embedding_cache import CachedEmbeddings
+    connection_model=embeddings.embeddings if isinstance(embeddings, CachedEmbeddings) else embeddings     #   A cache hit would not open the connection.
+    await step("embedding_connection", connection_model.aembed_query("warm-up"))
+    if not is_replaying():
+        await step("reranker", asyncio.to_thread(get_reranker, RERANK_TOP_N))
+    from facets import get_facet_catalogue
+    for collection_name in collection_names:
+        await step(f"collection:{collection_name}", ensure_filter_indexes(client, collection_name))
+        await step(f"facets:{collection_name}", get_facet_catalogue(client, collection_name))
+    return timings
+
+#   Build the vector store used for retrieval according to RETRIEVAL_MODE.
+
+async def get_vector_store(collection_name: str) -> "QdrantVectorStore":
+    from langchain_qdrant import (
+        QdrantVectorStore,
+        RetrievalMode
+    )
+    from client_qdrant import initialize_vector_store
+    if RETRIEVAL_MODE=="hybrid":
+        vector_store=await initialize_vector_store(
+            client=client,
+            collection_name=collection_name,
+            embedding_model=embeddings
+        )
+        if vector_store:
+            return vector_store
+        logger.warning("Hybrid vector store unavailable, falling back to dense retrieval")
+    return await asyncio.to_thread(
+        lambda: QdrantVectorStore(
+            client=client,
+            collection_name=collection_name,
+            embedding=embeddings,
+            retrieval_mode=RetrievalMode.DENSE,
+        )
+    )
+
+#   Whether dense searches go through the shared async Qdrant client.
+
+def uses_async_search() -> bool:
+    from client_qdrant import use_async_search
+    return RETRIEVAL_MODE=="dense" and use_async_search()
+
+#   Whether dense searches try the in-process vector mirror first.
+
+def uses_vector_mirror() -> bool:
+    from vector_mirror import VECTOR_MIRROR_ENABLED
+    return RETRIEVAL_MODE=="dense" and VECTOR_MIRROR_ENABLED
+
+#   Embed the query once for the mirror and async search paths (the LangChain retriever embeds internally).
+
+async def embed_query(query: str):
+    if not (uses_vector_mirror() or uses_async_search()):
+        return None
+    return await call_upstream("embedding", lambda: embeddings.aembed_query(query))
+
+#   Retrieve the top-k documents for a query, optionally constrained by generated filters.
+
+async def retrieve_documents(collection_name: str, query: str, k: int, filters: Dict[str, Any]=None, query_vector=None) -> List[Document]:
+    if query_vector is None and (uses_vector_mirror() or uses_async_search()):
+        query_vector=await call_upstream("embedding", lambda: embeddings.aembed_query(query))
+    if uses_vector_mirror():
+        from vector_mirror import mirror_search
+        documents=await mirror_search(client, collection_name, query_vector, k, filters)
+        if documents is not None:
+            return documents
+    filter_obj=build_qdrant_filter(filters) if filters else None
+    if uses_async_search():
+        from client_qdrant import async_dense_search
+        return await async_dense_search(collection_name, query_vector, k, filter_obj)
+    vector_store=await get_vector_store(collection_name)
+    retriever=vector_store.as_retriever(search_kwargs={"k": k, "filter": filter_obj})
+    return await retriever.ainvoke(query)
+
+#   Embed the query and retrieve an unfiltered top-k, for downstream nodes to post-filter or reuse.
+
+async def speculative_retrieval(collection_name: str, query: str) -> Tuple[Any, List[Document]]:
+    start_time=time.perf_counter()
+    await initialize_components()
+    query_vector=await embed_query(query)
+    documents=await retrieve_documents(collection_name, query, SPECULATIVE_K, None, query_vector)
+    record_stage_latency("speculative_retrieval", time.perf_counter()-start_time)
+    return query_vector, documents
+
+#   Start a turn's speculative retrieval in the background.
+
+def start_speculation(speculation_id: str, collection_name: str, query: str) -> None:
+    if not SPECULATIVE_RETRIEVAL or not speculation_id:
+        return
+    task=asyncio.create_task(speculative_retrieval(collection_name, query))
+    task.add_done_callback(lambda finished: finished.cancelled() or finished.exception())  #   Discarded speculations must not log unretrieved errors.
+    _speculations[speculation_id]=task
+
+#   Wait for the turn's speculative retrieval; None when there is none or it failed.
+
+async def take_speculation(state: "GraphState") -> Optional[Tuple[Any, List[Document]]]:
+    task=_speculations.pop(state.get("speculation_id") or "", None)
+    if task is None:
+        return None
+    try:
+        return await task
+    except Exception as e:
+        logger.warning(f"Speculative retrieval failed: {e}")
+        return None
+
+#   Cancel a speculation nobody consumed (flight index and aggregate turns, failed runs).
+
+def discard_speculation(speculation_id: str) -> None:
+    task=_speculations.pop(speculation_id, None)
+    if task is not None and not task.done():
+        task.cancel()
 
-    pass
+#   Build the LLM reranker used by the reranking stages, reusing one instance per model and top_n (the routed rerank model by default).
+
+_rerankers={}
+
+def get_reranker(top_n: int, model: Optional[str]=None):
+    from model_router import get_route
+    model=model or get_route("rerank")["model"]
+    if (model, top_n) not in _rerankers:
+        from langchain_community.document_compressors.rankllm_rerank import RankLLMRerank
+        _rerankers[(model, top_n)]=RankLLMRerank(
+            model="gpt",
+            gpt_model=model,
+            top_n=top_n
+        )
+    return _rerankers[(model, top_n)]
+
+#   Invoke a stage's routed chat model through the circuit breaker, bounded by the stage timeout and the request
+#   deadline; tokens and latency are accounted to the stage and model. The request identifies the call on a cassette.
+#   The blocking client runs in a thread that cannot be cancelled, so the call is not hedged.
+
+async def invoke_chat(state: Dict[str, Any], choice: Dict[str, Any], request: Any, invoke):
+    from model_router import (
+        record_model_call,
+        usage_of
+    )
+    start_time=time.perf_counter()
+    try:
+        response=await within_deadline(state, call_upstream("chat", lambda: replayable(
+            "chat",
+            f"{choice['stage']}:{choice['model']}",
+            request,
+            lambda: asyncio.to_thread(invoke)
+        ), hedge=False), choice["timeout"])
+    except BreakerOpen:
+        raise
+    except Exception:
+        record_model_call(choice, time.perf_counter()-start_time, error=True)
+        raise
+    record_model_call(choice, time.perf_counter()-start_time, usage_of(response))
+    return response
+
+def degradation_reason(error: Exception) -> str:
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(error, BreakerOpen):
+        return str(error)
+    return f"upstream error: {error}"
 
 #   Represents the state of the minimal search and answer generation graph.
 
@@ -97,14 +313,92 @@ class GraphState(TypedDict):
     collection_name: str
     query_type: str #   "flight_only", "info_only", "both"
     filters: Dict[str, Any] #   Hard filters to apply.
-    filter_options: Dict[str, Any]  #   Available filter options.
     filtered_docs: List[Document]
     info_docs: List[Document]   #   Documents from hybrid retrieval.
     reranked_docs: List[Document]
+    aggregates: Dict[str, Any]  #   Exact figures for aggregate questions (min/max/avg/count, by airline).
+    candidate_docs: List[Document]  #   Flights of the last search, kept by the session checkpointer for refinements.
+    session_query: str  #   The search the candidates came from, with refinements appended.
+    refined: bool   #   Whether this turn was answered by refining the previous candidates.
+    speculation_id: str #   Background retrieval started with the turn.
+    deadline: float #   Monotonic deadline of the request (0 means none).
+    degraded: List[str] #   Stages that ran degraded to meet the deadline.
     answer: str
 
+#   Session turns that refine the previous results are answered from the stored candidates; every other turn runs the full pipeline.
+
+@timed_node("route_turn")
+async def route_turn(state: GraphState) -> Command[Literal["classify_query", "refine_candidates"]]:
+    query=state["query"]
+    if state.get("candidate_docs"):
+        from sessions import is_refinement
+        catalogue=None
+        try:
+            await initialize_components()
+            from facets import get_facet_catalogue
+            catalogue=await get_facet_catalogue(client, state["collection_name"])
+        except Exception as e:
+            logger.warning(f"Facet catalogue unavailable for turn routing: {e}")
+        if is_refinement(query, catalogue, state.get("filters")):
+            return Command(goto="refine_candidates")
+    start_speculation(state.get("speculation_id"), state["collection_name"], query)
+    return Command(goto="classify_query", update=new_search_update(query))
+
+#   Query the flight search of a turn runs: the session query, which is the turn's own query for a new search and
+#   the stored search extended by the follow-up when a refinement has to search again.
+
+def retrieval_query(state: GraphState) -> str:
+    return state.get("session_query") or state["query"]
+
+#   A turn that is not a refinement starts a new search: the previous filters and candidates no longer apply.
+
+def new_search_update(query: str) -> Dict[str, Any]:
+    return {"session_query": query, "refined": False, "filters": {}, "candidate_docs": []}
+
+#   Re-filter the previous candidates in memory with the constraints added by a follow-up.
+
+@timed_node("refine_candidates")
+async def refine_candidates(state: GraphState) -> Command[Literal["generate_answer", "classify_query", "flight_index_search", "apply_hard_filters"]]:
+    logger.info("Starting candidate refinement")
+    query=state["query"]
+    try:
+        await initialize_components()
+        from facets import get_facet_catalogue
+        from flight_index import requested_sort
+        from sessions import (
+            extract_refinement_filters,
+            refine_documents
+        )
+        catalogue=await get_facet_catalogue(client, state["collection_name"])
+        new_filters=extract_refinement_filters(query, catalogue)
+        sort_by=requested_sort(query)
+        if not new_filters and not sort_by:
+            logger.info("No refinement constraints found, running the full pipeline")
+            start_speculation(state.get("speculation_id"), state["collection_name"], query)
+            return Command(goto="classify_query", update=new_search_update(query))
+        filters={**state.get("filters", {}), **new_filters}
+        session_query=f"{state.get('session_query') or ''}; {query}".strip("; ")
+        refined_docs=refine_documents(state["candidate_docs"], new_filters, sort_by)
+        logger.info(f"Refined {len(state['candidate_docs'])} candidates to {len(refined_docs)} with {new_filters} (sort: {sort_by})")
+        if not refined_docs:
+            update={"filters": filters, "session_query": session_query, "query_type": "flight_only", "refined": False}
+            if routes_to_flight_index("flight_only", filters):
+                return Command(goto="flight_index_search", update=update)
+            return Command(goto="apply_hard_filters", update=update)
+        return Command(goto="generate_answer", update={
+            "filters": filters,
+            "session_query": session_query,
+            "candidate_docs": refined_docs,
+            "reranked_docs": refined_docs[:RERANK_TOP_N],
+            "refined": True
+        })
+    except Exception as e:
+        logger.error(f"Error in refine_candidates: {e}", exc_info=True)
+        return Command(goto="classify_query", update=new_search_update(query))
+
 #   Classifying the query to determine if it's flight-related, info-related, or both.
 
+@timed_node("classify_query")
 async def classify_query(state: GraphState) -> Command[Literal["generate_filters", "hybrid_retrieval"]]:
     logger.info("Starting query classification")
     try:
@@ -125,15 +419,16 @@ async def classify_query(state: GraphState) -> Command[Literal["generate_filters
             User Query: {query}"""),
             ("human", "Classify this query.")
         ])
-        llm_instance=await get_gemini_llm()
+        if not has_budget(state, "classify_query"):
+            return Command(goto="generate_filters", update={"query_type": "both", "degraded": mark_degraded(state, "classify_query")})
+        llm_instance, choice=await get_stage_llm("classify")
         if llm_instance:
             try:
-                response=await asyncio.to_thread(
-                    lambda: llm_instance.invoke([
-                        SystemMessage(content=classification_prompt.format(query=query)),
-                        HumanMessage(content="Classify this query.")
-                    ])
-                )
+                messages=[
+                    SystemMessage(content=classification_prompt.format(query=query)),
+                    HumanMessage(content="Classify this query.")
+                ]
+                response=await invoke_chat(state, choice, [message.content for message in messages], lambda: llm_instance.invoke(messages))
                 query_type=response.content.strip().lower()
                 if query_type not in ["flight_only", "info_only", "both"]:
                     logger.warning(f"Invalid classification '{query_type}', defaulting to 'both'")
@@ -143,6 +438,8 @@ async def classify_query(state: GraphState) -> Command[Literal["generate_filters
                     return Command(goto="generate_filters", update={"query_type": query_type})
                 else:
                     return Command(goto="hybrid_retrieval", update={"query_type": query_type})
+            except (asyncio.TimeoutError, BreakerOpen) as e:
+                return Command(goto="generate_filters", update={"query_type": "both", "degraded": mark_degraded(state, "classify_query", degradation_reason(e))})
             except Exception as e:
                 logger.error(f"Error classifying query with LLM: {e}")
                 return Command(goto="generate_filters", update={"query_type": "both"})
@@ -155,18 +452,22 @@ async def classify_query(state: GraphState) -> Command[Literal["generate_filters
 
 #   Generate dynamic filters using LLM based on the query and available filter options.
 
-async def generate_filters(state: GraphState) -> Dict[str, Any]:
+@timed_node("generate_filters")
+async def generate_filters(state: GraphState) -> Command[Literal["apply_hard_filters", "flight_index_search", "compute_aggregates"]]:
     logger.info("Starting dynamic filter generation")
     try:
         await initialize_components()
         query=state["query"]
-        filter_options=state.get("filter_options", get_filter_options())
+        if not has_budget(state, "generate_filters"):
+            return route_filters(state, await extract_local_filters(state), {"degraded": mark_degraded(state, "generate_filters")})
+        from facets import describe_facets
+        facets=await describe_facets(client, state["collection_name"], query)
         logger.info(f"Generating filters for query: {query}")
         filter_prompt=ChatPromptTemplate.from_messages([
             ("system", """You are a filter generation assistant for a flight booking system. Based on the user's query and available filter options, generate appropriate filters to narrow down the search results.
 
-            Available filter options:
-            {filter_options}
+            Available filter options (field: allowed values):
+            {facets}
 
             Instructions:
             
@@ -191,8 +492,14 @@ async def generate_filters(state: GraphState) -> Dict[str, Any]:
                 "baggage_included": null,
                 "wifi_available": null,
                 "meal_service": null,
-                "aircraft_type": null
+                "aircraft_type": null,
+                "max_layovers": null,
+                "departure_after": null,
+                "departure_before": null,
+                "min_availability": null
             }}
+
+            Use "max_layovers" (0 for direct flights) only when the number of stops is constrained, "departure_after"/"departure_before" as ISO dates (YYYY-MM-DD) only for explicit travel dates, and "min_availability" only for a required number of seats.
              
             Examples:
             
@@ -204,20 +511,22 @@ async def generate_filters(state: GraphState) -> Dict[str, Any]:
             ("human", "Generate filters for this query.")
         ])
         json_parser=JsonOutputParser()
-        llm_instance=await get_gemini_llm()
+        llm_instance, choice=await get_stage_llm("filters")
         if llm_instance:
             try:
-                chain=filter_prompt | llm_instance | json_parser
-                filters=await asyncio.to_thread(
-                    lambda: chain.invoke({
-                        "query": query,
-                        "filter_options": json.dumps(filter_options, indent=2)
-                    })
-                )
+                chain=filter_prompt | llm_instance
+                inputs={
+                    "query": query,
+                    "facets": facets
+                }
+                response=await invoke_chat(state, choice, inputs, lambda: chain.invoke(inputs))
+                filters=json_parser.invoke(response)
                 
                 cleaned_filters={k: v for k, v in filters.items() if v is not None}
                 logger.info(f"Generated filters: {cleaned_filters}")
-                return Command(goto="apply_hard_filters", update={"filters": cleaned_filters})
+                return route_filters(state, cleaned_filters)
+            except (asyncio.TimeoutError, BreakerOpen) as e:
+                return route_filters(state, await extract_local_filters(state), {"degraded": mark_degraded(state, "generate_filters", degradation_reason(e))})
             except Exception as e:
                 logger.error(f"Error generating filters with LLM: {e}")
                 return Command(goto="apply_hard_filters", update={"filters": {}})
@@ -228,154 +537,167 @@ async def generate_filters(state: GraphState) -> Dict[str, Any]:
         logger.error(f"Error in generate_filters: {e}", exc_info=True)
         return Command(goto="apply_hard_filters", update={"filters": {}})
 
+#   Filters extracted locally from the query and the facet catalogue, when there is no budget for the LLM.
+
+async def extract_local_filters(state: GraphState) -> Dict[str, Any]:
+    from facets import get_facet_catalogue
+    from sessions import extract_refinement_filters
+    catalogue=await get_facet_catalogue(client, state["collection_name"])
+    filters=extract_refinement_filters(state["query"], catalogue)
+    logger.info(f"Extracted filters locally: {filters}")
+    return filters
+
+#   Route filters to the aggregate, flight index or vector search path.
+
+def route_filters(state: GraphState, filters: Dict[str, Any], update: Optional[Dict[str, Any]]=None) -> Command[Literal["apply_hard_filters", "flight_index_search", "compute_aggregates"]]:
+    update={**(update or {}), "filters": filters}
+    if routes_to_aggregates(state.get("query_type"), state["query"]):
+        discard_speculation(state.get("speculation_id") or "")
+        return Command(goto="compute_aggregates", update=update)
+    if routes_to_flight_index(state.get("query_type"), filters):
+        discard_speculation(state.get("speculation_id") or "")
+        return Command(goto="flight_index_search", update=update)
+    return Command(goto="apply_hard_filters", update=update)
+
+#   Flight-only queries with explicit constraints are answered from the columnar flight index; fuzzy intent (no constraints) uses vector search.
+
+def routes_to_flight_index(query_type: str, filters: Dict[str, Any]) -> bool:
+    from flight_index import (
+        FLIGHT_INDEX_ENABLED,
+        has_explicit_constraints
+    )
+    return FLIGHT_INDEX_ENABLED and query_type=="flight_only" and has_explicit_constraints(filters)
+
+#   Answer structured flight queries from the columnar flight index, falling back to vector search when nothing matches.
+
+@timed_node("flight_index_search")
+async def flight_index_search(state: GraphState) -> Command[Literal["merge_documents", "apply_hard_filters"]]:
+    logger.info("Starting flight index search")
+    try:
+        await initialize_components()
+        from flight_index import search_flights
+        from flight_index import FLIGHT_INDEX_TOP_N
+        from sessions import SESSION_MAX_CANDIDATES
+        flights, sort_by=await search_flights(client, state["collection_name"], retrieval_query(state), state["filters"], max(FLIGHT_INDEX_TOP_N, SESSION_MAX_CANDIDATES))
+        if not flights:
+            logger.info(f"No indexed flights match {state['filters']}, falling back to vector search")
+            return Command(goto="apply_hard_filters")
+        logger.info(f"Flight index returned {len(flights)} candidate flights sorted by {sort_by}")
+        return Command(goto="merge_documents", update={"filtered_docs": flights[:FLIGHT_INDEX_TOP_N], "candidate_docs": flights})
+    except Exception as e:
+        logger.error(f"Error in flight_index_search: {e}", exc_info=True)
+        return Command(goto="apply_hard_filters")
+
+#   Flight-only aggregate questions (cheapest, average, how many, by airline) are computed over every matching flight.
+
+def routes_to_aggregates(query_type: str, query: str) -> bool:
+    from flight_index import FLIGHT_INDEX_ENABLED
+    from aggregates import detect_aggregate_intent
+    return FLIGHT_INDEX_ENABLED and query_type=="flight_only" and detect_aggregate_intent(query) is not None
+
+#   Compute aggregate figures with the flight index and pass them, with a few representative flights, to answer generation.
+
+@timed_node("compute_aggregates")
+async def compute_aggregates(state: GraphState) -> Command[Literal["merge_documents", "apply_hard_filters"]]:
+    logger.info("Starting aggregate computation")
+    try:
+        await initialize_components()
+        from flight_index import get_flight_index
+        from aggregates import (
+            detect_aggregate_intent,
+            compute_aggregate,
+            aggregate_summary,
+            sample_documents
+        )
+        index=await get_flight_index(client, state["collection_name"])
+        if not index.size:
+            logger.info("No indexed flights in the collection, falling back to vector search")
+            return Command(goto="apply_hard_filters")
+        intent=detect_aggregate_intent(state["query"])
+        result=compute_aggregate(index, state["filters"], intent)
+        summary=aggregate_summary(result)
+        logger.info(f"Computed aggregate: {summary}")
+        return Command(goto="merge_documents", update={"aggregates": summary, "filtered_docs": sample_documents(result), "candidate_docs": []})
+    except Exception as e:
+        logger.error(f"Error in compute_aggregates: {e}", exc_info=True)
+        return Command(goto="apply_hard_filters")
+
+#   Filtered flight search; the best results found so far are kept in "partial" in case the deadline cuts it short.
+
+async def search_filtered_documents(state: GraphState, partial: Dict[str, Any]) -> List[Document]:
+    collection_name=state["collection_name"]
+    filters=state["filters"]
+    query=retrieval_query(state)
+    speculation=await take_speculation(state)
+    query_vector, speculative_docs=speculation if speculation else (await embed_query(query), None)
+
+    #   First search with filters applied. The speculative top-k post-filtered in memory is exact when it still
+    #   holds k documents (every better match is in it) or when it covers the whole collection.
+
+    filtered_docs=None
+    if speculative_docs is not None:
+        post_filtered=[doc for doc in speculative_docs if matches_filters(doc.metadata, filters)]
+        partial["documents"]=(post_filtered or speculative_docs)[:FLIGHT_RETRIEVAL_K]
+        if len(post_filtered)>=FLIGHT_RETRIEVAL_K or len(speculative_docs)<SPECULATIVE_K:
+            filtered_docs=post_filtered[:FLIGHT_RETRIEVAL_K]
+            logger.info(f"Post-filtered {len(speculative_docs)} speculative documents to {len(filtered_docs)}")
+    if filtered_docs is None:
+        logger.info(f"Searching with query: '{query}' and filters: {filters}")
+        filtered_docs=await retrieve_documents(collection_name, query, FLIGHT_RETRIEVAL_K, filters, query_vector)
+    if not filtered_docs:
+        logger.warning(f"No documents found with filters: {filters}, trying without filters")
+        if speculative_docs is not None and SPECULATIVE_K>=FLIGHT_RETRIEVAL_K:
+            filtered_docs=speculative_docs[:FLIGHT_RETRIEVAL_K]
+        else:
+            filtered_docs=await retrieve_documents(collection_name, query, FLIGHT_RETRIEVAL_K, None, query_vector)
+        logger.info(f"Retrieved {len(filtered_docs)} documents without filters")
+    else:
+        logger.info(f"Retrieved {len(filtered_docs)} documents with filters")
+    return filtered_docs
+
 #   Apply hard filters to the collection based on metadata and query.
 
+@timed_node("apply_hard_filters")
 async def apply_hard_filters(state: GraphState) -> Command[Literal["llm_reranker"]]:
     logger.info("Starting hard filter application")
     try:
         await initialize_components()
         collection_name=state["collection_name"]
         filters=state["filters"]
-        query=state["query"]
         logger.info(f"Applying filters: {filters} to collection: {collection_name}")
         try:
+            from client_qdrant import ensure_filter_indexes
             await ensure_filter_indexes(client, collection_name)
             logger.info("Ensured filter indexes exist")
         except Exception as e:
             logger.warning(f"Could not ensure filter indexes: {e}")
-        try:
-            sample_points, _=await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: client.scroll(
-                    collection_name=collection_name,
-                    limit=1,
-                    with_payload=True,
-                    with_vectors=False,
-                )
-            )
-            if sample_points:
-                sample_metadata=sample_points[0].payload
-                logger.info(f"Sample document metadata keys: {list(sample_metadata.keys())}")
-                logger.info(f"Sample document metadata: {sample_metadata}")
-        except Exception as e:
-            logger.warning(f"Could not get sample document: {e}")
-        filter_conditions=[]
-        if "airline" in filters:
-            filter_conditions.append(
-                FieldCondition(
-                    key="airline",
-                    match=MatchValue(value=filters["airline"])
-                )
-            )
-        if "alliance" in filters:
-            filter_conditions.append(
-                FieldCondition(
-                    key="alliance",
-                    match=MatchValue(value=filters["alliance"])
-                )
-            )
-        if "from_country" in filters:
-            filter_conditions.append(
-                FieldCondition(
-                    key="from_country",
-                    match=MatchValue(value=filters["from_country"])
-                )
-            )
-        if "to_country" in filters:
-            filter_conditions.append(
-                FieldCondition(
-                    key="to_country",
-                    match=MatchValue(value=filters["to_country"])
-                )
-            )
-        if "travel_class" in filters:
-            filter_conditions.append(
-                FieldCondition(
-                    key="travel_class",
-                    match=MatchValue(value=filters["travel_class"])
-                )
-            )
-        if "max_price" in filters:
-            filter_conditions.append(
-                FieldCondition(
-                    key="price_usd",
-                    range=Range(lte=filters["max_price"])
-                )
-            )
-        if "min_price" in filters:
-            filter_conditions.append(
-                FieldCondition(
-                    key="price_usd",
-                    range=Range(gte=filters["min_price"])
-                )
-            )
-        if "refundable" in filters:
-            filter_conditions.append(
-                FieldCondition(
-                    key="refundable",
-                    match=MatchValue(value=filters["refundable"])
-                )
-            )
-        if "baggage_included" in filters:
-            filter_conditions.append(
-                FieldCondition(
-                    key="baggage_included",
-                    match=MatchValue(value=filters["baggage_included"])
-                )
-            )
-        if "wifi_available" in filters:
-            filter_conditions.append(
-                FieldCondition(
-                    key="wifi_available",
-                    match=MatchValue(value=filters["wifi_available"])
-                )
-            )
-        if "meal_service" in filters:
-            filter_conditions.append(
-                FieldCondition(
-                    key="meal_service",
-                    match=MatchValue(value=filters["meal_service"])
-                )
-            )
-        if "aircraft_type" in filters:
-            filter_conditions.append(
-                FieldCondition(
-                    key="aircraft_type",
-                    match=MatchValue(value=filters["aircraft_type"])
-                )
-            )
-        if filter_conditions:
-            if len(filter_conditions) > 1:
-                filter_obj=Filter(should=filter_conditions)
-            else:
-                filter_obj=Filter(must=filter_conditions)
-            logger.info(f"Created filter with {len(filter_conditions)} conditions: {filter_conditions}")
-        else:
-            filter_obj=None
+        if logger.isEnabledFor(logging.DEBUG):
+            try:
+                from client_qdrant import async_scroll
+                sample_points=await async_scroll(collection_name, limit=1, with_payload=True, with_vectors=False)
+                if sample_points:
+                    logger.debug(f"Sample document payload: {sample_points[0].payload}")
+            except Exception as e:
+                logger.warning(f"Could not get sample document: {e}")
+        if build_qdrant_filter(filters) is None:
             logger.info("No filter conditions created, will search without filters")
-        original_store=await asyncio.to_thread(
-            lambda: QdrantVectorStore(
-                client=client,
-                collection_name=collection_name,
-                embedding=embeddings,
-                retrieval_mode=RetrievalMode.DENSE,
-            )
-        )
+        update={}
+        partial={}
+        try:
+            filtered_docs=await within_deadline(state, search_filtered_documents(state, partial))
+        except asyncio.TimeoutError:
+            filtered_docs=partial.get("documents", [])
+            update["degraded"]=mark_degraded(state, "apply_hard_filters")
+            logger.warning(f"Retrieval hit the deadline, returning {len(filtered_docs)} partial results")
+        except BreakerOpen as e:
 
-        #   First search with filters applied.
+            #   Without query embeddings, constrained flight queries are still answered from the flight index.
 
-        retriever=original_store.as_retriever(
-            search_kwargs={"k": 20, "filter": filter_obj}
-        )
-        logger.info(f"Searching with query: '{query}' and filter: {filter_obj}")
-        filtered_docs=await retriever.ainvoke(query)
-        if not filtered_docs:
-            logger.warning(f"No documents found with filters: {filters}, trying without filters")
-            retriever=original_store.as_retriever(search_kwargs={"k": 20})
-            filtered_docs=await retriever.ainvoke(query)
-            logger.info(f"Retrieved {len(filtered_docs)} documents without filters")
-        else:
-            logger.info(f"Retrieved {len(filtered_docs)} documents with filters")
+            filtered_docs=[]
+            if routes_to_flight_index("flight_only", filters):
+                from flight_index import search_flights
+                filtered_docs, _=await search_flights(client, collection_name, retrieval_query(state), filters, FLIGHT_RETRIEVAL_K)
+            update["degraded"]=mark_degraded(state, "apply_hard_filters", degradation_reason(e))
         
         logger.info(f"Total documents retrieved: {len(filtered_docs)}")
 
@@ -387,18 +709,52 @@ async def apply_hard_filters(state: GraphState) -> Command[Literal["llm_reranker
                 logger.info(f"  Doc {i+1}: {doc.page_content[:100]}...")
                 if hasattr(doc, 'metadata') and doc.metadata:
                     logger.info(f"    Metadata: {doc.metadata}")
-        return Command(goto="llm_reranker", update={"filtered_docs": filtered_docs})
+        return Command(goto="llm_reranker", update={**update, "filtered_docs": filtered_docs, "candidate_docs": filtered_docs})
     except Exception as e:
         logger.error(f"Error in apply_hard_filters: {e}", exc_info=True)
         return Command(goto="llm_reranker", update={"filtered_docs": []})
     
+#   Rerank documents with the LLM reranker; without budget left, or when the reranker fails, the retrieval order is kept.
+
+async def rerank_documents(state: GraphState, documents: List[Document], top_n: int, stage: str) -> Tuple[List[Document], Dict[str, Any]]:
+    if not has_budget(state, stage):
+        return documents[:top_n], {"degraded": mark_degraded(state, stage)}
+    from model_router import (
+        select_model,
+        record_model_call
+    )
+    choice=select_model("rerank")
+    top_n=min(top_n, len(documents))
+
+    #   RankLLM reranks in an executor thread that cannot be cancelled, so the call is not hedged.
+
+    async def rerank():
+        compressor=await asyncio.to_thread(get_reranker, top_n, choice["model"])
+        return await compressor.acompress_documents(
+            documents=documents,
+            query=retrieval_query(state)
+        )
+
+    request={"query": retrieval_query(state), "top_n": top_n, "documents": [document.page_content for document in documents]}
+    start_time=time.perf_counter()
+    try:
+        reranked_docs=await within_deadline(state, call_upstream("rerank", lambda: replayable("rerank", choice["model"], request, rerank), hedge=False), choice["timeout"])
+        record_model_call(choice, time.perf_counter()-start_time)
+        return reranked_docs, {}
+    except Exception as e:
+        if not isinstance(e, BreakerOpen):
+            record_model_call(choice, time.perf_counter()-start_time, error=True)
+        if not isinstance(e, (asyncio.TimeoutError, BreakerOpen)):
+            logger.error(f"Error reranking documents: {e}")
+        return documents[:top_n], {"degraded": mark_degraded(state, stage, degradation_reason(e))}
+
 #   Rerank the filtered documents using LLM reranker.
 
+@timed_node("llm_reranker")
 async def llm_reranker(state: GraphState) -> Command[Literal["merge_documents"]]:
     logger.info("Starting document reranking")
     try:
         filtered_docs=state["filtered_docs"]
-        query=state["query"]
         if not filtered_docs:
             logger.warning("No documents to rerank.")
             return Command(goto="merge_documents", update={"reranked_docs": []})
@@ -417,18 +773,7 @@ async def llm_reranker(state: GraphState) -> Command[Literal["merge_documents"]]
         
         #   Using the LLM reranker – run in separate thread to avoid blocking.
 
-        compressor=await asyncio.to_thread(
-            lambda: RankLLMRerank(
-                model="gpt", 
-                gpt_model="gpt-4o-mini", 
-                top_n=min(10, len(filtered_docs))
-            )
-        )
-        
-        reranked_docs=await compressor.acompress_documents(
-            documents=filtered_docs,
-            query=query
-        )
+        reranked_docs, update=await rerank_documents(state, filtered_docs, RERANK_TOP_N, "llm_reranker")
 
         #   Logging the reranked documents for debugging.
 
@@ -441,22 +786,30 @@ async def llm_reranker(state: GraphState) -> Command[Literal["merge_documents"]]
             if hasattr(doc, "metadata") and doc.metadata:
                 logger.info(f"    Metadata: {doc.metadata}")
         logger.info(f"Reranked flight documents to {len(reranked_docs)} documents")
-        return Command(goto="merge_documents", update={"reranked_docs": reranked_docs})
+        return Command(goto="merge_documents", update={**update, "reranked_docs": reranked_docs})
     except Exception as e:
         logger.error(f"Error in llm_reranker: {e}", exc_info=True)
         return Command(goto="merge_documents", update={"reranked_docs": []})
     
 #   Generate the final answer based on the reranked documents and query.
 
+@timed_node("generate_answer")
 async def generate_answer(state: GraphState) -> Command[Literal[END]]:
     logger.info("Starting answer generation")
     try:
-        query=state["query"]
+        query=retrieval_query(state)
         reranked_docs=state["reranked_docs"]
-        if not reranked_docs:
+        aggregates=state.get("aggregates")
+        if not reranked_docs and not aggregates:
             logger.warning("No documents available for answer generation")
             return Command(goto=END, update={"answer": "I couldn't find any relevant information to answer your query."})
         context="\n\n".join([doc.page_content for doc in reranked_docs])
+        if aggregates:
+            context=f"""Exact figures computed over all {aggregates['matching_flights']} matching flights (use these numbers as they are, do not estimate from the examples):
+        {json.dumps(aggregates, indent=2)}
+
+        Example flights:
+        {context}"""
         system_message=f"""You are a helpful assistant that answers questions based on the provided context.
         Context:
         {context}
@@ -464,21 +817,23 @@ async def generate_answer(state: GraphState) -> Command[Literal[END]]:
         Please answer the following question based on the context above. If the context doesn't contain enough information to answer the question, say so. Be concise and accurate.
 
         Question: {query}"""
-        llm_instance=await get_gemini_llm()
+        if not has_budget(state, "generate_answer"):
+            return Command(goto=END, update={"answer": render_answer(query, reranked_docs, aggregates), "degraded": mark_degraded(state, "generate_answer")})
+        llm_instance, choice=await get_stage_llm("answer")
         if llm_instance:
             try:
-                response=await asyncio.to_thread(
-                    lambda: llm_instance.invoke([
-                        SystemMessage(content=system_message),
-                        HumanMessage(content=query)
-                    ])
-                )
+                messages=[
+                    SystemMessage(content=system_message),
+                    HumanMessage(content=query)
+                ]
+                response=await invoke_chat(state, choice, [message.content for message in messages], lambda: llm_instance.invoke(messages))
                 answer=response.content
             except Exception as e:
-                logger.error(f"Error calling LLM: {e}")
-                answer=f"Based on the {len(reranked_docs)} relevant documents found, here's what I can tell you about '{query}': [LLM generation failed]"
+                if not isinstance(e, (asyncio.TimeoutError, BreakerOpen)):
+                    logger.error(f"Error calling LLM: {e}")
+                return Command(goto=END, update={"answer": render_answer(query, reranked_docs, aggregates), "degraded": mark_degraded(state, "generate_answer", degradation_reason(e))})
         else:
-            answer=f"Based on the {len(reranked_docs)} relevant documents found, here's what I can tell you about '{query}': [LLM not available]"
+            return Command(goto=END, update={"answer": render_answer(query, reranked_docs, aggregates), "degraded": mark_degraded(state, "generate_answer", "LLM not available")})
         logger.info("Answer generation complete")
         return Command(goto=END, update={"answer": answer})
     except Exception as e:
@@ -487,6 +842,7 @@ async def generate_answer(state: GraphState) -> Command[Literal[END]]:
     
 #   Perform hybrid retrieval for info-only queries without hard filters.
     
+@timed_node("hybrid_retrieval")
 async def hybrid_retrieval(state: GraphState) -> Command[Literal["merge_documents"]]:
     logger.info("Starting hybrid retrieval for info queries")
     try:
@@ -494,16 +850,14 @@ async def hybrid_retrieval(state: GraphState) -> Command[Literal["merge_document
         collection_name=state["collection_name"]
         query=state["query"]
         logger.info(f"Performing hybrid retrieval for query: '{query}'")
-        original_store=await asyncio.to_thread(
-            lambda: QdrantVectorStore(
-                client=client,
-                collection_name=collection_name,
-                embedding=embeddings,
-                retrieval_mode=RetrievalMode.DENSE,
-            )
-        )
-        retriever=original_store.as_retriever(search_kwargs={"k": 10})
-        info_docs=await retriever.ainvoke(query)
+        try:
+            speculation=await within_deadline(state, take_speculation(state))
+            if speculation is not None and SPECULATIVE_K>=INFO_RETRIEVAL_K:
+                info_docs=speculation[1][:INFO_RETRIEVAL_K]
+            else:
+                info_docs=await within_deadline(state, retrieve_documents(collection_name, query, INFO_RETRIEVAL_K, None, speculation[0] if speculation else None))
+        except (asyncio.TimeoutError, BreakerOpen) as e:
+            return Command(goto="merge_documents", update={"info_docs": [], "degraded": mark_degraded(state, "hybrid_retrieval", degradation_reason(e))})
         logger.info(f"Retrieved {len(info_docs)} documents from hybrid retrieval")
         return Command(goto="merge_documents", update={"info_docs": info_docs})
     except Exception as e:
@@ -512,30 +866,21 @@ async def hybrid_retrieval(state: GraphState) -> Command[Literal["merge_document
 
 #   Merge documents from both flight and info retrieval paths, reranking if needed.
 
+@timed_node("merge_documents")
 async def merge_documents(state: GraphState) -> Command[Literal["generate_answer"]]:
     logger.info("Starting document merging")
     try:
         filtered_docs=state.get("filtered_docs", [])
         info_docs=state.get("info_docs", [])
         query_type=state.get("query_type", "both")
-        query=state["query"]
+        update={}
         if query_type=="flight_only":
             merged_docs=filtered_docs
             logger.info(f"Flight-only query: using {len(merged_docs)} flight documents")
         elif query_type=="info_only":
             if info_docs:
                 logger.info(f"Reranking {len(info_docs)} info documents")
-                compressor=await asyncio.to_thread(
-                    lambda: RankLLMRerank(
-                        model="gpt", 
-                        gpt_model="gpt-4o-mini", 
-                        top_n=min(10, len(info_docs))
-                    )
-                )
-                merged_docs=await compressor.acompress_documents(
-                    documents=info_docs,
-                    query=query
-                )
+                merged_docs, update=await rerank_documents(state, info_docs, RERANK_TOP_N, "merge_documents")
                 logger.info(f"Reranked info documents to {len(merged_docs)} documents")
             else:
                 merged_docs=[]
@@ -544,111 +889,115 @@ async def merge_documents(state: GraphState) -> Command[Literal["generate_answer
             all_docs=filtered_docs+info_docs
             if all_docs:
                 logger.info(f"Reranking combined {len(all_docs)} documents (flight and information)")
-                compressor=await asyncio.to_thread(
-                    lambda: RankLLMRerank(
-                        model="gpt", 
-                        gpt_model="gpt-4o-mini", 
-                        top_n=min(15, len(all_docs))
-                    )
-                )
-                merged_docs=await compressor.acompress_documents(
-                    documents=all_docs,
-                    query=query
-                )
+                merged_docs, update=await rerank_documents(state, all_docs, COMBINED_RERANK_TOP_N, "merge_documents")
                 logger.info(f"Reranked combined documents to {len(merged_docs)} documents")
             else:
                 merged_docs=[]
                 logger.info("No documents to rerank")
-        return Command(goto="generate_answer", update={"reranked_docs": merged_docs})
+        return Command(goto="generate_answer", update={**update, "reranked_docs": merged_docs})
     except Exception as e:
         logger.error(f"Error in merge_documents: {e}", exc_info=True)
         return Command(goto="generate_answer", update={"reranked_docs": []})
 
-workflow=StateGraph(GraphState) #   Building the graph workflow.
-
-#   Adding nodes to the workflow.
-
-workflow.add_node("classify_query", classify_query)
-workflow.add_node("generate_filters", generate_filters)
-workflow.add_node("apply_hard_filters", apply_hard_filters)
-workflow.add_node("llm_reranker", llm_reranker)
-workflow.add_node("generate_answer", generate_answer)
-workflow.add_node("hybrid_retrieval", hybrid_retrieval)
-workflow.add_node("merge_documents", merge_documents)
-
-#   Defining the workflow structure.
-
-workflow.add_edge(START, "classify_query")
-
-app=workflow.compile()  #   Compiling the workflow.
-
-#   Loading filter options from the extracted data.
-
-def get_filter_options():
-    return {
-        "airline": [
-            "Aeromexico", "Air Canada", "Air France", "Alitalia", "All Nippon Airways",
-            "American Airlines", "British Airways", "Cathay Pacific", "China Eastern",
-            "Delta Air Lines", "Emirates", "Etihad Airways", "Finnair", "Iberia",
-            "Japan Airlines", "JetBlue Airways", "KLM", "Korean Air", "Lufthansa",
-            "Norwegian Air", "Qantas", "Qatar Airways", "Ryanair", "Singapore Airlines",
-            "Southwest Airlines", "Spirit Airlines", "Swiss International", "Thai Airways",
-            "Turkish Airlines", "United Airlines", "Vietnam Airlines", "Virgin Atlantic"
-        ],
-        "alliance": ["Non-Alliance", "OneWorld", "SkyTeam", "Star Alliance"],
-        "from_country": [
-            "Australia", "Canada", "Egypt", "France", "Germany", "Hong Kong", "India",
-            "Italy", "Japan", "Netherlands", "Qatar", "Singapore", "South Korea",
-            "Spain", "Thailand", "Turkey", "UAE", "UK", "USA"
-        ],
-        "to_country": [
-            "Australia", "Canada", "Egypt", "France", "Germany", "Hong Kong", "India",
-            "Italy", "Japan", "Netherlands", "Qatar", "Singapore", "South Korea",
-            "Spain", "Thailand", "Turkey", "UAE", "UK", "USA"
-        ],
-        "travel_class": ["business", "economy", "first", "premium_economy"],
-        "refundable": [False, True],
-        "baggage_included": [False, True],
-        "wifi_available": [False, True],
-        "meal_service": ["meal", "none", "premium_meal", "snack"],
-        "aircraft_type": [
-            "Airbus A320", "Airbus A330", "Airbus A350", "Airbus A380",
-            "Boeing 737", "Boeing 777", "Boeing 787"
-        ],
-        "price_ranges": {
-            "min": 300,
-            "max": 12430,
-            "suggested_ranges": [
-                {"min": 0, "max": 500, "label": "Budget (0-500 USD)"},
-                {"min": 500, "max": 1000, "label": "Economy (500-1000 USD)"},
-                {"min": 1000, "max": 2000, "label": "Mid-range (1000-2000 USD)"},
-                {"min": 2000, "max": 5000, "label": "Premium (2000-5000 USD)"},
-                {"min": 5000, "max": 12430, "label": "Luxury (5000+ USD)"}
-            ]
-        }
-    }
+#   Build the graph workflow.
+
+def build_workflow() -> StateGraph:
+    workflow=StateGraph(GraphState)
+
+    #   Adding nodes to the workflow.
+
+    workflow.add_node("route_turn", route_turn)
+    workflow.add_node("refine_candidates", refine_candidates)
+    workflow.add_node("classify_query", classify_query)
+    workflow.add_node("generate_filters", generate_filters)
+    workflow.add_node("flight_index_search", flight_index_search)
+    workflow.add_node("compute_aggregates", compute_aggregates)
+    workflow.add_node("apply_hard_filters", apply_hard_filters)
+    workflow.add_node("llm_reranker", llm_reranker)
+    workflow.add_node("generate_answer", generate_answer)
+    workflow.add_node("hybrid_retrieval", hybrid_retrieval)
+    workflow.add_node("merge_documents", merge_documents)
+
+    #   Defining the workflow structure.
+
+    workflow.add_edge(START, "route_turn")
+    return workflow
+
+_app=None
+_session_app=None
+
+#   Compile the workflow on first use so importing this module stays cheap.
 
+def get_app():
+    global _app
+    if _app is None:
+        _app=build_workflow().compile()
+    return _app
+
+#   Compile the workflow with the SQLite session checkpointer.
+
+async def get_session_app():
+    global _session_app
+    if _session_app is None:
+        from sessions import get_checkpointer
+        _session_app=build_workflow().compile(checkpointer=await get_checkpointer())
+    return _session_app
+
+#   Expose the compiled workflow as "app" (the langgraph.json entry point) without compiling at import time.
+
+def __getattr__(name: str):
+    if name=="app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 #   Run the complete search and answer generation workflow with dynamic filter generation.
 
 async def run_search_and_answer(
     query: str,
-    collection_name: str
+    collection_name: str,
+    session_id: Optional[str]=None,
+    timeout_ms: Optional[int]=None
 ) -> Dict[str, Any]:
     initial_state={
         "query": query,
         "collection_name": collection_name,
         "query_type": "both",   #   Default to "both" until classified.
         "filters": {},
-        "filter_options": get_filter_options(),
         "filtered_docs": [],
         "info_docs": [],
         "reranked_docs": [],
+        "aggregates": {},
+        "candidate_docs": [],
+        "session_query": query,
+        "refined": False,
+        "speculation_id": uuid.uuid4().hex,
+        "deadline": deadline_from(timeout_ms),
+        "degraded": [],
         "answer": ""
     }
     
+    record_search({"query": query, "collection_name": collection_name, "session_id": session_id, "timeout_ms": timeout_ms})
+    start_time=time.perf_counter()
     try:
-        result=await app.ainvoke(initial_state)
+        if session_id:
+            from sessions import session_config
+            app=await get_session_app()
+            config=session_config(session_id)
+            snapshot=await app.aget_state(config)
+            previous=snapshot.values or {}
+            if previous.get("collection_name")==collection_name:
+
+                #   Continuing a session: keep its filters, candidates and query type, reset the per-turn fields.
+
+                turn_state={key: initial_state[key] for key in ("query", "info_docs", "reranked_docs", "aggregates", "refined", "speculation_id", "deadline", "degraded", "answer")}
+            else:
+                turn_state=initial_state
+            result=await app.ainvoke(turn_state, config)
+            from sessions import touch_session
+            await touch_session(session_id)
+        else:
+            result=await get_app().ainvoke(initial_state)
+        record_stage_latency("run_search_and_answer", time.perf_counter()-start_time)
         if "error" in result:
             return {"success": False, "error": result["error"]}
         return {
@@ -657,16 +1006,21 @@ async def run_search_and_answer(
             "query_type": result.get("query_type", "unknown"),
             "filters": result.get("filters", {}),
             "documents_used": len(result.get("reranked_docs", [])),
+            "aggregates": result.get("aggregates") or None,
+            "refined": result.get("refined", False),
+            "degraded": result.get("degraded", []),
             "reranked_docs": result.get("reranked_docs", [])
         }   #   Formatting the result for the response.
     
     except Exception as e:
         logger.error(f"Error in run_search_and_answer: {e}", exc_info=True)
         return {"success": False, "error": str(e)}
+    finally:
+        discard_speculation(initial_state["speculation_id"])
     
 #   Generating a PNG representation of the graph – uncomment to use.
     
-# png_data=app.get_graph().draw_mermaid_png()
+# png_data=get_app().get_graph().draw_mermaid_png()
 # output_path="graph.png"
 # with open(output_path, "wb") as f:
 #     f.write(png_data)
\ No newline at end of file
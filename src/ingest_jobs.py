@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional,
+    Callable,
+    Awaitable
+)
+
+'''
+
+    Background ingestion jobs. /ingest validates the request, submits a job and returns its id at once; jobs
+    run on the worker's event loop, at most INGEST_JOB_CONCURRENCY at a time, with at most INGEST_JOB_QUEUE_SIZE
+    queued or running per worker (more are rejected).
+
+    Job state (documents parsed, embedded, upserted and deleted, throughput, ETA, errors) is written to SQLite
+    at INGEST_JOBS_DB_PATH, off the event loop, so /jobs/{id} answers from any worker. Finished jobs are kept
+    for INGEST_JOB_RETENTION_SECONDS. The job slots are created by start_jobs() in the app's lifespan, on the
+    loop that runs the jobs.
+
+    Search keeps priority: before each batch, a job waits while searches are in flight on its worker, for up
+    to INGEST_SEARCH_YIELD_SECONDS per batch.
+
+'''
+
+logger=logging.getLogger(__name__)
+
+INGEST_JOB_CONCURRENCY=int(os.getenv("INGEST_JOB_CONCURRENCY", "1"))
+INGEST_JOB_QUEUE_SIZE=int(os.getenv("INGEST_JOB_QUEUE_SIZE", "16"))
+INGEST_JOBS_DB_PATH=os.getenv("INGEST_JOBS_DB_PATH", "ingest_jobs.sqlite")
+INGEST_JOB_RETENTION_SECONDS=float(os.getenv("INGEST_JOB_RETENTION_SECONDS", "86400"))
+INGEST_SEARCH_YIELD_SECONDS=float(os.getenv("INGEST_SEARCH_YIELD_SECONDS", "2"))
+INGEST_JOB_PERSIST_SECONDS=1.0  #   Minimum interval between progress writes of a running job.
+
+QUEUED="queued"
+RUNNING="running"
+SUCCEEDED="succeeded"
+FAILED="failed"
+
+PROGRESS_FIELDS=("parsed", "embedded", "upserted", "deleted", "expected", "files_total", "files_done")
+
+class JobQueueFull(Exception):
+    pass
+
+class IngestJob:
+
+    def __init__(self, kind: str, request: Dict[str, Any]):
+        self.job_id=uuid.uuid4().hex
+        self.kind=kind
+        self.request=request
+        self.status=QUEUED
+        self.progress={field: 0 for field in PROGRESS_FIELDS}
+        self.progress.update({"expected": None, "files_total": None, "files_done": None})
+        self.documents_processed=None
+        self.errors=[]
+        self.created_at=time.time()
+        self.started_at=None
+        self.finished_at=None
+        self.persisted_at=0.0
+
+    #   Progress callback for ingestion: counts of documents parsed, embedded, upserted, deleted and expected.
+
+    def update_progress(self, counts: Dict[str, Optional[int]]) -> None:
+        self.progress.update({field: value for field, value in counts.items() if field in PROGRESS_FIELDS})
+        if time.monotonic()-self.persisted_at>=INGEST_JOB_PERSIST_SECONDS:
+            save_job_in_background(self)
+
+    def add_error(self, error: str) -> None:
+        self.errors.append(error)
+        save_job_in_background(self)
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed=((self.finished_at or time.time())-self.started_at) if self.started_at else 0.0
+        parsed=self.progress["parsed"]
+        expected=self.progress["expected"]
+        rate=parsed/elapsed if elapsed else 0.0
+        eta=None
+        if self.status==RUNNING and expected and rate:
+            eta=round(max(expected-parsed, 0)/rate, 1)
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "request": self.request,
+            "documents_parsed": parsed,
+            "documents_embedded": self.progress["embedded"],
+            "documents_upserted": self.progress["upserted"],
+            "documents_deleted": self.progress["deleted"],
+            "documents_expected": expected,
+            "documents_processed": self.documents_processed,
+            "docs_per_second": round(rate, 2),
+            "elapsed_seconds": round(elapsed, 3),
+            "eta_seconds": 0.0 if self.status==SUCCEEDED else eta,
+            "errors": list(self.errors),
+            "files_total": self.progress["files_total"],
+            "files_done": self.progress["files_done"],
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+_jobs={}    #   Job id -> IngestJob submitted by this worker and not yet expired.
+_tasks=set()
+_writes=set()   #   Background job-state writes still running.
+_job_semaphore=None     #   Created by start_jobs() on the serving loop.
+_connection=None
+_connection_lock=threading.Lock()
+_searches_in_flight=0
+
+def get_connection() -> sqlite3.Connection:
+    global _connection
+    if _connection is None:
+        os.makedirs(os.path.dirname(INGEST_JOBS_DB_PATH) or ".", exist_ok=True)
+        _connection=sqlite3.connect(INGEST_JOBS_DB_PATH, check_same_thread=False, timeout=10)
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute("CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)")
+        _connection.commit()
+    return _connection
+
+def save_job(job: IngestJob) -> None:
+    job.persisted_at=time.monotonic()
+    try:
+        with _connection_lock:
+            connection=get_connection()
+            connection.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?)", (job.job_id, json.dumps(job.snapshot(), default=str), time.time()))
+            connection.commit()
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to persist ingestion job {job.job_id}: {str(e)}")
+
+#   Persist a job from a synchronous callback on the event loop: the write runs in a thread, and its snapshot is
+#   taken when it runs, so a later write never loses to an earlier one.
+
+def save_job_in_background(job: IngestJob) -> None:
+    job.persisted_at=time.monotonic()
+    task=asyncio.get_running_loop().create_task(asyncio.to_thread(save_job, job))
+    _writes.add(task)
+    task.add_done_callback(_writes.discard)
+
+#   Current state of a job: live from this worker, or as last persisted by the worker running it.
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    job=_jobs.get(job_id)
+    if job is not None:
+        return job.snapshot()
+    with _connection_lock:
+        row=get_connection().execute("SELECT state FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+#   Drop expired jobs: finished ones from this worker's memory (on the loop), old rows from SQLite (in a thread).
+
+def forget_expired_jobs() -> None:
+    cutoff=time.time()-INGEST_JOB_RETENTION_SECONDS
+    for job_id, job in list(_jobs.items()):
+        if job.finished_at and job.finished_at<cutoff:
+            del _jobs[job_id]
+
+def prune_jobs() -> None:
+    cutoff=time.time()-INGEST_JOB_RETENTION_SECONDS
+    try:
+        with _connection_lock:
+            connection=get_connection()
+            connection.execute("DELETE FROM jobs WHERE updated_at<?", (cutoff,))
+            connection.commit()
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to prune ingestion jobs: {str(e)}")
+
+def active_jobs() -> int:
+    return sum(1 for job in _jobs.values() if job.status in (QUEUED, RUNNING))
+
+async def run_job(job: IngestJob, run: Callable[[IngestJob], Awaitable[int]]) -> None:
+    async with _job_semaphore:
+        job.status=RUNNING
+        job.started_at=time.time()
+        await asyncio.to_thread(save_job, job)
+        logger.info(f"Started ingestion job {job.job_id}: {job.request}")
+        try:
+            job.documents_processed=await run(job)
+            job.status=SUCCEEDED
+            logger.info(f"Ingestion job {job.job_id} processed {job.documents_processed} documents")
+        except Exception as e:
+            job.status=FAILED
+            job.errors.append(str(e))
+            logger.error(f"Ingestion job {job.job_id} failed: {str(e)}")
+        finally:
+            job.finished_at=time.time()
+            await asyncio.to_thread(save_job, job)
+
+#   Create the job slots on the running loop; called from the app's lifespan before any job is submitted.
+
+def start_jobs() -> None:
+    global _job_semaphore
+    _job_semaphore=asyncio.Semaphore(INGEST_JOB_CONCURRENCY)
+
+#   Queue a job that runs run(job) in the background; raises JobQueueFull when the worker has too many.
+
+async def submit_job(kind: str, request: Dict[str, Any], run: Callable[[IngestJob], Awaitable[int]]) -> IngestJob:
+    if _job_semaphore is None:
+        raise RuntimeError("Ingestion jobs are not started")
+    forget_expired_jobs()
+    await asyncio.to_thread(prune_jobs)
+    if active_jobs()>=INGEST_JOB_QUEUE_SIZE:
+        raise JobQueueFull(f"{INGEST_JOB_QUEUE_SIZE} ingestion jobs are already queued or running")
+    job=IngestJob(kind, request)
+    _jobs[job.job_id]=job
+    await asyncio.to_thread(save_job, job)
+    task=asyncio.create_task(run_job(job, run))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+#   Mark a search in flight for the duration of the block; ingestion batches wait while any is.
+
+@asynccontextmanager
+async def search_priority():
+    global _searches_in_flight
+    _searches_in_flight+=1
+    try:
+        yield
+    finally:
+        _searches_in_flight-=1
+
+async def yield_to_search() -> None:
+    waited=0.0
+    while _searches_in_flight and waited<INGEST_SEARCH_YIELD_SECONDS:
+        await asyncio.sleep(0.05)
+        waited+=0.05
+
+#   Cancel this worker's jobs on shutdown; they are marked failed and can be resubmitted (ingestion resumes from its checkpoint).
+
+async def shutdown_jobs() -> None:
+    global _connection, _job_semaphore
+    for task in list(_tasks):
+        task.cancel()
+    for job in _jobs.values():
+        if job.status in (QUEUED, RUNNING):
+            job.status=FAILED
+            job.errors.append("Interrupted by shutdown")
+            job.finished_at=time.time()
+            await asyncio.to_thread(save_job, job)
+    if _tasks or _writes:
+        await asyncio.gather(*_tasks, *_writes, return_exceptions=True)
+    _job_semaphore=None
+    with _connection_lock:
+        if _connection is not None:
+            _connection.close()
+            _connection=None
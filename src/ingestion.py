@@ -1,124 +1,184 @@
 import os
+import glob
 import json
+import time
+import uuid
+import shutil
+import asyncio
+import hashlib
 import logging
-from typing import List
-from langchain.schema import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from client_qdrant import (
-    get_qdrant_client,
-    initialize_vector_store,
-    create_qdrant_collection
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    List,
+    Iterable,
+    Iterator,
+    Optional,
+    Callable,
+    Awaitable,
+    Dict,
+    Tuple,
+    Any
+)
+from langchain_core.documents import Document
+from models import (
+    FileType,
+    IngestMode
+)
+from filters import (
+    METADATA_PAYLOAD_KEY,
+    payload_key
 )
-from models import FileType
-from embeddings import get_embedding_model
 
 logger=logging.getLogger(__name__)
 
-#   Text splitter configuration.
+text_splitter=None
 
-text_splitter=RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=200,
-    length_function=len,
-    separators=["\n\n", "\n", " ", ""]
-)
+#   Ingestion settings: documents embedded and upserted per batch, and seconds between progress reports.
+
+INGEST_BATCH_SIZE=int(os.getenv("INGEST_BATCH_SIZE", "256"))
+INGEST_PROGRESS_SECONDS=float(os.getenv("INGEST_PROGRESS_SECONDS", "5"))
+INGEST_CHECKPOINT_DIRECTORY=os.getenv("INGEST_CHECKPOINT_DIRECTORY", "checkpoints")
+INGEST_SCROLL_BATCH=int(os.getenv("INGEST_SCROLL_BATCH", "1000"))
+
+INGEST_PARSE_PROCESSES=int(os.getenv("INGEST_PARSE_PROCESSES", str(min(os.cpu_count() or 1, 4))))
+INGEST_POOL_MAX_FILE_MB=float(os.getenv("INGEST_POOL_MAX_FILE_MB", "64"))  #   Larger JSON files are streamed in-process instead.
+INGEST_BULK_FILE_CONCURRENCY=int(os.getenv("INGEST_BULK_FILE_CONCURRENCY", "4"))
+
+PROJECT_ROOT=os.path.realpath(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+POINT_ID_NAMESPACE=uuid.uuid5(uuid.NAMESPACE_URL, "kavak/qdrant-points")
+
+JSON_VALUE_EVENTS=("start_map", "start_array", "string", "number", "boolean", "null")
 
-#   Function to process JSON files and convert them into Document objects.
+#   Text splitter configuration – created on first use so importing this module stays cheap.
 
-async def process_json_file(file_path: str) -> List[Document]:
+def get_text_splitter():
+    global text_splitter
+    if text_splitter is None:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        text_splitter=RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=200,
+            length_function=len,
+            separators=["\n\n", "\n", " ", ""]
+        )
+    return text_splitter
+
+#   Document for one JSON object; the parsed object is used as its own metadata.
+
+def json_document(item: dict, file_path: str, item_index: int, total_items: int) -> Document:
+    content=json.dumps(item, indent=2)
+    item.update({
+        "source": file_path,
+        "document_type": "json",
+        "item_index": item_index,
+        "total_items": total_items
+    })
+    return Document(
+        page_content=content,
+        metadata=item
+    )
+
+#   Number of items in a JSON array file, counted with the incremental parser; None for a single top-level object.
+
+def count_json_items(file_path: str) -> Optional[int]:
+    import ijson
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            data=json.load(file)
-        documents=[]
-        if isinstance(data, list):
-            for i, item in enumerate(data):
+        with open(file_path, "rb") as file:
+            events=ijson.parse(file)
+            first=next(events, None)
+            if first is None:
+                raise ValueError(f"Invalid JSON format in {file_path}: empty file")
+            if first[:2]==("", "start_map"):
+                return None
+            if first[:2]!=("", "start_array"):
+                raise ValueError(f"Unsupported JSON structure in {file_path}")
+            return sum(1 for prefix, event, _ in events if prefix=="item" and event in JSON_VALUE_EVENTS)
+    except ijson.JSONError as e:
+        logger.error(f"Failed to parse JSON file {file_path}: {str(e)}")
+        raise ValueError(f"Invalid JSON format in {file_path}: {str(e)}")
+
+#   Stream the objects of a JSON file (an array of objects, or a single object) as documents, one at a time.
+
+def iter_json_documents(file_path: str, total_items: Optional[int]) -> Iterator[Document]:
+    import ijson
+    try:
+        with open(file_path, "rb") as file:
+            if total_items is None:
+                for item in ijson.items(file, "", use_float=True):
+                    yield json_document(item, file_path, 0, 1)
+                return
+            for i, item in enumerate(ijson.items(file, "item", use_float=True)):
                 if isinstance(item, dict):
-                    content=json.dumps(item, indent=2)
-                    metadata=item.copy()
-                    metadata.update({
-                        "source": file_path,
-                        "document_type": "json",
-                        "item_index": i,
-                        "total_items": len(data)
-                    })
-                    doc=Document(
-                        page_content=content,
-                        metadata=metadata
-                    )
-                    documents.append(doc)
-        elif isinstance(data, dict):
-            content=json.dumps(data, indent=2)
-            metadata=data.copy()
-            metadata.update({
-                "source": file_path,
-                "document_type": "json",
-                "item_index": 0,
-                "total_items": 1
-            })
-            doc=Document(
-                page_content=content,
-                metadata=metadata
-            )
-            documents.append(doc)
-        else:
-            raise ValueError(f"Unsupported JSON structure in {file_path}")
-            
-        logger.info(f"Successfully processed {len(documents)} JSON objects from {file_path}")
-        return documents
-    except json.JSONDecodeError as e:
+                    yield json_document(item, file_path, i, total_items)
+    except ijson.JSONError as e:
         logger.error(f"Failed to parse JSON file {file_path}: {str(e)}")
         raise ValueError(f"Invalid JSON format in {file_path}: {str(e)}")
-    except Exception as e:
-        logger.error(f"Error processing JSON file {file_path}: {str(e)}")
-        raise
+
+#   Group documents into lists of at most batch_size.
+
+def iter_batches(documents: Iterable[Document], batch_size: int) -> Iterator[List[Document]]:
+    batch=[]
+    for document in documents:
+        batch.append(document)
+        if len(batch)>=batch_size:
+            yield batch
+            batch=[]
+    if batch:
+        yield batch
+
+#   Read a text file and chunk it into documents (flight fields carry empty placeholder values).
+
+def split_file(file_path: str, document_type: str) -> List[Document]:
+    with open(file_path, "r", encoding="utf-8") as file:
+        content=file.read()
+    chunks=get_text_splitter().split_text(content)
+    documents=[]
+    for i, chunk in enumerate(chunks):
+        metadata={
+            "source": file_path,
+            "document_type": document_type,
+            "chunk_index": i,
+            "total_chunks": len(chunks),
+            "filename": os.path.basename(file_path),
+            "flight_id": "",
+            "airline": "",
+            "alliance": "",
+            "from": "",
+            "from_airport": "",
+            "from_country": "",
+            "to": "",
+            "to_airport": "",
+            "to_country": "",
+            "departure_date": "",
+            "return_date": "",
+            "travel_class": "",
+            "layovers": [],
+            "layover_duration_hours": 0,
+            "price_usd": 0,
+            "refundable": False,
+            "cancellation_fee_percent": 0,
+            "baggage_included": False,
+            "wifi_available": False,
+            "meal_service": "",
+            "flight_duration_hours": 0,
+            "aircraft_type": "",
+            "availability": 0,
+            "item_index": i,
+            "total_items": len(chunks)
+        }
+        doc=Document(
+            page_content=chunk,
+            metadata=metadata
+        )
+        documents.append(doc)
+    return documents
 
 #   Function to process a Markdown file by reading its content and chunking it.
 
 async def process_markdown_file(file_path: str) -> List[Document]:
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            content=file.read()
-        
-        chunks=text_splitter.split_text(content)
-        documents=[]
-        for i, chunk in enumerate(chunks):
-            metadata={
-                "source": file_path,
-                "document_type": "markdown",
-                "chunk_index": i,
-                "total_chunks": len(chunks),
-                "filename": os.path.basename(file_path),
-                "flight_id": "",
-                "airline": "",
-                "alliance": "",
-                "from": "",
-                "from_airport": "",
-                "from_country": "",
-                "to": "",
-                "to_airport": "",
-                "to_country": "",
-                "departure_date": "",
-                "return_date": "",
-                "travel_class": "",
-                "layovers": [],
-                "layover_duration_hours": 0,
-                "price_usd": 0,
-                "refundable": False,
-                "cancellation_fee_percent": 0,
-                "baggage_included": False,
-                "wifi_available": False,
-                "meal_service": "",
-                "flight_duration_hours": 0,
-                "aircraft_type": "",
-                "availability": 0,
-                "item_index": i,
-                "total_items": len(chunks)
-            }
-            doc=Document(
-                page_content=chunk,
-                metadata=metadata
-            )
-            documents.append(doc)
+        documents=split_file(file_path, "markdown")
         logger.info(f"Successfully processed markdown file {file_path} into {len(documents)} chunks")
         return documents
     except Exception as e:
@@ -129,110 +189,474 @@ async def process_markdown_file(file_path: str) -> List[Document]:
 
 async def process_text_file(file_path: str) -> List[Document]:
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            content=file.read()
-        chunks=text_splitter.split_text(content)
-        documents=[]
-        for i, chunk in enumerate(chunks):
-            metadata={
-                "source": file_path,
-                "document_type": "text",
-                "chunk_index": i,
-                "total_chunks": len(chunks),
-                "filename": os.path.basename(file_path),
-                "flight_id": "",
-                "airline": "",
-                "alliance": "",
-                "from": "",
-                "from_airport": "",
-                "from_country": "",
-                "to": "",
-                "to_airport": "",
-                "to_country": "",
-                "departure_date": "",
-                "return_date": "",
-                "travel_class": "",
-                "layovers": [],
-                "layover_duration_hours": 0,
-                "price_usd": 0,
-                "refundable": False,
-                "cancellation_fee_percent": 0,
-                "baggage_included": False,
-                "wifi_available": False,
-                "meal_service": "",
-                "flight_duration_hours": 0,
-                "aircraft_type": "",
-                "availability": 0,
-                "item_index": i,
-                "total_items": len(chunks)
-            }
-            doc=Document(
-                page_content=chunk,
-                metadata=metadata
-            )
-            documents.append(doc)
+        documents=split_file(file_path, "text")
         logger.info(f"Successfully processed text file {file_path} into {len(documents)} chunks")
         return documents
     except Exception as e:
         logger.error(f"Error processing text file {file_path}: {str(e)}")
         raise
 
-#   Function to ingest data from a file into Qdrant vector store.
+#   Checkpoint of a file's ingestion into a collection, keyed by the file's path, size and modification time
+#   and the embedding model, so a changed file or model starts over.
+
+def checkpoint_path(file_path: str, collection_name: str, embedding_model_name: str) -> str:
+    stat=os.stat(file_path)
+    key=json.dumps([os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, embedding_model_name])
+    return os.path.join(INGEST_CHECKPOINT_DIRECTORY, collection_name, f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}.json")
+
+#   Documents of the file already upserted by an interrupted run (0 without a checkpoint).
+
+def load_checkpoint(path: str) -> int:
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return int(json.load(file)["documents"])
+    except FileNotFoundError:
+        return 0
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable ingestion checkpoint {path}: {str(e)}")
+        return 0
+
+def save_checkpoint(path: str, file_path: str, documents: int) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path=f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        json.dump({"file": file_path, "documents": documents, "updated_at": time.time()}, file)
+    os.replace(temporary_path, path)
+
+def clear_checkpoint(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+#   Forget every checkpoint of a collection (it was recreated empty).
+
+def clear_collection_checkpoints(collection_name: str) -> None:
+    shutil.rmtree(os.path.join(INGEST_CHECKPOINT_DIRECTORY, collection_name), ignore_errors=True)
+
+#   Source key of a file: its real path, relative to the project root when inside it, so a file is named the same
+#   way whichever route or spelling of its path ingests it.
+
+def source_key(file_path: str) -> str:
+    path=os.path.realpath(file_path)
+    if os.path.commonpath([path, PROJECT_ROOT])==PROJECT_ROOT:
+        return os.path.relpath(path, PROJECT_ROOT)
+    return path
+
+#   Deterministic point IDs: flights by source and flight_id (numbered from the second occurrence when a file
+#   repeats one), other documents by source and content, so files sharing a flight_id never overwrite each
+#   other's points. Each document's metadata gets the hash of its content, and the source key when one is given.
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def assign_point_ids(documents: Iterable[Document], source: Optional[str]=None) -> Iterator[Tuple[str, Document]]:
+    occurrences={}
+    for document in documents:
+        digest=content_hash(document.page_content)
+        document.metadata["content_hash"]=digest
+        if source is not None:
+            document.metadata["source"]=source
+        flight_id=document.metadata.get("flight_id")
+        if flight_id:
+            occurrence=occurrences.get(flight_id, 0)
+            occurrences[flight_id]=occurrence+1
+            key=f"flight:{document.metadata.get('source')}:{flight_id}" if not occurrence else f"flight:{document.metadata.get('source')}:{flight_id}#{occurrence}"
+        else:
+            key=f"chunk:{document.metadata.get('source')}:{digest}"
+        yield str(uuid.uuid5(POINT_ID_NAMESPACE, key)), document
+
+#   Content hashes of the points already stored for a source (point id -> hash; None for points ingested before hashing).
+
+def load_stored_hashes(client, collection_name: str, source: str) -> Dict[str, Optional[str]]:
+    from qdrant_client.models import (
+        Filter,
+        FieldCondition,
+        MatchValue
+    )
+    stored={}
+    offset=None
+    while True:
+        points, offset=client.scroll(
+            collection_name,
+            scroll_filter=Filter(must=[FieldCondition(key=payload_key("source"), match=MatchValue(value=source))]),
+            limit=INGEST_SCROLL_BATCH,
+            offset=offset,
+            with_payload=[payload_key("content_hash")],
+            with_vectors=False
+        )
+        for point in points:
+            stored[str(point.id)]=((point.payload or {}).get(METADATA_PAYLOAD_KEY) or {}).get("content_hash")
+        if offset is None:
+            break
+    return stored
+
+def delete_points(client, collection_name: str, point_ids: List[str]) -> None:
+    from qdrant_client.models import PointIdsList
+    for start in range(0, len(point_ids), INGEST_SCROLL_BATCH):
+        client.delete(collection_name, points_selector=PointIdsList(points=point_ids[start:start+INGEST_SCROLL_BATCH]))
+
+#   Embed a batch through the executor and upsert it with its BM25 sparse vectors, in the vector store's point layout.
+
+async def upsert_documents(vector_store, executor, documents: List[Document], point_ids: List[str]) -> None:
+    from qdrant_client.models import (
+        PointStruct,
+        SparseVector
+    )
+    texts=[document.page_content for document in documents]
+    dense_vectors=await executor.embed(texts)
+    sparse_vectors=await asyncio.to_thread(vector_store.sparse_embeddings.embed_documents, texts)
+    points=[
+        PointStruct(
+            id=point_id,
+            vector={
+                vector_store.vector_name: dense_vector,
+                vector_store.sparse_vector_name: SparseVector(indices=sparse_vector.indices, values=sparse_vector.values)
+            },
+            payload={
+                vector_store.content_payload_key: document.page_content,
+                vector_store.metadata_payload_key: document.metadata
+            }
+        )
+        for point_id, document, dense_vector, sparse_vector in zip(point_ids, documents, dense_vectors, sparse_vectors)
+    ]
+    await asyncio.to_thread(vector_store.client.upsert, collection_name=vector_store.collection_name, points=points)
+
+#   Check that a file exists and its extension matches the declared type.
+
+def validate_ingest_file(file_path: str, file_type: FileType) -> None:
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+    file_extension=os.path.splitext(file_path)[1].lower()
+    if file_type==FileType.JSON and file_extension != ".json":
+        raise ValueError(f"File extension {file_extension} doesn't match declared type {file_type}")
+    if file_type==FileType.MARKDOWN and file_extension not in [".md", ".markdown"]:
+        raise ValueError(f"File extension {file_extension} doesn't match declared type {file_type}")
+    if file_type==FileType.TEXT and file_extension!=".txt":
+        raise ValueError(f"File extension {file_extension} doesn't match declared type {file_type}")
+
+#   Clients shared by every file ingested into a collection: Qdrant client, vector store and embedding executor.
+
+class IngestContext:
+
+    def __init__(self, collection_name: str, embedding_model_name: str, client, vector_store, executor):
+        self.collection_name=collection_name
+        self.embedding_model_name=embedding_model_name
+        self.client=client
+        self.vector_store=vector_store
+        self.executor=executor
+
+async def open_ingest_context(collection_name: str, embedding_model_name: str="text-embedding-004") -> IngestContext:
+    from client_qdrant import (
+        get_qdrant_client,
+        initialize_vector_store
+    )
+    from embeddings import get_embedding_model
+    from embedding_executor import EmbeddingExecutor
+    client=get_qdrant_client()
+    embedding_model=get_embedding_model(embedding_model_name)
+    vector_store=await initialize_vector_store(
+        client=client,
+        collection_name=collection_name,
+        embedding_model=embedding_model
+    )
+    if not vector_store:
+        raise RuntimeError("Failed to initialize vector store")
+    return IngestContext(collection_name, embedding_model_name, client, vector_store, EmbeddingExecutor(embedding_model))
+
+#   Documents of a file and their expected count; JSON is streamed, Markdown and text are chunked up front.
+
+async def load_documents(file_path: str, file_type: FileType) -> Tuple[Iterable[Document], int]:
+    if file_type==FileType.JSON:
+        total_items=await asyncio.to_thread(count_json_items, file_path)
+        return iter_json_documents(file_path, total_items), 1 if total_items is None else total_items
+    if file_type==FileType.MARKDOWN:
+        documents=await process_markdown_file(file_path)
+    elif file_type==FileType.TEXT:
+        documents=await process_text_file(file_path)
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    return documents, len(documents)
+
+#   Ingest one file's documents through a context. Documents are embedded and upserted in batches of batch_size
+#   and released after each batch, so streamed JSON files of any size ingest in constant memory; progress is
+#   called with the documents parsed, embedded, upserted and deleted so far and the expected total, and throttle
+#   is awaited before each batch (background jobs yield to search there). Each batch is checkpointed, and a
+#   rerun after a failure resumes after the last one.
+#
+#   Point IDs are deterministic, so re-ingesting is idempotent: documents whose content hash matches the stored
+#   point are skipped, new and changed ones are upserted, and in "sync" mode the points of the same source that
+#   are no longer in the file are deleted. Returns the counts.
+
+async def ingest_documents(
+    context: IngestContext,
+    file_path: str,
+    documents: Iterable[Document],
+    expected: Optional[int]=None,
+    batch_size: int=INGEST_BATCH_SIZE,
+    progress: Optional[Callable[[Dict[str, Optional[int]]], Any]]=None,
+    mode: IngestMode=IngestMode.UPSERT,
+    throttle: Optional[Callable[[], Awaitable]]=None
+) -> Dict[str, int]:
+    collection_name=context.collection_name
+    executor=context.executor
+    source=source_key(file_path)
+    stored=await asyncio.to_thread(load_stored_hashes, context.client, collection_name, source)
+    checkpoint=checkpoint_path(file_path, collection_name, context.embedding_model_name)
+    resumed=load_checkpoint(checkpoint)
+    if resumed:
+        logger.info(f"Resuming ingestion of {file_path} after {resumed} documents")
+    seen=set()
+    scanned=0
+
+    #   New and changed documents with their point ids and positions in the file; unchanged ones (and those
+    #   before the checkpoint) are only marked as seen.
+
+    def changed_documents():
+        nonlocal scanned
+        for point_id, document in assign_point_ids(documents, source):
+            seen.add(point_id)
+            scanned+=1
+            if scanned<=resumed or stored.get(point_id)==document.metadata["content_hash"]:
+                continue
+            yield scanned, point_id, document
+
+    #   Batches are parsed off the event loop, one at a time.
+
+    batches=iter_batches(changed_documents(), batch_size)
+    from vector_mirror import (
+        bump_collection_version,
+        get_collection_version
+    )
+    from flight_index import (
+        index_ingested_documents,
+        discard_flight_index
+    )
+    from facets import (
+        update_facets,
+        discard_facets
+    )
+    upserted=0
+    removed=[]
+    start_time=time.perf_counter()
+    reported_at=start_time
+
+    def counts() -> Dict[str, Optional[int]]:
+        return {"parsed": scanned, "embedded": executor.counts["texts"], "upserted": upserted, "deleted": len(removed), "expected": expected}
+
+    batch=await asyncio.to_thread(next, batches, None)
+    while batch:
+        if throttle is not None:
+            await throttle()
+        point_ids=[point_id for _, point_id, _ in batch]
+        batch_documents=[document for _, _, document in batch]
+        await upsert_documents(context.vector_store, executor, batch_documents, point_ids)
+        previous_version=get_collection_version(collection_name)
+        version=bump_collection_version(collection_name)
+        if any(point_id in stored for point_id in point_ids):
+
+            #   Changed points replace stored ones: the flight index and facets are rebuilt on next use.
+
+            discard_flight_index(collection_name)
+            discard_facets(collection_name)
+        else:
+            index_ingested_documents(collection_name, batch_documents, previous_version, version)
+            update_facets(collection_name, batch_documents)
+        upserted+=len(batch)
+        save_checkpoint(checkpoint, file_path, batch[-1][0])
+        if progress is not None:
+            progress(counts())
+        now=time.perf_counter()
+        if now-reported_at>=INGEST_PROGRESS_SECONDS:
+            reported_at=now
+            logger.info(f"Processed {scanned}/{expected} documents from {file_path}, {upserted} upserted ({scanned/(now-start_time):.1f} docs/s)")
+        batch=await asyncio.to_thread(next, batches, None)
+    if not scanned:
+        logger.warning(f"No documents generated from file: {file_path}")
+
+    #   An empty file in "sync" mode removes every stored point of its source.
+
+    if mode==IngestMode.SYNC:
+        removed=[point_id for point_id in stored if point_id not in seen]
+    if removed:
+        await asyncio.to_thread(delete_points, context.client, collection_name, removed)
+        bump_collection_version(collection_name)
+        discard_flight_index(collection_name)
+        discard_facets(collection_name)
+    if progress is not None:
+        progress(counts())
+    clear_checkpoint(checkpoint)
+    seconds=time.perf_counter()-start_time
+    logger.info(
+        f"Successfully ingested {scanned} documents from {file_path} to collection '{collection_name}' in {seconds:.1f}s "
+        f"({scanned/seconds if seconds else 0.0:.1f} docs/s): {upserted} upserted, {scanned-upserted} unchanged, {len(removed)} deleted; embedding {executor.stats()}"
+    )
+    return counts()
+
+#   Function to ingest data from a file into Qdrant vector store (see ingest_documents); returns the documents processed.
 
 async def ingest_data_to_qdrant(
     file_path: str,
     file_type: FileType,
     collection_name: str,
-    embedding_model_name: str="text-embedding-004"
+    embedding_model_name: str="text-embedding-004",
+    batch_size: int=INGEST_BATCH_SIZE,
+    progress: Optional[Callable[[Dict[str, Optional[int]]], Any]]=None,
+    mode: IngestMode=IngestMode.UPSERT,
+    throttle: Optional[Callable[[], Awaitable]]=None
 ) -> int:
     try:
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"File not found: {file_path}")
-        file_extension=os.path.splitext(file_path)[1].lower()
-        if file_type==FileType.JSON and file_extension != ".json":
-            raise ValueError(f"File extension {file_extension} doesn't match declared type {file_type}")
-        if file_type==FileType.MARKDOWN and file_extension not in [".md", ".markdown"]:
-            raise ValueError(f"File extension {file_extension} doesn't match declared type {file_type}")
-        if file_type==FileType.TEXT and file_extension!=".txt":
-            raise ValueError(f"File extension {file_extension} doesn't match declared type {file_type}")
-        if file_type==FileType.JSON:
-            documents=await process_json_file(file_path)
-        elif file_type==FileType.MARKDOWN:
-            documents=await process_markdown_file(file_path)
-        elif file_type==FileType.TEXT:
-            documents=await process_text_file(file_path)
-        else:
-            raise ValueError(f"Unsupported file type: {file_type}")
-        if not documents:
-            logger.warning(f"No documents generated from file: {file_path}")
-            return 0
-        client=get_qdrant_client()
-        embedding_model=get_embedding_model(embedding_model_name)
-        vector_store=await initialize_vector_store(
-            client=client,
-            collection_name=collection_name,
-            embedding_model=embedding_model
-        )
-        if not vector_store:
-            raise RuntimeError("Failed to initialize vector store")
-        await vector_store.aadd_documents(documents=documents)
-        logger.info(f"Successfully ingested {len(documents)} documents to collection '{collection_name}'")
-        return len(documents)  
+        validate_ingest_file(file_path, file_type)
+        documents, expected=await load_documents(file_path, file_type)
+        context=await open_ingest_context(collection_name, embedding_model_name)
+        counts=await ingest_documents(context, file_path, documents, expected, batch_size, progress, mode, throttle)
+        return counts["parsed"]
     except Exception as e:
         logger.error(f"Failed to ingest data from {file_path}: {str(e)}")
         raise
-        
+
+#   File types recognised by extension for bulk ingestion.
+
+FILE_TYPE_EXTENSIONS={
+    ".json": FileType.JSON,
+    ".md": FileType.MARKDOWN,
+    ".markdown": FileType.MARKDOWN,
+    ".txt": FileType.TEXT
+}
+
+def detect_file_type(file_path: str) -> Optional[FileType]:
+    return FILE_TYPE_EXTENSIONS.get(os.path.splitext(file_path)[1].lower())
+
+#   Files of a directory (recursively) or glob pattern with their types; files of other types are skipped, and
+#   file_type, when given, keeps only the files of that type.
+
+def resolve_ingest_paths(pattern: str, file_type: Optional[FileType]=None) -> List[Tuple[str, FileType]]:
+    if os.path.isdir(pattern):
+        paths=[os.path.join(directory, name) for directory, _, names in os.walk(pattern) for name in names]
+    else:
+        paths=glob.glob(pattern, recursive=True)
+    resolved=[]
+    for path in sorted(paths):
+        detected=detect_file_type(path)
+        if os.path.isfile(path) and detected is not None and (file_type is None or detected==file_type):
+            resolved.append((path, detected))
+    return resolved
+
+_parse_pool=None
+
+#   Process pool parsing and chunking files for bulk ingestion (spawned, so forking never copies server threads).
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool=ProcessPoolExecutor(max_workers=INGEST_PARSE_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+    return _parse_pool
+
+def close_parse_pool() -> None:
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(cancel_futures=True)
+        _parse_pool=None
+
+#   Parse a file into documents in a pool process.
+
+def parse_file(file_path: str, file_type: str) -> List[Document]:
+    if FileType(file_type)==FileType.JSON:
+        return list(iter_json_documents(file_path, count_json_items(file_path)))
+    return split_file(file_path, FileType(file_type).value)
+
+#   Ingest many files into a collection with one set of clients and one embedding executor. Files up to
+#   INGEST_POOL_MAX_FILE_MB are parsed in the process pool, larger JSON files are streamed in-process, and
+#   INGEST_BULK_FILE_CONCURRENCY files are in flight at a time. A failed file is reported through on_error and
+#   does not stop the others; progress gets aggregate counts. Returns the aggregate counts and throughput.
+
+async def ingest_bulk(
+    files: List[Tuple[str, FileType]],
+    collection_name: str,
+    embedding_model_name: str="text-embedding-004",
+    mode: IngestMode=IngestMode.UPSERT,
+    progress: Optional[Callable[[Dict[str, Optional[int]]], Any]]=None,
+    throttle: Optional[Callable[[], Awaitable]]=None,
+    on_error: Optional[Callable[[str], Any]]=None
+) -> Dict[str, Any]:
+    context=await open_ingest_context(collection_name, embedding_model_name)
+    loop=asyncio.get_running_loop()
+    semaphore=asyncio.Semaphore(INGEST_BULK_FILE_CONCURRENCY)
+    file_counts={}  #   File path -> latest counts of its ingestion.
+    failed=[]
+    start_time=time.perf_counter()
+
+    #   Aggregate counts; the expected total extrapolates the files not parsed yet from the average so far.
+
+    def aggregate() -> Dict[str, Optional[int]]:
+        totals={field: sum(counts[field] or 0 for counts in file_counts.values()) for field in ("parsed", "upserted", "deleted", "expected")}
+        started=len(file_counts)
+        remaining=len(files)-started-len(failed)
+        totals["expected"]=totals["expected"]+(round(totals["expected"]/started*remaining) if started else 0)
+        totals["embedded"]=context.executor.counts["texts"]
+        totals["files_total"]=len(files)
+        totals["files_done"]=sum(1 for counts in file_counts.values() if counts.get("done"))+len(failed)
+        return totals
+
+    def report(file_path: str, counts: Dict[str, Optional[int]]) -> None:
+        file_counts[file_path]={**file_counts.get(file_path, {}), **counts}
+        if progress is not None:
+            progress(aggregate())
+
+    async def ingest_file(file_path: str, file_type: FileType) -> None:
+        async with semaphore:
+            try:
+                if file_type==FileType.JSON and os.path.getsize(file_path)>INGEST_POOL_MAX_FILE_MB*1024*1024:
+                    documents, expected=await load_documents(file_path, file_type)
+                else:
+                    documents=await loop.run_in_executor(get_parse_pool(), parse_file, file_path, file_type.value)
+                    expected=len(documents)
+                report(file_path, {"parsed": 0, "upserted": 0, "deleted": 0, "expected": expected})
+                counts=await ingest_documents(context, file_path, documents, expected, progress=lambda counts: report(file_path, counts), mode=mode, throttle=throttle)
+                report(file_path, {**counts, "done": True})
+            except Exception as e:
+                logger.error(f"Failed to ingest {file_path}: {str(e)}")
+                file_counts.pop(file_path, None)
+                failed.append(file_path)
+                if on_error is not None:
+                    on_error(f"{file_path}: {str(e)}")
+                if progress is not None:
+                    progress(aggregate())
+
+    await asyncio.gather(*[ingest_file(file_path, file_type) for file_path, file_type in files])
+    if files and len(failed)==len(files):
+        raise RuntimeError(f"All {len(files)} files failed to ingest")
+    seconds=time.perf_counter()-start_time
+    totals=aggregate()
+    result={
+        **totals,
+        "documents_processed": totals["parsed"],
+        "failed_files": failed,
+        "seconds": round(seconds, 3),
+        "docs_per_second": round(totals["parsed"]/seconds, 2) if seconds else 0.0,
+        "embedding": context.executor.stats()
+    }
+    logger.info(f"Bulk ingestion of {len(files)} files into '{collection_name}': {totals['parsed']} documents in {seconds:.1f}s ({result['docs_per_second']} docs/s), {len(failed)} files failed")
+    return result
+
 #   Function to create a new Qdrant collection with vector store initialization.
 
 async def create_collection(
     collection_name: str
 ) -> dict:
+    from client_qdrant import (
+        get_qdrant_client,
+        initialize_vector_store,
+        create_qdrant_collection
+    )
+    from embeddings import get_embedding_model
     try:
         embedding_model_name="text-embedding-004"
         logger.info(f"Creating collection: {collection_name} with Gemini model: {embedding_model_name}")
         vector_size=768
         client=get_qdrant_client()
         await create_qdrant_collection(collection_name, client, vector_size)
+        clear_collection_checkpoints(collection_name)
         logger.info(f"Successfully created Qdrant collection: {collection_name}")
         embedding_model=get_embedding_model(embedding_model_name)
         vector_store=await initialize_vector_store(
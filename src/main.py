@@ -1,16 +1,25 @@
 import os
 import time
+import asyncio
 import logging
-import nest_asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import (
     FastAPI,
-    HTTPException
+    HTTPException,
+    Request,
+    Header
 )
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
+from fastapi.responses import (
+    JSONResponse,
+    FileResponse
+)
 from models import (
     DataIngestionRequest,
-    DataIngestionResponse,
+    BulkIngestionRequest,
+    IngestJobResponse,
+    IngestJobStatus,
     CreateCollectionRequest,
     CreateCollectionResponse,
     SearchRequest,
@@ -18,9 +27,40 @@ from models import (
 )
 from ingestion import (
     ingest_data_to_qdrant,
+    ingest_bulk,
+    resolve_ingest_paths,
+    close_parse_pool,
+    validate_ingest_file,
     create_collection
 )
-from graph import run_search_and_answer
+from ingest_jobs import (
+    JobQueueFull,
+    start_jobs,
+    submit_job,
+    get_job,
+    search_priority,
+    yield_to_search,
+    shutdown_jobs
+)
+from graph import (
+    run_search_and_answer,
+    warm_up
+)
+from metrics import get_stage_latency_summary
+from resilience import get_upstream_states
+from model_router import get_routing_report
+from profiling import (
+    PROFILED_PATHS,
+    PROFILED_JOB_PATHS,
+    RequestProfiler,
+    profile_job,
+    is_profiling_authorized,
+    resolve_profile_format,
+    try_acquire_profile_slot,
+    release_profile_slot,
+    list_profiles,
+    get_profile_path
+)
 
 #   Creating a directory for logs if it doesn't exist.
 
@@ -41,7 +81,55 @@ os.environ["TZ"]="Asia/Karachi"
 time.tzset()
 
 logger=logging.getLogger(__name__)
-nest_asyncio.apply()
+
+#   Warm-up configuration: collections to prime and how often to retry a failed warm-up.
+
+WARMUP_COLLECTIONS=[name.strip() for name in os.getenv("WARMUP_COLLECTIONS", "").split(",") if name.strip()]
+WARMUP_RETRIES=int(os.getenv("WARMUP_RETRIES", "3"))
+WARMUP_RETRY_DELAY=float(os.getenv("WARMUP_RETRY_DELAY", "5"))
+
+readiness={"ready": False, "status": "starting", "timings": {}, "error": None}
+
+#   Build every client and prime collection state, retrying transient failures before giving up.
+
+async def warm_up_service():
+    start_time=time.time()
+    for attempt in range(1, WARMUP_RETRIES+1):
+        readiness["status"]=f"warming_up (attempt {attempt}/{WARMUP_RETRIES})"
+        try:
+            readiness["timings"]=await warm_up(WARMUP_COLLECTIONS)
+            readiness.update({"ready": True, "status": "ready", "error": None, "warmup_seconds": round(time.time()-start_time, 3)})
+            logger.info(f"Warm-up complete in {time.time()-start_time:.2f}s: {readiness['timings']}")
+            return
+        except Exception as e:
+            readiness["error"]=str(e)
+            logger.error(f"Warm-up attempt {attempt} failed: {str(e)}")
+            if attempt<WARMUP_RETRIES:
+                await asyncio.sleep(WARMUP_RETRY_DELAY)
+    readiness["status"]="failed"
+
+#   Warm up in the background so the server can answer /ready while it is still cold.
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_jobs()
+    warmup_task=asyncio.create_task(warm_up_service())
+    yield
+    warmup_task.cancel()
+    await shutdown_jobs()
+    close_parse_pool()
+    from client_qdrant import (
+        close_async_qdrant_client,
+        close_embedded_qdrant_client
+    )
+    from sessions import close_checkpointer
+    from cassette import close_cassette
+    from embedding_cache import close_embedding_cache
+    await close_async_qdrant_client()
+    close_embedded_qdrant_client()
+    await close_checkpointer()
+    close_cassette()
+    close_embedding_cache()
 
 #   Initialize FastAPI application.
 
@@ -51,7 +139,7 @@ if os.getenv("ENVIRONMENT")!="dev":
     app_kwargs["redoc_url"]=None
     app_kwargs["openapi_url"]=None
 
-app=FastAPI(**app_kwargs)
+app=FastAPI(lifespan=lifespan, **app_kwargs)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -60,49 +148,117 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+#   Profile a single /search request when asked with the "X-Profile" header or "profile" query flag. /ingest and
+#   /ingest/bulk return as soon as their job is queued, so the job itself is profiled (keyed by its job id).
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    requested_format=request.headers.get("X-Profile", request.query_params.get("profile"))
+    if requested_format is None or request.url.path not in PROFILED_PATHS+PROFILED_JOB_PATHS:
+        return await call_next(request)
+    if not is_profiling_authorized(request.headers.get("X-Admin-Token")):
+        return JSONResponse(status_code=403, content={"detail": "Profiling requires a valid admin token"})
+    try:
+        profile_format=resolve_profile_format(requested_format)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    trace_memory=request.headers.get("X-Profile-Memory", request.query_params.get("profile_memory", "")).lower() in ("1", "true", "yes")
+    if request.url.path in PROFILED_JOB_PATHS:
+        request.state.job_profile=(profile_format, trace_memory)
+        response=await call_next(request)
+        response.headers["X-Profile-Status"]="job"
+        return response
+    if not await try_acquire_profile_slot():
+        logger.warning(f"Profiler busy, serving {request.url.path} without profiling")
+        response=await call_next(request)
+        response.headers["X-Profile-Status"]="busy"
+        return response
+    try:
+        profiler=RequestProfiler(request.url.path, profile_format, trace_memory=trace_memory)
+        profiler.start()
+        status_code=500
+        try:
+            response=await call_next(request)
+            status_code=response.status_code
+        finally:
+            metadata=profiler.stop(status_code)
+        response.headers["X-Profile-Id"]=metadata["profile_id"]
+        return response
+    finally:
+        release_profile_slot()
+
+#   Wrap a job's run callable to profile the job when its submitting request asked for a profile.
+
+def profiled_job(http_request: Request, run):
+    options=getattr(http_request.state, "job_profile", None)
+    if options is None:
+        return run
+    profile_format, trace_memory=options
+
+    async def run_profiled(job):
+        return await profile_job(http_request.url.path, job.job_id, profile_format, trace_memory, lambda: run(job))
+
+    return run_profiled
+
 @app.get("/")
 async def read_root():
     return {"message": "Welcome to the KAVAK's Conversational Travel Assistant Platform!"}
 
-#   Endpoint to ingest data into Qdrant.
+#   Readiness endpoint for the load balancer – not ready until warm-up completes.
 
-@app.post("/ingest", response_model=DataIngestionResponse)
-async def ingest_data(request: DataIngestionRequest):
-    try:
-        logger.info(f"Starting data ingestion for file: {request.filename}, type: {request.file_type}")
-        
-        #   Validate file path and ensure it is within the project directory.
+@app.get("/ready")
+async def ready():
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
 
-        if not os.path.isabs(request.filename):
+#   Per-stage latency summaries, upstream circuit-breaker state and per-model accounting of this worker.
 
-            #   If the filename is relative, construct the absolute path.
+@app.get("/metrics")
+async def get_metrics():
+    return {"stages": get_stage_latency_summary(), "upstreams": get_upstream_states(), "models": get_routing_report()}
 
-            project_root=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            file_path=os.path.join(project_root, request.filename)
-        else:
-            file_path=request.filename
+#   Endpoint to ingest data into Qdrant: validates the file and submits a background job, whose id is returned.
+
+@app.post("/ingest", response_model=IngestJobResponse, status_code=202)
+async def ingest_data(request: DataIngestionRequest, http_request: Request):
+    try:
+        logger.info(f"Starting data ingestion for file: {request.filename}, type: {request.file_type}")
         
-        #   Check if the file exists.
+        #   Validate file path and ensure it is within the project directory; relative filenames are resolved
+        #   against it, and the path is normalised so ".." or symlinks cannot lead outside.
 
-        project_root=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        project_root=os.path.realpath(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        file_path=os.path.realpath(request.filename if os.path.isabs(request.filename) else os.path.join(project_root, request.filename))
         if not os.path.commonpath([file_path, project_root])==project_root:
             raise HTTPException(
                 status_code=400,
                 detail="File path must be within the project directory"
             )
 
-        documents_processed=await ingest_data_to_qdrant(
+        validate_ingest_file(file_path, request.file_type)
+        job=await submit_job("file", request.dict(), profiled_job(http_request, lambda job: ingest_data_to_qdrant(
             file_path=file_path,
             file_type=request.file_type,
-            collection_name=request.collection_name
-        )   #   Ingesting data from the file into Qdrant vector store.
-        logger.info(f"Successfully ingested {documents_processed} documents from {request.filename}")
-        return DataIngestionResponse(
+            collection_name=request.collection_name,
+            mode=request.mode,
+            progress=job.update_progress,
+            throttle=yield_to_search
+        )))  #   Ingesting data from the file into Qdrant vector store in the background.
+        logger.info(f"Submitted ingestion job {job.job_id} for {request.filename}")
+        return IngestJobResponse(
             success=True,
-            message=f"Successfully ingested {documents_processed} documents from {request.filename}",
-            documents_processed=documents_processed,
+            message=f"Ingestion of {request.filename} submitted as job {job.job_id}",
+            job_id=job.job_id,
+            status=job.status,
             collection_name=request.collection_name
         )
+    except HTTPException:
+        raise
+    except JobQueueFull as e:
+        logger.warning(f"Rejected ingestion of {request.filename}: {str(e)}")
+        raise HTTPException(
+            status_code=429,
+            detail=str(e)
+        )
     except FileNotFoundError:
         logger.error(f"File not found: {request.filename}")
         raise HTTPException(
@@ -121,7 +277,81 @@ async def ingest_data(request: DataIngestionRequest):
             status_code=500,
             detail=f"Internal server error during data ingestion: {str(e)}"
         )
-    
+
+#   Endpoint to ingest every JSON, Markdown and text file of a directory or glob pattern as one background job:
+#   files are parsed in a process pool and share one set of clients and one embedding executor.
+
+@app.post("/ingest/bulk", response_model=IngestJobResponse, status_code=202)
+async def ingest_bulk_data(request: BulkIngestionRequest, http_request: Request):
+    try:
+        logger.info(f"Starting bulk ingestion for path: {request.path}, type: {request.file_type or 'auto'}")
+        project_root=os.path.realpath(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        pattern=request.path if os.path.isabs(request.path) else os.path.join(project_root, request.path)
+
+        #   Only files within the project directory are ingested: the normalised directory or glob is checked before
+        #   it is walked, and matches are checked again in case a symlink leads outside.
+
+        pattern=os.path.realpath(pattern)
+        if not os.path.commonpath([pattern, project_root])==project_root:
+            raise HTTPException(
+                status_code=400,
+                detail="Path must be within the project directory"
+            )
+        files=await asyncio.to_thread(resolve_ingest_paths, pattern, request.file_type)
+        files=[(file_path, file_type) for file_path, file_type in files if os.path.commonpath([os.path.realpath(file_path), project_root])==project_root]
+        if not files:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No ingestible files found for: {request.path}"
+            )
+
+        async def run(job):
+            result=await ingest_bulk(
+                files,
+                collection_name=request.collection_name,
+                mode=request.mode,
+                progress=job.update_progress,
+                throttle=yield_to_search,
+                on_error=job.add_error
+            )
+            return result["documents_processed"]
+
+        job=await submit_job("bulk", {**request.dict(), "files": len(files)}, profiled_job(http_request, run))
+        logger.info(f"Submitted bulk ingestion job {job.job_id} for {len(files)} files from {request.path}")
+        return IngestJobResponse(
+            success=True,
+            message=f"Ingestion of {len(files)} files from {request.path} submitted as job {job.job_id}",
+            job_id=job.job_id,
+            status=job.status,
+            collection_name=request.collection_name
+        )
+    except HTTPException:
+        raise
+    except JobQueueFull as e:
+        logger.warning(f"Rejected bulk ingestion of {request.path}: {str(e)}")
+        raise HTTPException(
+            status_code=429,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error during bulk ingestion: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error during bulk ingestion: {str(e)}"
+        )
+
+#   Progress, throughput, ETA and errors of an ingestion job.
+
+@app.get("/jobs/{job_id}", response_model=IngestJobStatus)
+async def get_job_status(job_id: str):
+    job=await asyncio.to_thread(get_job, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Job not found: {job_id}"
+        )
+    return job
+
 #   Endpoint to create a new collection in Qdrant.
 
 @app.post("/create-collection", response_model=CreateCollectionResponse)
@@ -177,7 +407,7 @@ async def create_new_collection(request: CreateCollectionRequest):
 '''
     
 @app.post("/search", response_model=SearchResponse)
-async def search_with_langgraph(request: SearchRequest):
+async def search_with_langgraph(request: SearchRequest, x_request_timeout_ms: Optional[int]=Header(default=None)):
     """
     Search using LangGraph agent with hybrid RAG capabilities.
     
@@ -191,6 +421,7 @@ async def search_with_langgraph(request: SearchRequest):
     
     Args:
         request: Search request with query and collection name
+        x_request_timeout_ms: Request budget, used when the request body has no timeout_ms
         
     Returns:
         Search response with generated answer and processing details
@@ -202,10 +433,13 @@ async def search_with_langgraph(request: SearchRequest):
         
         #   Running the LangGraph search workflow.
 
-        result=await run_search_and_answer(
-            query=request.query,
-            collection_name=request.collection_name
-        )
+        async with search_priority():
+            result=await run_search_and_answer(
+                query=request.query,
+                collection_name=request.collection_name,
+                session_id=request.session_id,
+                timeout_ms=request.timeout_ms or x_request_timeout_ms
+            )
         
         processing_time=time.time()-start_time
         if result.get("success", False):
@@ -217,6 +451,10 @@ async def search_with_langgraph(request: SearchRequest):
                 query_type=result.get("query_type", "unknown"),
                 filters_applied=result.get("filters", {}),
                 documents_used=result.get("documents_used", 0),
+                aggregates=result.get("aggregates"),
+                session_id=request.session_id,
+                refined=result.get("refined", False),
+                degraded=result.get("degraded", []),
                 processing_time=processing_time
             )
         else:
@@ -241,7 +479,36 @@ async def search_with_langgraph(request: SearchRequest):
             detail=f"Internal server error during search: {str(e)}"
         )
 
+#   Endpoint to list recently captured request profiles.
+
+@app.get("/profiles")
+async def get_profiles(limit: int=20, x_admin_token: Optional[str]=Header(default=None)):
+    if not is_profiling_authorized(x_admin_token):
+        raise HTTPException(
+            status_code=403,
+            detail="Listing profiles requires a valid admin token"
+        )
+    return {"profiles": list_profiles(limit=limit)}
+
+#   Endpoint to download a single profile artifact.
+
+@app.get("/profiles/{name}")
+async def get_profile(name: str, x_admin_token: Optional[str]=Header(default=None)):
+    if not is_profiling_authorized(x_admin_token):
+        raise HTTPException(
+            status_code=403,
+            detail="Downloading profiles requires a valid admin token"
+        )
+    path=get_profile_path(name)
+    if path is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Profile not found: {name}"
+        )
+    return FileResponse(path)
+
 if __name__=="__main__":
+    import uvicorn
     try:
         uvicorn.run(app, host="0.0.0.0", port=8001)
     except Exception as e:
@@ -0,0 +1,87 @@
+import os
+import time
+import math
+import functools
+import threading
+from collections import (
+    defaultdict,
+    deque
+)
+from typing import (
+    Dict,
+    List,
+    Any,
+    Iterable
+)
+
+#   In-process latency samples per graph stage, bounded so long-running workers don't grow without limit.
+
+METRICS_MAX_SAMPLES=int(os.getenv("METRICS_MAX_SAMPLES", "10000"))
+
+_lock=threading.Lock()
+_stage_latencies=defaultdict(lambda: deque(maxlen=METRICS_MAX_SAMPLES))
+
+#   Record the latency of a single stage execution in seconds.
+
+def record_stage_latency(stage: str, seconds: float) -> None:
+    with _lock:
+        _stage_latencies[stage].append(seconds)
+
+#   Return a copy of the raw latency samples per stage.
+
+def get_stage_latencies() -> Dict[str, List[float]]:
+    with _lock:
+        return {stage: list(samples) for stage, samples in _stage_latencies.items()}
+
+#   Clear all recorded samples.
+
+def reset_metrics() -> None:
+    with _lock:
+        _stage_latencies.clear()
+
+#   Linear-interpolated percentile of a list of values (q in [0, 100]).
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered=sorted(values)
+    position=(len(ordered)-1)*q/100
+    lower=math.floor(position)
+    upper=math.ceil(position)
+    if lower==upper:
+        return ordered[lower]
+    return ordered[lower]+(ordered[upper]-ordered[lower])*(position-lower)
+
+#   Summarize latency samples into count, mean and tail percentiles (in milliseconds).
+
+def summarize_latencies(values: Iterable[float]) -> Dict[str, Any]:
+    values=list(values)
+    if not values:
+        return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "count": len(values),
+        "mean_ms": round(1000*sum(values)/len(values), 3),
+        "p50_ms": round(1000*percentile(values, 50), 3),
+        "p95_ms": round(1000*percentile(values, 95), 3),
+        "p99_ms": round(1000*percentile(values, 99), 3),
+        "max_ms": round(1000*max(values), 3)
+    }
+
+#   Summaries for every recorded stage.
+
+def get_stage_latency_summary() -> Dict[str, Dict[str, Any]]:
+    return {stage: summarize_latencies(samples) for stage, samples in get_stage_latencies().items()}
+
+#   Decorator recording the wall-clock latency of an async graph node.
+
+def timed_node(stage: str):
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start_time=time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                record_stage_latency(stage, time.perf_counter()-start_time)
+        return wrapper
+    return decorator
@@ -0,0 +1,148 @@
+import os
+import time
+import logging
+import threading
+from collections import (
+    defaultdict,
+    deque
+)
+from typing import (
+    Dict,
+    Any,
+    Optional
+)
+from metrics import (
+    percentile,
+    summarize_latencies
+)
+
+'''
+
+    Per-stage model routing. Classification, filter extraction, answer generation and reranking each have
+    their own model, temperature, max output tokens and timeout, configured with <STAGE>_MODEL,
+    <STAGE>_TEMPERATURE, <STAGE>_MAX_TOKENS and <STAGE>_TIMEOUT_SECONDS (stages: CLASSIFY, FILTERS, ANSWER,
+    RERANK). Gemini 2.5 models count thinking tokens toward the output limit, so a stage can cap them with
+    <STAGE>_THINKING_BUDGET; the answer stage defaults to 0 so its whole limit goes to the answer.
+
+    When the measured p95 latency of a stage's primary model exceeds <STAGE>_LATENCY_BUDGET_SECONDS, the
+    stage is downgraded to <STAGE>_FALLBACK_MODEL for ROUTER_DOWNGRADE_SECONDS and then retries the primary.
+    Calls, errors, tokens and latency are accounted per stage and model.
+
+'''
+
+logger=logging.getLogger(__name__)
+
+ROUTER_MIN_SAMPLES=int(os.getenv("ROUTER_MIN_SAMPLES", "20"))
+ROUTER_PERCENTILE=float(os.getenv("ROUTER_PERCENTILE", "95"))
+ROUTER_DOWNGRADE_SECONDS=float(os.getenv("ROUTER_DOWNGRADE_SECONDS", "300"))
+ROUTER_MAX_SAMPLES=int(os.getenv("ROUTER_MAX_SAMPLES", "200"))
+
+CHAT_STAGES=["classify", "filters", "answer"]
+
+#   Defaults per stage: model, fallback model, temperature, max output tokens, timeout and latency budget (seconds).
+
+DEFAULT_ROUTES={
+    "classify": ("gemini-2.5-flash-lite", "gemini-2.0-flash-lite", 0.0, 16, 5.0, 1.0),
+    "filters": ("gemini-2.5-flash-lite", "gemini-2.0-flash-lite", 0.0, 512, 8.0, 2.0),
+    "answer": ("gemini-2.5-flash", "gemini-2.5-flash-lite", 0.1, 1024, 20.0, 4.0),
+    "rerank": ("gpt-4o-mini", "gpt-4.1-nano", 0.0, 0, 20.0, 4.0),
+}
+
+#   Thinking token budgets per stage; stages without one use the model's default.
+
+DEFAULT_THINKING_BUDGETS={
+    "answer": 0,
+}
+
+def load_thinking_budget(stage: str) -> Optional[int]:
+    value=os.getenv(f"{stage.upper()}_THINKING_BUDGET", "")
+    if value=="":
+        return DEFAULT_THINKING_BUDGETS.get(stage)
+    return int(value)
+
+def load_route(stage: str) -> Dict[str, Any]:
+    model, fallback_model, temperature, max_tokens, timeout, latency_budget=DEFAULT_ROUTES[stage]
+    prefix=stage.upper()
+    return {
+        "stage": stage,
+        "model": os.getenv(f"{prefix}_MODEL", model),
+        "fallback_model": os.getenv(f"{prefix}_FALLBACK_MODEL", fallback_model),   #   Empty disables the downgrade.
+        "temperature": float(os.getenv(f"{prefix}_TEMPERATURE", str(temperature))),
+        "max_tokens": int(os.getenv(f"{prefix}_MAX_TOKENS", str(max_tokens))),
+        "thinking_budget": load_thinking_budget(stage),     #   None leaves the model's default.
+        "timeout": float(os.getenv(f"{prefix}_TIMEOUT_SECONDS", str(timeout))),
+        "latency_budget": float(os.getenv(f"{prefix}_LATENCY_BUDGET_SECONDS", str(latency_budget)))
+    }
+
+ROUTES={stage: load_route(stage) for stage in DEFAULT_ROUTES}
+
+_lock=threading.Lock()
+_latencies=defaultdict(lambda: deque(maxlen=ROUTER_MAX_SAMPLES))     #   (stage, model) -> recent call latencies.
+_usage=defaultdict(lambda: {"calls": 0, "errors": 0, "input_tokens": 0, "output_tokens": 0})    #   (stage, model) -> counters.
+_downgraded_until={}    #   Stage -> monotonic time until which the fallback model is used.
+
+def get_route(stage: str) -> Dict[str, Any]:
+    return ROUTES[stage]
+
+#   Route for a stage's next call: the primary model, or the fallback while the stage is downgraded.
+
+def select_model(stage: str) -> Dict[str, Any]:
+    route=ROUTES[stage]
+    with _lock:
+        downgraded=time.monotonic()<_downgraded_until.get(stage, 0.0)
+    if downgraded and route["fallback_model"]:
+        return {**route, "model": route["fallback_model"]}
+    return route
+
+#   Token counts of a LangChain chat response, when the provider reports them.
+
+def usage_of(response) -> Dict[str, int]:
+    usage=getattr(response, "usage_metadata", None) or {}
+    return {"input_tokens": int(usage.get("input_tokens") or 0), "output_tokens": int(usage.get("output_tokens") or 0)}
+
+#   Account one call of a routed model; a primary over its latency budget downgrades the stage.
+
+def record_model_call(choice: Dict[str, Any], seconds: float, usage: Optional[Dict[str, int]]=None, error: bool=False) -> None:
+    stage, model=choice["stage"], choice["model"]
+    route=ROUTES[stage]
+    with _lock:
+        counters=_usage[(stage, model)]
+        counters["calls"]+=1
+        counters["errors"]+=int(error)
+        for key, value in (usage or {}).items():
+            counters[key]+=value
+        samples=_latencies[(stage, model)]
+        samples.append(seconds)
+        if model!=route["model"] or not route["fallback_model"] or len(samples)<ROUTER_MIN_SAMPLES:
+            return
+        observed=percentile(list(samples), ROUTER_PERCENTILE)
+        if observed>route["latency_budget"]:
+            _downgraded_until[stage]=time.monotonic()+ROUTER_DOWNGRADE_SECONDS
+            samples.clear()     #   The primary is measured afresh when the stage returns to it.
+            logger.warning(f"Downgrading {stage} from {model} to {route['fallback_model']} for {ROUTER_DOWNGRADE_SECONDS:.0f}s: p{ROUTER_PERCENTILE:.0f} {observed:.2f}s over the {route['latency_budget']:.2f}s budget")
+
+#   Routing state and per-model accounting of every stage, for the metrics endpoint and benchmarks.
+
+def get_routing_report() -> Dict[str, Any]:
+    with _lock:
+        now=time.monotonic()
+        report={}
+        for stage, route in ROUTES.items():
+            downgraded_for=max(_downgraded_until.get(stage, 0.0)-now, 0.0)
+            models={}
+            for (usage_stage, model), counters in _usage.items():
+                if usage_stage==stage:
+                    models[model]={**counters, **summarize_latencies(_latencies[(stage, model)])}
+            report[stage]={
+                "model": route["model"],
+                "active_model": route["fallback_model"] if downgraded_for and route["fallback_model"] else route["model"],
+                "downgraded_for_seconds": round(downgraded_for, 3),
+                "models": models
+            }
+        return report
+
+def reset_routing() -> None:
+    with _lock:
+        _latencies.clear()
+        _usage.clear()
+        _downgraded_until.clear()
@@ -1,5 +1,10 @@
 from pydantic import BaseModel, validator
-from typing import Optional
+from typing import (
+    Optional,
+    List,
+    Dict,
+    Any
+)
 from enum import Enum
 
 class FileType(str, Enum):
@@ -7,11 +12,18 @@ class FileType(str, Enum):
     MARKDOWN="markdown"
     TEXT="text"
 
+#   "upsert" adds new and changed documents; "sync" also deletes the file's points that are no longer in it.
+
+class IngestMode(str, Enum):
+    UPSERT="upsert"
+    SYNC="sync"
+
 class DataIngestionRequest(BaseModel):
 
     filename: str
     file_type: FileType
     collection_name: str
+    mode: IngestMode=IngestMode.UPSERT
 
     @validator("filename")
     def validate_filename(cls, v):
@@ -25,12 +37,62 @@ class DataIngestionRequest(BaseModel):
             raise ValueError("Collection name cannot be empty")
         return v.strip()
 
+#   Bulk ingestion of a directory (walked recursively) or glob pattern; file types are detected by extension
+#   unless file_type restricts the files to one type.
+
+class BulkIngestionRequest(BaseModel):
+
+    path: str
+    collection_name: str
+    mode: IngestMode=IngestMode.UPSERT
+    file_type: Optional[FileType]=None
+
+    @validator("path")
+    def validate_path(cls, v):
+        if not v or not v.strip():
+            raise ValueError("Path cannot be empty")
+        return v.strip()
+
+    @validator("collection_name")
+    def validate_collection_name(cls, v):
+        if not v or not v.strip():
+            raise ValueError("Collection name cannot be empty")
+        return v.strip()
+
 class DataIngestionResponse(BaseModel):
     success: bool
     message: str
     documents_processed: int
     collection_name: str
 
+class IngestJobResponse(BaseModel):
+    success: bool
+    message: str
+    job_id: str
+    status: str
+    collection_name: str
+
+class IngestJobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: str     #   "queued", "running", "succeeded" or "failed".
+    request: Dict[str, Any]
+    documents_parsed: int
+    documents_embedded: int     #   Embedded by the model (embedding cache hits are not counted).
+    documents_upserted: int
+    documents_deleted: int
+    documents_expected: Optional[int]=None
+    documents_processed: Optional[int]=None     #   Set when the job succeeds.
+    docs_per_second: float
+    elapsed_seconds: float
+    eta_seconds: Optional[float]=None
+    errors: List[str]=[]
+    files_total: Optional[int]=None     #   Bulk jobs only.
+    files_done: Optional[int]=None
+    created_at: float
+    started_at: Optional[float]=None
+    finished_at: Optional[float]=None
+
 class CreateCollectionRequest(BaseModel):
 
     collection_name: str
@@ -55,6 +117,8 @@ class SearchRequest(BaseModel):
 
     query: str
     collection_name: str
+    session_id: Optional[str]=None  #   Conversation to continue; follow-ups refine the previous results.
+    timeout_ms: Optional[int]=None  #   Request budget; stages degrade instead of exceeding it.
     
     @validator("query")
     def validate_query(cls, v):
@@ -67,6 +131,12 @@ class SearchRequest(BaseModel):
         if not v or not v.strip():
             raise ValueError("Collection name cannot be empty")
         return v.strip()
+    
+    @validator("timeout_ms")
+    def validate_timeout_ms(cls, v):
+        if v is not None and v<=0:
+            raise ValueError("Timeout must be a positive number of milliseconds")
+        return v
 
 class SearchResponse(BaseModel):
     success: bool
@@ -75,4 +145,8 @@ class SearchResponse(BaseModel):
     query_type: str
     filters_applied: Optional[dict]=None
     documents_used: int
+    aggregates: Optional[dict]=None
+    session_id: Optional[str]=None
+    refined: bool=False
+    degraded: List[str]=[]  #   Stages that ran degraded to meet the deadline (partial results when not empty).
     processing_time: float
\ No newline at end of file
@@ -0,0 +1,253 @@
+import os
+import sys
+import time
+import json
+import hmac
+import uuid
+import asyncio
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from typing import (
+    Optional,
+    Callable,
+    Awaitable,
+    List,
+    Dict,
+    Any
+)
+
+logger=logging.getLogger(__name__)
+
+#   Profiling configuration – profiling is disabled unless an admin token is configured.
+
+PROFILES_DIRECTORY=os.getenv("PROFILES_DIRECTORY", "profiles")
+PROFILES_MAX_FILES=int(os.getenv("PROFILES_MAX_FILES", "50"))
+PROFILE_SAMPLE_INTERVAL=float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.001"))
+PROFILED_PATHS=("/search",)
+PROFILED_JOB_PATHS=("/ingest", "/ingest/bulk")    #   Return at once; their background job is profiled instead of the request.
+PROFILE_FORMATS=("html", "collapsed")
+TRACEMALLOC_TOP_STATS=50
+
+_profile_lock=asyncio.Lock()    #   Only one request is profiled at a time per process.
+
+#   Check whether pyinstrument is installed for HTML profiles.
+
+def pyinstrument_available() -> bool:
+    try:
+        import pyinstrument  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+#   Validate the admin token supplied with a profiling request.
+
+def is_profiling_authorized(token: Optional[str]) -> bool:
+    admin_token=os.getenv("PROFILING_ADMIN_TOKEN")
+    if not admin_token or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), admin_token.encode("utf-8"))
+
+#   Resolve the requested output format, falling back to collapsed stacks when pyinstrument is missing.
+
+def resolve_profile_format(requested: Optional[str]) -> str:
+    requested=(requested or "").strip().lower()
+    if requested in ("", "1", "true", "yes", "html"):
+        return "html" if pyinstrument_available() else "collapsed"
+    if requested=="collapsed":
+        return "collapsed"
+    raise ValueError(f"Unsupported profile format '{requested}', expected one of {list(PROFILE_FORMATS)}")
+
+#   Stack sampling profiler producing collapsed stacks (flamegraph.pl / speedscope input).
+
+class StackSampler:
+
+    def __init__(self, interval: float=PROFILE_SAMPLE_INTERVAL):
+        self.interval=interval
+        self.samples=Counter()
+        self._stop=threading.Event()
+        self._thread=None
+
+    def start(self) -> None:
+        self._thread=threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    #   Sampling every thread so work offloaded with asyncio.to_thread is captured as well.
+
+    def _run(self) -> None:
+        sampler_id=threading.get_ident()
+        thread_names={}
+        while not self._stop.is_set():
+            for thread in threading.enumerate():
+                thread_names[thread.ident]=thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id==sampler_id:
+                    continue
+                stack=[]
+                while frame is not None:
+                    code=frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame=frame.f_back
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))]+=1
+            time.sleep(self.interval)
+
+    def render(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+#   Profile a single request and write its artifacts to the profiles directory.
+
+class RequestProfiler:
+
+    def __init__(self, path: str, profile_format: str, trace_memory: bool=False, job_id: Optional[str]=None):
+        self.path=path
+        self.profile_format=profile_format
+        self.trace_memory=trace_memory
+        self.job_id=job_id
+        if job_id:
+            self.profile_id=f"{time.strftime('%Y%m%d-%H%M%S')}-job-{job_id}"
+        else:
+            self.profile_id=f"{time.strftime('%Y%m%d-%H%M%S')}-{path.strip('/').replace('/', '_') or 'root'}-{uuid.uuid4().hex[:8]}"
+        self._profiler=None
+        self._snapshot=None
+        self._started_tracemalloc=False
+        self._start_time=None
+
+    def start(self) -> None:
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+                self._started_tracemalloc=True
+            self._snapshot=tracemalloc.take_snapshot()
+        if self.profile_format=="html":
+            from pyinstrument import Profiler
+            self._profiler=Profiler(interval=PROFILE_SAMPLE_INTERVAL, async_mode="enabled")
+        else:
+            self._profiler=StackSampler()
+        self._start_time=time.perf_counter()
+        self._profiler.start()
+
+    def stop(self, status_code: int) -> Dict[str, Any]:
+        self._profiler.stop()
+        duration=time.perf_counter()-self._start_time
+        os.makedirs(PROFILES_DIRECTORY, exist_ok=True)
+        extension="html" if self.profile_format=="html" else "collapsed"
+        profile_file=f"{self.profile_id}.{extension}"
+        with open(os.path.join(PROFILES_DIRECTORY, profile_file), "w", encoding="utf-8") as file:
+            file.write(self._profiler.output_html() if self.profile_format=="html" else self._profiler.render())
+        memory_file=None
+        if self.trace_memory and self._snapshot is not None:
+            memory_file=f"{self.profile_id}.alloc.txt"
+            with open(os.path.join(PROFILES_DIRECTORY, memory_file), "w", encoding="utf-8") as file:
+                file.write(self._render_allocation_diff())
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        metadata={
+            "profile_id": self.profile_id,
+            "path": self.path,
+            "job_id": self.job_id,
+            "format": self.profile_format,
+            "status_code": status_code,
+            "duration_seconds": round(duration, 4),
+            "created_at": time.time(),
+            "profile_file": profile_file,
+            "memory_file": memory_file
+        }
+        with open(os.path.join(PROFILES_DIRECTORY, f"{self.profile_id}.json"), "w", encoding="utf-8") as file:
+            json.dump(metadata, file, indent=2)
+        prune_profiles()
+        logger.info(f"Wrote profile {profile_file} for {self.path} ({duration:.2f}s)")
+        return metadata
+
+    #   Diff allocations against the snapshot taken before the request, project sources first.
+
+    def _render_allocation_diff(self) -> str:
+        snapshot=tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        stats=snapshot.compare_to(self._snapshot, "lineno")
+        project_root=os.path.dirname(os.path.abspath(__file__))
+        project_stats=[stat for stat in stats if stat.traceback[0].filename.startswith(project_root)]
+        lines=[f"Allocation diff for {self.path} ({self.profile_id})", "", "Project sources (src/):"]
+        lines.extend(str(stat) for stat in project_stats[:TRACEMALLOC_TOP_STATS])
+        lines.extend(["", "All sources:"])
+        lines.extend(str(stat) for stat in stats[:TRACEMALLOC_TOP_STATS])
+        return "\n".join(lines)+"\n"
+
+#   Acquire the per-process profiling slot without waiting; returns False if another profile is running.
+
+async def try_acquire_profile_slot() -> bool:
+    if _profile_lock.locked():
+        return False
+    await _profile_lock.acquire()
+    return True
+
+def release_profile_slot() -> None:
+    if _profile_lock.locked():
+        _profile_lock.release()
+
+#   Profile a background ingestion job from start to finish; runs it unprofiled when another profile is running.
+
+async def profile_job(path: str, job_id: str, profile_format: str, trace_memory: bool, run: Callable[[], Awaitable[Any]]) -> Any:
+    if not await try_acquire_profile_slot():
+        logger.warning(f"Profiler busy, running job {job_id} without profiling")
+        return await run()
+    try:
+        profiler=RequestProfiler(path, profile_format, trace_memory=trace_memory, job_id=job_id)
+        profiler.start()
+        status_code=500
+        try:
+            result=await run()
+            status_code=200
+            return result
+        finally:
+            profiler.stop(status_code)
+    finally:
+        release_profile_slot()
+
+#   Delete the oldest profiles beyond the retention limit.
+
+def prune_profiles() -> None:
+    for metadata in list_profiles(limit=None)[PROFILES_MAX_FILES:]:
+        for key in ("profile_file", "memory_file"):
+            if metadata.get(key):
+                try:
+                    os.remove(os.path.join(PROFILES_DIRECTORY, metadata[key]))
+                except FileNotFoundError:
+                    pass
+        try:
+            os.remove(os.path.join(PROFILES_DIRECTORY, f"{metadata['profile_id']}.json"))
+        except FileNotFoundError:
+            pass
+
+#   List recent profiles, newest first.
+
+def list_profiles(limit: Optional[int]=20) -> List[Dict[str, Any]]:
+    if not os.path.isdir(PROFILES_DIRECTORY):
+        return []
+    profiles=[]
+    for name in os.listdir(PROFILES_DIRECTORY):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILES_DIRECTORY, name), "r", encoding="utf-8") as file:
+                profiles.append(json.load(file))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Skipping unreadable profile metadata {name}: {str(e)}")
+    profiles.sort(key=lambda metadata: metadata.get("created_at", 0), reverse=True)
+    return profiles if limit is None else profiles[:limit]
+
+#   Resolve a profile artifact name to a path inside the profiles directory.
+
+def get_profile_path(name: str) -> Optional[str]:
+    if os.path.basename(name)!=name:
+        return None
+    path=os.path.join(PROFILES_DIRECTORY, name)
+    return path if os.path.isfile(path) else None
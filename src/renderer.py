@@ -0,0 +1,65 @@
+import logging
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional
+)
+from langchain_core.documents import Document
+
+'''
+
+    Deterministic answer renderer: a plain-text answer built from the retrieved documents and aggregate
+    figures without an LLM call, used when the request's deadline leaves no budget for answer generation.
+
+'''
+
+logger=logging.getLogger(__name__)
+
+RENDER_MAX_DOCUMENTS=5
+RENDER_EXCERPT_CHARS=300
+
+OPERATION_NAMES={"min": "lowest", "max": "highest", "avg": "average", "count": "number of flights"}
+
+#   One line per flight, from its structured metadata.
+
+def render_flight(metadata: Dict[str, Any]) -> str:
+    stops=len(metadata.get("layovers") or [])
+    details=[
+        f"{metadata.get('from')} to {metadata.get('to')}",
+        str(metadata.get("departure_date") or "")[:10],
+        str(metadata.get("travel_class") or "").replace("_", " "),
+        f"${metadata.get('price_usd')}" if metadata.get("price_usd") is not None else "",
+        "direct" if not stops else f"{stops} stop{'s' if stops>1 else ''}",
+        "refundable" if metadata.get("refundable") else ""
+    ]
+    return f"- {metadata.get('airline')} {metadata.get('flight_id')}: {', '.join(detail for detail in details if detail)}"
+
+#   Sentence stating an aggregate result.
+
+def render_aggregates(aggregates: Dict[str, Any]) -> str:
+    operation=OPERATION_NAMES.get(aggregates.get("operation"), aggregates.get("operation"))
+    metric=str(aggregates.get("metric", "")).replace("_", " ")
+    if aggregates.get("groups"):
+        groups="; ".join(f"{group[aggregates['group_by']]}: {group['value']}" for group in aggregates["groups"][:RENDER_MAX_DOCUMENTS])
+        return f"{operation.capitalize()} {metric} by {aggregates['group_by']} over {aggregates['matching_flights']} matching flights – {groups}."
+    if aggregates.get("operation")=="count":
+        return f"{aggregates['matching_flights']} flights match your criteria."
+    return f"The {operation} {metric} over {aggregates['matching_flights']} matching flights is {aggregates.get('value')}."
+
+#   Render an answer from the documents (flights as one line each, other documents as excerpts).
+
+def render_answer(query: str, documents: List[Document], aggregates: Optional[Dict[str, Any]]=None) -> str:
+    if not documents and not aggregates:
+        return "I couldn't find any relevant information to answer your query."
+    lines=[]
+    if aggregates:
+        lines.append(render_aggregates(aggregates))
+    if documents:
+        lines.append(f"Top results for '{query}':")
+        for document in documents[:RENDER_MAX_DOCUMENTS]:
+            if document.metadata.get("flight_id"):
+                lines.append(render_flight(document.metadata))
+            else:
+                lines.append(f"- {document.page_content[:RENDER_EXCERPT_CHARS].strip()}")
+    return "\n".join(lines)
@@ -0,0 +1,216 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import (
+    Dict,
+    Any,
+    Optional,
+    Callable,
+    Awaitable
+)
+from metrics import (
+    percentile,
+    record_stage_latency
+)
+
+'''
+
+    Resilience layer for the upstream calls of the graph: "chat" (Gemini), "rerank" (RankLLM on gpt-4o-mini)
+    and "embedding" (Gemini embeddings).
+
+    Each upstream has a circuit breaker. Consecutive errors or calls slower than the upstream's slow-call
+    threshold open it; while open, calls fail fast with BreakerOpen and the nodes use their local fallback
+    (retrieval order instead of reranking, a rendered answer, local filters). After BREAKER_OPEN_SECONDS one
+    half-open probe is let through, and its success closes the breaker again.
+
+    Calls that have not answered after the upstream's recent p95 latency are hedged with a second, identical
+    request; the first answer wins and the other is cancelled. Hedges are capped at HEDGE_MAX_RATIO of the calls
+    to bound extra load. Only cancellable (natively async) calls are hedged – a blocking client call running in a
+    thread cannot be stopped, so its hedge would leave both requests running – and nothing is hedged while a
+    cassette records or replays, where a duplicate call would record or consume an extra entry.
+
+'''
+
+logger=logging.getLogger(__name__)
+
+BREAKER_FAILURE_THRESHOLD=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_OPEN_SECONDS=float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+
+#   Calls slower than this count as failures for the breaker.
+
+BREAKER_SLOW_CALL_SECONDS={
+    "chat": float(os.getenv("CHAT_SLOW_CALL_SECONDS", "10")),
+    "rerank": float(os.getenv("RERANK_SLOW_CALL_SECONDS", "10")),
+    "embedding": float(os.getenv("EMBEDDING_SLOW_CALL_SECONDS", "3")),
+}
+
+HEDGE_ENABLED=os.getenv("HEDGE_ENABLED", "true").lower()=="true"
+HEDGE_PERCENTILE=float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES=int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY_SECONDS=float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "0.05"))
+HEDGE_MAX_RATIO=float(os.getenv("HEDGE_MAX_RATIO", "0.1"))
+UPSTREAM_LATENCY_SAMPLES=int(os.getenv("UPSTREAM_LATENCY_SAMPLES", "200"))
+
+CLOSED="closed"
+OPEN="open"
+HALF_OPEN="half_open"
+
+class BreakerOpen(Exception):
+
+    def __init__(self, upstream: str):
+        super().__init__(f"Circuit breaker for {upstream} is open")
+        self.upstream=upstream
+
+class CircuitBreaker:
+
+    def __init__(self, upstream: str):
+        self.upstream=upstream
+        self.slow_call_seconds=BREAKER_SLOW_CALL_SECONDS.get(upstream, float("inf"))
+        self.state=CLOSED
+        self.failures=0     #   Consecutive failures.
+        self.opened_at=None
+        self.probe_in_flight=False
+        self.latencies=deque(maxlen=UPSTREAM_LATENCY_SAMPLES)   #   Successful call latencies, for the hedge delay.
+        self.counts={"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "hedges": 0, "hedge_wins": 0}
+        self.lock=threading.Lock()
+
+    #   Whether a call may go out; in half-open state only one probe at a time.
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.state==OPEN and time.monotonic()-self.opened_at>=BREAKER_OPEN_SECONDS:
+                self.state=HALF_OPEN
+                self.probe_in_flight=False
+                logger.info(f"Circuit breaker for {self.upstream} is half-open, probing")
+            if self.state==CLOSED or (self.state==HALF_OPEN and not self.probe_in_flight):
+                self.probe_in_flight=self.state==HALF_OPEN
+                self.counts["calls"]+=1
+                return True
+            self.counts["rejected"]+=1
+            return False
+
+    def record_success(self, seconds: float) -> None:
+        if seconds>self.slow_call_seconds:
+            with self.lock:
+                self.counts["slow_calls"]+=1
+            self.record_failure()
+            return
+        with self.lock:
+            self.latencies.append(seconds)
+            self.failures=0
+            self.probe_in_flight=False
+            if self.state!=CLOSED:
+                logger.info(f"Circuit breaker for {self.upstream} closed")
+            self.state=CLOSED
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures+=1
+            self.counts["failures"]+=1
+            self.probe_in_flight=False
+            if self.state==HALF_OPEN or self.failures>=BREAKER_FAILURE_THRESHOLD:
+                if self.state!=OPEN:
+                    logger.warning(f"Circuit breaker for {self.upstream} opened after {self.failures} failures")
+                self.state=OPEN
+                self.opened_at=time.monotonic()
+
+    #   Delay before hedging a call: the recent p95 latency, or None while there are too few samples or hedges are over budget.
+
+    def hedge_delay(self) -> Optional[float]:
+        with self.lock:
+            if not HEDGE_ENABLED or len(self.latencies)<HEDGE_MIN_SAMPLES:
+                return None
+            if self.counts["hedges"]>=HEDGE_MAX_RATIO*self.counts["calls"]:
+                return None
+            return max(percentile(list(self.latencies), HEDGE_PERCENTILE), HEDGE_MIN_DELAY_SECONDS)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            delay=None
+            if len(self.latencies)>=HEDGE_MIN_SAMPLES:
+                delay=round(max(percentile(list(self.latencies), HEDGE_PERCENTILE), HEDGE_MIN_DELAY_SECONDS), 3)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "open_for_seconds": round(time.monotonic()-self.opened_at, 3) if self.state==OPEN else 0.0,
+                "hedge_delay_seconds": delay,
+                **self.counts
+            }
+
+_breakers={}    #   Upstream name -> CircuitBreaker.
+
+def get_breaker(upstream: str) -> CircuitBreaker:
+    if upstream not in _breakers:
+        _breakers[upstream]=CircuitBreaker(upstream)
+    return _breakers[upstream]
+
+#   Run a call, hedging it with a second identical call once the delay passes; the first successful answer wins.
+
+async def hedged(breaker: CircuitBreaker, call: Callable[[], Awaitable]):
+    delay=breaker.hedge_delay()
+    first=asyncio.ensure_future(call())
+    pending={first}
+    try:
+        if delay is None:
+            return await first
+        done, _=await asyncio.wait(pending, timeout=delay)
+        if done:
+            return first.result()
+        with breaker.lock:
+            breaker.counts["hedges"]+=1
+        second=asyncio.ensure_future(call())
+        pending={first, second}
+        error=None
+        while pending:
+            done, pending=await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is second:
+                        with breaker.lock:
+                            breaker.counts["hedge_wins"]+=1
+                    return task.result()
+                error=task.exception()
+        raise error
+    finally:
+        for task in pending:
+            if not task.done():
+                task.cancel()
+
+#   Call an upstream through its circuit breaker (and hedging, for cancellable calls); raises BreakerOpen while the
+#   breaker is open.
+
+async def call_upstream(upstream: str, call: Callable[[], Awaitable], hedge: bool=True):
+    breaker=get_breaker(upstream)
+    if not breaker.allow():
+        raise BreakerOpen(upstream)
+    if hedge:
+        from cassette import get_cassette
+        hedge=get_cassette() is None
+    start_time=time.perf_counter()
+    try:
+        result=await (hedged(breaker, call) if hedge else call())
+    except asyncio.CancelledError:
+        if time.perf_counter()-start_time>breaker.slow_call_seconds:
+            breaker.record_failure()
+        else:
+            with breaker.lock:
+                breaker.probe_in_flight=False
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    seconds=time.perf_counter()-start_time
+    breaker.record_success(seconds)
+    record_stage_latency(f"upstream:{upstream}", seconds)
+    return result
+
+#   Breaker state and counters of every upstream, for the metrics endpoint.
+
+def get_upstream_states() -> Dict[str, Dict[str, Any]]:
+    return {upstream: breaker.snapshot() for upstream, breaker in _breakers.items()}
+
+def reset_breakers() -> None:
+    _breakers.clear()
@@ -0,0 +1,141 @@
+import os
+import sys
+import logging
+import argparse
+import multiprocessing
+from typing import (
+    List,
+    Optional
+)
+
+'''
+
+    Production server entry point with N worker processes.
+
+    - gunicorn (default when installed): UvicornWorker processes forked from a master that has already
+      imported the app and preloaded read-mostly shared state (collection schemas, facet catalogues), so
+      workers start warm and share those pages copy-on-write.
+    - uvicorn: uvicorn's own multi-process supervisor (workers are spawned and warm up individually).
+
+    Both use uvloop and httptools when they are installed. Clients (Qdrant, Gemini, RankLLM) are never
+    created before the fork: every worker builds its own in the FastAPI lifespan hook.
+
+        python src/server.py --workers 4 --port 8001
+
+'''
+
+logger=logging.getLogger(__name__)
+
+SRC_DIRECTORY=os.path.dirname(os.path.abspath(__file__))
+
+#   Default worker count: one per core.
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+#   Load read-mostly state in the master process so forked workers inherit it.
+
+def preload_shared_state(collection_names: List[str]) -> None:
+    from client_qdrant import preload_collection_schemas
+    from facets import preload_facets
+    if collection_names:
+        indexed=preload_collection_schemas(collection_names)
+        logger.info(f"Preloaded schemas, collections with filter indexes: {indexed}")
+        facet_counts=preload_facets(collection_names)
+        logger.info(f"Preloaded facet catalogues, flights per collection: {facet_counts}")
+
+#   Pick uvloop and httptools when available, falling back to the pure-Python implementations.
+
+def event_loop_implementation() -> str:
+    try:
+        import uvloop  # noqa: F401
+        return "uvloop"
+    except ImportError:
+        return "asyncio"
+
+def http_implementation() -> str:
+    try:
+        import httptools  # noqa: F401
+        return "httptools"
+    except ImportError:
+        return "h11"
+
+def run_gunicorn(host: str, port: int, workers: int, timeout: int, collection_names: List[str]) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class StandaloneApplication(BaseApplication):
+
+        def __init__(self, options):
+            self.options=options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+    def on_starting(server):
+        preload_shared_state(collection_names)
+
+    StandaloneApplication({
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "timeout": timeout,
+        "graceful_timeout": timeout,
+        "keepalive": 5,
+        "on_starting": on_starting
+    }).run()
+
+def run_uvicorn(host: str, port: int, workers: int) -> None:
+    import uvicorn
+    uvicorn.run(
+        "main:app",
+        app_dir=SRC_DIRECTORY,
+        host=host,
+        port=port,
+        workers=workers,
+        loop=event_loop_implementation(),
+        http=http_implementation()
+    )
+
+def parse_args(argv: Optional[List[str]]=None) -> argparse.Namespace:
+    parser=argparse.ArgumentParser(description="Run the KAVAK API with multiple worker processes")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8001")))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--server", choices=["gunicorn", "uvicorn"], default=None, help="Defaults to gunicorn when installed")
+    parser.add_argument("--timeout", type=int, default=int(os.getenv("WORKER_TIMEOUT", "120")), help="Worker timeout in seconds (gunicorn)")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]]=None) -> int:
+    args=parse_args(argv)
+    if SRC_DIRECTORY not in sys.path:
+        sys.path.insert(0, SRC_DIRECTORY)
+    server=args.server
+    if server is None:
+        try:
+            import gunicorn  # noqa: F401
+            server="gunicorn"
+        except ImportError:
+            server="uvicorn"
+    workers=args.workers
+    if os.getenv("QDRANT_MODE", "remote").lower()=="local" and workers>1:
+        logger.warning("Embedded Qdrant storage (QDRANT_MODE=local) is locked by one process, running a single worker")
+        workers=1
+    if os.getenv("CASSETTE_MODE", "off").lower()=="record" and workers>1:
+        logger.warning("A cassette (CASSETTE_MODE=record) is appended to by one process, running a single worker")
+        workers=1
+    collection_names=[name.strip() for name in os.getenv("WARMUP_COLLECTIONS", "").split(",") if name.strip()]
+    if server=="gunicorn":
+        run_gunicorn(args.host, args.port, workers, args.timeout, collection_names)
+    else:
+        run_uvicorn(args.host, args.port, workers)
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
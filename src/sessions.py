@@ -0,0 +1,214 @@
+import os
+import re
+import time
+import logging
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional
+)
+from langchain_core.documents import Document
+from filters import (
+    FILTER_FIELDS,
+    matches_filters
+)
+
+'''
+
+    Conversational sessions: a SQLite LangGraph checkpointer keeps each session's state (filters, candidate
+    flights, the search they came from) between turns, and refinement turns ("only the refundable ones",
+    "what about direct flights under $900") are answered by re-filtering the previous candidates in memory.
+
+    Sessions idle for longer than SESSION_TTL_SECONDS are deleted, as are the least recently used ones beyond
+    SESSION_MAX_SESSIONS; the store is pruned at most every SESSION_PRUNE_SECONDS, after a session turn.
+
+    Refinement constraints are extracted locally from the query and the collection's facet catalogue, so a
+    refinement turn skips classification, filter generation, retrieval and reranking – only the answer is
+    generated.
+
+'''
+
+logger=logging.getLogger(__name__)
+
+SESSION_DB_PATH=os.getenv("SESSION_DB_PATH", "sessions.sqlite")
+SESSION_MAX_CANDIDATES=int(os.getenv("SESSION_MAX_CANDIDATES", "100"))
+SESSION_TTL_SECONDS=float(os.getenv("SESSION_TTL_SECONDS", "86400"))
+SESSION_MAX_SESSIONS=int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SESSION_PRUNE_SECONDS=float(os.getenv("SESSION_PRUNE_SECONDS", "60"))
+
+_checkpointer=None
+_checkpointer_connection=None
+_pruned_at=0.0
+
+#   Phrases that open a refinement of the previous results, and references back to them.
+
+REFINEMENT_PATTERN=re.compile(
+    r"^\s*(only|just|and|but|now|what about|how about|any|show( me)?|which|with|without|under|below|over|above|sort|cheaper|cheapest|fastest|earliest)\b",
+    re.IGNORECASE
+)
+ANAPHORA_PATTERN=re.compile(r"\b(of (them|those|these)|the ones|those|these|them)\b", re.IGNORECASE)
+
+#   A capitalised place after "to" or "from", for when no facet catalogue is available.
+
+PLACE_PATTERN=re.compile(r"\b(to|from)\s+[A-Z][\w'-]*")
+
+MAX_PRICE_PATTERN=re.compile(r"\b(under|below|less than|cheaper than|up to|max(imum)?|at most)\s*(usd\s*)?\$?\s*([\d,]+)", re.IGNORECASE)
+MIN_PRICE_PATTERN=re.compile(r"\b(over|above|more than|at least|min(imum)?)\s*(usd\s*)?\$?\s*([\d,]+)", re.IGNORECASE)
+
+#   Boolean constraints: (pattern for True, pattern for False).
+
+BOOLEAN_PATTERNS={
+    "refundable": (re.compile(r"(?<!non-)(?<!non )\brefundable\b", re.IGNORECASE), re.compile(r"\bnon[- ]?refundable\b", re.IGNORECASE)),
+    "wifi_available": (re.compile(r"\bwi-?fi\b", re.IGNORECASE), re.compile(r"\b(no|without) wi-?fi\b", re.IGNORECASE)),
+    "baggage_included": (re.compile(r"\b(baggage|luggage|bags?) included\b|\bwith (baggage|luggage|bags)\b", re.IGNORECASE), re.compile(r"\b(no|without) (baggage|luggage|bags)\b", re.IGNORECASE)),
+}
+
+DIRECT_PATTERN=re.compile(r"\b(direct|non-?stop|no layovers?)\b", re.IGNORECASE)
+
+#   Get the process-wide SQLite checkpointer, opening it on first use.
+
+async def get_checkpointer():
+    global _checkpointer, _checkpointer_connection
+    if _checkpointer is None:
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        _checkpointer_connection=await aiosqlite.connect(SESSION_DB_PATH)
+        _checkpointer=AsyncSqliteSaver(_checkpointer_connection)
+        await _checkpointer.setup()
+
+        #   Last use of each session; sessions stored before it was tracked count as used now.
+
+        await _checkpointer_connection.execute("CREATE TABLE IF NOT EXISTS session_activity (thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)")
+        await _checkpointer_connection.execute("INSERT OR IGNORE INTO session_activity SELECT DISTINCT thread_id, ? FROM checkpoints", (time.time(),))
+        await _checkpointer_connection.commit()
+        logger.info(f"Opened session store at {SESSION_DB_PATH}")
+    return _checkpointer
+
+#   Record a session turn, then prune the store when it is due.
+
+async def touch_session(session_id: str) -> None:
+    global _pruned_at
+    checkpointer=await get_checkpointer()
+    async with checkpointer.lock:
+        await _checkpointer_connection.execute("INSERT OR REPLACE INTO session_activity VALUES (?, ?)", (session_id, time.time()))
+        await _checkpointer_connection.commit()
+    if time.monotonic()-_pruned_at>=SESSION_PRUNE_SECONDS:
+        _pruned_at=time.monotonic()
+        try:
+            await prune_sessions()
+        except Exception as e:
+            logger.warning(f"Failed to prune sessions: {str(e)}")
+
+#   Delete expired sessions and the least recently used ones over the cap; returns the number deleted.
+
+async def prune_sessions() -> int:
+    checkpointer=await get_checkpointer()
+    async with checkpointer.lock:
+        cursor=await _checkpointer_connection.execute(
+            "SELECT thread_id FROM session_activity WHERE updated_at<? "
+            "UNION SELECT thread_id FROM (SELECT thread_id FROM session_activity ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (time.time()-SESSION_TTL_SECONDS, SESSION_MAX_SESSIONS)
+        )
+        expired=[row[0] for row in await cursor.fetchall()]
+    for thread_id in expired:
+        await checkpointer.adelete_thread(thread_id)
+    if expired:
+        async with checkpointer.lock:
+            await _checkpointer_connection.executemany("DELETE FROM session_activity WHERE thread_id=?", [(thread_id,) for thread_id in expired])
+            await _checkpointer_connection.commit()
+        logger.info(f"Pruned {len(expired)} sessions")
+    return len(expired)
+
+async def close_checkpointer() -> None:
+    global _checkpointer, _checkpointer_connection
+    if _checkpointer_connection is not None:
+        await _checkpointer_connection.close()
+    _checkpointer=None
+    _checkpointer_connection=None
+
+def session_config(session_id: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": session_id}}
+
+#   Whether a facet value occurs in the query as a whole word (underscores in values read as spaces).
+
+def mentions(query: str, value: str) -> bool:
+    pattern=re.escape(str(value)).replace("_", "[ _]")
+    return re.search(rf"(?<!\w){pattern}(?!\w)", query, re.IGNORECASE) is not None
+
+#   Constraints stated in a follow-up, extracted without an LLM call.
+
+def extract_refinement_filters(query: str, catalogue) -> Dict[str, Any]:
+    filters={}
+    for field, (true_pattern, false_pattern) in BOOLEAN_PATTERNS.items():
+        if false_pattern.search(query):
+            filters[field]=False
+        elif true_pattern.search(query):
+            filters[field]=True
+    price_match=MAX_PRICE_PATTERN.search(query)
+    if price_match:
+        filters["max_price"]=int(price_match.group(4).replace(",", ""))
+    price_match=MIN_PRICE_PATTERN.search(query)
+    if price_match:
+        filters["min_price"]=int(price_match.group(4).replace(",", ""))
+    if DIRECT_PATTERN.search(query):
+        filters["max_layovers"]=0
+    if catalogue is not None:
+        for filter_key in ("airline", "alliance", "travel_class", "meal_service", "aircraft_type"):
+            field=FILTER_FIELDS[filter_key][0]
+            matched=[value for value in catalogue.values.get(field, {}) if mentions(query, value)]
+            if len(matched)==1:
+                filters[filter_key]=matched[0]
+        for place, country in catalogue.places.items():
+            if re.search(rf"\bto {re.escape(place)}\b", query, re.IGNORECASE):
+                filters["to_country"]=country
+            if re.search(rf"\bfrom {re.escape(place)}\b", query, re.IGNORECASE):
+                filters["from_country"]=country
+    return filters
+
+#   Countries of the origins and destinations a query names ("to Tokyo", "from Japan").
+
+def mentioned_countries(query: str, catalogue) -> set:
+    countries=set()
+    for place, country in catalogue.places.items():
+        if re.search(rf"\b(to|from|in) {re.escape(place)}\b", query, re.IGNORECASE):
+            countries.add(country)
+    for field in ("from_country", "to_country"):
+        for country in catalogue.values.get(field, {}):
+            if re.search(rf"\b(to|from|in) {re.escape(country)}\b", query, re.IGNORECASE):
+                countries.add(country)
+    return countries
+
+#   Whether a query names an origin or destination other than the session's current ones.
+
+def names_new_place(query: str, catalogue=None, filters: Optional[Dict[str, Any]]=None) -> bool:
+    if catalogue is None:
+        return PLACE_PATTERN.search(query) is not None
+    filters=filters or {}
+    current={filters.get("from_country"), filters.get("to_country")}
+    return bool(mentioned_countries(query, catalogue)-current)
+
+#   Whether a follow-up refines the previous results: it refers back to them ("only those", "sort them"), or it
+#   opens like a refinement without naming a new origin or destination ("show me flights to Tokyo" is a new search).
+
+def is_refinement(query: str, catalogue=None, filters: Optional[Dict[str, Any]]=None) -> bool:
+    if ANAPHORA_PATTERN.search(query):
+        return True
+    return REFINEMENT_PATTERN.search(query) is not None and not names_new_place(query, catalogue, filters)
+
+#   Whether one flight's metadata satisfies every constraint: the generated filters all hold, as with FILTER_MATCH_MODE="must".
+
+def satisfies_refinement(metadata: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    return matches_filters(metadata, filters, match_mode="must")
+
+#   Re-filter candidate flights in memory, optionally re-ordered by a sort key of the flight index.
+
+def refine_documents(documents: List[Document], filters: Dict[str, Any], sort_by: Optional[str]=None) -> List[Document]:
+    refined=[document for document in documents if satisfies_refinement(document.metadata, filters)]
+    if sort_by:
+        from flight_index import SORT_KEYS
+        field, descending=SORT_KEYS[sort_by]
+        present=[document for document in refined if document.metadata.get(field) not in (None, "")]
+        missing=[document for document in refined if document.metadata.get(field) in (None, "")]
+        refined=sorted(present, key=lambda document: document.metadata[field], reverse=descending)+missing
+    return refined
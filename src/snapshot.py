@@ -0,0 +1,54 @@
+import os
+import sys
+import logging
+import argparse
+from typing import (
+    List,
+    Optional
+)
+
+'''
+
+    Export Qdrant collections into an embedded storage directory for edge nodes and offline runs.
+
+        python src/snapshot.py --collections flights info --output snapshots/kavak
+
+    The directory can be served directly (QDRANT_MODE=local, QDRANT_PATH=snapshots/kavak, single worker)
+    or loaded into each worker's memory at start-up (QDRANT_MODE=memory, QDRANT_SNAPSHOT_PATH=snapshots/kavak).
+    The source is the remote Qdrant at QDRANT_URL, or another storage directory with --source-path.
+
+'''
+
+logger=logging.getLogger(__name__)
+
+def parse_args(argv: Optional[List[str]]=None) -> argparse.Namespace:
+    parser=argparse.ArgumentParser(description="Export Qdrant collections into an embedded storage directory")
+    parser.add_argument("--output", required=True, help="Storage directory to write")
+    parser.add_argument("--collections", nargs="+", default=None, help="Defaults to every collection")
+    parser.add_argument("--source-path", default=None, help="Copy from an embedded storage directory instead of QDRANT_URL")
+    parser.add_argument("--batch-size", type=int, default=256)
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]]=None) -> int:
+    from dotenv import load_dotenv
+    from qdrant_client import QdrantClient
+    from client_qdrant import copy_collections
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv()
+    args=parse_args(argv)
+    if args.source_path:
+        source=QdrantClient(path=args.source_path)
+    else:
+        source=QdrantClient(url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY"), port=None, timeout=60)
+    target=QdrantClient(path=args.output)
+    try:
+        counts=copy_collections(source, target, args.collections, args.batch_size)
+    finally:
+        source.close()
+        target.close()
+    for collection_name, count in counts.items():
+        print(f"{collection_name}: {count} points")
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
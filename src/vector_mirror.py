@@ -0,0 +1,267 @@
+import os
+import time
+import hashlib
+import asyncio
+import logging
+import numpy as np
+from typing import (
+    Dict,
+    Any,
+    List,
+    Optional
+)
+from langchain_core.documents import Document
+from filters import (
+    FILTER_FIELDS,
+    CONSTRAINT_FILTER_FIELDS,
+    FILTER_MATCH_MODE,
+    METADATA_PAYLOAD_KEY,
+    departure_bound
+)
+
+'''
+
+    In-process read-through mirror of small collections.
+
+    A mirror holds a collection's dense vectors as one contiguous, L2-normalised float32 matrix and the
+    filterable metadata as compact columns (dictionary-encoded strings, float32 numbers, int8 booleans),
+    so a filtered top-k search is a boolean mask plus one matrix-vector product – no network round trip.
+    Mirrors are rebuilt when the collection's version counter (bumped by ingestion) changes, revalidated
+    every VECTOR_MIRROR_REFRESH_SECONDS against a fingerprint of the point ids and content hashes stored in
+    Qdrant (ingests, updates and deletes in other workers), and not built at all for collections above
+    VECTOR_MIRROR_MAX_POINTS, which stay on Qdrant.
+
+'''
+
+logger=logging.getLogger(__name__)
+
+VECTOR_MIRROR_ENABLED=os.getenv("VECTOR_MIRROR_ENABLED", "false").lower()=="true"
+VECTOR_MIRROR_MAX_POINTS=int(os.getenv("VECTOR_MIRROR_MAX_POINTS", "20000"))
+VECTOR_MIRROR_REFRESH_SECONDS=float(os.getenv("VECTOR_MIRROR_REFRESH_SECONDS", "60"))
+VECTOR_MIRROR_SCROLL_BATCH=int(os.getenv("VECTOR_MIRROR_SCROLL_BATCH", "1000"))
+
+_collection_versions={}     #   Collection name -> version, bumped on every ingest into the collection.
+_mirrors={}     #   Collection name -> VectorMirror.
+_oversized_collections={}   #   Collection name -> version at which it was found over the size threshold.
+_mirror_locks={}    #   Collection name -> asyncio.Lock, so concurrent requests build a mirror only once.
+
+#   Mark a collection as changed so its mirror is rebuilt on next use.
+
+def bump_collection_version(collection_name: str) -> int:
+    _collection_versions[collection_name]=_collection_versions.get(collection_name, 0)+1
+    return _collection_versions[collection_name]
+
+def get_collection_version(collection_name: str) -> int:
+    return _collection_versions.get(collection_name, 0)
+
+#   Encode one metadata column: strings as int32 codes into a vocabulary, numbers as float32 (NaN when missing), booleans as int8 (-1 when missing).
+
+def encode_column(values: List[Any]) -> Dict[str, Any]:
+    present=[value for value in values if value is not None]
+    if present and all(isinstance(value, bool) for value in present):
+        return {"kind": "bool", "values": np.array([-1 if value is None else int(value) for value in values], dtype=np.int8)}
+    if present and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        return {"kind": "number", "values": np.array([np.nan if value is None else value for value in values], dtype=np.float32)}
+    vocabulary={}
+    codes=np.array([-1 if value is None else vocabulary.setdefault(str(value), len(vocabulary)) for value in values], dtype=np.int32)
+    return {"kind": "string", "values": codes, "vocabulary": vocabulary}
+
+def encode_dates(values: List[Any]) -> np.ndarray:
+    return np.array([value if value else "NaT" for value in values], dtype="datetime64[s]")
+
+#   Mask of one filter condition ("match", "lte", "gte", or "after"/"before" on a date column) over an encoded column.
+
+def column_mask(column: Dict[str, Any], kind: str, value: Any) -> np.ndarray:
+    values=column["values"]
+    if column["kind"]=="date":
+        bound=np.datetime64(departure_bound(kind, value), "s")
+        return values>=bound if kind=="after" else values<=bound
+    if kind=="lte":
+        return values<=value if column["kind"]=="number" else np.zeros(len(values), dtype=bool)
+    if kind=="gte":
+        return values>=value if column["kind"]=="number" else np.zeros(len(values), dtype=bool)
+    if column["kind"]=="bool":
+        return values==int(bool(value))
+    if column["kind"]=="number":
+        return values==value
+    code=column["vocabulary"].get(str(value))
+    return values==code if code is not None else np.zeros(len(values), dtype=bool)
+
+class VectorMirror:
+
+    def __init__(self, collection_name: str, version: int, points: List[Any]):
+        self.collection_name=collection_name
+        self.version=version
+        self.loaded_at=time.monotonic()
+        self.point_count=len(points)
+        self.ids=[point.id for point in points]
+        self.contents=[(point.payload or {}).get("page_content", "") for point in points]
+        self.metadata=[dict((point.payload or {}).get(METADATA_PAYLOAD_KEY) or {}) for point in points]
+        self.fingerprint=content_fingerprint(points)
+        if points:
+            vectors=np.array([self.dense_vector(point.vector) for point in points], dtype=np.float32)
+            norms=np.linalg.norm(vectors, axis=1, keepdims=True)
+            self.vectors=np.ascontiguousarray(vectors/np.where(norms==0, 1, norms))
+        else:
+            self.vectors=np.zeros((0, 0), dtype=np.float32)
+        fields={field for field, _ in FILTER_FIELDS.values()}|{"availability", "flight_duration_hours"}
+        self.columns={field: encode_column([metadata.get(field) for metadata in self.metadata]) for field in fields}
+        self.columns["layovers"]={"kind": "number", "values": np.array([len(metadata.get("layovers") or []) for metadata in self.metadata], dtype=np.float32)}
+        self.columns["departure_date"]={"kind": "date", "values": encode_dates([metadata.get("departure_date") for metadata in self.metadata])}
+
+    #   The unnamed dense vector of a point (hybrid collections also carry a named sparse vector).
+
+    @staticmethod
+    def dense_vector(vector) -> List[float]:
+        if isinstance(vector, dict):
+            return vector.get("", next(iter(vector.values())))
+        return vector
+
+    def condition_mask(self, field: str, kind: str, value: Any) -> np.ndarray:
+        return column_mask(self.columns[field], "lte" if kind=="count_lte" else kind, value)
+
+    #   Mask of a set of generated filters, combined like build_qdrant_filter; None means no filtering.
+
+    def filter_mask(self, filters: Optional[Dict[str, Any]], match_mode: Optional[str]=None) -> Optional[np.ndarray]:
+        masks=[
+            self.condition_mask(field, kind, filters[filter_key])
+            for filter_key, (field, kind) in FILTER_FIELDS.items()
+            if filters and filter_key in filters
+        ]
+        constraints=[
+            self.condition_mask(field, kind, filters[filter_key])
+            for filter_key, (field, kind) in CONSTRAINT_FILTER_FIELDS.items()
+            if filters and filter_key in filters
+        ]
+        if not masks and not constraints:
+            return None
+        match_mode=match_mode or FILTER_MATCH_MODE
+        if match_mode=="should" and len(masks)>1:
+            masks=[np.logical_or.reduce(masks)]
+        return np.logical_and.reduce(masks+constraints)
+
+    #   Filtered top-k by cosine similarity.
+
+    def search(self, query_vector: List[float], k: int, filters: Optional[Dict[str, Any]]=None) -> List[Document]:
+        query=np.asarray(query_vector, dtype=np.float32)
+        norm=np.linalg.norm(query)
+        if norm:
+            query=query/norm
+        mask=self.filter_mask(filters)
+        candidates=np.flatnonzero(mask) if mask is not None else np.arange(self.point_count)
+        if not len(candidates):
+            return []
+        scores=self.vectors[candidates]@query if mask is not None else self.vectors@query
+        if len(candidates)>k:
+            top=np.argpartition(-scores, k-1)[:k]
+        else:
+            top=np.arange(len(candidates))
+        top=top[np.argsort(-scores[top])]
+        return [self.to_document(int(candidates[index])) for index in top]
+
+    def to_document(self, index: int) -> Document:
+        metadata=dict(self.metadata[index])
+        metadata["_id"]=self.ids[index]
+        metadata["_collection_name"]=self.collection_name
+        return Document(page_content=self.contents[index], metadata=metadata)
+
+#   Fingerprint of a collection's contents: its point ids with their content hashes (set by ingestion).
+
+def content_fingerprint(points: List[Any]) -> str:
+    entries=sorted((str(point.id), str(((point.payload or {}).get(METADATA_PAYLOAD_KEY) or {}).get("content_hash"))) for point in points)
+    return hashlib.sha256(repr(entries).encode("utf-8")).hexdigest()
+
+#   Fingerprint of what Qdrant currently stores, read without vectors.
+
+def load_fingerprint(client, collection_name: str) -> str:
+    points=[]
+    offset=None
+    while True:
+        batch, offset=client.scroll(
+            collection_name,
+            limit=VECTOR_MIRROR_SCROLL_BATCH,
+            offset=offset,
+            with_payload=[f"{METADATA_PAYLOAD_KEY}.content_hash"],
+            with_vectors=False
+        )
+        points.extend(batch)
+        if offset is None:
+            break
+    return content_fingerprint(points)
+
+#   Load every point of a collection, or None when it is over the size threshold.
+
+def load_mirror(client, collection_name: str, version: int) -> Optional[VectorMirror]:
+    point_count=client.count(collection_name, exact=True).count
+    if point_count>VECTOR_MIRROR_MAX_POINTS:
+        logger.info(f"Collection {collection_name} has {point_count} points, over the mirror threshold of {VECTOR_MIRROR_MAX_POINTS}")
+        return None
+    points=[]
+    offset=None
+    while True:
+        batch, offset=client.scroll(
+            collection_name,
+            limit=VECTOR_MIRROR_SCROLL_BATCH,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        points.extend(batch)
+        if offset is None:
+            break
+    mirror=VectorMirror(collection_name, version, points)
+    logger.info(f"Mirrored {mirror.point_count} points of {collection_name} ({mirror.vectors.nbytes/1e6:.1f} MB of vectors)")
+    return mirror
+
+#   Whether a loaded mirror is still current; past the refresh interval its fingerprint is checked against Qdrant,
+#   which catches points changed in place as well as added or deleted ones.
+
+def is_current(client, mirror: VectorMirror) -> bool:
+    if mirror.version!=get_collection_version(mirror.collection_name):
+        return False
+    if time.monotonic()-mirror.loaded_at<VECTOR_MIRROR_REFRESH_SECONDS:
+        return True
+    if load_fingerprint(client, mirror.collection_name)!=mirror.fingerprint:
+        return False
+    mirror.loaded_at=time.monotonic()
+    return True
+
+#   Get the current mirror of a collection, building or refreshing it if needed; None means use Qdrant.
+
+async def get_mirror(client, collection_name: str) -> Optional[VectorMirror]:
+    version=get_collection_version(collection_name)
+    if _oversized_collections.get(collection_name)==version:
+        return None
+    mirror=_mirrors.get(collection_name)
+    if mirror is not None and mirror.version==version and time.monotonic()-mirror.loaded_at<VECTOR_MIRROR_REFRESH_SECONDS:
+        return mirror
+    lock=_mirror_locks.setdefault(collection_name, asyncio.Lock())
+    async with lock:
+        mirror=_mirrors.get(collection_name)
+        if mirror is not None and await asyncio.to_thread(is_current, client, mirror):
+            return mirror
+        version=get_collection_version(collection_name)
+        mirror=await asyncio.to_thread(load_mirror, client, collection_name, version)
+        if mirror is None:
+            _mirrors.pop(collection_name, None)
+            _oversized_collections[collection_name]=version
+        else:
+            _mirrors[collection_name]=mirror
+        return mirror
+
+#   Search a collection through its mirror; returns None when the collection is not mirrored, or when the mirror
+#   cannot evaluate the search (e.g. a generated filter value of the wrong type), so Qdrant answers it instead.
+
+async def mirror_search(client, collection_name: str, query_vector: List[float], k: int, filters: Optional[Dict[str, Any]]=None) -> Optional[List[Document]]:
+    try:
+        mirror=await get_mirror(client, collection_name)
+        if mirror is None:
+            return None
+        return mirror.search(query_vector, k, filters)
+    except Exception as e:
+        logger.warning(f"Vector mirror unavailable for {collection_name}, using Qdrant: {str(e)}")
+        return None
+
+def reset_mirrors() -> None:
+    _mirrors.clear()
+    _oversized_collections.clear()
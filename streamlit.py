@@ -2,9 +2,11 @@ import streamlit as st
 import requests
 import json
 import time
+import uuid
 from typing import (
     Dict,
-    Any
+    Any,
+    Optional
 )
 from pathlib import Path
 
@@ -118,16 +120,26 @@ def ingest_data(filename: str, file_type: str, collection_name: str) -> Dict[str
         return response.json()
     except Exception as e:
         return {"success": False, "error": str(e)}
+
+#   Function to fetch the status of an ingestion job.
+
+def get_job_status(job_id: str) -> Dict[str, Any]:
+    try:
+        response=requests.get(f'{API_BASE_URL}/jobs/{job_id}', timeout=10)
+        return response.json()
+    except Exception as e:
+        return {"status": "unknown", "errors": [str(e)]}
     
 #   Function to search using the LangGraph agent.
 
-def search_with_langgraph(query: str, collection_name: str) -> Dict[str, Any]:
+def search_with_langgraph(query: str, collection_name: str, session_id: Optional[str]=None) -> Dict[str, Any]:
     try:
         response=requests.post(
             f'{API_BASE_URL}/search',
             json={
                 "query": query,
-                "collection_name": collection_name
+                "collection_name": collection_name,
+                "session_id": session_id
             },
             timeout=120
         )
@@ -320,17 +332,33 @@ def show_data_ingestion():
 
         if st.button("🚀 Ingest Data", type="primary"):
             if collection_name:
-                with st.spinner("Ingesting data..."):
-                    result=ingest_data(
-                        filename=selected_file["path"],
-                        file_type=selected_file["type"],
-                        collection_name=collection_name
-                    )
-                if result.get("success"):
-                    st.success(f'✅ Successfully ingested {result.get("documents_processed", 0)} documents!')
-                    st.json(result)
+                result=ingest_data(
+                    filename=selected_file["path"],
+                    file_type=selected_file["type"],
+                    collection_name=collection_name
+                )
+                if not result.get("success"):
+                    st.error(f'❌ Ingestion failed: {result.get("detail", result.get("error", "Unknown error"))}')
+                    return
+                
+                #   Polling the background job until it finishes.
+
+                progress_bar=st.progress(0.0, text="Ingestion queued...")
+                while True:
+                    job=get_job_status(result["job_id"])
+                    if job.get("status") not in ("queued", "running"):
+                        break
+                    expected=job.get("documents_expected") or 0
+                    fraction=min(job["documents_parsed"]/expected, 1.0) if expected else 0.0
+                    eta=f', ETA {job["eta_seconds"]:.0f}s' if job.get("eta_seconds") is not None else ""
+                    progress_bar.progress(fraction, text=f'{job["documents_parsed"]}/{expected or "?"} documents, {job["docs_per_second"]} docs/s{eta}')
+                    time.sleep(1)
+                progress_bar.empty()
+                if job.get("status")=="succeeded":
+                    st.success(f'✅ Successfully ingested {job.get("documents_processed", 0)} documents!')
+                    st.json(job)
                 else:
-                    st.error(f'❌ Ingestion failed: {result.get("error", "Unknown error")}')
+                    st.error(f'❌ Ingestion failed: {"; ".join(job.get("errors") or ["Unknown error"])}')
             else:
                 st.error("Please enter a collection name")
 
@@ -361,13 +389,17 @@ def show_search():
         help="Ask questions about flights, travel policies, or any travel-related information"
     )
     
-    #   Options to show filters and metrics.
+    #   Options to show filters and metrics, and to continue the conversation.
 
-    col1, col2=st.columns(2)
+    col1, col2, col3=st.columns(3)
     with col1:
         show_filters=st.checkbox("Show Applied Filters", value=True)
     with col2:
         show_metrics=st.checkbox("Show Processing Metrics", value=True)
+    with col3:
+        use_session=st.checkbox("Continue Conversation", value=True, help="Follow-ups like \"only the refundable ones\" refine the previous results")
+        if "session_id" not in st.session_state or st.button("New Conversation"):
+            st.session_state["session_id"]=str(uuid.uuid4())
     
     #   Search button.
 
@@ -375,7 +407,7 @@ def show_search():
         if query and collection_name:
             with st.spinner("Searching with LangGraph agent..."):
                 start_time=time.time()
-                result=search_with_langgraph(query, collection_name)
+                result=search_with_langgraph(query, collection_name, st.session_state["session_id"] if use_session else None)
                 search_time=time.time() - start_time
             if result.get("success"):
                 st.success("✅ Search completed successfully!")
@@ -403,6 +435,8 @@ def show_search():
                             metrics_data={
                                 "Query Type": result.get("query_type", "unknown"),
                                 "Documents Used": result.get("documents_used", 0),
+                                "Refined Previous Results": result.get("refined", False),
+                                "Degraded Stages": result.get("degraded") or "none",
                                 "Processing Time": f'{result.get("processing_time", 0):.2f}s',
                                 "Total Time": f'{search_time:.2f}s'
                             }
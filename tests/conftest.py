@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+import pytest
+
+#   The service modules use flat imports from src/, so make them importable for the tests.
+
+SRC_DIRECTORY=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+if SRC_DIRECTORY not in sys.path:
+    sys.path.insert(0, SRC_DIRECTORY)
+
+#   API client with warm-up and ingestion stubbed out; profiles and job state go to a temporary directory.
+
+@pytest.fixture
+def api_client(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+    import profiling
+    import ingest_jobs
+
+    async def no_warm_up(collection_names):
+        return {}
+
+    async def fake_ingest(**kwargs):
+        time.sleep(0.05)
+        return 3
+
+    monkeypatch.setenv("PROFILING_ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILES_DIRECTORY", str(tmp_path/"profiles"))
+    monkeypatch.setattr(ingest_jobs, "INGEST_JOBS_DB_PATH", str(tmp_path/"jobs.sqlite"))
+    monkeypatch.setattr(main, "warm_up", no_warm_up)
+    monkeypatch.setattr(main, "ingest_data_to_qdrant", fake_ingest)
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+def wait_for_job(api_client, job_id: str) -> dict:
+    import ingest_jobs
+    for _ in range(100):
+        status=api_client.get(f"/jobs/{job_id}").json()
+        if status["status"] in (ingest_jobs.SUCCEEDED, ingest_jobs.FAILED):
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not finish")
@@ -0,0 +1,38 @@
+import pytest
+from flight_index import FlightIndex
+from aggregates import (
+    compute_aggregate,
+    detect_aggregate_intent
+)
+from test_flight_index import RECORDS
+
+@pytest.fixture
+def index():
+    return FlightIndex("flights", 0, [record["flight_id"] for record in RECORDS], RECORDS)
+
+@pytest.mark.parametrize("query, intent", [
+    ("cheapest flight to Dubai", {"operation": "min", "metric": "price_usd", "group_by": None}),
+    ("average price by airline", {"operation": "avg", "metric": "price_usd", "group_by": "airline"}),
+    ("how many refundable flights", {"operation": "count", "metric": "price_usd", "group_by": None}),
+    ("longest flight to Japan", {"operation": "max", "metric": "flight_duration_hours", "group_by": None}),
+    ("flights to Dubai", None),
+])
+def test_detect_aggregate_intent(query, intent):
+    assert detect_aggregate_intent(query)==intent
+
+def test_min_returns_every_tied_flight(index):
+    result=compute_aggregate(index, {"to_country": "UAE"}, {"operation": "min", "metric": "price_usd", "group_by": None})
+    assert result["value"]==800 and result["flight_ids"]==["FL1", "FL4"]
+    assert result["matching_flights"]==3
+
+def test_aggregates_require_every_filter(index):
+    result=compute_aggregate(index, {"to_country": "UAE", "airline": "Emirates"}, {"operation": "count", "metric": "price_usd", "group_by": None})
+    assert result["value"]==2
+
+def test_average_and_empty_matches(index):
+    assert compute_aggregate(index, {"airline": "Emirates"}, {"operation": "avg", "metric": "price_usd", "group_by": None})["value"]==pytest.approx(1566.67)
+    assert compute_aggregate(index, {"airline": "KLM"}, {"operation": "avg", "metric": "price_usd", "group_by": None})["value"] is None
+
+def test_group_by_airline(index):
+    result=compute_aggregate(index, {}, {"operation": "count", "metric": "price_usd", "group_by": "airline"})
+    assert [(group["airline"], group["count"]) for group in result["groups"]]==[("Emirates", 3), ("Qatar Airways", 1)]
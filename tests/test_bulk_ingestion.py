@@ -0,0 +1,26 @@
+import os
+import pytest
+import main
+
+#   Bulk paths are checked against the project directory before anything is walked or globbed.
+
+@pytest.mark.parametrize("path", ["/", "/**/*.json", "../", "data/../../**/*.json", "data/*/../../../etc"])
+def test_bulk_ingest_rejects_paths_outside_project(api_client, monkeypatch, path):
+    def walked(*args, **kwargs):
+        raise AssertionError("path was walked before the project-root check")
+
+    monkeypatch.setattr(main, "resolve_ingest_paths", walked)
+    response=api_client.post("/ingest/bulk", json={"path": path, "collection_name": "test"})
+    assert response.status_code==400
+
+def test_bulk_ingest_accepts_project_directory(api_client, monkeypatch):
+    seen=[]
+
+    def resolve(pattern, file_type):
+        seen.append(pattern)
+        return []
+
+    monkeypatch.setattr(main, "resolve_ingest_paths", resolve)
+    response=api_client.post("/ingest/bulk", json={"path": "data", "collection_name": "test"})
+    assert response.status_code==404
+    assert len(seen)==1 and seen[0].endswith(os.path.join(os.sep, "data"))
@@ -0,0 +1,51 @@
+import pytest
+from cassette import (
+    Cassette,
+    CassetteMiss
+)
+
+#   Record a few calls, then replay them from the same file.
+
+def record(path, calls):
+    cassette=Cassette(str(path), "record")
+    for upstream, operation, request, response in calls:
+        cassette.record(upstream, operation, request, 0.0, response)
+    cassette.close()
+
+@pytest.fixture
+def path(tmp_path):
+    path=tmp_path/"upstream.cassette"
+    record(path, [
+        ("embedding", "model", "tokyo", [1.0]),
+        ("embedding", "model", "tokyo", [2.0]),
+        ("qdrant", "upsert", ["ids", 1], "first"),
+        ("qdrant", "upsert", ["ids", 2], "second"),
+    ])
+    return path
+
+def test_keyed_recordings_replay_in_order_then_miss(path):
+    cassette=Cassette(str(path), "replay")
+    assert cassette.lookup("embedding", "model", "tokyo")["response"]==[1.0]
+    assert cassette.lookup("embedding", "model", "tokyo")["response"]==[2.0]
+    with pytest.raises(CassetteMiss):
+        cassette.lookup("embedding", "model", "tokyo")
+    assert cassette.counts["misses"]==1
+
+def test_each_recording_is_replayed_once_by_key_or_fallback(path):
+    cassette=Cassette(str(path), "replay")
+    assert cassette.lookup("qdrant", "upsert", ["ids", "random"])["response"]=="first"
+    assert cassette.lookup("qdrant", "upsert", ["ids", 2])["response"]=="second"
+    with pytest.raises(CassetteMiss):
+        cassette.lookup("qdrant", "upsert", ["ids", 1])
+    with pytest.raises(CassetteMiss):
+        cassette.lookup("qdrant", "upsert", ["ids", "other"])
+    assert cassette.counts=={"recorded": 0, "replayed": 1, "fallbacks": 1, "repeats": 0, "misses": 2}
+
+def test_repeat_serves_the_last_recording_of_an_exhausted_key(path):
+    cassette=Cassette(str(path), "replay", repeat=True)
+    for _ in range(2):
+        cassette.lookup("embedding", "model", "tokyo")
+    assert cassette.lookup("embedding", "model", "tokyo")["response"]==[2.0]
+    assert cassette.counts["repeats"]==1
+    with pytest.raises(CassetteMiss):
+        cassette.lookup("embedding", "model", "osaka")
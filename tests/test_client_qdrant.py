@@ -0,0 +1,169 @@
+import asyncio
+import pytest
+from qdrant_client import (
+    QdrantClient,
+    AsyncQdrantClient,
+    models
+)
+import snapshot
+import client_qdrant
+from client_qdrant import (
+    copy_collections,
+    load_snapshot,
+    export_snapshot,
+    create_async_qdrant_client,
+    get_async_qdrant_client,
+    close_async_qdrant_client,
+    async_dense_search,
+    async_scroll,
+    use_async_search
+)
+
+FLIGHTS=[
+    ([1.0, 0.0], {"page_content": "Emirates to Dubai", "metadata": {"airline": "Emirates"}}),
+    ([0.0, 1.0], {"page_content": "Lufthansa to Berlin", "metadata": {"airline": "Lufthansa"}}),
+    ([0.7, 0.7], {"page_content": "Qatar Airways to Doha", "metadata": {"airline": "Qatar Airways"}}),
+]
+
+#   The shared async client is replaced by an in-memory one holding a small collection.
+
+@pytest.fixture
+def async_qdrant(monkeypatch):
+    client=AsyncQdrantClient(location=":memory:")
+
+    async def create():
+        await client.create_collection("flights", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE))
+        await client.upsert("flights", [models.PointStruct(id=index, vector=vector, payload=payload) for index, (vector, payload) in enumerate(FLIGHTS)])
+
+    asyncio.run(create())
+    monkeypatch.setattr(client_qdrant, "_async_client", client)
+    return client
+
+def test_dense_search_returns_documents(async_qdrant):
+    documents=asyncio.run(async_dense_search("flights", [0.1, 1.0], 2))
+    assert [document.page_content for document in documents]==["Lufthansa to Berlin", "Qatar Airways to Doha"]
+    assert documents[0].metadata=={"airline": "Lufthansa", "_id": 1, "_collection_name": "flights"}
+
+def test_dense_search_applies_the_filter(async_qdrant):
+    query_filter=models.Filter(must=[models.FieldCondition(key="metadata.airline", match=models.MatchValue(value="Emirates"))])
+    documents=asyncio.run(async_dense_search("flights", [0.0, 1.0], 3, query_filter=query_filter, timeout=0.2))
+    assert [document.metadata["_id"] for document in documents]==[0]
+
+def test_scroll_returns_points(async_qdrant):
+    points=asyncio.run(async_scroll("flights", limit=2, with_payload=False))
+    assert len(points)==2 and points[0].payload is None
+
+def test_client_is_shared_until_closed(monkeypatch):
+    created=[]
+
+    def create():
+        created.append(AsyncQdrantClient(location=":memory:"))
+        return created[-1]
+
+    monkeypatch.setattr(client_qdrant, "_async_client", None)
+    monkeypatch.setattr(client_qdrant, "create_async_qdrant_client", create)
+    client=get_async_qdrant_client()
+    assert get_async_qdrant_client() is client and len(created)==1
+    asyncio.run(close_async_qdrant_client())
+    assert client_qdrant._async_client is None
+    assert get_async_qdrant_client() is not client
+
+#   Transport options: pooled keep-alive HTTP by default, gRPC with keep-alive pings on request.
+
+@pytest.fixture
+def client_kwargs(monkeypatch):
+    captured={}
+
+    def create(**kwargs):
+        captured.update(kwargs)
+        return captured
+
+    monkeypatch.setattr(client_qdrant, "AsyncQdrantClient", create)
+    return captured
+
+def test_http_client_uses_a_connection_pool(client_kwargs, monkeypatch):
+    monkeypatch.setattr(client_qdrant, "QDRANT_POOL_MAX_CONNECTIONS", 7)
+    create_async_qdrant_client(prefer_grpc=False, timeout=3)
+    assert client_kwargs["limits"].max_connections==7 and client_kwargs["timeout"]==3
+    assert not client_kwargs["prefer_grpc"] and "grpc_options" not in client_kwargs
+
+def test_grpc_client_sends_keepalive_pings(client_kwargs, monkeypatch):
+    monkeypatch.setattr(client_qdrant, "QDRANT_KEEPALIVE_SECONDS", 15)
+    create_async_qdrant_client(prefer_grpc=True)
+    assert client_kwargs["prefer_grpc"] and client_kwargs["grpc_port"]==client_qdrant.QDRANT_GRPC_PORT
+    assert client_kwargs["grpc_options"]["grpc.keepalive_time_ms"]==15000 and "limits" not in client_kwargs
+
+@pytest.mark.parametrize("mode, enabled, expected", [("remote", True, True), ("remote", False, False), ("local", True, False), ("memory", True, False)])
+def test_async_search_is_remote_only(monkeypatch, mode, enabled, expected):
+    monkeypatch.setattr(client_qdrant, "QDRANT_MODE", mode)
+    monkeypatch.setattr(client_qdrant, "QDRANT_ASYNC_SEARCH", enabled)
+    assert use_async_search()==expected
+
+#   Embedded modes: local storage persisted under QDRANT_PATH, or in-memory storage loaded from a snapshot directory.
+
+def create_flights(client):
+    client.create_collection(
+        "flights",
+        vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE),
+        sparse_vectors_config={"langchain-sparse": models.SparseVectorParams()}
+    )
+    client.upsert("flights", [
+        models.PointStruct(id=index, vector={"": vector, "langchain-sparse": models.SparseVector(indices=[index], values=[1.0])}, payload=payload)
+        for index, (vector, payload) in enumerate(FLIGHTS)
+    ])
+
+@pytest.fixture
+def embedded(monkeypatch):
+    monkeypatch.setattr(client_qdrant, "_embedded_client", None)
+
+    def embedded(mode, **settings):
+        monkeypatch.setattr(client_qdrant, "QDRANT_MODE", mode)
+        for name, value in settings.items():
+            monkeypatch.setattr(client_qdrant, name, value)
+        return client_qdrant.get_qdrant_client()
+
+    yield embedded
+    client_qdrant.close_embedded_qdrant_client()
+
+def test_local_mode_persists_across_restarts(embedded, tmp_path):
+    client=embedded("local", QDRANT_PATH=str(tmp_path/"storage"))
+    assert client_qdrant.get_qdrant_client() is client
+    create_flights(client)
+    client_qdrant.close_embedded_qdrant_client()
+    reopened=embedded("local", QDRANT_PATH=str(tmp_path/"storage"))
+    assert reopened is not client and reopened.count("flights").count==len(FLIGHTS)
+
+def test_memory_mode_loads_the_snapshot(embedded, tmp_path):
+    source=QdrantClient(location=":memory:")
+    create_flights(source)
+    assert export_snapshot(source, str(tmp_path/"snapshot"))=={"flights": len(FLIGHTS)}
+    client=embedded("memory", QDRANT_SNAPSHOT_PATH=str(tmp_path/"snapshot"))
+    collection=client.get_collection("flights")
+    assert collection.points_count==len(FLIGHTS)
+    assert "langchain-sparse" in collection.config.params.sparse_vectors
+    point=client.retrieve("flights", [2], with_vectors=True)[0]
+    assert point.payload==FLIGHTS[2][1] and point.vector["langchain-sparse"].indices==[2]
+
+def test_memory_mode_without_a_snapshot_starts_empty(embedded):
+    assert embedded("memory", QDRANT_SNAPSHOT_PATH=None).get_collections().collections==[]
+
+def test_missing_snapshot_is_reported(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_snapshot(QdrantClient(location=":memory:"), str(tmp_path/"missing"))
+
+def test_copy_replaces_existing_collections_in_batches():
+    source, target=QdrantClient(location=":memory:"), QdrantClient(location=":memory:")
+    create_flights(source)
+    target.create_collection("flights", vectors_config=models.VectorParams(size=5, distance=models.Distance.DOT))
+    assert copy_collections(source, target, ["flights"], batch_size=2)=={"flights": len(FLIGHTS)}
+    assert target.get_collection("flights").config.params.vectors.size==2
+
+def test_snapshot_command_copies_a_storage_directory(tmp_path, capsys):
+    source=QdrantClient(path=str(tmp_path/"source"))
+    create_flights(source)
+    source.close()
+    assert snapshot.main(["--source-path", str(tmp_path/"source"), "--output", str(tmp_path/"output")])==0
+    assert capsys.readouterr().out.strip()==f"flights: {len(FLIGHTS)} points"
+    output=QdrantClient(path=str(tmp_path/"output"))
+    assert output.count("flights").count==len(FLIGHTS)
+    output.close()
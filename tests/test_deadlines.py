@@ -0,0 +1,46 @@
+import asyncio
+import time
+import pytest
+import deadlines
+from deadlines import (
+    deadline_from,
+    remaining_seconds,
+    has_budget,
+    within_deadline,
+    mark_degraded
+)
+
+def test_no_timeout_means_no_deadline():
+    assert deadline_from(0)==0.0
+    assert remaining_seconds({"deadline": 0.0}) is None
+    assert has_budget({"deadline": 0.0}, "generate_answer")
+
+def test_default_budget_applies_without_a_timeout(monkeypatch):
+    monkeypatch.setattr(deadlines, "SEARCH_DEADLINE_MS", 2000)
+    assert deadline_from(None)-time.monotonic()==pytest.approx(2.0, abs=0.1)
+
+def test_stage_budget():
+    state={"deadline": time.monotonic()+2.5}
+    assert has_budget(state, "generate_filters")
+    assert not has_budget(state, "generate_answer")
+
+def test_within_deadline_times_out_at_the_deadline():
+    state={"deadline": time.monotonic()+0.05}
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(within_deadline(state, asyncio.sleep(1)))
+
+def test_within_deadline_uses_the_shorter_timeout():
+    state={"deadline": time.monotonic()+10}
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(within_deadline(state, asyncio.sleep(1), timeout=0.05))
+
+def test_within_deadline_returns_the_result():
+    async def answer():
+        return 42
+    assert asyncio.run(within_deadline({"deadline": 0.0}, answer()))==42
+
+def test_mark_degraded_adds_each_stage_once():
+    state={"deadline": 0.0, "degraded": ["classify_query"]}
+    assert mark_degraded(state, "classify_query")==["classify_query"]
+    assert mark_degraded(state, "llm_reranker")==["classify_query", "llm_reranker"]
+    assert state["degraded"]==["classify_query"]
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from embedding_cache import (
+    EmbeddingCache,
+    CachedEmbeddings,
+    text_hash
+)
+
+class CountingEmbeddings:
+
+    def __init__(self):
+        self.embedded=[]
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        self.embedded.append(text)
+        return [float(len(text)), 0.0]
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+@pytest.fixture
+def cache(tmp_path):
+    cache=EmbeddingCache(str(tmp_path/"cache.sqlite"))
+    yield cache
+    cache.close()
+
+def test_unchanged_content_is_embedded_once(cache):
+    model=CountingEmbeddings()
+    embeddings=CachedEmbeddings(model, "model", cache, dimension=2)
+    first=embeddings.embed_documents(["a", "bb", "a"])
+    second=embeddings.embed_documents(["bb", "a"])
+    assert model.embedded==["a", "bb"]
+    assert first==[[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert second==[[2.0, 1.0], [1.0, 1.0]]
+
+def test_queries_and_documents_are_cached_separately(cache):
+    model=CountingEmbeddings()
+    embeddings=CachedEmbeddings(model, "model", cache, dimension=2)
+    embeddings.embed_documents(["a"])
+    assert embeddings.embed_query("a")==[1.0, 0.0]
+    assert model.embedded==["a", "a"]
+
+def test_async_misses_go_to_the_executor(cache):
+    model=CountingEmbeddings()
+    embeddings=CachedEmbeddings(model, "model", cache, dimension=2)
+    seen=[]
+
+    async def embed(texts):
+        seen.extend(texts)
+        return [[9.0, 9.0] for _ in texts]
+
+    assert asyncio.run(embeddings.aembed_documents(["x", "x"], embed=embed))==[[9.0, 9.0], [9.0, 9.0]]
+    assert seen==["x"] and model.embedded==[]
+
+def test_cache_is_keyed_by_model(cache):
+    cache.put_many("a", "document", 2, {text_hash("x"): [1.0, 2.0]})
+    assert cache.get_many("a", "document", 2, [text_hash("x")])=={text_hash("x"): [1.0, 2.0]}
+    assert cache.get_many("b", "document", 2, [text_hash("x")])=={}
+
+def test_least_recently_used_entries_are_evicted(cache):
+    for index in range(4):
+        cache.put_many("model", "document", 2, {str(index): [float(index), 0.0]})
+    cache.get_many("model", "document", 2, ["0"])
+    cache.evict(16/1024/1024)
+    remaining=cache.get_many("model", "document", 2, ["0", "1", "2", "3"])
+    assert set(remaining)=={"0", "3"}
+    assert cache.counts["evictions"]==2
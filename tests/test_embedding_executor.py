@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+import embedding_executor
+from embedding_executor import (
+    EmbeddingExecutor,
+    TokenBucket,
+    backoff_seconds,
+    is_rate_limited
+)
+
+class FakeClock:
+
+    def __init__(self):
+        self.now=0.0
+        self.sleeps=[]
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now+=seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock=FakeClock()
+    monkeypatch.setattr(embedding_executor.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(embedding_executor.asyncio, "sleep", clock.sleep)
+    return clock
+
+def test_token_bucket_starts_full_then_paces(clock):
+    bucket=TokenBucket(60, capacity=2)
+
+    async def take(count):
+        for _ in range(count):
+            await bucket.acquire()
+
+    asyncio.run(take(4))
+    assert clock.sleeps==[pytest.approx(1.0), pytest.approx(1.0)]
+    assert bucket.waited_seconds==pytest.approx(2.0)
+
+def test_token_bucket_refills_up_to_capacity(clock):
+    bucket=TokenBucket(60, capacity=2)
+    asyncio.run(bucket.acquire(2))
+    clock.now+=10
+    asyncio.run(bucket.acquire(2))
+    assert clock.sleeps==[]
+
+def test_oversized_request_waits_for_a_full_bucket(clock):
+    bucket=TokenBucket(60, capacity=2)
+    asyncio.run(bucket.acquire(2))
+    asyncio.run(bucket.acquire(5))
+    assert clock.sleeps==[pytest.approx(2.0)]
+
+def test_backoff_grows_exponentially_and_is_capped(monkeypatch):
+    monkeypatch.setattr(embedding_executor.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(embedding_executor, "EMBED_BACKOFF_SECONDS", 1.0)
+    monkeypatch.setattr(embedding_executor, "EMBED_MAX_BACKOFF_SECONDS", 10.0)
+    assert [backoff_seconds(attempt) for attempt in range(5)]==[1.0, 2.0, 4.0, 8.0, 10.0]
+
+def test_backoff_is_jittered_from_zero(monkeypatch):
+    monkeypatch.setattr(embedding_executor.random, "uniform", lambda low, high: low)
+    assert backoff_seconds(3)==0
+
+@pytest.mark.parametrize("error, expected", [
+    (RuntimeError("429 Too Many Requests"), True),
+    (RuntimeError("RESOURCE_EXHAUSTED: quota exceeded"), True),
+    (type("ResourceExhausted", (Exception,), {})("boom"), True),
+    (ValueError("invalid input"), False),
+])
+def test_is_rate_limited(error, expected):
+    assert is_rate_limited(error)==expected
+
+class FlakyEmbeddings:
+
+    def __init__(self, failures):
+        self.failures=failures
+        self.batches=[]
+
+    async def aembed_documents(self, texts):
+        if self.failures:
+            self.failures-=1
+            raise RuntimeError("429 rate limit")
+        self.batches.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+def test_executor_batches_in_order_and_retries_rate_limits(clock, monkeypatch):
+    monkeypatch.setattr(embedding_executor, "_buckets", {"requests": None, "texts": None})
+    embeddings=FlakyEmbeddings(failures=2)
+    executor=EmbeddingExecutor(embeddings, batch_size=2, concurrency=1)
+    vectors=asyncio.run(executor.embed(["a", "bb", "ccc"]))
+    assert vectors==[[1.0], [2.0], [3.0]]
+    assert embeddings.batches==[["a", "bb"], ["ccc"]]
+    assert executor.counts["retries"]==2 and executor.counts["texts"]==3
+
+def test_executor_gives_up_after_max_retries(clock, monkeypatch):
+    monkeypatch.setattr(embedding_executor, "_buckets", {"requests": None, "texts": None})
+    monkeypatch.setattr(embedding_executor, "EMBED_MAX_RETRIES", 1)
+    executor=EmbeddingExecutor(FlakyEmbeddings(failures=5), batch_size=2, concurrency=1)
+    with pytest.raises(RuntimeError):
+        asyncio.run(executor.embed(["a"]))
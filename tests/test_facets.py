@@ -0,0 +1,46 @@
+import asyncio
+from facets import (
+    FacetCatalogue,
+    update_facets,
+    reset_facets,
+    discard_facets,
+    get_facet_catalogue
+)
+from langchain_core.documents import Document
+
+FLIGHTS=[
+    {"flight_id": "FL1", "airline": "Emirates", "alliance": "Non-Alliance", "from": "New York", "from_country": "USA", "to": "Dubai", "to_country": "UAE", "travel_class": "economy", "price_usd": 800},
+    {"flight_id": "FL2", "airline": "Japan Airlines", "alliance": "Oneworld", "from": "London", "from_country": "UK", "to": "Tokyo", "to_country": "Japan", "travel_class": "business", "price_usd": 3100},
+    {"flight_id": "", "airline": "", "to_country": "", "price_usd": 0},
+]
+
+def catalogue_of(records):
+    catalogue=FacetCatalogue("flights")
+    catalogue.add_records(records)
+    return catalogue
+
+def test_add_records_skips_non_flights():
+    catalogue=catalogue_of(FLIGHTS)
+    assert catalogue.flight_count==2
+    assert catalogue.values["airline"]=={"Emirates": 1, "Japan Airlines": 1}
+    assert catalogue.places=={"New York": "USA", "Dubai": "UAE", "London": "UK", "Tokyo": "Japan"}
+    assert (catalogue.price_min, catalogue.price_max)==(800, 3100)
+
+def test_describe_inlines_small_fields_and_resolves_cities(monkeypatch):
+    import facets
+    monkeypatch.setattr(facets, "FACET_INLINE_MAX_VALUES", 1)
+    description=catalogue_of(FLIGHTS).describe("business flights to Tokyo on Japan Airlines")
+    assert "to_country: Japan" in description
+    assert "airline: Japan Airlines" in description
+    assert description.endswith("not mentioned in the query (leave null): alliance")
+    assert "price_usd (max_price/min_price): 800-3100" in description
+
+def test_empty_catalogue():
+    assert FacetCatalogue("flights").describe("anything")=="No flights in this collection."
+
+def test_cached_catalogue_is_updated_by_ingestion():
+    reset_facets("test_facets")
+    update_facets("test_facets", [Document(page_content="", metadata=FLIGHTS[0])])
+    catalogue=asyncio.run(get_facet_catalogue(None, "test_facets"))
+    assert catalogue.flight_count==1
+    discard_facets("test_facets")
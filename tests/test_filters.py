@@ -0,0 +1,86 @@
+import pytest
+from qdrant_client import (
+    QdrantClient,
+    models
+)
+from filters import (
+    build_qdrant_filter,
+    condition_holds,
+    matches_filters,
+    payload_key
+)
+
+FLIGHT={"airline": "Emirates", "to_country": "UAE", "price_usd": 800, "refundable": False}
+
+def test_no_applicable_filters_builds_nothing():
+    assert build_qdrant_filter({}) is None
+    assert build_qdrant_filter({"unknown": 1}) is None
+
+def test_conditions_target_nested_metadata():
+    qdrant_filter=build_qdrant_filter({"airline": "Emirates", "max_price": 900, "min_price": 100}, match_mode="must")
+    conditions={condition.key: condition for condition in qdrant_filter.must}
+    assert set(conditions)=={payload_key("airline"), payload_key("price_usd")} and len(qdrant_filter.must)==3
+    assert conditions[payload_key("airline")].match.value=="Emirates"
+    ranges=[condition.range for condition in qdrant_filter.must if condition.range is not None]
+    assert {(price_range.gte, price_range.lte) for price_range in ranges}=={(None, 900), (100, None)}
+
+@pytest.mark.parametrize("match_mode, clause", [("should", "should"), ("must", "must")])
+def test_match_mode_combines_conditions(match_mode, clause):
+    qdrant_filter=build_qdrant_filter({"airline": "Emirates", "refundable": True}, match_mode=match_mode)
+    assert len(getattr(qdrant_filter, clause))==2
+
+def test_single_condition_is_always_required():
+    assert len(build_qdrant_filter({"airline": "Emirates"}, match_mode="should").must)==1
+
+@pytest.mark.parametrize("filter_key, value, expected", [
+    ("airline", "Emirates", True),
+    ("airline", "Qatar Airways", False),
+    ("max_price", 800, True),
+    ("max_price", 799, False),
+    ("min_price", 801, False),
+    ("refundable", False, True),
+    ("alliance", "Star Alliance", False),
+])
+def test_condition_holds(filter_key, value, expected):
+    assert condition_holds(FLIGHT, filter_key, value)==expected
+
+def test_condition_holds_rejects_non_numeric_prices():
+    assert not condition_holds({"price_usd": ""}, "max_price", 100)
+
+def test_matches_filters_follows_match_mode():
+    filters={"airline": "Emirates", "refundable": True}
+    assert matches_filters(FLIGHT, filters, match_mode="should")
+    assert not matches_filters(FLIGHT, filters, match_mode="must")
+    assert matches_filters(FLIGHT, {}, match_mode="must")
+
+FLIGHTS=[
+    {"airline": "Emirates", "price_usd": 800, "layovers": [], "availability": 5, "flight_duration_hours": 14.0, "departure_date": "2025-10-03T08:00:00"},
+    {"airline": "Qatar Airways", "price_usd": 2400, "layovers": [{"city": "Doha"}], "availability": 0, "flight_duration_hours": 16.5, "departure_date": "2025-10-01T08:00:00"},
+    {"airline": "Emirates", "price_usd": 3100, "layovers": [], "availability": 9, "flight_duration_hours": 12.0, "departure_date": "2025-10-04T08:00:00"},
+]
+
+@pytest.fixture
+def qdrant():
+    client=QdrantClient(":memory:")
+    client.create_collection("flights", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE))
+    client.upsert("flights", [models.PointStruct(id=index, vector=[1.0, 0.0], payload={"metadata": flight}) for index, flight in enumerate(FLIGHTS)])
+    yield client
+    client.close()
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"max_layovers": 0}, [0, 2]),
+    ({"min_availability": 1}, [0, 2]),
+    ({"max_duration_hours": 14}, [0, 2]),
+    ({"departure_after": "2025-10-02", "departure_before": "2025-10-03"}, [0]),
+    ({"departure_before": "2025-10-01T07:00:00"}, []),
+    ({"airline": "Qatar Airways", "max_price": 1000, "max_layovers": 0}, [0]),
+])
+def test_constraints_match_in_qdrant_and_in_memory(qdrant, filters, expected):
+    points, _=qdrant.scroll("flights", scroll_filter=build_qdrant_filter(filters, match_mode="should"), limit=10)
+    assert sorted(point.id for point in points)==expected
+    assert [index for index, flight in enumerate(FLIGHTS) if matches_filters(flight, filters, match_mode="should")]==expected
+
+def test_constraints_always_narrow():
+    qdrant_filter=build_qdrant_filter({"airline": "Emirates", "refundable": True, "min_availability": 2}, match_mode="should")
+    assert len(qdrant_filter.should)==2 and len(qdrant_filter.must)==1
+    assert qdrant_filter.must[0].key==payload_key("availability")
@@ -0,0 +1,75 @@
+import pytest
+from flight_index import (
+    FlightIndex,
+    has_explicit_constraints,
+    requested_sort,
+    detect_sort
+)
+
+RECORDS=[
+    {"flight_id": "FL1", "airline": "Emirates", "to_country": "UAE", "travel_class": "economy", "price_usd": 800, "flight_duration_hours": 14.0, "departure_date": "2025-10-03T08:00:00", "layovers": [], "availability": 5, "refundable": True},
+    {"flight_id": "FL2", "airline": "Qatar Airways", "to_country": "UAE", "travel_class": "business", "price_usd": 2400, "flight_duration_hours": 16.5, "departure_date": "2025-10-01T08:00:00", "layovers": [{"city": "Doha"}], "availability": 0, "refundable": False},
+    {"flight_id": "FL3", "airline": "Emirates", "to_country": "Japan", "travel_class": "business", "price_usd": 3100, "flight_duration_hours": 12.0, "departure_date": "2025-10-02T08:00:00", "layovers": [], "availability": 9, "refundable": True},
+    {"flight_id": "FL4", "airline": "Emirates", "to_country": "UAE", "travel_class": "economy", "price_usd": 800, "flight_duration_hours": 13.0, "departure_date": "2025-10-04T08:00:00", "layovers": [], "availability": 2, "refundable": False},
+]
+
+@pytest.fixture
+def index():
+    return FlightIndex("flights", 0, [record["flight_id"] for record in RECORDS], RECORDS)
+
+def flight_ids(documents):
+    return [document.metadata["flight_id"] for document in documents]
+
+def test_search_filters_and_sorts_by_price(index):
+    assert flight_ids(index.search({"max_price": 2500}, "price"))==["FL1", "FL4", "FL2"]
+
+def test_filters_must_all_match_on_the_index_path(index, monkeypatch):
+    monkeypatch.setattr("filters.FILTER_MATCH_MODE", "should")
+    filters={"airline": "Emirates", "to_country": "Japan"}
+    assert index.filter_mask(filters).tolist()==[False, False, True, False]
+    assert flight_ids(index.search(filters, "price"))==["FL3"]
+    assert index.filter_mask({"airline": "Qatar Airways", "to_country": "Japan"}, match_mode="should").tolist()==[False, True, True, False]
+
+def test_index_only_filters_always_narrow(index):
+    mask=index.filter_mask({"airline": "Qatar Airways", "to_country": "Japan", "max_layovers": 0, "min_availability": 1}, match_mode="should")
+    assert mask.tolist()==[False, False, True, False]
+
+def test_departure_range(index):
+    filters={"departure_after": "2025-10-02", "departure_before": "2025-10-03T23:59:59"}
+    assert flight_ids(index.search(filters, "departure"))==["FL3", "FL1"]
+
+def test_sort_keys(index):
+    assert flight_ids(index.search({}, "duration"))==["FL3", "FL4", "FL1", "FL2"]
+    assert flight_ids(index.search({}, "latest_departure", limit=2))==["FL4", "FL1"]
+
+def test_extend_appends_flights_and_rebuilds_columns_on_read(index):
+    assert flight_ids(index.search({}, "price", limit=1))==["FL1"]
+    index.extend(1, ["FL5"], [dict(RECORDS[0], flight_id="FL5", price_usd=100)])
+    index.extend(2, ["FL6"], [dict(RECORDS[2], flight_id="FL6", price_usd=50)])
+    assert index._columns is None
+    assert (index.size, index.version, len(RECORDS))==(6, 2, 4)
+    assert flight_ids(index.search({}, "price", limit=2))==["FL6", "FL5"]
+    assert len(index.columns["price_usd"]["values"])==6
+
+def test_ingested_batches_extend_the_current_index():
+    from langchain_core.documents import Document
+    from flight_index import (
+        _flight_indexes,
+        reset_flight_index,
+        index_ingested_documents
+    )
+    reset_flight_index("ingest-test", 1)
+    first=_flight_indexes["ingest-test"]
+    for version, record in enumerate(RECORDS, start=2):
+        index_ingested_documents("ingest-test", [Document(page_content=record["flight_id"], metadata=dict(record, document_type="json"))], version-1, version)
+    assert _flight_indexes["ingest-test"] is first
+    assert flight_ids(first.search({"airline": "Emirates", "to_country": "UAE"}, "duration"))==["FL4", "FL1"]
+    index_ingested_documents("ingest-test", [], 3, 9)
+    assert "ingest-test" not in _flight_indexes
+
+def test_query_sort_and_constraints():
+    assert requested_sort("fastest flights to Tokyo")=="duration"
+    assert requested_sort("flights to Tokyo") is None
+    assert detect_sort("flights to Tokyo")=="price"
+    assert has_explicit_constraints({"max_layovers": 0})
+    assert not has_explicit_constraints({})
@@ -0,0 +1,58 @@
+import os
+import sys
+import json
+import subprocess
+import pytest
+from benchmarks import SRC_DIRECTORY
+from benchmarks.import_time import (
+    TARGETS,
+    load_budget,
+    check_budget,
+    measure_target
+)
+
+#   Each check runs in a fresh interpreter (the test session itself has long since imported the heavy clients),
+#   from a temporary directory so the service's log file is not written into the tree.
+
+@pytest.fixture
+def imported_modules(tmp_path):
+    def imported_modules(code: str) -> set:
+        completed=subprocess.run(
+            [sys.executable, "-c", f"{code}\nimport sys, json\nprint(json.dumps(sorted(sys.modules)))"],
+            cwd=tmp_path,
+            env={**os.environ, "PYTHONPATH": SRC_DIRECTORY},
+            capture_output=True,
+            text=True
+        )
+        assert completed.returncode==0, completed.stderr
+        return set(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    return imported_modules
+
+@pytest.mark.parametrize("target", list(TARGETS))
+def test_forbidden_modules_stay_out_of_start_up(imported_modules, target):
+    modules=imported_modules(TARGETS[target])
+    for forbidden in load_budget()["targets"][target]["forbidden_modules"]:
+        assert not any(module==forbidden or module.startswith(f"{forbidden}.") for module in modules), forbidden
+
+def test_workflow_is_compiled_on_first_use(imported_modules):
+    modules=imported_modules("import graph\nassert graph._app is None and graph._session_app is None\ngraph.app\nassert graph._app is graph.get_app()")
+    assert "langgraph.graph" in modules
+
+def test_measure_target_parses_importtime():
+    result=measure_target("import json")
+    assert "json" in result["modules"] and result["import_ms"]>0
+
+def test_measure_target_reports_failures():
+    with pytest.raises(RuntimeError, match="ModuleNotFoundError"):
+        measure_target("import module_that_does_not_exist")
+
+def test_check_budget_flags_forbidden_modules_and_slow_targets():
+    budget={"targets": {"main": {"max_import_ms": 100.0, "forbidden_modules": ["qdrant_client"]}}}
+    fast={"main": {"import_ms": 80.0, "modules": ["fastapi", "qdrant_client_helpers"]}}
+    slow={"main": {"import_ms": 120.0, "modules": ["qdrant_client.http"]}}
+    assert check_budget(fast, budget)==[]
+    assert check_budget(slow, budget)==["main: imports qdrant_client at start-up", "main: import time 120.0 ms exceeds budget 100.0 ms"]
+
+def test_unset_time_budget_is_not_enforced():
+    assert check_budget({"graph": {"import_ms": 10000.0, "modules": []}}, {"targets": {"graph": {"max_import_ms": None}}})==[]
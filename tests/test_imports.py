@@ -0,0 +1,13 @@
+import importlib
+
+#   The graph and the API must import cleanly: the service, langgraph.json and every benchmark load them at start-up.
+
+def test_graph_imports():
+    graph=importlib.import_module("graph")
+    assert "speculation_id" in graph.GraphState.__annotations__
+    assert callable(graph.take_speculation)
+
+def test_main_imports():
+    main=importlib.import_module("main")
+    paths={route.path for route in main.app.routes}
+    assert {"/search", "/ingest"}<=paths
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import pytest
+import ingest_jobs
+from ingest_jobs import (
+    IngestJob,
+    JobQueueFull,
+    submit_job,
+    get_job,
+    search_priority,
+    yield_to_search,
+    shutdown_jobs,
+    start_jobs,
+    SUCCEEDED,
+    FAILED,
+    RUNNING
+)
+
+@pytest.fixture(autouse=True)
+def jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_jobs, "INGEST_JOBS_DB_PATH", str(tmp_path/"jobs.sqlite"))
+    monkeypatch.setattr(ingest_jobs, "_jobs", {})
+    monkeypatch.setattr(ingest_jobs, "_job_semaphore", None)
+    monkeypatch.setattr(ingest_jobs, "_connection", None)
+
+def run_jobs(*runs):
+    async def main():
+        start_jobs()
+        jobs=[await submit_job("file", {"index": index}, run) for index, run in enumerate(runs)]
+        await asyncio.gather(*ingest_jobs._tasks)
+        return jobs
+    return asyncio.run(main())
+
+def test_job_reports_result_and_progress():
+    async def run(job):
+        job.update_progress({"parsed": 3, "upserted": 2, "expected": 3, "unknown": 1})
+        return 3
+
+    job,=run_jobs(run)
+    status=get_job(job.job_id)
+    assert status["status"]==SUCCEEDED
+    assert (status["documents_parsed"], status["documents_upserted"], status["documents_processed"])==(3, 2, 3)
+    assert status["eta_seconds"]==0.0
+
+def test_failed_job_records_the_error():
+    async def run(job):
+        raise RuntimeError("qdrant down")
+
+    job,=run_jobs(run)
+    assert get_job(job.job_id)["status"]==FAILED
+    assert get_job(job.job_id)["errors"]==["qdrant down"]
+
+def test_status_is_read_from_sqlite_by_other_workers():
+    async def run(job):
+        return 1
+
+    job,=run_jobs(run)
+    ingest_jobs._jobs.clear()
+    assert get_job(job.job_id)["status"]==SUCCEEDED
+    assert get_job("missing") is None
+
+def test_queue_is_bounded(monkeypatch):
+    monkeypatch.setattr(ingest_jobs, "INGEST_JOB_QUEUE_SIZE", 1)
+
+    async def main():
+        release=asyncio.Event()
+
+        async def run(job):
+            await release.wait()
+            return 0
+
+        start_jobs()
+        await submit_job("file", {}, run)
+        with pytest.raises(JobQueueFull):
+            await submit_job("file", {}, run)
+        release.set()
+        await asyncio.gather(*ingest_jobs._tasks)
+
+    asyncio.run(main())
+
+def test_eta_from_throughput(monkeypatch):
+    job=IngestJob("file", {})
+    job.status=RUNNING
+    job.started_at=100.0
+    monkeypatch.setattr(ingest_jobs.time, "time", lambda: 110.0)
+    job.progress.update({"parsed": 50, "expected": 150})
+    snapshot=job.snapshot()
+    assert snapshot["docs_per_second"]==5.0
+    assert snapshot["eta_seconds"]==20.0
+
+def test_ingestion_yields_while_searches_are_in_flight(monkeypatch):
+    monkeypatch.setattr(ingest_jobs, "INGEST_SEARCH_YIELD_SECONDS", 1)
+
+    async def main():
+        order=[]
+
+        async def search():
+            async with search_priority():
+                await asyncio.sleep(0.1)
+                order.append("search")
+
+        async def batch():
+            await asyncio.sleep(0)
+            await yield_to_search()
+            order.append("batch")
+
+        await asyncio.gather(search(), batch())
+        return order
+
+    assert asyncio.run(main())==["search", "batch"]
+
+def test_shutdown_marks_running_jobs_failed():
+    async def main():
+        async def run(job):
+            await asyncio.sleep(10)
+            return 0
+
+        start_jobs()
+        job=await submit_job("file", {}, run)
+        await asyncio.sleep(0)
+        await shutdown_jobs()
+        return job
+
+    job=asyncio.run(main())
+    assert job.status==FAILED and "Interrupted by shutdown" in job.errors
+
+def test_jobs_run_on_each_new_loop():
+    async def run(job):
+        return 1
+
+    for _ in range(2):
+        job,=run_jobs(run)
+        assert get_job(job.job_id)["status"]==SUCCEEDED
+
+def test_submitting_before_start_fails():
+    async def run(job):
+        return 0
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(submit_job("file", {}, run))
+
+def test_progress_writes_run_off_the_event_loop(monkeypatch):
+    writers=[]
+    save_job=ingest_jobs.save_job
+    monkeypatch.setattr(ingest_jobs, "save_job", lambda job: (writers.append(threading.current_thread()), save_job(job)))
+
+    async def run(job):
+        job.update_progress({"parsed": 1})
+        job.add_error("bad record")
+        return 1
+
+    job,=run_jobs(run)
+    assert writers and threading.main_thread() not in writers
+    assert get_job(job.job_id)["errors"]==["bad record"]
@@ -0,0 +1,168 @@
+import os
+import json
+import asyncio
+import pytest
+from langchain_core.documents import Document
+import ingestion
+from ingestion import (
+    IngestContext,
+    assign_point_ids,
+    content_hash,
+    ingest_documents,
+    source_key,
+    count_json_items,
+    iter_json_documents,
+    iter_batches,
+    load_documents,
+    PROJECT_ROOT
+)
+from embedding_executor import EmbeddingExecutor
+from models import (
+    IngestMode,
+    FileType
+)
+
+def flight(source, flight_id, price=100):
+    return Document(page_content=f"{flight_id} {price}", metadata={"source": source, "flight_id": flight_id, "price_usd": price})
+
+def chunk(source, text):
+    return Document(page_content=text, metadata={"source": source, "flight_id": ""})
+
+def point_ids(documents):
+    return [point_id for point_id, _ in assign_point_ids(documents)]
+
+def test_point_ids_are_deterministic():
+    documents=lambda: [flight("a.json", "FL1"), chunk("a.md", "visa rules")]
+    assert point_ids(documents())==point_ids(documents())
+
+def test_point_ids_ignore_flight_content():
+    assert point_ids([flight("a.json", "FL1", 100)])==point_ids([flight("a.json", "FL1", 200)])
+
+def test_point_ids_differ_by_source():
+    assert point_ids([flight("a.json", "FL1")])!=point_ids([flight("b.json", "FL1")])
+    assert point_ids([chunk("a.md", "same")])!=point_ids([chunk("b.md", "same")])
+
+def test_repeated_flight_ids_within_a_file_are_numbered():
+    ids=point_ids([flight("a.json", "FL1"), flight("a.json", "FL1")])
+    assert len(set(ids))==2
+    assert ids[0]==point_ids([flight("a.json", "FL1")])[0]
+
+def test_assign_point_ids_sets_content_hash():
+    document=chunk("a.md", "visa rules")
+    list(assign_point_ids([document]))
+    assert document.metadata["content_hash"]==content_hash("visa rules")
+
+def test_source_key_is_normalised_and_project_relative(tmp_path):
+    assert source_key(os.path.join(PROJECT_ROOT, "src", "..", "data", "flights.json"))==os.path.join("data", "flights.json")
+    assert source_key(str(tmp_path/"a"/".."/"flights.json"))==os.path.realpath(tmp_path/"flights.json")
+
+#   ingest_documents against stored hashes, with the Qdrant and embedding calls replaced.
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    state={"stored": {}, "upserted": [], "deleted": []}
+
+    async def upsert_documents(vector_store, executor, documents, ids):
+        state["upserted"].extend(ids)
+
+    monkeypatch.setattr(ingestion, "INGEST_CHECKPOINT_DIRECTORY", str(tmp_path/"checkpoints"))
+    monkeypatch.setattr(ingestion, "load_stored_hashes", lambda client, collection_name, source: dict(state["stored"]))
+    monkeypatch.setattr(ingestion, "upsert_documents", upsert_documents)
+    monkeypatch.setattr(ingestion, "delete_points", lambda client, collection_name, ids: state["deleted"].extend(ids))
+    source=tmp_path/"flights.json"
+    source.write_text("[]")
+    state["source"]=str(source)
+    return state
+
+def ingest(store, documents, mode):
+    context=IngestContext("test_ingestion", "model", None, None, EmbeddingExecutor(None))
+    return asyncio.run(ingest_documents(context, store["source"], documents, len(documents), mode=mode))
+
+def stored_hashes(documents):
+    return {point_id: document.metadata["content_hash"] for point_id, document in assign_point_ids(documents)}
+
+def test_unchanged_documents_are_skipped(store):
+    source=store["source"]
+    store["stored"]=stored_hashes([flight(source, "FL1"), flight(source, "FL2")])
+    counts=ingest(store, [flight(source, "FL1"), flight(source, "FL2", 300)], IngestMode.UPSERT)
+    assert store["upserted"]==point_ids([flight(source, "FL2")])
+    assert counts["parsed"]==2 and counts["upserted"]==1
+
+def test_sync_deletes_points_no_longer_in_the_file(store):
+    source=store["source"]
+    store["stored"]=stored_hashes([flight(source, "FL1"), flight(source, "FL2")])
+    counts=ingest(store, [flight(source, "FL1")], IngestMode.SYNC)
+    assert store["deleted"]==point_ids([flight(source, "FL2")])
+    assert counts["deleted"]==1
+
+def test_upsert_keeps_points_no_longer_in_the_file(store):
+    source=store["source"]
+    store["stored"]=stored_hashes([flight(source, "FL1"), flight(source, "FL2")])
+    ingest(store, [flight(source, "FL1")], IngestMode.UPSERT)
+    assert store["deleted"]==[]
+
+def test_sync_of_an_empty_file_deletes_every_point_of_its_source(store):
+    source=store["source"]
+    store["stored"]=stored_hashes([flight(source, "FL1"), flight(source, "FL2")])
+    counts=ingest(store, [], IngestMode.SYNC)
+    assert sorted(store["deleted"])==sorted(store["stored"])
+    assert counts["deleted"]==2
+
+def test_point_ids_do_not_depend_on_how_the_path_is_spelled(store, tmp_path):
+    source=store["source"]
+    (tmp_path/"data").mkdir()
+    store["source"]=str(tmp_path/"data"/".."/"flights.json")
+    documents=[flight(store["source"], "FL1")]
+    ingest(store, documents, IngestMode.UPSERT)
+    assert store["upserted"]==point_ids([flight(os.path.realpath(source), "FL1")])
+    assert documents[0].metadata["source"]==os.path.realpath(source)
+
+#   JSON files are streamed item by item instead of being loaded whole.
+
+def write_json(tmp_path, text, name="flights.json"):
+    path=tmp_path/name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def test_count_json_items(tmp_path):
+    assert count_json_items(write_json(tmp_path, '[{"a": [1, {"b": 2}]}, {"c": {}}, 3]'))==3
+    assert count_json_items(write_json(tmp_path, "[]"))==0
+    assert count_json_items(write_json(tmp_path, '{"flight_id": "FL1"}')) is None
+
+@pytest.mark.parametrize("text", ["", '"just a string"', "[{\"a\": 1},"])
+def test_count_json_items_rejects_bad_files(tmp_path, text):
+    with pytest.raises(ValueError):
+        count_json_items(write_json(tmp_path, text))
+
+def test_array_items_become_documents(tmp_path):
+    path=write_json(tmp_path, '[{"flight_id": "FL1", "price_usd": 99.5}, "skipped", {"flight_id": "FL2"}]')
+    documents=list(iter_json_documents(path, count_json_items(path)))
+    assert [document.metadata["flight_id"] for document in documents]==["FL1", "FL2"]
+    assert [document.metadata["item_index"] for document in documents]==[0, 2]
+    assert documents[0].metadata["price_usd"]==99.5 and isinstance(documents[0].metadata["price_usd"], float)
+    assert documents[0].metadata["total_items"]==3 and documents[0].metadata["source"]==path
+    assert json.loads(documents[0].page_content)=={"flight_id": "FL1", "price_usd": 99.5}
+
+def test_single_object_is_one_document(tmp_path):
+    path=write_json(tmp_path, '{"flight_id": "FL1"}')
+    documents=list(iter_json_documents(path, None))
+    assert len(documents)==1 and documents[0].metadata["item_index"]==0 and documents[0].metadata["total_items"]==1
+
+def test_items_before_a_parse_error_are_yielded(tmp_path):
+    documents=iter_json_documents(write_json(tmp_path, '[{"flight_id": "FL1"}, {"flight_id": '), 2)
+    assert next(documents).metadata["flight_id"]=="FL1"
+    with pytest.raises(ValueError, match="Invalid JSON format"):
+        next(documents)
+
+def test_batches_keep_order_and_size():
+    documents=[chunk("a.md", str(i)) for i in range(7)]
+    batches=list(iter_batches(iter(documents), 3))
+    assert [len(batch) for batch in batches]==[3, 3, 1]
+    assert [document for batch in batches for document in batch]==documents
+    assert list(iter_batches([], 3))==[]
+
+def test_json_files_are_loaded_lazily(tmp_path):
+    path=write_json(tmp_path, '[{"flight_id": "FL1"}, {"flight_id": "FL2"}]')
+    documents, total=asyncio.run(load_documents(path, FileType.JSON))
+    assert total==2 and not isinstance(documents, list)
+    assert [document.metadata["flight_id"] for document in documents]==["FL1", "FL2"]
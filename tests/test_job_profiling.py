@@ -0,0 +1,24 @@
+import profiling
+import ingest_jobs
+from conftest import wait_for_job
+
+#   /ingest returns as soon as its job is queued, so a profiled ingestion must cover the job, not the submission.
+
+INGEST_REQUEST={"filename": "data/test.txt", "file_type": "text", "collection_name": "test"}
+
+def test_ingest_profiles_the_background_job(api_client):
+    response=api_client.post("/ingest?profile=collapsed", json=INGEST_REQUEST, headers={"X-Admin-Token": "secret"})
+    assert response.status_code==202
+    assert response.headers["X-Profile-Status"]=="job"
+    job_id=response.json()["job_id"]
+    assert wait_for_job(api_client, job_id)["status"]==ingest_jobs.SUCCEEDED
+    profiles=api_client.get("/profiles", headers={"X-Admin-Token": "secret"}).json()["profiles"]
+    assert [profile["job_id"] for profile in profiles]==[job_id]
+    assert profiles[0]["path"]=="/ingest"
+    assert profiles[0]["duration_seconds"]>=0.05
+
+def test_ingest_without_profile_flag_is_not_profiled(api_client):
+    response=api_client.post("/ingest", json=INGEST_REQUEST)
+    assert response.status_code==202
+    wait_for_job(api_client, response.json()["job_id"])
+    assert profiling.list_profiles()==[]
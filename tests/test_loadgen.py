@@ -0,0 +1,105 @@
+import asyncio
+import httpx
+import pytest
+from benchmarks.loadgen import (
+    LatencyHistogram,
+    Workload,
+    send_request,
+    run_closed_loop,
+    run_open_loop,
+    run_ramp,
+    compare_runs
+)
+
+#   Requests are served by an in-process transport; /ingest answers 429 as when the job queue is full.
+
+def client_for(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://loadgen.test")
+
+async def ok_search_full_queue(request):
+    return httpx.Response(429 if request.url.path=="/ingest" else 200, json={})
+
+def test_histogram_buckets_by_milliseconds():
+    histogram=LatencyHistogram()
+    for seconds in (0.004, 0.005, 0.2, 90.0):
+        histogram.record(seconds)
+    buckets=histogram.to_dict()["histogram"]
+    assert (buckets["<=5ms"], buckets["<=250ms"], buckets[">60000ms"])==(2, 1, 1)
+    assert histogram.to_dict()["count"]==4
+
+@pytest.mark.parametrize("scenario, paths", [("search", {"/search"}), ("ingest", {"/ingest"}), ("mix", {"/search", "/ingest"})])
+def test_workload_scenarios(scenario, paths):
+    workload=Workload(scenario, "flights", "loadtest_ingest", ingest_ratio=0.5)
+    requests=[workload.next_request() for _ in range(50)]
+    assert {path for path, _ in requests}==paths
+    assert all(payload["collection_name"]==("loadtest_ingest" if path=="/ingest" else "flights") for path, payload in requests)
+
+def test_workload_is_reproducible():
+    first=Workload("mix", "flights", "ingest", 0.3, seed=3)
+    second=Workload("mix", "flights", "ingest", 0.3, seed=3)
+    assert [first.next_request() for _ in range(20)]==[second.next_request() for _ in range(20)]
+
+def test_closed_loop_records_statuses_per_endpoint():
+    async def main():
+        async with client_for(ok_search_full_queue) as client:
+            return await run_closed_loop(client, Workload("mix", "flights", "ingest", 0.5), concurrency=4, duration=0.2)
+
+    phase=asyncio.run(main())
+    search, ingest=phase["endpoints"]["/search"], phase["endpoints"]["/ingest"]
+    assert search["error_rate"]==0.0 and set(search["statuses"])=={"200"}
+    assert ingest["error_rate"]==1.0 and set(ingest["statuses"])=={"429"}
+    assert phase["requests"]==search["requests"]+ingest["requests"]
+
+def test_transport_errors_are_counted():
+    async def timeout(request):
+        raise httpx.ReadTimeout("slow", request=request)
+
+    async def main():
+        stats={}
+        async with client_for(timeout) as client:
+            await send_request(client, Workload("search", "flights", "ingest", 0.0), stats)
+        return stats
+
+    endpoint=asyncio.run(main())["/search"]
+    assert endpoint.errors=={"timeout": 1} and endpoint.failures==1
+
+def test_open_loop_drops_requests_over_the_inflight_cap():
+    async def slow(request):
+        await asyncio.sleep(0.3)
+        return httpx.Response(200, json={})
+
+    async def main():
+        async with client_for(slow) as client:
+            return await run_open_loop(client, Workload("search", "flights", "ingest", 0.0), rps=100, duration=0.1, max_inflight=2)
+
+    phase=asyncio.run(main())
+    assert phase["requests"]==2 and phase["dropped"]>0
+
+def test_ramp_stops_when_throughput_stops_growing():
+    lock=asyncio.Lock()
+
+    async def serial(request):
+        async with lock:
+            await asyncio.sleep(0.01)
+        return httpx.Response(200, json={})
+
+    async def main():
+        async with client_for(serial) as client:
+            return await run_ramp(client, Workload("search", "flights", "ingest", 0.0), start=1, step=3, maximum=16,
+                                  step_duration=0.2, slo_ms=60000, max_error_rate=0.01, min_gain=0.5)
+
+    result=asyncio.run(main())
+    assert result["saturation"]["concurrency"]==4
+    assert result["saturation"]["last_healthy_concurrency"]==1
+    assert any("throughput gain" in reason for reason in result["saturation"]["reasons"])
+
+def test_compare_runs_per_endpoint():
+    def run(p95, rps):
+        latency={"p50_ms": p95/2, "p95_ms": p95, "p99_ms": p95}
+        return {"result": {"mode": "concurrency", "throughput_rps": rps, "error_rate": 0.0,
+                           "endpoints": {"/search": {"latency": latency, "throughput_rps": rps, "error_rate": 0.0}}}}
+
+    rows={(row["name"], row["metric"]): row["change_pct"] for row in compare_runs(run(200.0, 10.0), run(100.0, 20.0))}
+    assert rows[("/search", "p95_ms")]==-50.0
+    assert rows[("overall", "throughput_rps")]==100.0
+    assert rows[("overall", "error_rate")] is None
@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+import metrics
+from metrics import (
+    percentile,
+    summarize_latencies,
+    record_stage_latency,
+    get_stage_latencies,
+    get_stage_latency_summary,
+    reset_metrics,
+    timed_node
+)
+
+@pytest.fixture(autouse=True)
+def samples():
+    reset_metrics()
+    yield
+    reset_metrics()
+
+def test_percentile_interpolates():
+    assert percentile([], 95)==0.0
+    assert percentile([3.0, 1.0, 2.0], 50)==2.0
+    assert percentile([1.0, 2.0], 75)==1.75
+    assert percentile([1.0, 2.0, 3.0, 4.0], 100)==4.0
+
+def test_summary_is_in_milliseconds():
+    summary=summarize_latencies([0.1, 0.2, 0.3])
+    assert summary["count"]==3
+    assert (summary["mean_ms"], summary["p50_ms"], summary["max_ms"])==(200.0, 200.0, 300.0)
+    assert summarize_latencies([])["p99_ms"]==0.0
+
+def test_timed_node_records_failures_too():
+    @timed_node("node")
+    async def node(fail):
+        if fail:
+            raise RuntimeError("boom")
+        return "ok"
+
+    assert asyncio.run(node(False))=="ok"
+    with pytest.raises(RuntimeError):
+        asyncio.run(node(True))
+    assert get_stage_latency_summary()["node"]["count"]==2
+
+def test_samples_are_bounded(monkeypatch):
+    monkeypatch.setattr(metrics, "_stage_latencies", metrics.defaultdict(lambda: metrics.deque(maxlen=3)))
+    for seconds in range(5):
+        record_stage_latency("stage", float(seconds))
+    assert get_stage_latencies()["stage"]==[2.0, 3.0, 4.0]
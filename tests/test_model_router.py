@@ -0,0 +1,56 @@
+import pytest
+import model_router
+from model_router import (
+    get_route,
+    select_model,
+    record_model_call,
+    get_routing_report,
+    reset_routing,
+    usage_of
+)
+
+@pytest.fixture(autouse=True)
+def routing(monkeypatch):
+    monkeypatch.setattr(model_router, "ROUTER_MIN_SAMPLES", 3)
+    reset_routing()
+    yield
+    reset_routing()
+
+def test_stage_uses_its_primary_model():
+    assert select_model("classify")["model"]==get_route("classify")["model"]
+
+def test_slow_primary_downgrades_the_stage():
+    route=get_route("answer")
+    for _ in range(3):
+        record_model_call(route, route["latency_budget"]+1)
+    assert select_model("answer")["model"]==route["fallback_model"]
+    assert get_routing_report()["answer"]["active_model"]==route["fallback_model"]
+
+def test_primary_within_budget_stays():
+    route=get_route("answer")
+    for _ in range(3):
+        record_model_call(route, route["latency_budget"]/2)
+    assert select_model("answer")["model"]==route["model"]
+
+def test_downgrade_expires(monkeypatch):
+    monkeypatch.setattr(model_router, "ROUTER_DOWNGRADE_SECONDS", 0)
+    route=get_route("filters")
+    for _ in range(3):
+        record_model_call(route, route["latency_budget"]+1)
+    assert select_model("filters")["model"]==route["model"]
+
+def test_calls_are_accounted_per_stage_and_model():
+    route=get_route("classify")
+    record_model_call(route, 0.1, {"input_tokens": 10, "output_tokens": 2})
+    record_model_call(route, 0.2, error=True)
+    counters=get_routing_report()["classify"]["models"][route["model"]]
+    assert (counters["calls"], counters["errors"], counters["input_tokens"], counters["output_tokens"])==(2, 1, 10, 2)
+
+def test_usage_of_responses_without_metadata():
+    assert usage_of(object())=={"input_tokens": 0, "output_tokens": 0}
+
+def test_answer_stage_spends_no_tokens_on_thinking(monkeypatch):
+    assert get_route("answer")["thinking_budget"]==0
+    assert get_route("classify")["thinking_budget"] is None
+    monkeypatch.setenv("ANSWER_THINKING_BUDGET", "256")
+    assert model_router.load_route("answer")["thinking_budget"]==256
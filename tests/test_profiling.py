@@ -0,0 +1,35 @@
+import pytest
+import profiling
+from profiling import (
+    is_profiling_authorized,
+    resolve_profile_format,
+    RequestProfiler,
+    list_profiles,
+    prune_profiles
+)
+
+def test_profiling_requires_the_configured_token(monkeypatch):
+    monkeypatch.delenv("PROFILING_ADMIN_TOKEN", raising=False)
+    assert not is_profiling_authorized("secret")
+    monkeypatch.setenv("PROFILING_ADMIN_TOKEN", "secret")
+    assert is_profiling_authorized("secret")
+    assert not is_profiling_authorized("wrong")
+    assert not is_profiling_authorized(None)
+
+def test_resolve_profile_format(monkeypatch):
+    monkeypatch.setattr(profiling, "pyinstrument_available", lambda: False)
+    assert resolve_profile_format("1")=="collapsed"
+    assert resolve_profile_format("collapsed")=="collapsed"
+    with pytest.raises(ValueError):
+        resolve_profile_format("svg")
+
+def test_profiles_are_written_and_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILES_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILES_MAX_FILES", 1)
+    for _ in range(2):
+        profiler=RequestProfiler("/search", "collapsed")
+        profiler.start()
+        metadata=profiler.stop(200)
+    assert (tmp_path/metadata["profile_file"]).exists()
+    prune_profiles()
+    assert [profile["profile_id"] for profile in list_profiles()]==[metadata["profile_id"]]
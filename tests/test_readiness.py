@@ -0,0 +1,103 @@
+import time
+import asyncio
+import pytest
+
+#   The API client runs the lifespan, whose background warm-up gates /ready.
+
+@pytest.fixture
+def serve(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+    import ingest_jobs
+    monkeypatch.setattr(ingest_jobs, "INGEST_JOBS_DB_PATH", str(tmp_path/"jobs.sqlite"))
+    monkeypatch.setattr(main, "readiness", {"ready": False, "status": "starting", "timings": {}, "error": None})
+    monkeypatch.setattr(main, "WARMUP_RETRY_DELAY", 0)
+
+    def serve(warm_up):
+        monkeypatch.setattr(main, "warm_up", warm_up)
+        return TestClient(main.app)
+
+    return serve
+
+def wait_for_status(client, status):
+    for _ in range(100):
+        response=client.get("/ready")
+        if response.json()["status"]==status:
+            return response
+        time.sleep(0.02)
+    raise AssertionError(f"/ready never reported {status}")
+
+def test_ready_after_warm_up(serve):
+    async def warm_up(collection_names):
+        await asyncio.sleep(0.1)
+        return {"components": 0.1}
+
+    with serve(warm_up) as client:
+        assert client.get("/ready").status_code==503
+        response=wait_for_status(client, "ready")
+        assert response.status_code==200
+        assert response.json()["timings"]=={"components": 0.1}
+        assert client.get("/").status_code==200
+
+def test_failed_warm_up_is_retried_then_reported(serve, monkeypatch):
+    import main
+    monkeypatch.setattr(main, "WARMUP_RETRIES", 2)
+    attempts=[]
+
+    async def warm_up(collection_names):
+        attempts.append(collection_names)
+        raise RuntimeError("qdrant unreachable")
+
+    with serve(warm_up) as client:
+        response=wait_for_status(client, "failed")
+        assert response.status_code==503
+        assert response.json()["error"]=="qdrant unreachable"
+    assert len(attempts)==2
+
+def test_transient_failure_recovers(serve):
+    attempts=[]
+
+    async def warm_up(collection_names):
+        attempts.append(None)
+        if len(attempts)==1:
+            raise RuntimeError("timeout")
+        return {}
+
+    with serve(warm_up) as client:
+        assert wait_for_status(client, "ready").json()["error"] is None
+    assert len(attempts)==2
+
+#   warm_up builds every client and primes the configured collections.
+
+def test_warm_up_primes_clients_and_collections(monkeypatch):
+    import graph
+    import client_qdrant
+    import facets
+    primed=[]
+
+    class Embeddings:
+        async def aembed_query(self, text):
+            primed.append("embedding")
+            return [0.0]
+
+    async def initialize_components():
+        monkeypatch.setattr(graph, "embeddings", Embeddings())
+
+    async def get_stage_llm(stage):
+        return object(), {}
+
+    async def ensure_filter_indexes(client, collection_name):
+        primed.append(f"indexes:{collection_name}")
+
+    async def get_facet_catalogue(client, collection_name):
+        primed.append(f"facets:{collection_name}")
+
+    monkeypatch.setattr(graph, "initialize_components", initialize_components)
+    monkeypatch.setattr(graph, "get_stage_llm", get_stage_llm)
+    monkeypatch.setattr(graph, "get_reranker", lambda top_n: primed.append("reranker"))
+    monkeypatch.setattr(client_qdrant, "get_sparse_embedding", lambda: primed.append("sparse"))
+    monkeypatch.setattr(client_qdrant, "ensure_filter_indexes", ensure_filter_indexes)
+    monkeypatch.setattr(facets, "get_facet_catalogue", get_facet_catalogue)
+    timings=asyncio.run(graph.warm_up(["flights"]))
+    assert primed==["sparse", "embedding", "reranker", "indexes:flights", "facets:flights"]
+    assert {"components", "llm:answer", "collection:flights", "facets:flights"}<=set(timings)
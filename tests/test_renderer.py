@@ -0,0 +1,58 @@
+from langchain_core.documents import Document
+from renderer import (
+    render_flight,
+    render_aggregates,
+    render_answer,
+    RENDER_MAX_DOCUMENTS,
+    RENDER_EXCERPT_CHARS
+)
+
+FLIGHT={
+    "flight_id": "EK201",
+    "airline": "Emirates",
+    "from": "Dubai",
+    "to": "Tokyo",
+    "departure_date": "2025-10-03T08:00:00",
+    "travel_class": "premium_economy",
+    "price_usd": 1200,
+    "layovers": [{"city": "Doha"}, {"city": "Seoul"}],
+    "refundable": True
+}
+
+def test_flight_line_lists_the_details():
+    assert render_flight(FLIGHT)=="- Emirates EK201: Dubai to Tokyo, 2025-10-03, premium economy, $1200, 2 stops, refundable"
+
+def test_flight_line_skips_missing_details():
+    metadata={"flight_id": "LH400", "airline": "Lufthansa", "from": "Berlin", "to": "Paris", "layovers": [{"city": "Munich"}]}
+    assert render_flight(metadata)=="- Lufthansa LH400: Berlin to Paris, 1 stop"
+    assert render_flight(dict(metadata, layovers=[], price_usd=0)).endswith("Berlin to Paris, $0, direct")
+
+def test_aggregate_sentences():
+    assert render_aggregates({"operation": "min", "metric": "price_usd", "matching_flights": 12, "value": 640.0})==\
+        "The lowest price usd over 12 matching flights is 640.0."
+    assert render_aggregates({"operation": "count", "metric": "price_usd", "matching_flights": 7, "value": 7})==\
+        "7 flights match your criteria."
+
+def test_grouped_aggregate_lists_each_group():
+    aggregates={
+        "operation": "avg",
+        "metric": "price_usd",
+        "matching_flights": 5,
+        "group_by": "airline",
+        "groups": [{"airline": "Emirates", "count": 3, "value": 900.0}, {"airline": "Lufthansa", "count": 2, "value": 450.5}]
+    }
+    assert render_aggregates(aggregates)=="Average price usd by airline over 5 matching flights – Emirates: 900.0; Lufthansa: 450.5."
+
+def test_answer_renders_flights_and_excerpts():
+    documents=[Document(page_content="x"*1000, metadata={"source": "policy.pdf"})]+[Document(page_content="", metadata=FLIGHT)]*10
+    lines=render_answer("flights to Tokyo", documents).split("\n")
+    assert lines[0]=="Top results for 'flights to Tokyo':"
+    assert lines[1]=="- "+"x"*RENDER_EXCERPT_CHARS
+    assert lines[2]==render_flight(FLIGHT) and len(lines)==1+RENDER_MAX_DOCUMENTS
+
+def test_answer_leads_with_the_aggregate():
+    aggregates={"operation": "count", "metric": "price_usd", "matching_flights": 0, "value": 0}
+    assert render_answer("how many flights", [], aggregates)=="0 flights match your criteria."
+
+def test_nothing_found():
+    assert render_answer("flights to Mars", [])=="I couldn't find any relevant information to answer your query."
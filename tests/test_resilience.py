@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+import resilience
+from resilience import (
+    BreakerOpen,
+    CircuitBreaker,
+    CLOSED,
+    OPEN,
+    HALF_OPEN,
+    call_upstream,
+    reset_breakers
+)
+
+@pytest.fixture(autouse=True)
+def breakers(monkeypatch):
+    monkeypatch.setattr(resilience, "BREAKER_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(resilience, "BREAKER_OPEN_SECONDS", 30)
+    reset_breakers()
+    yield
+    reset_breakers()
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker=CircuitBreaker("chat")
+    breaker.record_failure()
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state==CLOSED
+    breaker.record_failure()
+    assert breaker.state==OPEN
+    assert not breaker.allow()
+    assert breaker.counts["rejected"]==1
+
+def test_slow_calls_count_as_failures():
+    breaker=CircuitBreaker("embedding")
+    breaker.record_success(breaker.slow_call_seconds+1)
+    breaker.record_success(breaker.slow_call_seconds+1)
+    assert breaker.state==OPEN
+    assert breaker.counts["slow_calls"]==2
+
+def test_half_open_lets_one_probe_through(monkeypatch):
+    breaker=CircuitBreaker("chat")
+    breaker.record_failure()
+    breaker.record_failure()
+    monkeypatch.setattr(resilience, "BREAKER_OPEN_SECONDS", 0)
+    assert breaker.allow()
+    assert breaker.state==HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success(0.1)
+    assert breaker.state==CLOSED
+
+def test_failed_probe_reopens(monkeypatch):
+    breaker=CircuitBreaker("chat")
+    breaker.record_failure()
+    breaker.record_failure()
+    monkeypatch.setattr(resilience, "BREAKER_OPEN_SECONDS", 0)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state==OPEN
+
+def test_call_upstream_fails_fast_while_open():
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await call_upstream("rerank", failing)
+        with pytest.raises(BreakerOpen):
+            await call_upstream("rerank", failing)
+
+    asyncio.run(run())
+
+@pytest.fixture
+def hedging(monkeypatch):
+    monkeypatch.setattr(resilience, "HEDGE_MIN_SAMPLES", 1)
+    monkeypatch.setattr(resilience, "HEDGE_MAX_RATIO", 1.0)
+    monkeypatch.setattr(resilience, "HEDGE_MIN_DELAY_SECONDS", 0.01)
+    breaker=resilience.get_breaker("chat")
+    breaker.latencies.append(0.01)
+    calls=[]
+
+    async def call():
+        calls.append(None)
+        await asyncio.sleep(0.2 if len(calls)==1 else 0)
+        return len(calls)
+
+    return breaker, call
+
+def test_slow_call_is_hedged(hedging):
+    breaker, call=hedging
+    assert asyncio.run(call_upstream("chat", call))==2
+    assert breaker.counts["hedges"]==1 and breaker.counts["hedge_wins"]==1
+
+def test_uncancellable_calls_are_not_hedged(hedging):
+    breaker, call=hedging
+    assert asyncio.run(call_upstream("chat", call, hedge=False))==1
+    assert breaker.counts["hedges"]==0
+
+def test_no_hedging_while_a_cassette_is_active(hedging, monkeypatch):
+    breaker, call=hedging
+    monkeypatch.setattr("cassette._cassette", object())
+    assert asyncio.run(call_upstream("chat", call))==1
+    assert breaker.counts["hedges"]==0
@@ -0,0 +1,44 @@
+import os
+import sys
+import json
+import subprocess
+from benchmarks.search_benchmark import (
+    compare_results,
+    find_regressions,
+    format_comparison
+)
+
+ROOT=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def result(p95, qps, stage_p95=100.0):
+    return {
+        "requests": {"p50_ms": p95/2, "p95_ms": p95, "p99_ms": p95},
+        "stages": {"generate_answer": {"p50_ms": stage_p95/2, "p95_ms": stage_p95, "p99_ms": stage_p95}},
+        "throughput_qps": qps
+    }
+
+def test_comparison_reports_changes_per_percentile():
+    rows=compare_results(result(150.0, 8.0), result(100.0, 10.0))
+    changes={(row["name"], row["metric"]): row["change_pct"] for row in rows}
+    assert changes[("request", "p95_ms")]==50.0
+    assert changes[("generate_answer", "p95_ms")]==0.0
+    assert changes[("throughput", "qps")]==-20.0
+    assert "+50.0%" in format_comparison(rows)
+
+def test_regressions_are_p95_increases_and_throughput_drops():
+    rows=compare_results(result(150.0, 8.0), result(100.0, 10.0))
+    assert {(row["name"], row["metric"]) for row in find_regressions(rows, 10)}=={("request", "p95_ms"), ("throughput", "qps")}
+    assert find_regressions(compare_results(result(105.0, 9.5), result(100.0, 10.0)), 10)==[]
+
+#   The benchmark replaces module attributes process-wide, so the end-to-end run gets its own interpreter.
+
+def test_offline_run_covers_the_query_mix(tmp_path):
+    output=tmp_path/"search.json"
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.search_benchmark", "--iterations", "1", "--warmup", "0",
+         "--chat-latency", "0", "--embedding-latency", "0", "--rerank-latency", "0", "--output", str(output)],
+        cwd=ROOT, check=True, capture_output=True, timeout=120
+    )
+    run=json.loads(output.read_text())
+    assert run["requests"]["count"]==run["config"]["queries"] and run["requests"]["errors"]==0
+    assert {"classify_query", "generate_answer", "run_search_and_answer"}<=set(run["stages"])
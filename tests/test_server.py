@@ -0,0 +1,38 @@
+import pytest
+import server
+
+#   The runners are replaced so main() only resolves the server choice and worker count.
+
+@pytest.fixture
+def launched(monkeypatch):
+    calls=[]
+    monkeypatch.setattr(server, "run_gunicorn", lambda host, port, workers, timeout, collection_names: calls.append(("gunicorn", workers, collection_names)))
+    monkeypatch.setattr(server, "run_uvicorn", lambda host, port, workers: calls.append(("uvicorn", workers, None)))
+    for name in ("QDRANT_MODE", "CASSETTE_MODE", "WARMUP_COLLECTIONS"):
+        monkeypatch.delenv(name, raising=False)
+    return calls
+
+def test_workers_are_passed_through(launched):
+    assert server.main(["--server", "uvicorn", "--workers", "4"])==0
+    assert launched==[("uvicorn", 4, None)]
+
+@pytest.mark.parametrize("variable, value", [("QDRANT_MODE", "local"), ("CASSETTE_MODE", "record")])
+def test_single_process_modes_force_one_worker(launched, monkeypatch, variable, value):
+    monkeypatch.setenv(variable, value)
+    server.main(["--server", "gunicorn", "--workers", "4"])
+    assert launched==[("gunicorn", 1, [])]
+
+@pytest.mark.parametrize("variable, value", [("QDRANT_MODE", "memory"), ("CASSETTE_MODE", "replay")])
+def test_shareable_modes_keep_their_workers(launched, monkeypatch, variable, value):
+    monkeypatch.setenv(variable, value)
+    server.main(["--server", "uvicorn", "--workers", "3"])
+    assert launched==[("uvicorn", 3, None)]
+
+def test_warm_up_collections_are_preloaded_by_gunicorn(launched, monkeypatch):
+    monkeypatch.setenv("WARMUP_COLLECTIONS", "flights, ,policies")
+    server.main(["--server", "gunicorn", "--workers", "2"])
+    assert launched==[("gunicorn", 2, ["flights", "policies"])]
+
+def test_default_workers_from_environment(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "6")
+    assert server.default_workers()==6
@@ -0,0 +1,136 @@
+import pytest
+from langchain_core.documents import Document
+from facets import FacetCatalogue
+from sessions import (
+    extract_refinement_filters,
+    is_refinement,
+    satisfies_refinement,
+    refine_documents
+)
+
+FLIGHTS=[
+    {"flight_id": "FL1", "airline": "Emirates", "from": "New York", "from_country": "USA", "to": "Dubai", "to_country": "UAE", "price_usd": 800, "refundable": True, "wifi_available": True, "layovers": []},
+    {"flight_id": "FL2", "airline": "Qatar Airways", "from": "New York", "from_country": "USA", "to": "Dubai", "to_country": "UAE", "price_usd": 1200, "refundable": False, "wifi_available": True, "layovers": [{"city": "Doha"}]},
+    {"flight_id": "FL3", "airline": "Japan Airlines", "from": "London", "from_country": "UK", "to": "Tokyo", "to_country": "Japan", "price_usd": 950, "refundable": True, "wifi_available": False, "layovers": []},
+]
+
+@pytest.fixture
+def catalogue():
+    catalogue=FacetCatalogue("flights")
+    catalogue.add_records(FLIGHTS)
+    return catalogue
+
+def test_extract_refinement_filters(catalogue):
+    filters=extract_refinement_filters("only refundable direct Emirates flights under $1,000 to Dubai", catalogue)
+    assert filters=={"refundable": True, "max_price": 1000, "max_layovers": 0, "airline": "Emirates", "to_country": "UAE"}
+
+def test_extract_refinement_filters_negations(catalogue):
+    filters=extract_refinement_filters("non-refundable ones without wifi over 900", catalogue)
+    assert filters=={"refundable": False, "wifi_available": False, "min_price": 900}
+
+@pytest.mark.parametrize("query", [
+    "only the refundable ones",
+    "what about direct flights under $900",
+    "sort them by the earliest departure",
+    "which of those have wifi",
+    "show me the ones to Tokyo",
+])
+def test_refinements(catalogue, query):
+    assert is_refinement(query, catalogue, {"to_country": "UAE"})
+
+@pytest.mark.parametrize("query", [
+    "show me flights to Tokyo",
+    "any flights from London",
+    "now flights to japan",
+    "what is the visa policy for Japan",
+])
+def test_new_searches_are_not_refinements(catalogue, query):
+    assert not is_refinement(query, catalogue, {"to_country": "UAE"})
+
+def test_same_destination_is_a_refinement(catalogue):
+    assert is_refinement("what about flights to Dubai under $1000", catalogue, {"to_country": "UAE"})
+
+def test_new_place_without_catalogue():
+    assert not is_refinement("show me flights to Tokyo")
+    assert is_refinement("show me the cheaper ones")
+
+def test_satisfies_refinement_requires_every_constraint():
+    metadata=FLIGHTS[1]
+    assert satisfies_refinement(metadata, {"airline": "Qatar Airways", "wifi_available": True})
+    assert not satisfies_refinement(metadata, {"airline": "Qatar Airways", "refundable": True})
+    assert not satisfies_refinement(metadata, {"max_layovers": 0})
+    assert satisfies_refinement(metadata, {})
+
+def test_satisfies_refinement_ignores_filter_match_mode(monkeypatch):
+    import filters
+    monkeypatch.setattr(filters, "FILTER_MATCH_MODE", "should")
+    assert not satisfies_refinement(FLIGHTS[1], {"airline": "Qatar Airways", "refundable": True})
+
+def test_refine_documents_filters_and_sorts():
+    documents=[Document(page_content=flight["flight_id"], metadata=flight) for flight in FLIGHTS]
+    refined=refine_documents(documents, {"refundable": True}, "price")
+    assert [document.page_content for document in refined]==["FL1", "FL3"]
+
+#   A refinement that leaves no candidates searches again for the stored session query with the merged filters.
+
+def test_empty_refinement_searches_the_session_query_again(catalogue, monkeypatch):
+    import asyncio
+    import graph
+    searches=[]
+
+    async def initialize_components():
+        pass
+
+    async def get_facet_catalogue(client, collection_name):
+        return catalogue
+
+    async def search_flights(client, collection_name, query, filters, limit):
+        searches.append((query, filters))
+        return [Document(page_content="FL3", metadata=FLIGHTS[2])], "price"
+
+    monkeypatch.setattr(graph, "initialize_components", initialize_components)
+    monkeypatch.setattr("facets.get_facet_catalogue", get_facet_catalogue)
+    monkeypatch.setattr("flight_index.search_flights", search_flights)
+    state={
+        "query": "only under $500",
+        "collection_name": "flights",
+        "filters": {"to_country": "UAE"},
+        "session_query": "flights to Dubai",
+        "candidate_docs": [Document(page_content=flight["flight_id"], metadata=flight) for flight in FLIGHTS[:2]]
+    }
+    command=asyncio.run(graph.refine_candidates(state))
+    assert command.goto=="flight_index_search"
+    state.update(command.update)
+    assert state["filters"]=={"to_country": "UAE", "max_price": 500}
+    asyncio.run(graph.flight_index_search(state))
+    assert searches==[("flights to Dubai; only under $500", {"to_country": "UAE", "max_price": 500})]
+
+#   Expired and least recently used sessions are deleted from the checkpointer.
+
+def test_sessions_are_pruned_by_age_and_count(tmp_path, monkeypatch):
+    import asyncio
+    import sessions
+    monkeypatch.setattr(sessions, "SESSION_DB_PATH", str(tmp_path/"sessions.sqlite"))
+    monkeypatch.setattr(sessions, "SESSION_TTL_SECONDS", 200)
+    monkeypatch.setattr(sessions, "SESSION_MAX_SESSIONS", 2)
+    monkeypatch.setattr(sessions, "SESSION_PRUNE_SECONDS", 3600)
+    clock=[1000.0]
+    monkeypatch.setattr(sessions.time, "time", lambda: clock[0])
+
+    async def main():
+        checkpointer=await sessions.get_checkpointer()
+        connection=sessions._checkpointer_connection
+        for session_id in ("old", "a", "b", "c"):
+            await connection.execute("INSERT INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id) VALUES (?, '', '1')", (session_id,))
+            await sessions.touch_session(session_id)
+            clock[0]+=60
+        deleted=await sessions.prune_sessions()
+        cursor=await connection.execute("SELECT DISTINCT thread_id FROM checkpoints ORDER BY thread_id")
+        remaining=[row[0] for row in await cursor.fetchall()]
+        await sessions.close_checkpointer()
+        return deleted, remaining
+
+    try:
+        assert asyncio.run(main())==(2, ["b", "c"])
+    finally:
+        sessions._pruned_at=0.0
@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+from qdrant_client import (
+    QdrantClient,
+    models
+)
+import vector_mirror
+from vector_mirror import (
+    encode_column,
+    column_mask,
+    get_mirror,
+    mirror_search,
+    bump_collection_version,
+    reset_mirrors
+)
+from filters import build_qdrant_filter
+
+FLIGHTS=[
+    ([1.0, 0.0, 0.0], {"airline": "Emirates", "to_country": "UAE", "price_usd": 800, "refundable": True, "layovers": [], "availability": 5, "departure_date": "2025-10-03T08:00:00"}),
+    ([0.9, 0.1, 0.0], {"airline": "Qatar Airways", "to_country": "UAE", "price_usd": 2400, "refundable": False, "layovers": [{"city": "Doha"}], "availability": 0, "departure_date": "2025-10-01T08:00:00"}),
+    ([0.2, 1.0, 0.0], {"airline": "Emirates", "to_country": "Japan", "price_usd": 3100, "refundable": True, "layovers": [], "availability": 9, "departure_date": "2025-10-02T08:00:00"}),
+    ([0.0, 0.3, 1.0], {"airline": "Lufthansa", "to_country": "Germany", "price_usd": 950, "layovers": [{"city": "Frankfurt"}], "availability": 2, "departure_date": "2025-10-04T08:00:00"}),
+]
+
+def upsert(client, flights, start=0):
+    client.upsert("flights", [
+        models.PointStruct(id=index, vector=vector, payload={"page_content": metadata["airline"], "metadata": dict(metadata, content_hash=str(metadata["price_usd"]))})
+        for index, (vector, metadata) in enumerate(flights, start=start)
+    ])
+
+@pytest.fixture
+def qdrant():
+    reset_mirrors()
+    client=QdrantClient(":memory:")
+    client.create_collection("flights", vectors_config=models.VectorParams(size=3, distance=models.Distance.COSINE))
+    upsert(client, FLIGHTS)
+    yield client
+    client.close()
+    reset_mirrors()
+
+def search(client, query_vector, k, filters=None):
+    return asyncio.run(mirror_search(client, "flights", query_vector, k, filters))
+
+def qdrant_ids(client, query_vector, k, filters=None):
+    points=client.query_points("flights", query=query_vector, limit=k, query_filter=build_qdrant_filter(filters or {})).points
+    return [point.id for point in points]
+
+def test_column_mask_per_kind():
+    assert column_mask(encode_column(["a", None, "b"]), "match", "b").tolist()==[False, False, True]
+    assert column_mask(encode_column(["a", None]), "match", "c").tolist()==[False, False]
+    assert column_mask(encode_column([1.0, None, 3.0]), "lte", 2).tolist()==[True, False, False]
+    assert column_mask(encode_column([True, None, False]), "match", False).tolist()==[False, False, True]
+    assert column_mask(encode_column(["a", "b"]), "gte", 1).tolist()==[False, False]
+
+@pytest.mark.parametrize("filters", [
+    None,
+    {"airline": "Emirates"},
+    {"max_price": 1000},
+    {"airline": "Emirates", "to_country": "Germany"},
+    {"refundable": False, "min_price": 900},
+    {"max_layovers": 0, "airline": "Lufthansa", "to_country": "Japan"},
+    {"departure_after": "2025-10-02", "min_availability": 1},
+    {"airline": "Air France"},
+])
+def test_search_matches_qdrant(qdrant, filters):
+    query_vector=[1.0, 0.2, 0.1]
+    documents=search(qdrant, query_vector, 3, filters)
+    assert [document.metadata["_id"] for document in documents]==qdrant_ids(qdrant, query_vector, 3, filters)
+
+def test_documents_carry_content_and_metadata(qdrant):
+    document=search(qdrant, [0.0, 0.3, 1.0], 1)[0]
+    assert document.page_content=="Lufthansa"
+    assert document.metadata["_collection_name"]=="flights" and document.metadata["to_country"]=="Germany"
+
+def test_bad_filter_values_fall_back_to_qdrant(qdrant):
+    assert search(qdrant, [1.0, 0.0, 0.0], 2, {"max_price": "cheap"}) is None
+
+def test_version_bump_rebuilds_the_mirror(qdrant):
+    mirror=asyncio.run(get_mirror(qdrant, "flights"))
+    assert asyncio.run(get_mirror(qdrant, "flights")) is mirror
+    upsert(qdrant, FLIGHTS[:1], start=len(FLIGHTS))
+    bump_collection_version("flights")
+    rebuilt=asyncio.run(get_mirror(qdrant, "flights"))
+    assert rebuilt is not mirror and rebuilt.point_count==len(FLIGHTS)+1
+
+def test_changes_from_other_workers_are_seen_after_the_refresh_interval(qdrant, monkeypatch):
+    mirror=asyncio.run(get_mirror(qdrant, "flights"))
+    vector, metadata=FLIGHTS[0]
+    upsert(qdrant, [(vector, dict(metadata, price_usd=500))])  #   Same point count, changed content.
+    assert asyncio.run(get_mirror(qdrant, "flights")) is mirror
+    monkeypatch.setattr(vector_mirror, "VECTOR_MIRROR_REFRESH_SECONDS", 0)
+    assert search(qdrant, vector, 1)[0].metadata["price_usd"]==500
+
+def test_unchanged_collection_is_revalidated_in_place(qdrant, monkeypatch):
+    mirror=asyncio.run(get_mirror(qdrant, "flights"))
+    monkeypatch.setattr(vector_mirror, "VECTOR_MIRROR_REFRESH_SECONDS", 0)
+    assert asyncio.run(get_mirror(qdrant, "flights")) is mirror
+
+def test_oversized_collections_stay_on_qdrant(qdrant, monkeypatch):
+    monkeypatch.setattr(vector_mirror, "VECTOR_MIRROR_MAX_POINTS", 2)
+    assert search(qdrant, [1.0, 0.0, 0.0], 2) is None